@@ -50,11 +50,13 @@ Overview of Services
     aioxmpp.DiscoClient
     aioxmpp.DiscoServer
     aioxmpp.EntityCapsService
+    aioxmpp.HTTPUploadClient
     aioxmpp.MUCClient
     aioxmpp.PingService
     aioxmpp.PresenceClient
     aioxmpp.PresenceServer
     aioxmpp.PEPClient
+    aioxmpp.ReceiptAggregator
     aioxmpp.RosterClient
     aioxmpp.VersionServer
 
@@ -138,9 +140,13 @@ from .ping import PingService  # NOQA: F401
 from .pep import PEPClient  # NOQA: F401
 from .bookmarks import BookmarkClient  # NOQA: F401
 from .version import VersionServer  # NOQA: F401
-from .mdr import DeliveryReceiptsService  # NOQA: F401
+from .mdr import (  # NOQA: F401
+    DeliveryReceiptsService,
+    ReceiptAggregator,
+)
 
 from . import httpupload  # NOQA: F401
+from .httpupload import HTTPUploadClient  # NOQA: F401
 
 
 def set_strict_mode():
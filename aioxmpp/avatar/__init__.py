@@ -51,6 +51,10 @@ avatar image:
 
 .. autoclass:: AvatarSet
 
+The image data of avatars is cached in a content-addressed store:
+
+.. autoclass:: AvatarImageCache
+
 .. module:: aioxmpp.avatar.service
 .. currentmodule:: aioxmpp.avatar.service
 .. autoclass:: AbstractAvatarDescriptor()
@@ -88,4 +92,4 @@ handle it in the application:
 """
 
 from .service import (AvatarSet, AvatarService,  # NOQA: F401
-                      normalize_id)
+                      AvatarImageCache, normalize_id)
@@ -20,8 +20,11 @@
 #
 ########################################################################
 import asyncio
+import collections
 import hashlib
 import logging
+import os
+import tempfile
 import warnings
 
 import aioxmpp
@@ -34,7 +37,7 @@ import aioxmpp.pubsub as pubsub
 import aioxmpp.vcard as vcard
 
 from aioxmpp.cache import LRUDict
-from aioxmpp.utils import namespaces, gather_reraise_multi
+from aioxmpp.utils import namespaces, gather_reraise_multi, mkdir_exist_ok
 
 from . import xso as avatar_xso
 
@@ -183,6 +186,268 @@ class AvatarSet:
         )
 
 
+def _scan_image_dir(path):
+    mkdir_exist_ok(path)
+    entries = []
+    for entry in os.scandir(str(path)):
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        stat = entry.stat()
+        entries.append((stat.st_mtime, entry.name, stat.st_size))
+    entries.sort()
+    return [(name, size) for _, name, size in entries]
+
+
+def _read_image_file(path):
+    with path.open("rb") as f:
+        return f.read()
+
+
+def _write_image_file(path, data):
+    with tempfile.NamedTemporaryFile(dir=str(path.parent),
+                                     prefix=".",
+                                     delete=False) as tmpf:
+        try:
+            tmpf.write(data)
+        except:  # NOQA
+            os.unlink(tmpf.name)
+            raise
+    os.replace(tmpf.name, str(path))
+
+
+def _unlink_image_files(paths):
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class AvatarImageCache:
+    """
+    Content-addressed store for avatar image data.
+
+    The image data is keyed by the normalized SHA1 avatar id (see
+    :func:`normalize_id`). As the id is derived from the data, entities which
+    use the same avatar share a single cache entry, and all requests for the
+    same id are served by a single fetch.
+
+    The cache has a memory tier, which is bounded by :attr:`memory_limit`,
+    and an optional disk tier, which is bounded by :attr:`disk_limit` and
+    enabled with :meth:`load_disk_tier`. Both tiers evict the least recently
+    used entries first. File system access happens in a thread pool.
+
+    Data is only stored in the cache if its SHA1 hash matches the id. Data
+    read from the disk tier is checked again; a file which does not match is
+    removed and the data is fetched anew.
+
+    .. versionadded:: 0.14
+
+    .. automethod:: get_image_bytes
+
+    .. automethod:: load_disk_tier
+
+    .. autoattribute:: memory_limit
+       :annotation: = 4 MiB
+
+    .. autoattribute:: disk_limit
+       :annotation: = 64 MiB
+
+    .. automethod:: clear_memory
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._memory = collections.OrderedDict()
+        self._memory_size = 0
+        self._memory_limit = 4 * 1024 * 1024
+        self._disk_path = None
+        self._disk = collections.OrderedDict()
+        self._disk_size = 0
+        self._disk_limit = 64 * 1024 * 1024
+        self._pending = {}
+
+    @property
+    def memory_limit(self):
+        """
+        Maximum number of bytes of image data held in memory.
+        """
+        return self._memory_limit
+
+    @memory_limit.setter
+    def memory_limit(self, value):
+        if value < 0:
+            raise ValueError("memory_limit must be non-negative")
+        self._memory_limit = value
+        self._purge_memory()
+
+    @property
+    def disk_limit(self):
+        """
+        Maximum number of bytes of image data stored on disk.
+        """
+        return self._disk_limit
+
+    @disk_limit.setter
+    def disk_limit(self, value):
+        if value < 0:
+            raise ValueError("disk_limit must be non-negative")
+        self._disk_limit = value
+        self._purge_disk()
+
+    def _purge_memory(self):
+        while self._memory_size > self._memory_limit:
+            _, data = self._memory.popitem(last=False)
+            self._memory_size -= len(data)
+
+    def _purge_disk(self):
+        evicted = []
+        while self._disk_size > self._disk_limit:
+            id_, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(self._disk_path / id_)
+        if evicted:
+            asyncio.get_event_loop().run_in_executor(
+                None,
+                _unlink_image_files,
+                evicted,
+            )
+
+    def _store_memory(self, id_, data):
+        if len(data) > self._memory_limit:
+            return
+        old = self._memory.pop(id_, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[id_] = data
+        self._memory_size += len(data)
+        self._purge_memory()
+
+    async def load_disk_tier(self, path):
+        """
+        Use a directory as disk tier of the cache.
+
+        :param path: Path to the directory.
+        :type path: :class:`pathlib.Path`
+
+        The directory is created if it does not exist. Files which are
+        already in the directory are indexed (in a thread pool) and served
+        from the cache; the least recently modified files are evicted first
+        if :attr:`disk_limit` is exceeded.
+        """
+        entries = await asyncio.get_event_loop().run_in_executor(
+            None,
+            _scan_image_dir,
+            path,
+        )
+        self._disk_path = path
+        self._disk.clear()
+        self._disk_size = 0
+        for id_, size in entries:
+            self._disk[id_] = size
+            self._disk_size += size
+        self._purge_disk()
+
+    def clear_memory(self):
+        """
+        Drop all image data from the memory tier.
+        """
+        self._memory.clear()
+        self._memory_size = 0
+
+    async def _load(self, id_, fetch):
+        loop = asyncio.get_event_loop()
+
+        if id_ in self._disk:
+            self._disk.move_to_end(id_)
+            try:
+                data = await loop.run_in_executor(
+                    None,
+                    _read_image_file,
+                    self._disk_path / id_,
+                )
+            except OSError as exc:
+                logger.debug("failed to read cached avatar %s: %s", id_, exc)
+                self._disk_size -= self._disk.pop(id_, 0)
+            else:
+                if hashlib.sha1(data).hexdigest() == id_:
+                    self._store_memory(id_, data)
+                    return data
+                logger.warning("cached avatar data does not match id %s, "
+                               "dropping file", id_)
+                self._disk_size -= self._disk.pop(id_, 0)
+                await loop.run_in_executor(
+                    None,
+                    _unlink_image_files,
+                    [self._disk_path / id_],
+                )
+
+        data = await fetch()
+
+        if hashlib.sha1(data).hexdigest() != id_:
+            logger.warning("avatar data does not match id %s, not caching",
+                           id_)
+            return data
+
+        self._store_memory(id_, data)
+
+        if (self._disk_path is not None and
+                len(data) <= self._disk_limit and
+                id_ not in self._disk):
+            try:
+                await loop.run_in_executor(
+                    None,
+                    _write_image_file,
+                    self._disk_path / id_,
+                    data,
+                )
+            except OSError as exc:
+                logger.debug("failed to write cached avatar %s: %s",
+                             id_, exc)
+            else:
+                self._disk[id_] = len(data)
+                self._disk_size += len(data)
+                self._purge_disk()
+
+        return data
+
+    async def get_image_bytes(self, id_, fetch):
+        """
+        Return the image data for an avatar id.
+
+        :param id_: The avatar id.
+        :type id_: :class:`str`
+        :param fetch: Coroutine function to retrieve the data on a miss.
+        :return: The image data.
+        :rtype: :class:`bytes`
+
+        If the data is neither in the memory nor in the disk tier, `fetch` is
+        called without arguments to retrieve it. Concurrent calls for the same
+        `id_` share a single call to `fetch`; exceptions raised by `fetch` are
+        propagated to all of them and not cached.
+        """
+        id_ = normalize_id(id_)
+
+        try:
+            data = self._memory[id_]
+        except KeyError:
+            pass
+        else:
+            self._memory.move_to_end(id_)
+            return data
+
+        try:
+            task = self._pending[id_]
+        except KeyError:
+            task = asyncio.ensure_future(self._load(id_, fetch))
+            self._pending[id_] = task
+            task.add_done_callback(
+                lambda fut: self._pending.pop(id_, None)
+            )
+
+        return await asyncio.shield(task)
+
+
 class AbstractAvatarDescriptor:
     """
     Description of the properties of and how to retrieve a specific
@@ -223,7 +488,9 @@ class AbstractAvatarDescriptor:
     """
 
     def __init__(self, remote_jid, id_, *, mime_type=None,
-                 nbytes=None, width=None, height=None, url=None):
+                 nbytes=None, width=None, height=None, url=None,
+                 image_cache=None):
+        self._image_cache = image_cache
         self._remote_jid = remote_jid
         self._mime_type = mime_type
         self._id = id_
@@ -259,9 +526,20 @@ class AbstractAvatarDescriptor:
 
         :raises aiomxpp.XMPPCancelError: if trying to retrieve the
             image data causes an XMPP error.
+
+        .. versionchanged:: 0.14
+
+            If the descriptor was obtained from an :class:`AvatarService`,
+            the image data is served from and stored in its
+            :attr:`~AvatarService.image_cache`.
         """
         raise NotImplementedError
 
+    async def _get_image_bytes_cached(self, fetch):
+        if self._image_cache is None:
+            return await fetch()
+        return await self._image_cache.get_image_bytes(self._id, fetch)
+
     @property
     def can_get_image_bytes_via_xmpp(self):
         """
@@ -377,6 +655,9 @@ class PubsubAvatarDescriptor(AbstractAvatarDescriptor):
         return True
 
     async def get_image_bytes(self):
+        return await self._get_image_bytes_cached(self._fetch_image_bytes)
+
+    async def _fetch_image_bytes(self):
         image_data = await self._pubsub.get_items_by_id(
             self._remote_jid,
             namespaces.xep0084_data,
@@ -421,8 +702,14 @@ class VCardAvatarDescriptor(AbstractAvatarDescriptor):
         if self._image_bytes is not None:
             return self._image_bytes
 
+        return await self._get_image_bytes_cached(self._fetch_image_bytes)
+
+    async def _fetch_image_bytes(self):
         logger.debug("retrieving vCard %s", self._remote_jid)
-        vcard = await self._vcard.get_vcard(self._remote_jid)
+        vcard = await self._vcard.get_vcard(
+            self._remote_jid,
+            photo_hash=self._id,
+        )
         photo = vcard.get_photo_data()
         if photo is None:
             raise RuntimeError("Avatar image is not set")
@@ -446,8 +733,10 @@ class AvatarService(service.Service):
 
     Observing avatars:
 
-    .. note:: :class:`AvatarService` only caches the metadata, not the
-              actual image data. This is the job of the caller.
+    .. note:: The image data retrieved via
+              :meth:`~.AbstractAvatarDescriptor.get_image_bytes` of the
+              descriptors returned by this service is cached in the
+              :attr:`image_cache`.
 
     .. signal:: on_metadata_changed(jid, metadata)
 
@@ -487,6 +776,8 @@ class AvatarService(service.Service):
 
     .. autoattribute:: metadata_cache_size
        :annotation: = 200
+
+    .. autoattribute:: image_cache
     """
 
     ORDER_AFTER = [
@@ -511,6 +802,7 @@ class AvatarService(service.Service):
         self._has_pep_avatar = set()
         self._metadata_cache = LRUDict()
         self._metadata_cache.maxsize = 200
+        self._image_cache = AvatarImageCache()
         self._pubsub = self.dependencies[pubsub.PubSubClient]
         self._pep = self.dependencies[pep.PEPClient]
         self._presence_server = self.dependencies[presence.PresenceServer]
@@ -547,6 +839,27 @@ class AvatarService(service.Service):
     def metadata_cache_size(self, value):
         self._metadata_cache.maxsize = value
 
+    @property
+    def image_cache(self):
+        """
+        The :class:`~.avatar.AvatarImageCache` used for the image data of
+        the avatars.
+
+        The attribute can be set to share a single cache among multiple
+        :class:`AvatarService` instances. Deleting it creates a new cache.
+
+        .. versionadded:: 0.14
+        """
+        return self._image_cache
+
+    @image_cache.setter
+    def image_cache(self, value):
+        self._image_cache = value
+
+    @image_cache.deleter
+    def image_cache(self):
+        self._image_cache = AvatarImageCache()
+
     @property
     def synchronize_vcard(self):
         """
@@ -679,7 +992,7 @@ class AvatarService(service.Service):
         self._presence_server.resend_presence()
 
         self._vcard_rehash_task = asyncio.ensure_future(
-            self._calculate_vcard_id()
+            self._calculate_vcard_id(self._vcard_rehashing_for)
         )
 
         def set_new_vcard_id(fut):
@@ -691,9 +1004,11 @@ class AvatarService(service.Service):
             set_new_vcard_id
         )
 
-    async def _calculate_vcard_id(self):
+    async def _calculate_vcard_id(self, photo_hash=None):
         self.logger.debug("updating vcard hash")
-        vcard = await self._vcard.get_vcard()
+        # if another resource advertised a hash, the vCard service can
+        # answer from its cache if our last copy of the vCard matches
+        vcard = await self._vcard.get_vcard(photo_hash=photo_hash)
         self.logger.debug("got vcard for hash update: %s", vcard)
         photo = vcard.get_photo_data()
 
@@ -742,6 +1057,7 @@ class AvatarService(service.Service):
                     mime_type=None,
                     vcard=self._vcard,
                     nbytes=None,
+                    image_cache=self._image_cache,
                 )
             )
         return result
@@ -772,6 +1088,7 @@ class AvatarService(service.Service):
                     width=info_node.width,
                     height=info_node.height,
                     pubsub=self._pubsub,
+                    image_cache=self._image_cache,
                 )
             result.append(descriptor)
 
@@ -803,6 +1120,7 @@ class AvatarService(service.Service):
             nbytes=len(photo),
             vcard=self._vcard,
             image_bytes=photo,
+            image_cache=self._image_cache,
         )]
 
     async def _get_avatar_metadata_pep(self, jid):
@@ -23,12 +23,18 @@ import asyncio
 import collections
 import contextlib
 import importlib
+import json
 import math
 import functools
 import time
 import os
 
-from nose.plugins import Plugin
+try:
+    from nose.plugins import Plugin
+except ImportError:
+    # nose is only needed for python -m aioxmpp.benchtest; the benchmarks
+    # can also be run with pytest
+    Plugin = object
 
 
 def scaleinfo(n, significant_digits=None):
@@ -132,6 +138,12 @@ class Accumulator:
     def total_runs(self):
         return len(self.items)
 
+    def percentile(self, p):
+        # nearest-rank method
+        items = sorted(self.items)
+        rank = max(1, math.ceil(p / 100 * len(items)))
+        return items[rank - 1]
+
     def infodict(self):
         return {
             "nsamples": self.total_runs,
@@ -140,6 +152,9 @@ class Accumulator:
             "stddev": self.stddev,
             "min": self.min,
             "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
         }
 
     @property
@@ -223,6 +238,149 @@ def times(n, pass_iteration=False):
     return decorator
 
 
+def print_report(stream, registry=None):
+    """
+    Print a table of the recorded benchmark results to `stream`.
+    """
+    if registry is None:
+        registry = _registry
+
+    table = []
+    for key, info in sorted(registry.items(), key=lambda x: x[0]):
+        if not info.total_runs:
+            continue
+        table.append(
+            (
+                ".".join(key[:2]),
+                "/".join(key[2:]),
+                info.total_runs,
+                info.structured_avg,
+            ),
+        )
+
+    if not table:
+        return
+
+    table.sort()
+    c12len = max(len(c1)+len(c2)+2 for c1, c2, *_ in table)
+    c12fmt = "{{:<{}s}}".format(c12len)
+    c3len = max(math.floor(math.log10(v)) + 1
+                for _, _, v, *_ in table)
+    c3fmt = "{{:>{}d}}".format(c3len)
+    c4lhs = max(lhs for _, _, _, (_, _, (lhs, _), _, _) in table)
+    c4rhs = max(rhs for _, _, _, (_, _, (_, rhs), _, _) in table)
+    for c1, c2, c3, (v, round_to, (lhs, rhs), prefix, unit) in table:
+        c4numberfmt = "{{:{}.{}f}}".format(
+            lhs+rhs+1,
+            rhs
+        )
+        if rhs == 0:
+            lhs += 1
+        c4num = "".join([
+            " "*(c4lhs-lhs),
+            c4numberfmt.format(v),
+            "." if rhs == 0 else "",
+            " "*(c4rhs-rhs)
+        ])
+
+        print(
+            c12fmt.format("{}  {}".format(c1, c2)),
+            c3fmt.format(c3),
+            "{} {}{}".format(
+                c4num,
+                prefix or " ",
+                unit,
+            ),
+            sep="  ",
+            file=stream
+        )
+
+
+def dump_results(f, registry=None):
+    """
+    Write the recorded benchmark results as JSON to the text file `f`.
+
+    The document contains a list of objects, one per key, with the key as
+    list of strings, the unit and the statistics of the samples.
+    """
+    results = [
+        result
+        for _, result in sorted(current_results(registry).items())
+    ]
+    json.dump({"version": 1, "results": results}, f, indent=2)
+
+
+def load_results(f):
+    """
+    Load benchmark results written by :func:`dump_results`.
+
+    :return: Mapping of key tuples to the result objects.
+    """
+    data = json.load(f)
+    return {
+        tuple(result["key"]): result
+        for result in data["results"]
+    }
+
+
+def is_rate_unit(unit):
+    """
+    Return whether larger values are better for `unit`.
+
+    Units of the form ``things/s`` are rates; for all other units (most
+    notably durations in seconds), smaller values are better.
+    """
+    return unit is not None and unit.endswith("/s")
+
+
+def compare_results(baseline, current, tolerance=0.1):
+    """
+    Compare benchmark results against a baseline.
+
+    :param baseline: Baseline results as returned by :func:`load_results`.
+    :param current: Current results in the same format.
+    :param tolerance: Relative change of the average which is tolerated.
+    :return: List of regressions as tuples of key, baseline average, current
+        average and relative change (positive means worse).
+
+    Keys which only occur in one of the two result sets are ignored.
+    """
+    regressions = []
+    for key, result in sorted(current.items()):
+        try:
+            base = baseline[key]
+        except KeyError:
+            continue
+        if base["unit"] != result["unit"] or not base["avg"]:
+            continue
+
+        change = (result["avg"] - base["avg"]) / base["avg"]
+        if is_rate_unit(result["unit"]):
+            change = -change
+        if change > tolerance:
+            regressions.append((key, base["avg"], result["avg"], change))
+    return regressions
+
+
+def current_results(registry=None):
+    """
+    Return the recorded benchmark results in the format of
+    :func:`load_results`.
+    """
+    if registry is None:
+        registry = _registry
+
+    result = {}
+    for key, info in registry.items():
+        if not info.total_runs:
+            continue
+        item = info.infodict()
+        item["key"] = list(key)
+        item["unit"] = info.unit
+        result[key] = item
+    return result
+
+
 class BenchmarkPlugin(Plugin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -255,53 +413,11 @@ class BenchmarkPlugin(Plugin):
 
     def report(self, stream):
         data = {}
-        table = []
-        for key, info in sorted(_registry.items(), key=lambda x: x[0]):
-            if not info.total_runs:
-                continue
-            table.append(
-                (
-                    ".".join(key[:2]),
-                    "/".join(key[2:]),
-                    info.total_runs,
-                    info.structured_avg,
-                ),
-            )
-            data[key] = info.infodict()
-
-        table.sort()
-        c12len = max(len(c1)+len(c2)+2 for c1, c2, *_ in table)
-        c12fmt = "{{:<{}s}}".format(c12len)
-        c3len = max(math.floor(math.log10(v)) + 1
-                    for _, _, v, *_ in table)
-        c3fmt = "{{:>{}d}}".format(c3len)
-        c4lhs = max(lhs for _, _, _, (_, _, (lhs, _), _, _) in table)
-        c4rhs = max(rhs for _, _, _, (_, _, (_, rhs), _, _) in table)
-        for c1, c2, c3, (v, round_to, (lhs, rhs), prefix, unit) in table:
-            c4numberfmt = "{{:{}.{}f}}".format(
-                lhs+rhs+1,
-                rhs
-            )
-            if rhs == 0:
-                lhs += 1
-            c4num = "".join([
-                " "*(c4lhs-lhs),
-                c4numberfmt.format(v),
-                "." if rhs == 0 else "",
-                " "*(c4rhs-rhs)
-            ])
-
-            print(
-                c12fmt.format("{}  {}".format(c1, c2)),
-                c3fmt.format(c3),
-                "{} {}{}".format(
-                    c4num,
-                    prefix or " ",
-                    unit,
-                ),
-                sep="  ",
-                file=stream
-            )
+        for key, info in _registry.items():
+            if info.total_runs:
+                data[key] = info.infodict()
+
+        print_report(stream)
 
         if self.report_filename is not None:
             with open(self.report_filename, "w") as f:
@@ -0,0 +1,562 @@
+########################################################################
+# File name: server.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+"""
+Minimal in-process XMPP server for end-to-end benchmarks.
+
+The server implements just enough of RFC 6120 and a few extensions to drive
+a real :class:`aioxmpp.Client` through the full network stack: STARTTLS (with
+a throw-away self-signed certificate), SASL PLAIN (any password is accepted),
+resource binding, :xep:`198` Stream Management including resumption, routing
+between local sessions, an echo component and a rudimentary :xep:`45` service.
+
+It is **not** a conforming server and must not be used for anything but
+testing.
+"""
+import asyncio
+import base64
+import collections
+import itertools
+import os
+import ssl
+import tempfile
+
+import lxml.etree as etree
+
+import OpenSSL.crypto
+
+import aioxmpp
+import aioxmpp.security_layer
+
+from datetime import timedelta
+
+from aioxmpp.utils import namespaces
+
+
+_STREAM_HEADER = (
+    "<?xml version='1.0'?>"
+    "<stream:stream xmlns='jabber:client' "
+    "xmlns:stream='http://etherx.jabber.org/streams' "
+    "from='{domain}' id='{id_}' version='1.0'>"
+)
+
+_SASL_NS = namespaces.sasl
+_TLS_NS = namespaces.starttls
+_BIND_NS = namespaces.rfc6120_bind
+_SM_NS = namespaces.stream_management
+_MUC_USER_NS = "http://jabber.org/protocol/muc#user"
+
+_STANZA_TAGS = frozenset(
+    "{{{}}}{}".format(namespaces.client, name)
+    for name in ["message", "presence", "iq"]
+)
+
+
+def _make_ssl_context(domain):
+    key = OpenSSL.crypto.PKey()
+    key.generate_key(OpenSSL.crypto.TYPE_RSA, 2048)
+
+    cert = OpenSSL.crypto.X509()
+    cert.get_subject().CN = domain
+    cert.set_serial_number(1)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(86400)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, "sha256")
+
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        certfile = os.path.join(tmpdir, "cert.pem")
+        keyfile = os.path.join(tmpdir, "key.pem")
+        with open(certfile, "wb") as f:
+            f.write(OpenSSL.crypto.dump_certificate(
+                OpenSSL.crypto.FILETYPE_PEM, cert
+            ))
+        with open(keyfile, "wb") as f:
+            f.write(OpenSSL.crypto.dump_privatekey(
+                OpenSSL.crypto.FILETYPE_PEM, key
+            ))
+        ctx.load_cert_chain(certfile, keyfile)
+    return ctx
+
+
+class _SMSession:
+    def __init__(self, id_, jid):
+        super().__init__()
+        self.id_ = id_
+        self.jid = jid
+        self.inbound = 0
+        self.outbound = 0
+        self.unacked = collections.deque()
+        self.connection = None
+
+
+class _Connection(asyncio.Protocol):
+    REQUEST_INTERVAL = 64
+
+    def __init__(self, server):
+        super().__init__()
+        self._server = server
+        self._transport = None
+        self._parser = None
+        self._depth = 0
+        self._authenticated = False
+        self._tls = False
+        self._localpart = None
+        self.jid = None
+        self.sm = None
+
+    # transport handling
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._reset_parser()
+
+    def connection_lost(self, exc):
+        self._server._connection_lost(self)
+
+    def data_received(self, data):
+        parser = self._parser
+        parser.feed(data)
+        for ev, elem in parser.read_events():
+            if ev == "start":
+                self._depth += 1
+                if self._depth == 1:
+                    self._stream_started()
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._stream_ended()
+                    return
+                if self._depth == 1:
+                    elem.getparent().remove(elem)
+                    self._element_received(elem)
+                    if self._parser is not parser:
+                        # stream restart
+                        return
+
+    def _reset_parser(self):
+        self._parser = etree.XMLPullParser(events=("start", "end"))
+        self._depth = 0
+
+    def _write(self, data):
+        if self._transport is not None:
+            self._transport.write(data.encode("utf-8")
+                                  if isinstance(data, str) else data)
+
+    def abort(self):
+        if self._transport is not None:
+            self._transport.abort()
+            self._transport = None
+
+    # stream level
+
+    def _stream_started(self):
+        self._write(_STREAM_HEADER.format(
+            domain=self._server.domain,
+            id_=self._server._next_id(),
+        ))
+        if not self._tls:
+            features = (
+                "<starttls xmlns='{}'><required/></starttls>".format(_TLS_NS)
+            )
+        elif not self._authenticated:
+            features = (
+                "<mechanisms xmlns='{}'>"
+                "<mechanism>PLAIN</mechanism>"
+                "</mechanisms>".format(_SASL_NS)
+            )
+        else:
+            features = "<bind xmlns='{}'/><sm xmlns='{}'/>".format(
+                _BIND_NS, _SM_NS,
+            )
+        self._write("<stream:features>{}</stream:features>".format(features))
+
+    def _stream_ended(self):
+        self._write("</stream:stream>")
+        if self.sm is not None:
+            self._server._sm_sessions.pop(self.sm.id_, None)
+            self.sm = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _element_received(self, elem):
+        tag = elem.tag
+        if tag in _STANZA_TAGS:
+            if self.sm is not None:
+                self.sm.inbound += 1
+            if tag.endswith("}iq") and self.jid is None:
+                self._bind(elem)
+            else:
+                elem.set("from", str(self.jid))
+                self._server._route(elem)
+        elif tag == "{{{}}}r".format(_SM_NS):
+            self._write("<a xmlns='{}' h='{}'/>".format(
+                _SM_NS, self.sm.inbound,
+            ))
+        elif tag == "{{{}}}a".format(_SM_NS):
+            self._acked(int(elem.get("h")))
+        elif tag == "{{{}}}starttls".format(_TLS_NS):
+            self._starttls()
+        elif tag == "{{{}}}auth".format(_SASL_NS):
+            _, authcid, _ = base64.b64decode(elem.text or "").split(b"\0")
+            self._localpart = authcid.decode("utf-8")
+            self._authenticated = True
+            self._write("<success xmlns='{}'/>".format(_SASL_NS))
+            self._reset_parser()
+        elif tag == "{{{}}}enable".format(_SM_NS):
+            self._enable_sm(elem)
+        elif tag == "{{{}}}resume".format(_SM_NS):
+            self._resume_sm(elem)
+
+    def _starttls(self):
+        self._write("<proceed xmlns='{}'/>".format(_TLS_NS))
+        transport = self._transport
+        self._transport = None
+        self._parser = None
+
+        async def upgrade():
+            loop = asyncio.get_event_loop()
+            self._transport = await loop.start_tls(
+                transport, self, self._server._ssl_context,
+                server_side=True,
+            )
+            self._tls = True
+            self._reset_parser()
+
+        asyncio.ensure_future(upgrade())
+
+    def _bind(self, elem):
+        resource = elem.findtext("{{{0}}}bind/{{{0}}}resource".format(
+            _BIND_NS,
+        ))
+        if not resource:
+            resource = self._server._next_id()
+        self.jid = self._server._bind(
+            self,
+            aioxmpp.JID(self._localpart, self._server.domain, resource),
+        )
+        self._write(
+            "<iq type='result' id='{}'>"
+            "<bind xmlns='{}'><jid>{}</jid></bind>"
+            "</iq>".format(elem.get("id"), _BIND_NS, self.jid)
+        )
+
+    # stream management
+
+    def _enable_sm(self, elem):
+        self.sm = self._server._new_sm_session(self)
+        self._write("<enabled xmlns='{}' id='{}' resume='true'/>".format(
+            _SM_NS, self.sm.id_,
+        ))
+
+    def _resume_sm(self, elem):
+        sm = self._server._sm_sessions.get(elem.get("previd"))
+        if sm is None:
+            self._write("<failed xmlns='{}'>"
+                        "<item-not-found "
+                        "xmlns='urn:ietf:params:xml:ns:xmpp-stanzas'/>"
+                        "</failed>".format(_SM_NS))
+            return
+
+        old = sm.connection
+        if old is not None and old is not self:
+            old.sm = None
+            old.abort()
+
+        self.sm = sm
+        self.jid = sm.jid
+        sm.connection = self
+        self._server._sessions[self.jid] = self
+        self._acked(int(elem.get("h")))
+        self._write("<resumed xmlns='{}' previd='{}' h='{}'/>".format(
+            _SM_NS, sm.id_, sm.inbound,
+        ))
+        for data in sm.unacked:
+            self._write(data)
+
+    def _acked(self, h):
+        sm = self.sm
+        # h is a 32 bit wrapping counter; benchmarks stay far below that
+        ndropped = len(sm.unacked) - (sm.outbound - h)
+        for _ in range(max(0, ndropped)):
+            sm.unacked.popleft()
+
+    def deliver(self, elem):
+        data = etree.tostring(elem)
+        if self.sm is not None:
+            self.sm.outbound += 1
+            self.sm.unacked.append(data)
+            self._write(data)
+            if len(self.sm.unacked) % self.REQUEST_INTERVAL == 0:
+                self._write("<r xmlns='{}'/>".format(_SM_NS))
+        else:
+            self._write(data)
+
+
+class LoopbackServer:
+    """
+    In-process XMPP server listening on the loopback interface.
+
+    :param domain: The domain of the server.
+    :type domain: :class:`str`
+
+    Entities:
+
+    * ``<domain>``: answers all IQ requests with an empty result.
+    * ``echo.<domain>``: reflects messages and presences to their sender and
+      answers IQ requests with an empty result.
+    * ``muc.<domain>``: accepts joins to any room and reflects group chat
+      messages to all occupants.
+    * Local users: any localpart can log in with any password. Stanzas to
+      full JIDs are routed to the session of that resource, stanzas to
+      bare JIDs to an arbitrary session of the user.
+
+    .. automethod:: start
+
+    .. automethod:: stop
+
+    .. automethod:: make_client
+
+    .. automethod:: kill_connections
+    """
+
+    def __init__(self, domain="bench.localhost"):
+        super().__init__()
+        self.domain = domain
+        self.echo_domain = "echo." + domain
+        self.muc_domain = "muc." + domain
+        self.host = None
+        self.port = None
+        self._server = None
+        self._ssl_context = None
+        self._ids = itertools.count()
+        self._connections = set()
+        self._sessions = {}
+        self._sm_sessions = {}
+        self._rooms = collections.defaultdict(dict)
+
+    async def start(self):
+        """
+        Start listening on an ephemeral port on ``127.0.0.1``.
+        """
+        loop = asyncio.get_event_loop()
+        self._ssl_context = await loop.run_in_executor(
+            None,
+            _make_ssl_context,
+            self.domain,
+        )
+        self._server = await loop.create_server(
+            self._make_connection,
+            "127.0.0.1", 0,
+        )
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """
+        Stop listening and drop all connections.
+        """
+        self.kill_connections()
+        self._sm_sessions.clear()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def kill_connections(self):
+        """
+        Abort all connections without closing the streams, as if the
+        network failed. Stream Management state is kept, so that the clients
+        can resume.
+        """
+        for conn in list(self._connections):
+            conn.abort()
+
+    def make_client(self, localpart, resource=None):
+        """
+        Create a :class:`aioxmpp.Client` for this server.
+
+        :param localpart: The localpart of the account.
+        :param resource: The resource to request.
+
+        The client does not verify the certificate of the server and
+        reconnects immediately after a connection failure.
+        """
+        security_layer = aioxmpp.make_security_layer(
+            "password",
+            no_verify=True,
+        )
+        client = aioxmpp.Client(
+            aioxmpp.JID(localpart, self.domain, resource),
+            security_layer,
+            override_peer=[
+                (self.host, self.port, aioxmpp.connector.STARTTLSConnector()),
+            ],
+        )
+        client.backoff_start = timedelta(0)
+        return client
+
+    def _next_id(self):
+        return "b{}".format(next(self._ids))
+
+    def _make_connection(self):
+        conn = _Connection(self)
+        self._connections.add(conn)
+        return conn
+
+    def _connection_lost(self, conn):
+        self._connections.discard(conn)
+        if conn.jid is not None and self._sessions.get(conn.jid) is conn:
+            del self._sessions[conn.jid]
+        if conn.sm is not None:
+            conn.sm.connection = None
+
+    def _bind(self, conn, jid):
+        old = self._sessions.get(jid)
+        if old is not None:
+            old.abort()
+        self._sessions[jid] = conn
+        return jid
+
+    def _new_sm_session(self, conn):
+        sm = _SMSession(self._next_id(), conn.jid)
+        sm.connection = conn
+        self._sm_sessions[sm.id_] = sm
+        return sm
+
+    def _deliver(self, to, elem):
+        conn = self._sessions.get(to)
+        if conn is None and to.is_bare:
+            for jid, conn in self._sessions.items():
+                if jid.bare() == to:
+                    break
+            else:
+                conn = None
+        if conn is None:
+            # the session may be suspended; queue for resumption
+            for sm in self._sm_sessions.values():
+                if sm.jid == to:
+                    sm.outbound += 1
+                    sm.unacked.append(etree.tostring(elem))
+                    return True
+            return False
+        conn.deliver(elem)
+        return True
+
+    def _reply(self, elem, type_="result"):
+        reply = etree.Element(elem.tag)
+        reply.set("type", type_)
+        reply.set("id", elem.get("id", ""))
+        reply.set("from", elem.get("to") or self.domain)
+        reply.set("to", elem.get("from"))
+        return reply
+
+    def _route(self, elem):
+        to = elem.get("to")
+        from_ = aioxmpp.JID.fromstr(elem.get("from"))
+        kind = etree.QName(elem).localname
+        is_request = kind == "iq" and elem.get("type") in ("get", "set")
+
+        if to is None:
+            if is_request:
+                self._deliver(from_, self._reply(elem))
+            return
+
+        to = aioxmpp.JID.fromstr(to)
+
+        if to.domain == self.echo_domain:
+            if is_request:
+                self._deliver(from_, self._reply(elem))
+            elif kind != "iq":
+                elem.set("from", str(to))
+                elem.set("to", str(from_))
+                self._deliver(from_, elem)
+            return
+
+        if to.domain == self.muc_domain:
+            self._muc(kind, elem, from_, to, is_request)
+            return
+
+        if to.localpart is None and to.domain == self.domain:
+            if is_request:
+                self._deliver(from_, self._reply(elem))
+            return
+
+        if not self._deliver(to, elem) and is_request:
+            reply = self._reply(elem, "error")
+            error = etree.SubElement(reply, "{jabber:client}error",
+                                     type="cancel")
+            etree.SubElement(
+                error,
+                "{urn:ietf:params:xml:ns:xmpp-stanzas}service-unavailable",
+            )
+            self._deliver(from_, reply)
+
+    def _muc(self, kind, elem, from_, to, is_request):
+        room_jid = to.bare()
+        room = self._rooms[room_jid]
+
+        if kind == "presence":
+            if to.resource is None:
+                return
+            leaving = elem.get("type") == "unavailable"
+            if leaving:
+                room.pop(to.resource, None)
+            else:
+                room[to.resource] = from_
+
+            presence = etree.Element("{jabber:client}presence")
+            if leaving:
+                presence.set("type", "unavailable")
+            presence.set("from", str(to))
+            presence.set("to", str(from_))
+            x = etree.SubElement(presence, "{{{}}}x".format(_MUC_USER_NS))
+            etree.SubElement(x, "{{{}}}item".format(_MUC_USER_NS),
+                             affiliation="none",
+                             role="none" if leaving else "participant")
+            etree.SubElement(x, "{{{}}}status".format(_MUC_USER_NS),
+                             code="110")
+            self._deliver(from_, presence)
+
+            if not leaving:
+                subject = etree.Element("{jabber:client}message",
+                                        type="groupchat")
+                subject.set("from", str(room_jid))
+                subject.set("to", str(from_))
+                etree.SubElement(subject, "{jabber:client}subject")
+                self._deliver(from_, subject)
+            return
+
+        if kind == "message" and elem.get("type") == "groupchat":
+            for nick, occupant in room.items():
+                if occupant == from_:
+                    break
+            else:
+                return
+            for occupant in list(room.values()):
+                copy = etree.fromstring(etree.tostring(elem))
+                copy.set("from", str(room_jid.replace(resource=nick)))
+                copy.set("to", str(occupant))
+                self._deliver(occupant, copy)
+            return
+
+        if is_request:
+            self._deliver(from_, self._reply(elem))
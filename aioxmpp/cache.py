@@ -31,99 +31,114 @@
 
 """
 
+import asyncio
+import collections
 import collections.abc
+import time
 
 
-class Node:
-    __slots__ = ("prev", "next_", "key", "value")
+class LRUDict(collections.abc.MutableMapping):
+    """
+    Size-restricted dictionary with Least Recently Used expiry policy.
 
+    .. versionadded:: 0.9
 
-def _init_linked_list():
-    root = Node()
-    root.prev = root
-    root.next_ = root
-    root.key = None
-    root.value = None
-    return root
+    The :class:`LRUDict` supports normal dictionary-style access and implements
+    :class:`collections.abc.MutableMapping`.
 
+    When the :attr:`maxsize` is exceeded, as many entries as needed to get
+    below the :attr:`maxsize` are removed from the dict. Least recently used
+    entries are purged first. Setting an entry does *not* count as use!
 
-def _remove_node(node):
-    node.next_.prev = node.prev
-    node.prev.next_ = node.next_
-    return node
+    In addition to the number of entries, the total weight of the entries can
+    be limited using :attr:`weight` and :attr:`maxweight`, for example to
+    bound the memory used by the values. Entries can also expire after a time
+    to live, see :attr:`ttl` and :meth:`store`. Expired entries are removed
+    when they are looked up, when they are purged because of the limits or
+    when :meth:`purge_expired` is called; until then, they still count
+    towards the limits and :func:`len`.
 
+    .. versionchanged:: 0.14
 
-def _insert_node(before, new_node):
-    new_node.next_ = before.next_
-    new_node.next_.prev = new_node
-    new_node.prev = before
-    before.next_ = new_node
+       The dictionary is now backed by a :class:`collections.OrderedDict`.
+       :meth:`values` and :meth:`items` do not count as use of the entries.
 
+       Support for weights, time to live, usage counters and
+       :meth:`get_or_create_async` was added.
 
-def _length(node):
-    # this is used only for testing
-    cur = node.next_
-    i = 0
-    while cur is not node:
-        i += 1
-        cur = cur.next_
-    return i
+    .. autoattribute:: maxsize
 
+    .. autoattribute:: weight
 
-def _has_consistent_links(node, node_dict=None):
-    # this is used only for testing
-    cur = node.next_
+    .. autoattribute:: maxweight
 
-    if cur.prev is not node:
-        return False
+    .. autoattribute:: total_weight
 
-    while cur is not node:
-        if node_dict is not None and node_dict[cur.key] is not cur:
-            return False
-        if cur is not cur.next_.prev:
-            return False
-        cur = cur.next_
-    return True
+    .. autoattribute:: ttl
 
+    .. automethod:: store
 
-class LRUDict(collections.abc.MutableMapping):
-    """
-    Size-restricted dictionary with Least Recently Used expiry policy.
+    .. automethod:: purge_expired
 
-    .. versionadded:: 0.9
+    .. automethod:: get_or_create_async
 
-    The :class:`LRUDict` supports normal dictionary-style access and implements
-    :class:`collections.abc.MutableMapping`.
+    .. autoattribute:: hits
 
-    When the :attr:`maxsize` is exceeded, as many entries as needed to get
-    below the :attr:`maxsize` are removed from the dict. Least recently used
-    entries are purged first. Setting an entry does *not* count as use!
+    .. autoattribute:: misses
 
-    .. autoattribute:: maxsize
+    .. autoattribute:: evictions
+
+    .. automethod:: reset_counters
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.__links = {}
-        self.__root = _init_linked_list()
+        # least recently used entries first
+        self.__data = collections.OrderedDict()
+        # monotonic expiry timestamps for entries with a time to live
+        self.__expires = {}
+        self.__weights = {}
+        self.__total_weight = 0
+        self.__pending = {}
 
         self.__maxsize = 1
+        self.__weight = None
+        self.__maxweight = None
+        self.__ttl = None
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
 
     def _test_consistency(self):
         """
         This method is only used for testing to assert that the operations
         leave the LRUDict in a valid state.
         """
-        return (_length(self.__root) == len(self.__links) and
-                _has_consistent_links(self.__root, self.__links))
+        if not set(self.__expires) <= set(self.__data):
+            return False
+        if self.__weight is None:
+            return not self.__weights and self.__total_weight == 0
+        return (set(self.__weights) == set(self.__data) and
+                sum(self.__weights.values()) == self.__total_weight)
+
+    def __evict_lru(self):
+        key, _ = self.__data.popitem(last=False)
+        self.__expires.pop(key, None)
+        if self.__weight is not None:
+            self.__total_weight -= self.__weights.pop(key)
+        self.__evictions += 1
 
     def _purge(self):
-        if self.__maxsize is None:
-            return
+        maxsize = self.__maxsize
+        if maxsize is not None:
+            while len(self.__data) > maxsize:
+                self.__evict_lru()
 
-        while len(self.__links) > self.__maxsize:
-            link = _remove_node(self.__root.prev)
-            del self.__links[link.key]
+        maxweight = self.__maxweight
+        if self.__weight is not None and maxweight is not None:
+            while self.__data and self.__total_weight > maxweight:
+                self.__evict_lru()
 
     @property
     def maxsize(self):
@@ -147,33 +162,284 @@ class LRUDict(collections.abc.MutableMapping):
         self.__maxsize = value
         self._purge()
 
+    @property
+    def weight(self):
+        """
+        Function which returns the weight of a value, or :data:`None`.
+
+        The function is called with the value whenever an entry is stored and
+        must return a non-negative number, for example the size of the value
+        in bytes. Changing this property re-computes the weights of all
+        entries and purges overhanging entries immediately.
+
+        .. versionadded:: 0.14
+        """
+        return self.__weight
+
+    @weight.setter
+    def weight(self, func):
+        self.__weight = func
+        self.__weights.clear()
+        self.__total_weight = 0
+        if func is not None:
+            for key, value in self.__data.items():
+                weight = func(value)
+                self.__weights[key] = weight
+                self.__total_weight += weight
+        self._purge()
+
+    @property
+    def maxweight(self):
+        """
+        Maximum total weight of the entries, as computed by :attr:`weight`.
+        Changing this property purges overhanging entries immediately.
+
+        Least recently used entries are removed until the total weight does
+        not exceed the limit. An entry which is heavier than the limit on its
+        own is thus not retained at all.
+
+        If set to :data:`None` (the default) or if :attr:`weight` is
+        :data:`None`, the weight is not limited.
+
+        .. versionadded:: 0.14
+        """
+        return self.__maxweight
+
+    @maxweight.setter
+    def maxweight(self, value):
+        if value is not None and value < 0:
+            raise ValueError("maxweight must be non-negative or None")
+        self.__maxweight = value
+        self._purge()
+
+    @property
+    def total_weight(self):
+        """
+        The sum of the weights of all entries (read-only).
+
+        This is always zero if :attr:`weight` is :data:`None`.
+
+        .. versionadded:: 0.14
+        """
+        return self.__total_weight
+
+    @property
+    def ttl(self):
+        """
+        Time to live in seconds for entries set through item assignment.
+
+        If set to :data:`None` (the default), entries do not expire. Changing
+        the value only affects entries stored afterwards.
+
+        .. versionadded:: 0.14
+        """
+        return self.__ttl
+
+    @ttl.setter
+    def ttl(self, value):
+        if value is not None and value < 0:
+            raise ValueError("ttl must be non-negative or None")
+        self.__ttl = value
+
+    @property
+    def hits(self):
+        """
+        Number of lookups which found an entry (read-only).
+
+        .. versionadded:: 0.14
+        """
+        return self.__hits
+
+    @property
+    def misses(self):
+        """
+        Number of lookups which did not find an entry or found an expired one
+        (read-only).
+
+        .. versionadded:: 0.14
+        """
+        return self.__misses
+
+    @property
+    def evictions(self):
+        """
+        Number of entries removed because of :attr:`maxsize`,
+        :attr:`maxweight` or expiry (read-only).
+
+        Entries removed explicitly, for example with ``del`` or
+        :meth:`clear`, are not counted.
+
+        .. versionadded:: 0.14
+        """
+        return self.__evictions
+
+    def reset_counters(self):
+        """
+        Reset :attr:`hits`, :attr:`misses` and :attr:`evictions` to zero.
+
+        .. versionadded:: 0.14
+        """
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
     def __len__(self):
-        return len(self.__links)
+        return len(self.__data)
 
     def __iter__(self):
-        return iter(self.__links)
+        return iter(self.__data)
+
+    def store(self, key, value, ttl):
+        """
+        Set an entry with a specific time to live.
+
+        :param key: The key of the entry.
+        :param value: The value of the entry.
+        :param ttl: Time to live of the entry in seconds, or :data:`None` if
+            the entry shall not expire.
+        :type ttl: :class:`float` or :data:`None`
+
+        This behaves like item assignment, except that `ttl` is used instead
+        of :attr:`ttl`.
+
+        .. versionadded:: 0.14
+        """
+        data = self.__data
+        is_new = key not in data
+        data[key] = value
+
+        if ttl is None:
+            self.__expires.pop(key, None)
+        else:
+            self.__expires[key] = time.monotonic() + ttl
+
+        weight_func = self.__weight
+        if weight_func is not None:
+            weight = weight_func(value)
+            self.__total_weight += weight - self.__weights.get(key, 0)
+            self.__weights[key] = weight
+        elif not is_new:
+            return
+
+        self._purge()
 
     def __setitem__(self, key, value):
-        try:
-            self.__links[key].value = value
-        except KeyError:
-            link = Node()
-            link.key = key
-            link.value = value
-            self.__links[key] = link
-            _insert_node(self.__root, link)
-            self._purge()
+        if (self.__ttl is None and self.__weight is None and
+                not self.__expires):
+            data = self.__data
+            if key in data:
+                data[key] = value
+                return
+            data[key] = value
+            maxsize = self.__maxsize
+            if maxsize is not None:
+                # without weights and expiry timestamps, only the entries
+                # themselves need to be removed
+                while len(data) > maxsize:
+                    data.popitem(last=False)
+                    self.__evictions += 1
+            return
+
+        self.store(key, value, self.__ttl)
 
     def __getitem__(self, key):
-        link = self.__links[key]
-        _remove_node(link)
-        _insert_node(self.__root, link)
-        return link.value
+        try:
+            value = self.__data[key]
+        except KeyError:
+            self.__misses += 1
+            raise
+
+        if self.__expires:
+            try:
+                expires = self.__expires[key]
+            except KeyError:
+                pass
+            else:
+                if time.monotonic() >= expires:
+                    self.__remove(key)
+                    self.__evictions += 1
+                    self.__misses += 1
+                    raise KeyError(key)
+
+        self.__data.move_to_end(key)
+        self.__hits += 1
+        return value
+
+    def __remove(self, key):
+        del self.__data[key]
+        self.__expires.pop(key, None)
+        if self.__weight is not None:
+            self.__total_weight -= self.__weights.pop(key)
 
     def __delitem__(self, key):
-        link = self.__links.pop(key)
-        _remove_node(link)
+        self.__remove(key)
+
+    def values(self):
+        return self.__data.values()
+
+    def items(self):
+        return self.__data.items()
+
+    def purge_expired(self):
+        """
+        Remove all expired entries.
+
+        This takes time linear in the number of entries with a time to live.
+
+        .. versionadded:: 0.14
+        """
+        now = time.monotonic()
+        expired = [
+            key
+            for key, expires in self.__expires.items()
+            if now >= expires
+        ]
+        for key in expired:
+            self.__remove(key)
+        self.__evictions += len(expired)
+
+    async def get_or_create_async(self, key, factory):
+        """
+        Return the value for `key`, creating it with `factory` if needed.
+
+        :param key: The key of the entry.
+        :param factory: Coroutine function to create the value.
+        :return: The cached or newly created value.
+
+        If there is no (unexpired) entry for `key`, `factory` is called
+        without arguments and awaited. Its result is stored using item
+        assignment and returned.
+
+        Concurrent calls for the same `key` share a single call to `factory`
+        (single-flight). If `factory` raises, the exception is propagated to
+        all waiting callers and nothing is stored. Cancelling one of the
+        callers does not cancel the call to `factory`.
+
+        .. versionadded:: 0.14
+        """
+        try:
+            return self[key]
+        except KeyError:
+            pass
+
+        try:
+            fut = self.__pending[key]
+        except KeyError:
+            fut = asyncio.ensure_future(self.__create(key, factory))
+            self.__pending[key] = fut
+
+        return await asyncio.shield(fut)
+
+    async def __create(self, key, factory):
+        try:
+            value = await factory()
+        finally:
+            del self.__pending[key]
+        self[key] = value
+        return value
 
     def clear(self):
-        self.__links.clear()
-        self.__root = _init_linked_list()
+        self.__data.clear()
+        self.__expires.clear()
+        self.__weights.clear()
+        self.__total_weight = 0
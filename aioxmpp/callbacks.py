@@ -98,6 +98,7 @@ Filters
 
 import abc
 import asyncio
+import bisect
 import collections
 import contextlib
 import functools
@@ -105,6 +106,8 @@ import logging
 import types
 import weakref
 
+from . import metrics
+
 
 logger = logging.getLogger(__name__)
 
@@ -259,13 +262,27 @@ class AbstractAdHocSignal:
     def __init__(self):
         super().__init__()
         self._connections = collections.OrderedDict()
+        # immutable copy of the connections used during emission; rebuilt
+        # lazily after the connections changed
+        self._snapshot = None
         self.logger = logger
 
+    def _make_entry(self, token, wrapper):
+        return token, wrapper
+
     def _connect(self, wrapper):
         token = object()
-        self._connections[token] = wrapper
+        self._connections[token] = self._make_entry(token, wrapper)
+        self._snapshot = None
         return token
 
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = tuple(self._connections.values())
+            self._snapshot = snapshot
+        return snapshot
+
     def disconnect(self, token):
         """
         Disconnect the connection identified by `token`. This never raises,
@@ -275,6 +292,13 @@ class AbstractAdHocSignal:
             del self._connections[token]
         except KeyError:
             pass
+        else:
+            self._snapshot = None
+
+    def _remove(self, tokens):
+        for token in tokens:
+            self._connections.pop(token, None)
+        self._snapshot = None
 
 
 class AdHocSignal(AbstractAdHocSignal):
@@ -528,15 +552,57 @@ class AdHocSignal(AbstractAdHocSignal):
 
         Instead of calling :meth:`fire` explicitly, the ad-hoc signal object
         itself can be called, too.
+
+        .. versionchanged:: 0.14
+
+           The connections are no longer copied on each emission. Listeners
+           connected or disconnected while the signal is being emitted still
+           only take effect with the next emission.
         """
-        for token, wrapper in list(self._connections.items()):
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._get_snapshot()
+        if not snapshot:
+            return
+
+        dead = None
+        for token, mode, target in snapshot:
             try:
-                keep = wrapper(args, kwargs)
+                if mode is _MODE_STRONG:
+                    if not target(*args, **kwargs):
+                        continue
+                elif mode is _MODE_WEAK:
+                    f = target()
+                    if f is None:
+                        # collect dead references and drop them in one go
+                        if dead is None:
+                            dead = [token]
+                        else:
+                            dead.append(token)
+                        continue
+                    if not f(*args, **kwargs):
+                        continue
+                elif target(args, kwargs):
+                    continue
             except Exception:
                 self.logger.exception("listener attached to signal raised")
-                keep = False
-            if not keep:
-                del self._connections[token]
+            # remove immediately, so that a nested emission does not call
+            # the listener again
+            self._connections.pop(token, None)
+            self._snapshot = None
+
+        if dead is not None:
+            self._remove(dead)
+
+    def _make_entry(self, token, wrapper):
+        # strong and weak connections are called directly by fire, without
+        # going through the wrapper
+        if isinstance(wrapper, functools.partial):
+            if wrapper.func is _strong_wrapper:
+                return token, _MODE_STRONG, wrapper.args[0]
+            if wrapper.func is _weakref_wrapper:
+                return token, _MODE_WEAK, wrapper.args[0]
+        return token, None, wrapper
 
     def future(self):
         """
@@ -553,6 +619,12 @@ class AdHocSignal(AbstractAdHocSignal):
     __call__ = fire
 
 
+_MODE_STRONG = "strong"
+_MODE_WEAK = "weak"
+_strong_wrapper = AdHocSignal._strong_wrapper
+_weakref_wrapper = AdHocSignal._weakref_wrapper
+
+
 class SyncAdHocSignal(AbstractAdHocSignal):
     """
     A synchronous ad-hoc signal is like :class:`AdHocSignal`, but for
@@ -609,10 +681,10 @@ class SyncAdHocSignal(AbstractAdHocSignal):
         Instead of calling :meth:`fire` explicitly, the ad-hoc signal object
         itself can be called, too.
         """
-        for token, coro in list(self._connections.items()):
+        for token, coro in self._get_snapshot():
             keep = await coro(*args, **kwargs)
             if not keep:
-                del self._connections[token]
+                self._remove((token,))
 
     __call__ = fire
 
@@ -728,10 +800,19 @@ class Filter:
     Other arguments passed to :meth:`filter` are passed unmodified to each
     function called; only the first argument is subject to filtering.
 
+    Changes to the chain made by a filter function while :meth:`filter` runs
+    take effect with the next call to :meth:`filter`.
+
     .. versionchanged:: 0.9
 
        This class was formerly available at :class:`aioxmpp.stream.Filter`.
 
+    .. versionchanged:: 0.14
+
+       Registering and unregistering no longer re-sort or scan the whole
+       chain, and :meth:`filter` returns the object immediately if the chain
+       is empty.
+
     .. automethod:: register
 
     .. automethod:: filter
@@ -739,6 +820,24 @@ class Filter:
     .. automethod:: unregister
 
     .. automethod:: context_register(func[, order])
+
+    .. attribute:: metrics
+
+       A :class:`aioxmpp.metrics.MetricsHook` or :data:`None` (the default).
+
+       If set, the time spent in each function of the chain is reported to
+       :meth:`~aioxmpp.metrics.MetricsHook.observe_filter` of the hook.
+       :class:`~aioxmpp.stream.StanzaStream` sets this on its filter chains
+       when its :attr:`~aioxmpp.stream.StanzaStream.metrics` are set.
+
+       .. versionadded:: 0.14
+
+    .. attribute:: name
+
+       The name under which the chain reports to :attr:`metrics`. Defaults to
+       :data:`None`.
+
+       .. versionadded:: 0.14
     """
 
     class Token:
@@ -750,7 +849,16 @@ class Filter:
 
     def __init__(self):
         super().__init__()
-        self._filter_order = []
+        # _orders, _tokens and _func_list are kept in parallel and sorted by
+        # order, so that the position of a new filter and the range of
+        # filters with the same order can be found with bisect
+        self._orders = []
+        self._tokens = []
+        self._func_list = []
+        self._token_orders = {}
+        self._funcs = ()
+        self.metrics = None
+        self.name = None
 
     def register(self, func, order):
         """
@@ -780,8 +888,12 @@ class Filter:
         The returned token can be used to :meth:`unregister` a filter.
         """
         token = self.Token()
-        self._filter_order.append((order, token, func))
-        self._filter_order.sort(key=lambda x: x[0])
+        index = bisect.bisect_right(self._orders, order)
+        self._orders.insert(index, order)
+        self._tokens.insert(index, token)
+        self._func_list.insert(index, func)
+        self._token_orders[token] = order
+        self._funcs = tuple(self._func_list)
         return token
 
     def filter(self, obj, *args, **kwargs):
@@ -799,8 +911,34 @@ class Filter:
         Returns the object returned by the last function in the filter chain or
         :data:`None` if any function returned :data:`None`.
         """
-        for _, _, func in self._filter_order:
-            obj = func(obj, *args, **kwargs)
+        funcs = self._funcs
+        if not funcs:
+            return obj
+
+        if self.metrics is not None:
+            return self._filter_timed(funcs, obj, args, kwargs)
+
+        if args or kwargs:
+            for func in funcs:
+                obj = func(obj, *args, **kwargs)
+                if obj is None:
+                    return None
+        else:
+            for func in funcs:
+                obj = func(obj)
+                if obj is None:
+                    return None
+        return obj
+
+    def _filter_timed(self, funcs, obj, args, kwargs):
+        hook = self.metrics
+        name = self.name
+        for func in funcs:
+            start = metrics.clock()
+            try:
+                obj = func(obj, *args, **kwargs)
+            finally:
+                hook.observe_filter(name, func, metrics.clock() - start)
             if obj is None:
                 return None
         return obj
@@ -814,13 +952,20 @@ class Filter:
         Unregister a function from the filter chain using the token returned by
         :meth:`register`.
         """
-        for i, (_, token, _) in enumerate(self._filter_order):
-            if token == token_to_remove:
-                break
-        else:
+        try:
+            order = self._token_orders.pop(token_to_remove)
+        except (KeyError, TypeError):
             raise ValueError("unregistered token: {!r}".format(
-                token_to_remove))
-        del self._filter_order[i]
+                token_to_remove)) from None
+
+        lo = bisect.bisect_left(self._orders, order)
+        hi = bisect.bisect_right(self._orders, order, lo)
+        i = self._tokens.index(token_to_remove, lo, hi)
+
+        del self._orders[i]
+        del self._tokens[i]
+        del self._func_list[i]
+        self._funcs = tuple(self._func_list)
 
     @contextlib.contextmanager
     def context_register(self, func, *args):
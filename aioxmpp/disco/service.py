@@ -20,9 +20,13 @@
 #
 ########################################################################
 import asyncio
+import collections
 import contextlib
 import functools
+import io
 import itertools
+import json
+import time
 
 import aioxmpp.cache
 import aioxmpp.callbacks
@@ -30,6 +34,7 @@ import aioxmpp.errors as errors
 import aioxmpp.service as service
 import aioxmpp.structs as structs
 import aioxmpp.stanza as stanza
+import aioxmpp.xml
 
 from aioxmpp.utils import namespaces
 
@@ -521,12 +526,18 @@ class DiscoClient(service.Service):
 
     .. automethod:: query_items
 
+    .. automethod:: query_info_many
+
     To prime the cache with information, the following methods can be used:
 
     .. automethod:: set_info_cache
 
     .. automethod:: set_info_future
 
+    .. automethod:: prefetch_info
+
+    .. automethod:: prefetch_info_on_presence
+
     To control the size of caches, the following properties are available:
 
     .. autoattribute:: info_cache_size
@@ -537,6 +548,40 @@ class DiscoClient(service.Service):
 
     .. automethod:: flush_cache
 
+    To control the expiry of :meth:`query_info` results, the following
+    attributes are available:
+
+    .. autoattribute:: info_cache_ttl
+       :annotation: = None
+
+    .. autoattribute:: info_cache_max_stale
+       :annotation: = None
+
+    .. attribute:: negative_cache_ttl
+       :annotation: = {}
+
+       Mapping of :class:`~aioxmpp.ErrorCondition` members to the number of
+       seconds for which an error reply with that condition is cached by
+       :meth:`query_info`.
+
+       While such an error is cached, :meth:`query_info` re-raises the cached
+       exception instead of sending a new request. Error conditions which are
+       not in this mapping are not cached (this is the default for all
+       conditions). Example::
+
+         disco.negative_cache_ttl[
+             aioxmpp.ErrorCondition.SERVICE_UNAVAILABLE
+         ] = 600
+
+       .. versionadded:: 0.14
+
+    The :meth:`query_info` cache can be saved and restored, for example across
+    restarts of the application:
+
+    .. automethod:: dump_info_cache
+
+    .. automethod:: load_info_cache
+
     Usage example, assuming that you have a :class:`.node.Client` `client`::
 
       import aioxmpp.disco as disco
@@ -553,6 +598,20 @@ class DiscoClient(service.Service):
           node.local_jid.bare()
       )
 
+    To warm the cache before the application asks for information,
+    :meth:`prefetch_info_on_presence` can be connected to
+    :meth:`.PresenceClient.on_available`::
+
+      presence = client.summon(aioxmpp.PresenceClient)
+      presence.on_available.connect(sd.prefetch_info_on_presence)
+
+    .. note::
+
+       Listeners of :class:`~aioxmpp.callbacks.AdHocSignal` are disconnected
+       when they return a true value. Do not connect :meth:`prefetch_info`
+       (or a lambda returning its result) directly, since the returned task
+       would disconnect the listener after the first presence.
+
     """
 
     on_info_result = aioxmpp.callbacks.Signal()
@@ -565,6 +624,14 @@ class DiscoClient(service.Service):
         self._items_pending = aioxmpp.cache.LRUDict()
         self._items_pending.maxsize = 100
 
+        # monotonic expiry timestamps for entries in _info_pending; entries
+        # without timestamp never expire
+        self._info_expires = {}
+        self._info_revalidating = {}
+        self._info_cache_ttl = None
+        self._info_cache_max_stale = None
+        self.negative_cache_ttl = {}
+
         self.client.on_stream_destroyed.connect(
             self._clear_cache
         )
@@ -598,23 +665,165 @@ class DiscoClient(service.Service):
     def items_cache_size(self, value):
         self._items_pending.maxsize = value
 
+    @property
+    def info_cache_ttl(self):
+        """
+        Time in seconds for which a successful :meth:`query_info` result is
+        used from the cache.
+
+        If set to :data:`None`, results do not expire (they may still be
+        evicted from the cache if :attr:`info_cache_size` is exceeded).
+        Changing the value only affects results received afterwards.
+
+        Entries created with :meth:`set_info_future` or :meth:`set_info_cache`
+        never expire.
+
+        .. versionadded:: 0.14
+        """
+        return self._info_cache_ttl
+
+    @info_cache_ttl.setter
+    def info_cache_ttl(self, value):
+        if value is not None and value < 0:
+            raise ValueError("info_cache_ttl must be non-negative or None")
+        self._info_cache_ttl = value
+
+    @property
+    def info_cache_max_stale(self):
+        """
+        Time in seconds after expiry during which an expired successful
+        :meth:`query_info` result is still returned.
+
+        When an expired result is returned this way, a request to refresh the
+        cache entry is sent in the background (stale-while-revalidate). Once
+        the response arrives, it replaces the cache entry. If the refresh fails
+        with an error which is not cached according to
+        :attr:`negative_cache_ttl`, the stale result continues to be served
+        until this time has passed.
+
+        If set to :data:`None`, expired results are never returned.
+
+        .. versionadded:: 0.14
+        """
+        return self._info_cache_max_stale
+
+    @info_cache_max_stale.setter
+    def info_cache_max_stale(self, value):
+        if value is not None and value < 0:
+            raise ValueError(
+                "info_cache_max_stale must be non-negative or None"
+            )
+        self._info_cache_max_stale = value
+
     def _clear_cache(self):
         for fut in self._info_pending.values():
             if not fut.done():
                 fut.cancel()
         self._info_pending.clear()
+        self._info_expires.clear()
+
+        for fut in self._info_revalidating.values():
+            fut.cancel()
+        self._info_revalidating.clear()
 
         for fut in self._items_pending.values():
             if not fut.done():
                 fut.cancel()
         self._items_pending.clear()
 
+    def _negative_ttl(self, exc):
+        if not isinstance(exc, errors.XMPPError):
+            return None
+        return self.negative_cache_ttl.get(exc.condition)
+
+    def _set_info_expiry(self, key, ttl):
+        self._info_expires[key] = time.monotonic() + ttl
+        if len(self._info_expires) > 2 * len(self._info_pending) + 16:
+            # drop timestamps of entries which have been evicted by the LRU
+            # policy
+            self._info_expires = {
+                key: expires
+                for key, expires in self._info_expires.items()
+                if key in self._info_pending
+            }
+
+    def _store_info_request(self, key, request):
+        self._info_pending[key] = request
+        self._info_expires.pop(key, None)
+
     def _handle_info_received(self, jid, node, task):
-        try:
-            result = task.result()
-        except Exception:
+        if task.cancelled():
             return
-        self.on_info_result(jid, node, result)
+
+        key = jid, node
+        exc = task.exception()
+        if exc is not None:
+            ttl = self._negative_ttl(exc)
+        else:
+            ttl = self._info_cache_ttl
+
+        if ttl is not None and self._info_pending.get(key) is task:
+            self._set_info_expiry(key, ttl)
+
+        if exc is None:
+            self.on_info_result(jid, node, task.result())
+
+    def _handle_revalidation_done(self, jid, node, task):
+        key = jid, node
+        if self._info_revalidating.get(key) is task:
+            del self._info_revalidating[key]
+
+        if task.cancelled():
+            return
+
+        exc = task.exception()
+        if exc is not None and self._negative_ttl(exc) is None:
+            self.logger.debug("failed to revalidate disco#info of %s, %r: %r",
+                              jid, node, exc)
+            return
+
+        self._store_info_request(key, task)
+        self._handle_info_received(jid, node, task)
+
+    def _revalidate_info(self, jid, node):
+        key = jid, node
+        if key in self._info_revalidating:
+            return
+
+        request = asyncio.ensure_future(
+            self.send_and_decode_info_query(jid, node)
+        )
+        request.add_done_callback(
+            functools.partial(
+                self._handle_revalidation_done,
+                jid,
+                node,
+            )
+        )
+        self._info_revalidating[key] = request
+
+    def _lookup_info_request(self, jid, node):
+        key = jid, node
+        request = self._info_pending[key]
+        try:
+            expires = self._info_expires[key]
+        except KeyError:
+            return request
+
+        now = time.monotonic()
+        if now < expires:
+            return request
+
+        if (self._info_cache_max_stale is not None and
+                now < expires + self._info_cache_max_stale and
+                not request.cancelled() and
+                request.exception() is None):
+            self._revalidate_info(jid, node)
+            return request
+
+        del self._info_pending[key]
+        del self._info_expires[key]
+        raise KeyError(key)
 
     def flush_cache(self):
         """
@@ -625,6 +834,7 @@ class DiscoClient(service.Service):
         `require_fresh` had been set to true.
         """
         self._info_pending.clear()
+        self._info_expires.clear()
         self._items_pending.clear()
 
     async def send_and_decode_info_query(self, jid, node):
@@ -686,15 +896,25 @@ class DiscoClient(service.Service):
         new query is sent at a later point for the same target, a new query is
         actually sent, independent of the value chosen for `require_fresh`.
 
+        Successful results expire after :attr:`info_cache_ttl` seconds. Error
+        replies are cached if their condition is configured in
+        :attr:`negative_cache_ttl`; while such an error is cached, all queries
+        for the target re-raise the exception without sending a request (unless
+        `require_fresh` is true).
+
         .. versionchanged:: 0.9
 
             The `no_cache` argument was added.
+
+        .. versionchanged:: 0.14
+
+            Support for expiry and negative caching was added.
         """
         key = jid, node
 
         if not require_fresh:
             try:
-                request = self._info_pending[key]
+                request = self._lookup_info_request(jid, node)
             except KeyError:
                 pass
             else:
@@ -715,7 +935,7 @@ class DiscoClient(service.Service):
         )
 
         if not no_cache:
-            self._info_pending[key] = request
+            self._store_info_request(key, request)
         try:
             if timeout is not None:
                 try:
@@ -733,12 +953,167 @@ class DiscoClient(service.Service):
                 except KeyError:
                     pass
                 else:
-                    if pending is request:
+                    # errors with an expiry timestamp are negatively cached
+                    if (pending is request and
+                            key not in self._info_expires):
                         del self._info_pending[key]
             raise
 
         return result
 
+    async def query_info_many(self, jids, *,
+                              node=None, max_concurrency=8, timeout=None,
+                              group_key=None):
+        """
+        Query the features and identities of many entities.
+
+        :param jids: The entities to query.
+        :type jids: iterable of :class:`aioxmpp.JID`
+        :param node: The node to query at each entity.
+        :type node: :class:`str` or :data:`None`
+        :param max_concurrency: Maximum number of queries in flight.
+        :type max_concurrency: positive :class:`int`
+        :param timeout: Optional timeout for each response.
+        :type timeout: :class:`float`
+        :param group_key: Function returning a key for equivalence classes.
+        :type group_key: callable or :data:`None`
+        :raises ValueError: if `max_concurrency` is not positive
+        :return: Asynchronous iterator of ``(jid, result)`` pairs.
+
+        The queries are made using :meth:`query_info`, with the same caching
+        and aliasing semantics. At most `max_concurrency` queries are run at
+        the same time, which prevents exceeding rate limits of the server when
+        querying thousands of entities.
+
+        The results are yielded in the order in which they complete. `result`
+        is either the :class:`.xso.InfoQuery` or the exception raised by
+        :meth:`query_info` for that `jid`. Each distinct `jid` is yielded
+        exactly once.
+
+        If `group_key` is given, it is called with each `jid` and must return
+        a hashable key or :data:`None`. All entities for which the same key
+        (other than :data:`None`) is returned are assumed to have the same
+        service discovery information; only one of them is queried and the
+        result is yielded for all of them. If the query fails, the next entity
+        of the group is queried instead.
+        :meth:`.EntityCapsService.query_info_many` uses this to query only once
+        per capability hash.
+
+        Example::
+
+          async for jid, result in disco.query_info_many(jids):
+              if isinstance(result, Exception):
+                  continue
+              print(jid, result.features)
+
+        When the iteration is stopped early, the queries which are still in
+        flight are cancelled.
+
+        .. versionadded:: 0.14
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be positive")
+
+        groups = collections.OrderedDict()
+        seen = set()
+        for jid in jids:
+            if jid in seen:
+                continue
+            seen.add(jid)
+
+            key = group_key(jid) if group_key is not None else None
+            if key is None:
+                groups[object()] = [jid]
+            else:
+                groups.setdefault(("group", key), []).append(jid)
+        del seen
+
+        queued = collections.deque(groups.values())
+        del groups
+        running = {}
+
+        def start_queries():
+            while queued and len(running) < max_concurrency:
+                members = queued.popleft()
+                task = asyncio.ensure_future(
+                    self.query_info(members[0], node=node, timeout=timeout)
+                )
+                running[task] = members
+
+        start_queries()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    list(running),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    members = running.pop(task)
+                    if task.cancelled():
+                        result = asyncio.CancelledError()
+                    elif task.exception() is not None:
+                        result = task.exception()
+                    else:
+                        result = task.result()
+
+                    if isinstance(result, BaseException) and len(members) > 1:
+                        queued.appendleft(members[1:])
+                        members = members[:1]
+
+                    for jid in members:
+                        yield jid, result
+
+                start_queries()
+        finally:
+            for task in running:
+                task.cancel()
+
+    def prefetch_info(self, jid, *, node=None):
+        """
+        Warm the :meth:`query_info` cache for an entity in the background.
+
+        :param jid: The entity to query.
+        :type jid: :class:`aioxmpp.JID`
+        :param node: The node to query.
+        :type node: :class:`str` or :data:`None`
+        :rtype: :class:`asyncio.Task`
+        :return: The task running the query.
+
+        This starts a :meth:`query_info` call in a task. If the information is
+        already cached, no request is sent. Errors are logged and otherwise
+        ignored.
+
+        To prefetch on presence, use :meth:`prefetch_info_on_presence`.
+
+        .. versionadded:: 0.14
+        """
+        return asyncio.ensure_future(self._prefetch_info(jid, node))
+
+    def prefetch_info_on_presence(self, full_jid, stanza):
+        """
+        Prefetch the information of an entity which became available.
+
+        :param full_jid: The entity which became available.
+        :type full_jid: :class:`aioxmpp.JID`
+        :param stanza: The presence stanza (ignored).
+
+        This calls :meth:`prefetch_info` for `full_jid` and returns
+        :data:`None`, so that it can be connected to
+        :meth:`.PresenceClient.on_available` and stays connected.
+
+        .. versionadded:: 0.14
+        """
+        self.prefetch_info(full_jid)
+
+    async def _prefetch_info(self, jid, node):
+        try:
+            await self.query_info(jid, node=node)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.logger.debug("prefetch of disco#info of %s, %r failed: %r",
+                              jid, node, exc)
+
     async def query_items(self, jid, *,
                           node=None, require_fresh=False, timeout=None):
         """
@@ -840,7 +1215,91 @@ class DiscoClient(service.Service):
 
         .. versionadded:: 0.5
         """
-        self._info_pending[jid, node] = fut
+        self._store_info_request((jid, node), fut)
+
+    def dump_info_cache(self, f):
+        """
+        Write the successful :meth:`query_info` results to a file.
+
+        :param f: Text file to write to.
+        :type f: text file-like
+
+        Only results which have been received (or set via
+        :meth:`set_info_cache`) and which have not expired are written. Pending
+        requests and cached errors are skipped. The remaining lifetime of each
+        entry is stored along with it.
+
+        .. seealso::
+
+           :meth:`load_info_cache` to restore the cache from the file.
+
+        .. versionadded:: 0.14
+        """
+        now_monotonic = time.monotonic()
+        now_wallclock = time.time()
+
+        entries = []
+        for (jid, node), fut in list(self._info_pending.items()):
+            if not fut.done() or fut.cancelled() or fut.exception():
+                continue
+            info = fut.result()
+            if not isinstance(info, disco_xso.InfoQuery):
+                continue
+
+            expires = self._info_expires.get((jid, node))
+            if expires is not None:
+                if expires <= now_monotonic:
+                    continue
+                expires = expires - now_monotonic + now_wallclock
+
+            entries.append({
+                "jid": str(jid),
+                "node": node,
+                "expires": expires,
+                "info": aioxmpp.xml.serialize_single_xso(info),
+            })
+
+        json.dump({"version": 1, "entries": entries}, f)
+
+    def load_info_cache(self, f):
+        """
+        Add the :meth:`query_info` results from a file to the cache.
+
+        :param f: Text file to read from.
+        :type f: text file-like
+        :raises ValueError: if the file has an unsupported format
+
+        The file must have been written by :meth:`dump_info_cache`. Entries
+        which have expired in the meantime are skipped. Existing cache entries
+        for the same targets are overridden.
+
+        .. versionadded:: 0.14
+        """
+        data = json.load(f)
+        if data.get("version") != 1:
+            raise ValueError("unsupported disco#info cache format")
+
+        now_monotonic = time.monotonic()
+        now_wallclock = time.time()
+
+        for entry in data["entries"]:
+            expires = entry["expires"]
+            if expires is not None:
+                if expires <= now_wallclock:
+                    continue
+                expires = expires - now_wallclock + now_monotonic
+
+            info = aioxmpp.xml.read_single_xso(
+                io.BytesIO(entry["info"].encode("utf-8")),
+                disco_xso.InfoQuery,
+            )
+            key = structs.JID.fromstr(entry["jid"]), entry["node"]
+
+            fut = asyncio.Future()
+            fut.set_result(info)
+            self._store_info_request(key, fut)
+            if expires is not None:
+                self._info_expires[key] = expires
 
 
 class mount_as_node(service.Descriptor):
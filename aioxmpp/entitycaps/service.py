@@ -23,10 +23,13 @@ import asyncio
 import collections
 import copy
 import functools
+import io
 import logging
 import os
+import sqlite3
 import tempfile
 
+import aioxmpp.cache
 import aioxmpp.callbacks
 import aioxmpp.disco as disco
 import aioxmpp.service
@@ -63,6 +66,21 @@ class Cache:
 
     .. automethod:: set_user_db_path
 
+    .. automethod:: load_user_db_file
+
+    .. automethod:: flush
+
+    The database paths point to directories which contain one file per hash.
+    Looking up a hash in those opens and parses a file on the event loop.
+    When many entities announce their capabilities at once (e.g. after
+    connecting), this can stall the event loop. :meth:`load_user_db_file`
+    offers an alternative user-level database consisting of a single file,
+    which is loaded into an in-memory index in a thread pool. Lookups in the
+    index do not access the file system and new entries are written in
+    batches. Each entry is parsed only once and the resulting
+    :class:`~.disco.xso.InfoQuery` is shared among all entities using the
+    same hash.
+
     Queries (API intended for :class:`Service`):
 
     .. automethod:: create_query_future
@@ -77,6 +95,10 @@ class Cache:
         self._memory_overlay = {}
         self._system_db_path = None
         self._user_db_path = None
+        self._user_db_file = None
+        self._db_index = {}
+        self._pending_writes = {}
+        self._writeback_task = None
 
     def _erase_future(self, key, fut):
         try:
@@ -93,6 +115,77 @@ class Cache:
     def set_user_db_path(self, path):
         self._user_db_path = path
 
+    async def load_user_db_file(self, path):
+        """
+        Use a single-file database as user-level database.
+
+        :param path: Path to the database file.
+        :type path: :class:`pathlib.Path`
+
+        The file is created if it does not exist. Its entries are loaded into
+        an in-memory index in a thread pool. The raw entries are only parsed
+        when they are first looked up.
+
+        Entries added with :meth:`add_cache_entry` are written to this file
+        (instead of to the directory configured with
+        :meth:`set_user_db_path`). The writes are collected and performed in
+        batches in a thread pool. Use :meth:`flush` to wait for them to
+        complete, e.g. before shutting down.
+
+        The index is consulted before the directories configured with
+        :meth:`set_system_db_path` and :meth:`set_user_db_path`.
+
+        .. versionadded:: 0.14
+        """
+        index = await asyncio.get_event_loop().run_in_executor(
+            None,
+            load_db_file,
+            path,
+        )
+        self._user_db_file = path
+        self._db_index.update(index)
+        logger.debug("loaded %d entries from %s", len(index), path)
+
+    async def flush(self):
+        """
+        Wait until all entries added with :meth:`add_cache_entry` have been
+        written to the database file set with :meth:`load_user_db_file`.
+
+        .. versionadded:: 0.14
+        """
+        while self._writeback_task is not None:
+            await asyncio.shield(self._writeback_task)
+
+    async def _writeback_main(self):
+        try:
+            # collect entries added during the current loop iteration
+            await asyncio.sleep(0)
+            while self._pending_writes:
+                entries = list(self._pending_writes.items())
+                self._pending_writes.clear()
+                try:
+                    await asyncio.get_event_loop().run_in_executor(
+                        None,
+                        write_db_entries,
+                        self._user_db_file,
+                        entries,
+                    )
+                except Exception:  # NOQA
+                    logger.exception("failed to write %d entries to %s",
+                                     len(entries), self._user_db_file)
+        finally:
+            self._writeback_task = None
+
+    def _lookup_in_index(self, key):
+        data = self._db_index.pop(str(key.path))
+        result = aioxmpp.xml.read_single_xso(
+            io.BytesIO(data),
+            disco.xso.InfoQuery,
+        )
+        # share the parsed object among all lookups for the hash
+        self._memory_overlay[key] = result
+        return result
+
     def lookup_in_database(self, key):
         try:
             result = self._memory_overlay[key]
@@ -102,6 +195,15 @@ class Cache:
             logger.debug("memory cache hit: %s", key)
             return result
 
+        if self._db_index:
+            try:
+                result = self._lookup_in_index(key)
+            except KeyError:
+                pass
+            else:
+                logger.debug("index hit: %s", key)
+                return result
+
         key_path = key.path
 
         if self._system_db_path is not None:
@@ -182,10 +284,21 @@ class Cache:
         `hash_` and the `node` URL. The `entry` is **not** validated to
         actually map to `node` with the given `hash_` function, it is expected
         that the caller performs the validation.
+
+        .. versionchanged:: 0.14
+
+            If a database file has been loaded with :meth:`load_user_db_file`,
+            the entry is written to that file in a batch.
         """
         copied_entry = copy.copy(entry)
         self._memory_overlay[key] = copied_entry
-        if self._user_db_path is not None:
+        if self._user_db_file is not None:
+            self._pending_writes[str(key.path)] = entry.captured_events
+            if self._writeback_task is None:
+                self._writeback_task = asyncio.ensure_future(
+                    self._writeback_main()
+                )
+        elif self._user_db_path is not None:
             asyncio.ensure_future(asyncio.get_event_loop().run_in_executor(
                 None,
                 writeback,
@@ -224,6 +337,12 @@ class EntityCapsService(aioxmpp.service.Service):
            which presences are sent for the sole purpose of updating peers with
            new capability information.
 
+           Changes which happen within the same event loop iteration are
+           always coalesced into a single re-calculation. Setting
+           :attr:`update_hash_delay` extends this to all changes which happen
+           in short succession, so that :meth:`on_ver_changed` fires only once
+           after the set of features has settled.
+
     2. Users should use a process-wide :class:`Cache` instance and assign it to
        the :attr:`cache` of each :class:`.entitycaps.Service` they use. This
        improves performance by sharing (verified) hashes among :class:`Service`
@@ -244,6 +363,10 @@ class EntityCapsService(aioxmpp.service.Service):
 
     .. autoattribute:: xep390_support
 
+    .. autoattribute:: update_hash_delay
+
+    .. automethod:: query_info_many
+
     .. versionchanged:: 0.8
 
        This class was formerly known as :class:`aioxmpp.entitycaps.Service`. It
@@ -281,6 +404,14 @@ class EntityCapsService(aioxmpp.service.Service):
 
         self.__active_hashsets = []
         self.__key_users = collections.Counter()
+        self.__jid_keys = {}
+
+        self.__update_hash_handle = None
+        self.__update_hash_delay = None
+        # maps a fingerprint of the announced identities and features to the
+        # hashset calculated for them
+        self.__hashset_memo = aioxmpp.cache.LRUDict()
+        self.__hashset_memo.maxsize = 8
 
     @property
     def xep115_support(self):
@@ -332,6 +463,30 @@ class EntityCapsService(aioxmpp.service.Service):
     def xep390_support(self, value):
         self._xep390_feature.enabled = value
 
+    @property
+    def update_hash_delay(self):
+        """
+        Time in seconds to wait for further changes before re-calculating the
+        capability hashes.
+
+        If set to :data:`None` (the default), the hashes are re-calculated in
+        the next event loop iteration after a change of the local
+        :class:`.DiscoServer` information. Otherwise, each change restarts a
+        timer with the given delay and the hashes are re-calculated when the
+        timer expires. This allows to emit only a single
+        :meth:`on_ver_changed` (and thus only a single presence broadcast) when
+        many services are summoned in a row.
+
+        .. versionadded:: 0.14
+        """
+        return self.__update_hash_delay
+
+    @update_hash_delay.setter
+    def update_hash_delay(self, value):
+        if value is not None and value < 0:
+            raise ValueError("update_hash_delay must be non-negative or None")
+        self.__update_hash_delay = value
+
     @property
     def cache(self):
         """
@@ -355,12 +510,36 @@ class EntityCapsService(aioxmpp.service.Service):
         disco.DiscoServer,
         "on_info_changed")
     def _info_changed(self):
-        self.logger.debug("info changed, scheduling re-calculation of version")
-        asyncio.get_event_loop().call_soon(
-            self.update_hash
-        )
+        loop = asyncio.get_event_loop()
+        if self.__update_hash_delay is None:
+            if self.__update_hash_handle is not None:
+                return
+            self.logger.debug(
+                "info changed, scheduling re-calculation of version"
+            )
+            self.__update_hash_handle = loop.call_soon(
+                self.update_hash
+            )
+        else:
+            if self.__update_hash_handle is not None:
+                self.__update_hash_handle.cancel()
+            self.logger.debug(
+                "info changed, (re-)scheduling re-calculation of version"
+            )
+            self.__update_hash_handle = loop.call_later(
+                self.__update_hash_delay,
+                self.update_hash
+            )
+
+    @aioxmpp.service.depsignal(aioxmpp.Client, "on_stream_destroyed")
+    def _stream_destroyed(self):
+        self.__jid_keys.clear()
 
     async def _shutdown(self):
+        if self.__update_hash_handle is not None:
+            self.__update_hash_handle.cancel()
+            self.__update_hash_handle = None
+
         for group in self.__current_keys.values():
             for key in group:
                 self.disco_server.unmount_node(key.node)
@@ -404,6 +583,41 @@ class EntityCapsService(aioxmpp.service.Service):
 
         return info
 
+    def query_info_many(self, jids, **kwargs):
+        """
+        Query the service discovery information of many entities, once per
+        capability hash.
+
+        :param jids: The entities to query.
+        :type jids: iterable of :class:`aioxmpp.JID`
+        :return: Asynchronous iterator of ``(jid, result)`` pairs.
+
+        This is a wrapper around :meth:`.DiscoClient.query_info_many`. All
+        entities which announced the same capability hash in their most recent
+        presence are treated as one equivalence class, so that only a single
+        query is made for each distinct hash. Entities without known
+        capabilities are queried individually.
+
+        The capability hash only describes the root node of an entity. If a
+        `node` keyword argument other than :data:`None` is given, every entity
+        is queried individually.
+
+        The keyword arguments are passed to
+        :meth:`.DiscoClient.query_info_many`; see there for details on the
+        result.
+
+        .. versionadded:: 0.14
+        """
+        if kwargs.get("node") is None:
+            group_key = self.__jid_keys.get
+        else:
+            group_key = None
+        return self.disco_client.query_info_many(
+            jids,
+            group_key=group_key,
+            **kwargs
+        )
+
     @aioxmpp.service.outbound_presence_filter
     def handle_outbound_presence(self, presence):
         if (presence.type_ == aioxmpp.structs.PresenceType.AVAILABLE
@@ -428,6 +642,10 @@ class EntityCapsService(aioxmpp.service.Service):
 
     @aioxmpp.service.inbound_presence_filter
     def handle_inbound_presence(self, presence):
+        if presence.type_ == aioxmpp.structs.PresenceType.UNAVAILABLE:
+            self.__jid_keys.pop(presence.from_, None)
+            return presence
+
         keys = []
 
         if self.xep390_support:
@@ -436,7 +654,12 @@ class EntityCapsService(aioxmpp.service.Service):
         if self.xep115_support:
             keys.extend(self.__115.extract_keys(presence))
 
-        if keys:
+        if not keys:
+            # the entity no longer announces capabilities; it must not be
+            # grouped by the hash of an earlier presence
+            self.__jid_keys.pop(presence.from_, None)
+        else:
+            self.__jid_keys[presence.from_] = keys[0]
             lookup_task = aioxmpp.utils.LazyTask(
                 self.lookup_info,
                 presence.from_,
@@ -474,16 +697,39 @@ class EntityCapsService(aioxmpp.service.Service):
         return True
 
     def update_hash(self):
+        if self.__update_hash_handle is not None:
+            self.__update_hash_handle.cancel()
+            self.__update_hash_handle = None
+
         node = disco.StaticNode.clone(self.disco_server)
-        info = node.as_info_xso()
 
-        new_hashset = {}
+        fingerprint = (
+            frozenset(node.iter_features()),
+            frozenset(node.iter_identities()),
+            self.xep115_support,
+            self.xep390_support,
+        )
 
-        if self.xep115_support:
-            new_hashset[self.__115] = set(self.__115.calculate_keys(info))
+        try:
+            new_hashset = self.__hashset_memo[fingerprint]
+        except KeyError:
+            info = node.as_info_xso()
 
-        if self.xep390_support:
-            new_hashset[self.__390] = set(self.__390.calculate_keys(info))
+            new_hashset = {}
+
+            if self.xep115_support:
+                new_hashset[self.__115] = set(
+                    self.__115.calculate_keys(info)
+                )
+
+            if self.xep390_support:
+                new_hashset[self.__390] = set(
+                    self.__390.calculate_keys(info)
+                )
+
+            self.__hashset_memo[fingerprint] = new_hashset
+        else:
+            self.logger.debug("hashset taken from memo")
 
         self.logger.debug("new hashset=%r", new_hashset)
 
@@ -511,3 +757,51 @@ def writeback(path, captured_events):
             os.unlink(tmpf.name)
             raise
     os.replace(tmpf.name, str(path))
+
+
+def _serialise_events(captured_events):
+    buf = io.BytesIO()
+    generator = aioxmpp.xml.XMPPXMLGenerator(
+        buf,
+        short_empty_elements=True)
+    generator.startDocument()
+    aioxmpp.xso.events_to_sax(captured_events, generator)
+    generator.endDocument()
+    return buf.getvalue()
+
+
+def _open_db_file(path):
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS caps ("
+        "path TEXT PRIMARY KEY, "
+        "info BLOB NOT NULL"
+        ")"
+    )
+    return conn
+
+
+def load_db_file(path):
+    aioxmpp.utils.mkdir_exist_ok(path.parent)
+    conn = _open_db_file(path)
+    try:
+        return dict(conn.execute("SELECT path, info FROM caps"))
+    finally:
+        conn.close()
+
+
+def write_db_entries(path, entries):
+    rows = [
+        (key_path, _serialise_events(captured_events))
+        for key_path, captured_events in entries
+    ]
+
+    conn = _open_db_file(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO caps (path, info) VALUES (?, ?)",
+                rows,
+            )
+    finally:
+        conn.close()
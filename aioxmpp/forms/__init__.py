@@ -42,7 +42,8 @@ Cheat Sheet:
   machine-to-machine use, using the :class:`Data` sent by the peer easily
   allows showing the user *all* fields supported by the peer.
 
-* For machine-processed tables, there is no tooling (yet).
+* For machine-processed tables, :meth:`Data.iter_rows` returns the rows of
+  the table as tuples of values.
 
 .. versionadded:: 0.7
 
@@ -171,6 +172,10 @@ Report and table support
 
 .. autoclass:: Item
 
+To read a table without handling the :class:`Field` objects of each cell, use
+:meth:`Data.iter_rows`, which lazily yields each row as a :class:`tuple` of
+values.
+
 """  # NOQA: E501
 
 
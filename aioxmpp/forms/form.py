@@ -227,7 +227,59 @@ class DescriptorClass(abc.ABCMeta):
             self.DESCRIPTOR_MAP[key] = descriptor
 
 
+class _FormTemplate:
+    """
+    Compiled lookup structures for a :class:`FormClass`.
+
+    :attr:`fields` maps the ``var`` of each field declared on the form to a
+    tuple of the descriptor and the :class:`~.FieldType` members which may
+    be upcast to the type of the descriptor.
+    """
+
+    __slots__ = ("fields",)
+
+    def __init__(self, descriptor_map):
+        self.fields = {}
+        for (ns, var), descriptor in descriptor_map.items():
+            if ns != fields.descriptor_ns or var == "FORM_TYPE":
+                continue
+            allowed_types = frozenset(
+                type_
+                for type_ in forms_xso.FieldType
+                if type_.allow_upcast(descriptor.FIELD_TYPE)
+            )
+            self.fields[var] = descriptor, allowed_types
+
+
 class FormClass(DescriptorClass):
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if isinstance(value, fields.AbstractDescriptor):
+            self._invalidate_template()
+
+    def _register_descriptor_keys(self, descriptor, keys):
+        super()._register_descriptor_keys(descriptor, keys)
+        self._invalidate_template()
+
+    def _get_template(self):
+        """
+        Return the :class:`_FormTemplate` of this class.
+
+        The template is compiled on first use and stored on the class itself,
+        so that subclasses compile their own.
+        """
+        try:
+            return self.__dict__["_FORM_TEMPLATE"]
+        except KeyError:
+            pass
+        template = _FormTemplate(self.DESCRIPTOR_MAP)
+        type.__setattr__(self, "_FORM_TEMPLATE", template)
+        return template
+
+    def _invalidate_template(self):
+        if "_FORM_TEMPLATE" in self.__dict__:
+            type.__delattr__(self, "_FORM_TEMPLATE")
+
     def from_xso(self, xso):
         """
         Construct and return an instance from the given `xso`.
@@ -262,9 +314,15 @@ class FormClass(DescriptorClass):
         If the :attr:`~.Data.type_` does not indicate an actual form (but
         rather a cancellation request or tabular result), :class:`ValueError`
         is raised.
+
+        .. versionchanged:: 0.14
+
+           Fields are matched through a ``var`` index which is compiled once
+           per form class.
         """
 
         my_form_type = getattr(self, "FORM_TYPE", None)
+        template_fields = self._get_template().fields
 
         f = self()
         for field in xso.fields:
@@ -280,17 +338,13 @@ class FormClass(DescriptorClass):
                             )
                         )
                 continue
-            if field.var is None:
-                continue
 
-            key = fields.descriptor_ns, field.var
             try:
-                descriptor = self.DESCRIPTOR_MAP[key]
+                descriptor, allowed_types = template_fields[field.var]
             except KeyError:
                 continue
 
-            if (field.type_ is not None and not
-                    field.type_.allow_upcast(descriptor.FIELD_TYPE)):
+            if field.type_ is not None and field.type_ not in allowed_types:
                 raise ValueError(
                     "mismatching type ({!r} != {!r}) on field var={!r}".format(
                         field.type_,
@@ -405,15 +459,11 @@ class Form(metaclass=FormClass):
         data = copy.copy(self._recv_xso)
         data.type_ = forms_xso.DataType.SUBMIT
         data.fields = list(self._recv_xso.fields)
+        template_fields = type(self)._get_template().fields
 
         for i, field_xso in enumerate(data.fields):
-            if field_xso.var is None:
-                continue
-            if field_xso.var == "FORM_TYPE":
-                continue
-            key = fields.descriptor_ns, field_xso.var
             try:
-                descriptor = self.DESCRIPTOR_MAP[key]
+                descriptor, _ = template_fields[field_xso.var]
             except KeyError:
                 continue
 
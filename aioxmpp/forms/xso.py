@@ -569,6 +569,10 @@ class Data(AbstractItem):
        This only makes sense on :attr:`.DataType.RESULT` typed objects.
 
     .. automethod:: get_form_type
+
+    .. automethod:: get_report_columns
+
+    .. automethod:: iter_rows
     """
 
     TAG = (namespaces.xep0004_data, "x")
@@ -639,5 +643,82 @@ class Data(AbstractItem):
                     return None
                 return field.values[0]
 
+    def get_report_columns(self):
+        """
+        Return the ``var`` values of the table columns.
+
+        :raises ValueError: if the form has no :attr:`reported` header
+        :return: The ``var`` of each column, in the order of the header.
+        :rtype: :class:`tuple` of :class:`str`
+
+        .. versionadded:: 0.14
+        """
+
+        if self.reported is None:
+            raise ValueError("form has no report header")
+        return tuple(field.var for field in self.reported.fields)
+
+    def iter_rows(self, columns=None):
+        """
+        Iterate over the rows of a report or table.
+
+        :param columns: The ``var`` values of the columns to extract, in the
+                        order in which they shall appear in the rows.
+        :type columns: iterable of :class:`str`
+        :raises ValueError: if `columns` is not given and the form has no
+                            :attr:`reported` header
+        :return: An iterator over one :class:`tuple` per :class:`Item`.
+
+        If `columns` is omitted, all columns from :meth:`get_report_columns`
+        are returned.
+
+        The rows are generated lazily from :attr:`items` and contain the raw
+        string values instead of :class:`Field` objects. For columns whose
+        type in the :attr:`reported` header is a ``-multi`` type, the cell is
+        a :class:`tuple` of the values. For all other columns, the cell is the
+        first value or :data:`None` if the field has no value or is missing
+        from the row.
+
+        Rows whose fields are in the same order as the requested columns are
+        read positionally; other rows are matched by ``var``.
+
+        .. versionadded:: 0.14
+        """
+
+        if columns is None:
+            columns = self.get_report_columns()
+        else:
+            columns = tuple(columns)
+
+        multivalued = set()
+        if self.reported is not None:
+            for field in self.reported.fields:
+                if field.type_ is not None and field.type_.is_multivalued:
+                    multivalued.add(field.var)
+        cell_multi = tuple(var in multivalued for var in columns)
+
+        for item in self.items:
+            item_fields = item.fields
+            item_vars = tuple([field.var for field in item_fields])
+            if item_vars == columns:
+                cells = item_fields
+            else:
+                by_var = dict(zip(item_vars, item_fields))
+                cells = [by_var.get(var) for var in columns]
+
+            row = []
+            for field, multi in zip(cells, cell_multi):
+                if field is None:
+                    row.append(() if multi else None)
+                    continue
+                values = field.values
+                if multi:
+                    row.append(tuple(values))
+                elif values:
+                    row.append(values[0])
+                else:
+                    row.append(None)
+            yield tuple(row)
+
 
 aioxmpp.Message.xep0004_data = xso.ChildList([Data])
@@ -53,6 +53,15 @@ Example use::
 
 .. autofunction:: request_slot
 
+To discover the upload service, cache its limits and prefetch slots, use the
+service:
+
+.. currentmodule:: aioxmpp
+
+.. autoclass:: HTTPUploadClient
+
+.. currentmodule:: aioxmpp.httpupload
+
 .. autoclass:: Request
 
 .. module:: aioxmpp.httpupload.xso
@@ -70,6 +79,7 @@ import asyncio
 from ..structs import JID, IQType
 from ..stanza import IQ
 from .xso import Request
+from .service import HTTPUploadClient  # NOQA: F401
 
 
 async def request_slot(client,
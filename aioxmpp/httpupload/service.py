@@ -0,0 +1,395 @@
+########################################################################
+# File name: service.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import asyncio
+import collections
+import os
+import pathlib
+import time
+
+import aioxmpp
+import aioxmpp.disco
+import aioxmpp.hashes
+import aioxmpp.service
+
+from aioxmpp.utils import namespaces
+
+from .xso import Request
+
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _hash_file(path, hash_algos):
+    hashes = [aioxmpp.hashes.hash_from_algo(algo) for algo in hash_algos]
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(_CHUNK_SIZE)
+            if not data:
+                break
+            size += len(data)
+            for h in hashes:
+                h.update(data)
+    return size, [
+        aioxmpp.hashes.Hash(algo, h.digest())
+        for algo, h in zip(hash_algos, hashes)
+    ]
+
+
+class _FileBody:
+    """
+    Asynchronous iterator over the chunks of an open file.
+
+    The chunks are read in the default executor. :class:`RuntimeError` is
+    raised if the file does not contain exactly `size` bytes.
+    """
+
+    def __init__(self, f, size):
+        super().__init__()
+        self._f = f
+        self._remaining = size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await asyncio.get_event_loop().run_in_executor(
+            None,
+            self._f.read,
+            _CHUNK_SIZE,
+        )
+        if not data:
+            if self._remaining:
+                raise RuntimeError("file changed while reading it")
+            raise StopAsyncIteration
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise RuntimeError("file changed while reading it")
+        return data
+
+
+class HTTPUploadClient(aioxmpp.service.Service):
+    """
+    Client service for :xep:`363` HTTP Upload.
+
+    The service discovers the upload service of the account's server with
+    :class:`aioxmpp.DiscoClient` and caches the result (including the
+    maximum file size) until the stream is destroyed.
+
+    .. automethod:: get_upload_service
+
+    .. automethod:: request_slot
+
+    .. automethod:: prefetch_slot
+
+    .. automethod:: upload
+
+    .. autoattribute:: slot_lifetime
+       :annotation: = 60
+
+    .. autoattribute:: max_prefetched_slots
+       :annotation: = 8
+
+    .. versionadded:: 0.14
+    """
+
+    ORDER_AFTER = [aioxmpp.DiscoClient]
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._disco = self.dependencies[aioxmpp.DiscoClient]
+        self._upload_service = None
+        self._prefetched = collections.OrderedDict()
+        self._slot_lifetime = 60
+        self._max_prefetched_slots = 8
+
+    @property
+    def slot_lifetime(self):
+        """
+        Time in seconds after which a prefetched slot is not used anymore.
+
+        Servers may expire unused slots; the default is conservative.
+        """
+        return self._slot_lifetime
+
+    @slot_lifetime.setter
+    def slot_lifetime(self, value):
+        if value < 0:
+            raise ValueError("slot_lifetime must be non-negative")
+        self._slot_lifetime = value
+
+    @property
+    def max_prefetched_slots(self):
+        """
+        Maximum number of prefetched slots. When more slots are prefetched,
+        the oldest ones are discarded.
+        """
+        return self._max_prefetched_slots
+
+    @max_prefetched_slots.setter
+    def max_prefetched_slots(self, value):
+        if value < 0:
+            raise ValueError("max_prefetched_slots must be non-negative")
+        self._max_prefetched_slots = value
+        self._purge_prefetched()
+
+    @aioxmpp.service.depsignal(aioxmpp.Client, "on_stream_destroyed")
+    def _stream_destroyed(self, reason=None):
+        if self._upload_service is not None:
+            self._upload_service.cancel()
+            self._upload_service = None
+        for task, _ in self._prefetched.values():
+            task.cancel()
+        self._prefetched.clear()
+
+    async def _shutdown(self):
+        self._stream_destroyed()
+
+    @staticmethod
+    def _extract_max_file_size(info):
+        for form in info.exts:
+            if form.get_form_type() != namespaces.xep0363_http_upload:
+                continue
+            for field in form.fields:
+                if field.var == "max-file-size" and field.values:
+                    try:
+                        return int(field.values[0])
+                    except ValueError:
+                        return None
+        return None
+
+    async def _discover_upload_service(self):
+        domain = self.client.local_jid.replace(
+            localpart=None,
+            resource=None,
+        )
+        items = await self._disco.query_items(domain)
+        candidates = [domain] + [
+            item.jid for item in items.items
+            if item.jid is not None and item.node is None
+        ]
+
+        found = {}
+        async for jid, info in self._disco.query_info_many(candidates):
+            if isinstance(info, Exception):
+                continue
+            if namespaces.xep0363_http_upload in info.features:
+                found[jid] = self._extract_max_file_size(info)
+
+        # prefer the candidates in the order in which they were listed
+        for jid in candidates:
+            if jid in found:
+                return jid, found[jid]
+
+        raise RuntimeError("no HTTP upload service found")
+
+    async def get_upload_service(self):
+        """
+        Return the HTTP upload service of the server.
+
+        :raises RuntimeError: if the server does not offer HTTP upload
+        :return: The address of the upload service and the maximum file size
+            in bytes (or :data:`None` if the service does not announce one).
+        :rtype: :class:`tuple` of :class:`aioxmpp.JID` and :class:`int`
+
+        The service is discovered on the first call by querying the items
+        of the server; the result is cached until the stream is destroyed.
+        Failed discoveries are not cached.
+        """
+        if self._upload_service is None:
+            self._upload_service = asyncio.ensure_future(
+                self._discover_upload_service()
+            )
+
+        task = self._upload_service
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self._upload_service is task:
+                self._upload_service = None
+            raise
+
+    async def _request_slot(self, filename, size, content_type):
+        service, max_size = await self.get_upload_service()
+        if max_size is not None and size > max_size:
+            raise ValueError(
+                "file too large: {} > {} bytes".format(size, max_size)
+            )
+
+        return await self.client.send(aioxmpp.IQ(
+            type_=aioxmpp.IQType.GET,
+            to=service,
+            payload=Request(filename, size, content_type),
+        ))
+
+    def _purge_prefetched(self):
+        now = time.monotonic()
+        for key, (task, expires) in list(self._prefetched.items()):
+            if expires > now:
+                break
+            task.cancel()
+            del self._prefetched[key]
+
+        while len(self._prefetched) > self._max_prefetched_slots:
+            _, (task, _) = self._prefetched.popitem(last=False)
+            task.cancel()
+
+    def prefetch_slot(self, filename, size, content_type):
+        """
+        Request an upload slot in the background.
+
+        The arguments are as for :meth:`request_slot`. A subsequent call to
+        :meth:`request_slot` or :meth:`upload` with the same arguments within
+        :attr:`slot_lifetime` seconds uses the prefetched slot instead of
+        sending a new request.
+
+        As :xep:`363` requires the slot to be requested with the exact size
+        of the file, slots can only be prefetched for known files, for
+        example while the user is still composing the message the file is
+        attached to.
+        """
+        key = filename, size, content_type
+        if key in self._prefetched:
+            return
+
+        task = asyncio.ensure_future(
+            self._request_slot(filename, size, content_type)
+        )
+        # the error is reported by request_slot if the slot is used
+        task.add_done_callback(
+            lambda fut: fut.cancelled() or fut.exception()
+        )
+        self._prefetched[key] = (
+            task,
+            time.monotonic() + self._slot_lifetime,
+        )
+        self._purge_prefetched()
+
+    async def request_slot(self, filename, size, content_type):
+        """
+        Request an HTTP upload slot from the upload service.
+
+        :param filename: Name of the file (without path).
+        :type filename: :class:`str`
+        :param size: Size of the file in bytes.
+        :type size: :class:`int`
+        :param content_type: The MIME type of the file.
+        :type content_type: :class:`str`
+        :raises ValueError: if `size` exceeds the maximum file size
+        :raises RuntimeError: if the server does not offer HTTP upload
+        :return: The assigned upload slot.
+        :rtype: :class:`.xso.Slot`
+
+        If a slot has been prefetched with the same arguments using
+        :meth:`prefetch_slot`, that slot is returned. If the prefetch failed,
+        a new slot is requested.
+        """
+        self._purge_prefetched()
+        try:
+            task, _ = self._prefetched.pop((filename, size, content_type))
+        except KeyError:
+            pass
+        else:
+            try:
+                return await task
+            except (ValueError, RuntimeError):
+                raise
+            except Exception:
+                pass
+
+        return await self._request_slot(filename, size, content_type)
+
+    async def upload(self, path, put, *,
+                     content_type="application/octet-stream",
+                     filename=None,
+                     hash_algos=()):
+        """
+        Upload a file.
+
+        :param path: The file to upload.
+        :type path: :class:`pathlib.Path` or :class:`str`
+        :param put: Coroutine function performing the HTTP PUT request.
+        :param content_type: The MIME type of the file.
+        :type content_type: :class:`str`
+        :param filename: Name of the file to announce; defaults to the name
+            of `path`.
+        :type filename: :class:`str` or :data:`None`
+        :param hash_algos: :xep:`300` hash algorithms to compute.
+        :type hash_algos: iterable of :class:`str`
+        :raises ValueError: if the file exceeds the maximum file size
+        :raises RuntimeError: if the server does not offer HTTP upload
+        :return: The GET URL of the uploaded file and the digests of the
+            file.
+        :rtype: :class:`tuple` of :class:`str` and :class:`list` of
+            :class:`aioxmpp.hashes.Hash`
+
+        The slot is requested (or taken from the prefetched slots, see
+        :meth:`prefetch_slot`) while the file is hashed in chunks in the
+        default executor of the event loop. The file is never held in memory
+        as a whole.
+
+        This module does not implement HTTP. `put` is called as
+        ``await put(url, headers, data)``, where `headers` is a
+        :class:`multidict.MultiDict` which contains the headers required by
+        the slot as well as ``Content-Type`` and ``Content-Length``, and
+        `data` is an asynchronous iterable of :class:`bytes` chunks of the
+        file (which is accepted as request body by :mod:`aiohttp`). It must
+        raise an exception if the request fails. If the file changes size
+        while it is uploaded, iterating `data` raises :class:`RuntimeError`.
+        """
+        path = pathlib.Path(path)
+        if filename is None:
+            filename = path.name
+        hash_algos = list(hash_algos)
+
+        loop = asyncio.get_event_loop()
+        size = (await loop.run_in_executor(None, os.stat, str(path))).st_size
+
+        slot_task = asyncio.ensure_future(
+            self.request_slot(filename, size, content_type)
+        )
+        try:
+            hashed_size, hashes = await loop.run_in_executor(
+                None,
+                _hash_file,
+                str(path),
+                hash_algos,
+            )
+            slot = await slot_task
+        except:  # NOQA
+            slot_task.cancel()
+            raise
+
+        if hashed_size != size:
+            raise RuntimeError("file changed while reading it")
+
+        headers = slot.put.headers.copy()
+        headers["Content-Type"] = content_type
+        headers["Content-Length"] = str(size)
+
+        f = await loop.run_in_executor(None, open, str(path), "rb")
+        try:
+            await put(slot.put.url, headers, _FileBody(f, size))
+        finally:
+            f.close()
+
+        return slot.get.url, hashes
@@ -20,6 +20,7 @@
 #
 ########################################################################
 import asyncio
+import collections
 import random
 
 from datetime import timedelta
@@ -27,6 +28,7 @@ from datetime import timedelta
 import aioxmpp
 import aioxmpp.callbacks
 import aioxmpp.errors as errors
+import aioxmpp.hashes
 import aioxmpp.service as service
 import aioxmpp.utils as utils
 
@@ -75,8 +77,11 @@ class IBBTransport(asyncio.Transport):
         self._closing = False
 
         self.set_write_buffer_limits()
-        self._write_buffer = b""
+        self._write_buffer = collections.deque()
+        self._write_buffer_size = 0
+        self._writing_paused = False
         self._can_write = asyncio.Event()
+        self._send_window = service.send_window
 
         self._reading_paused = False
         self._input_buffer = []
@@ -88,6 +93,9 @@ class IBBTransport(asyncio.Transport):
 
         self._wait_time = self._service.initial_wait_time.total_seconds()
         self._retries = 0
+        # number of bytes the peer has acknowledged (or, for message
+        # stanzas, which have been sent)
+        self._bytes_acked = 0
 
     def set_write_buffer_limits(self, high=None, low=None):
         if low is None:
@@ -112,7 +120,32 @@ class IBBTransport(asyncio.Transport):
         return self._output_buffer_limit_low, self._output_buffer_limit_high
 
     def get_write_buffer_size(self):
-        return len(self._write_buffer)
+        return self._write_buffer_size
+
+    def set_send_window(self, window):
+        """
+        Set the number of data stanzas which may await their reply.
+
+        :param window: The maximum number of blocks in flight.
+        :type window: :class:`int`
+
+        The default is taken from :attr:`IBBService.send_window` when the
+        session is created.
+
+        .. versionadded:: 0.14
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._send_window = window
+        self._can_write.set()
+
+    def get_send_window(self):
+        """
+        Return the number of data stanzas which may await their reply.
+
+        .. versionadded:: 0.14
+        """
+        return self._send_window
 
     def set_protocol(self, proto):
         self._protocol = proto
@@ -140,74 +173,140 @@ class IBBTransport(asyncio.Transport):
             "sid": self._sid,
         }.get(key, default)
 
+    def _take_block(self):
+        block_size = self._block_size
+        chunk = self._write_buffer[0]
+        if len(chunk) > block_size:
+            self._write_buffer[0] = chunk[block_size:]
+            block = chunk[:block_size]
+        elif len(chunk) == block_size or len(self._write_buffer) == 1:
+            self._write_buffer.popleft()
+            block = chunk
+        else:
+            # coalesce small writes into a single block
+            parts = bytearray()
+            while self._write_buffer and len(parts) < block_size:
+                chunk = self._write_buffer.popleft()
+                missing = block_size - len(parts)
+                if len(chunk) > missing:
+                    self._write_buffer.appendleft(chunk[missing:])
+                    chunk = chunk[:missing]
+                parts += chunk
+            block = memoryview(parts)
+
+        self._write_buffer_size -= len(block)
+        return block
+
+    def _make_data_stanza(self, seq, data):
+        if self._stanza_type == ibb_xso.IBBStanzaType.IQ:
+            return aioxmpp.IQ(
+                aioxmpp.IQType.SET,
+                to=self._peer_jid,
+                payload=ibb_xso.Data(
+                    self._sid,
+                    seq,
+                    data
+                )
+            )
+
+        # TODO: use some form of tracking for messages
+        stanza = aioxmpp.Message(
+            aioxmpp.MessageType.NORMAL,
+            to=self._peer_jid,
+        )
+        stanza.xep0047_data = ibb_xso.Data(
+            self._sid,
+            seq,
+            data
+        )
+        return stanza
+
     async def _write_task_main(self):
         e = None
-        while True:
-            await self._can_write.wait()
-
-            if self._write_buffer:
-                data = self._write_buffer[:self._block_size]
-
-                if self._stanza_type == ibb_xso.IBBStanzaType.IQ:
-                    stanza = aioxmpp.IQ(
-                        aioxmpp.IQType.SET,
-                        to=self._peer_jid,
-                        payload=ibb_xso.Data(
-                            self._sid,
-                            self._outgoing_seq,
-                            data
-                        )
-                    )
-                elif self._stanza_type == ibb_xso.IBBStanzaType.MESSAGE:
-                    # TODO: use some form of tracking for messages
-                    stanza = aioxmpp.Message(
-                        aioxmpp.MessageType.NORMAL,
-                        to=self._peer_jid,
-                    )
-                    stanza.xep0047_data = ibb_xso.Data(
-                        self._sid,
-                        self._outgoing_seq,
-                        data
-                    )
+        # blocks which have been sent, but not acknowledged, in order of
+        # their sequence numbers: (seq, data, send future)
+        in_flight = collections.deque()
+        # blocks which need to be re-sent after a wait error: (seq, data)
+        resend = collections.deque()
+
+        try:
+            while True:
+                while len(in_flight) < self._send_window:
+                    if resend:
+                        seq, data = resend.popleft()
+                    elif self._write_buffer:
+                        seq = self._outgoing_seq
+                        data = self._take_block()
+                        self._outgoing_seq = (seq + 1) & 0xffff
+                    else:
+                        break
+
+                    in_flight.append((
+                        seq,
+                        data,
+                        asyncio.ensure_future(self._service.client.send(
+                            self._make_data_stanza(seq, data),
+                        )),
+                    ))
+
+                if (self._writing_paused and
+                        self._write_buffer_size <
+                        self._output_buffer_limit_low):
+                    self._writing_paused = False
+                    self._protocol.resume_writing()
+
+                if not in_flight:
+                    if self._closing:
+                        break
+                    self._can_write.clear()
+                    await self._can_write.wait()
+                    continue
 
                 try:
-                    await self._service.client.send(
-                        stanza
-                    )
+                    await in_flight[0][2]
                 except errors.XMPPWaitError:
-                    # wait and try again unless max retries have been reached
-                    if self._retries < self._service.max_retries:
-                        await asyncio.sleep(self._wait_time)
-                        self._wait_time *= self._service.wait_backoff_factor
-                        self._retries += 1
-                        continue
-                    else:
+                    # the peer will reject any block sent after the failed
+                    # one (a compliant peer answers them with
+                    # unexpected-request, which is a cancel-type error), so
+                    # everything in flight has to be sent again
+                    failed = list(in_flight)
+                    in_flight.clear()
+                    results = await asyncio.gather(
+                        *(fut for _, _, fut in failed[1:]),
+                        return_exceptions=True,
+                    )
+                    for result in results:
+                        if (isinstance(result, BaseException) and
+                                not isinstance(result, errors.StanzaError)):
+                            raise result
+
+                    # wait and try again unless max retries have been
+                    # reached
+                    if self._retries >= self._service.max_retries:
                         e = asyncio.TimeoutError()
                         break
-                except errors.StanzaError as _e:
-                    # break the loop to close the connection
-                    e = _e
-                    break
-                # update the internal state after the successful
-                # write: remove the written data from the buffer and
-                # increment the sequence number
-                self._write_buffer = self._write_buffer[len(data):]
-                self._outgoing_seq += 1
-                self._outgoing_seq &= 0xffff
+
+                    resend.extendleft(
+                        (seq, data) for seq, data, _ in reversed(failed)
+                    )
+                    await asyncio.sleep(self._wait_time)
+                    self._wait_time *= self._service.wait_backoff_factor
+                    self._retries += 1
+                    continue
+
+                _, data, _ = in_flight.popleft()
+                self._bytes_acked += len(data)
 
                 # reset the wait time
                 self._wait_time = \
                     self._service.initial_wait_time.total_seconds()
                 self._retries = 0
-
-            if len(self._write_buffer) < self._output_buffer_limit_low:
-                self._protocol.resume_writing()
-
-            if not self._write_buffer:
-                if self._closing:
-                    e = None
-                    break
-                self._can_write.clear()
+        except errors.StanzaError as _e:
+            # break the loop to close the connection
+            e = _e
+        finally:
+            for _, _, fut in in_flight:
+                fut.cancel()
 
         close = ibb_xso.Close()
         close.sid = self._sid
@@ -233,18 +332,30 @@ class IBBTransport(asyncio.Transport):
 
         Chunks from one call of :meth:`write` will always be sent in
         series.
+
+        .. versionchanged:: 0.14
+
+           The data is queued without copying if it is a :class:`bytes`
+           object.
         """
 
         if self.is_closing():
             return
 
-        self._write_buffer += data
+        if not data:
+            return
+
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        self._write_buffer.append(memoryview(data))
+        self._write_buffer_size += len(data)
 
-        if len(self._write_buffer) >= self._output_buffer_limit_high:
+        if (not self._writing_paused and
+                self._write_buffer_size >= self._output_buffer_limit_high):
+            self._writing_paused = True
             self._protocol.pause_writing()
 
-        if self._write_buffer:
-            self._can_write.set()
+        self._can_write.set()
 
     def _connection_closed(self):
         self._write_task.cancel()
@@ -304,6 +415,120 @@ class IBBTransport(asyncio.Transport):
         self._data_received(payload.content)
 
 
+def _read_and_hash(f, size, hashes):
+    data = f.read(size)
+    for h in hashes:
+        h.update(data)
+    return data
+
+
+def _write_and_hash(f, data, hashes):
+    f.write(data)
+    for h in hashes:
+        h.update(data)
+
+
+class _FileSendProtocol(asyncio.Protocol):
+    def __init__(self):
+        super().__init__()
+        self.can_write = asyncio.Event()
+        self.can_write.set()
+        self.closed = asyncio.Future()
+
+    def pause_writing(self):
+        self.can_write.clear()
+
+    def resume_writing(self):
+        self.can_write.set()
+
+    def connection_lost(self, exc):
+        self.can_write.set()
+        if self.closed.done():
+            return
+        if exc is None:
+            self.closed.set_result(None)
+        else:
+            self.closed.set_exception(exc)
+
+
+class _FileReceiveProtocol(asyncio.Protocol):
+    # number of bytes buffered in memory before reading is paused
+    BUFFER_LIMIT = 4 * 1024 * 1024
+
+    def __init__(self, f, hashes, progress):
+        super().__init__()
+        self._f = f
+        self._hashes = hashes
+        self._progress = progress
+        self._transport = None
+        self._pending = []
+        self._pending_size = 0
+        self._reading_paused = False
+        self._writer = None
+        self._exc = None
+        self._lost = False
+        self.nbytes = 0
+        self.done = asyncio.Future()
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def data_received(self, data):
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if (not self._reading_paused and
+                self._pending_size >= self.BUFFER_LIMIT):
+            self._reading_paused = True
+            self._transport.pause_reading()
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._writer_main())
+
+    def connection_lost(self, exc):
+        self._lost = True
+        self._exc = exc
+        if self._writer is None:
+            self._finish()
+
+    def _finish(self, exc=None):
+        if self.done.done():
+            return
+        exc = exc or self._exc
+        if exc is None:
+            self.done.set_result(None)
+        else:
+            self.done.set_exception(exc)
+
+    async def _writer_main(self):
+        loop = asyncio.get_event_loop()
+        try:
+            while self._pending:
+                data = b"".join(self._pending)
+                self._pending.clear()
+                self._pending_size = 0
+                if self._reading_paused and not self._lost:
+                    self._reading_paused = False
+                    self._transport.resume_reading()
+
+                await loop.run_in_executor(
+                    None,
+                    _write_and_hash,
+                    self._f, data, self._hashes,
+                )
+                self.nbytes += len(data)
+                if self._progress is not None:
+                    self._progress(self.nbytes)
+        except Exception as exc:
+            if not self._lost:
+                self._transport.abort()
+            self._finish(exc)
+            return
+        finally:
+            self._writer = None
+
+        if self._lost:
+            self._finish()
+
+
 class IBBService(service.Service):
     """
     A service implementing in-band bytestreams.
@@ -314,6 +539,12 @@ class IBBService(service.Service):
 
     .. automethod:: open_session
 
+    Methods for transferring files:
+
+    .. automethod:: send_file
+
+    .. automethod:: receive_file
+
     The following attributes control the establishment of sessions due
     to a received request, that was not announced to the service by
     :meth:`expect_session`:
@@ -364,6 +595,21 @@ class IBBService(service.Service):
 
        The factor by which the wait time is prolonged on each
        successive wait error.
+
+    The following attribute controls the throughput of new sessions:
+
+    .. attribute:: send_window
+       :annotation: = 1
+
+       The number of data stanzas a session sends before waiting for the
+       reply to the oldest one. Values larger than one allow more than one
+       block per round trip. It can be changed per session with
+       :meth:`IBBTransport.set_send_window`.
+
+       If a block fails with a wait error, all blocks in flight are sent
+       again in order after the wait time.
+
+       .. versionadded:: 0.14
     """
 
     on_session_accepted = aioxmpp.callbacks.Signal()
@@ -385,6 +631,7 @@ class IBBService(service.Service):
         self.max_retries = 5
         self.initial_wait_time = timedelta(seconds=1)
         self.wait_backoff_factor = 1.2
+        self.send_window = 1
 
     def _on_stream_destroyed(self):
         self._expected_sessions = {}
@@ -466,6 +713,160 @@ class IBBService(service.Service):
         handle.set_protocol(protocol)
         return handle, protocol
 
+    async def send_file(self, peer_jid, f, *,
+                        hash_algos=("sha-256",),
+                        progress=None,
+                        chunk_size=None,
+                        **kwargs):
+        """
+        Send the contents of a file over a new session.
+
+        :param peer_jid: the JID with which to establish the byte-stream.
+        :type peer_jid: :class:`aioxmpp.JID`
+        :param f: the file to send
+        :type f: binary file-like object
+        :param hash_algos: the :xep:`300` hash algorithms to compute
+        :type hash_algos: iterable of :class:`str`
+        :param progress: called with the number of bytes read from `f` and
+            written to the session so far
+        :type progress: callable or :data:`None`
+        :param chunk_size: number of bytes to read from `f` at once
+        :type chunk_size: :class:`int` or :data:`None`
+        :raises Exception: the error which caused the session to be lost
+        :raises ConnectionError: if the session was closed before all data
+            was acknowledged by the peer
+        :returns: the digests of the data sent
+        :rtype: :class:`list` of :class:`aioxmpp.hashes.Hash`
+
+        The session is opened with :meth:`open_session`, to which the
+        remaining keyword arguments are passed. `f` is read from its current
+        position until its end; reading and hashing happen in the default
+        executor of the event loop. If `chunk_size` is :data:`None`, 64
+        blocks are read at once. Reading pauses while the write buffer of the
+        transport is above its high-water mark.
+
+        As the data is buffered by the session, the value passed to
+        `progress` runs ahead of the data acknowledged by the peer by up to
+        the high-water mark plus the send window. The session is closed after
+        all data has been sent; the coroutine only returns successfully once
+        the peer has acknowledged all of it.
+
+        .. versionadded:: 0.14
+        """
+
+        hashes = [
+            (algo, aioxmpp.hashes.hash_from_algo(algo))
+            for algo in hash_algos
+        ]
+        hash_impls = [h for _, h in hashes]
+
+        transport, protocol = await self.open_session(
+            _FileSendProtocol,
+            peer_jid,
+            **kwargs
+        )
+        if chunk_size is None:
+            chunk_size = 64 * transport.get_extra_info("block_size")
+
+        loop = asyncio.get_event_loop()
+        nbytes = 0
+        eof = False
+        try:
+            while not protocol.closed.done():
+                await protocol.can_write.wait()
+                if protocol.closed.done():
+                    break
+
+                data = await loop.run_in_executor(
+                    None,
+                    _read_and_hash,
+                    f, chunk_size, hash_impls,
+                )
+                if not data:
+                    eof = True
+                    break
+
+                transport.write(data)
+                nbytes += len(data)
+                if progress is not None:
+                    progress(nbytes)
+        except:  # NOQA
+            transport.abort()
+            raise
+
+        transport.close()
+        await protocol.closed
+
+        if not eof or transport._bytes_acked != nbytes:
+            raise ConnectionError(
+                "session closed after {} of {} bytes{}".format(
+                    transport._bytes_acked,
+                    nbytes,
+                    "" if eof else " (before the end of the file)",
+                )
+            )
+
+        return [
+            aioxmpp.hashes.Hash(algo, h.digest())
+            for algo, h in hashes
+        ]
+
+    async def receive_file(self, peer_jid, sid, f, *,
+                           hash_algos=("sha-256",),
+                           progress=None):
+        """
+        Receive the data of an expected session into a file.
+
+        :param peer_jid: the JID of the peer which will open the session.
+        :type peer_jid: :class:`aioxmpp.JID`
+        :param sid: the session id of the expected session
+        :type sid: :class:`str`
+        :param f: the file to write to
+        :type f: binary file-like object
+        :param hash_algos: the :xep:`300` hash algorithms to compute
+        :type hash_algos: iterable of :class:`str`
+        :param progress: called with the number of bytes written so far
+        :type progress: callable or :data:`None`
+        :raises Exception: the error which caused the session to be lost
+        :returns: the digests of the data received
+        :rtype: :class:`list` of :class:`aioxmpp.hashes.Hash`
+
+        The session is expected as with :meth:`expect_session`. The data is
+        written to `f` and hashed in the default executor of the event loop;
+        reading from the session pauses while too much data is waiting to be
+        written. The coroutine returns when the peer has closed the session
+        and all data has been written.
+
+        .. versionadded:: 0.14
+        """
+
+        hashes = [
+            (algo, aioxmpp.hashes.hash_from_algo(algo))
+            for algo in hash_algos
+        ]
+
+        protocol = _FileReceiveProtocol(
+            f,
+            [h for _, h in hashes],
+            progress,
+        )
+        transport, _ = await self.expect_session(
+            lambda: protocol,
+            peer_jid,
+            sid,
+        )
+
+        try:
+            await protocol.done
+        except asyncio.CancelledError:
+            transport.abort()
+            raise
+
+        return [
+            aioxmpp.hashes.Hash(algo, h.digest())
+            for algo, h in hashes
+        ]
+
     @service.iq_handler(
         aioxmpp.IQType.SET,
         ibb_xso.Open)
@@ -34,17 +34,22 @@ To make use of receipt tracking, :meth:`~aioxmpp.Client.summon` the
 use the :meth:`~.DeliveryReceiptsService.attach_tracker` method.
 
 To send delivery receipts, the :func:`aioxmpp.mdr.compose_receipt` helper
-function is provided.
+function is provided. Applications which acknowledge many messages at once
+should use the :class:`~aioxmpp.ReceiptAggregator` instead, which also
+coalesces :xep:`333` chat markers.
 
 .. currentmodule:: aioxmpp
 
 .. autoclass:: DeliveryReceiptsService
 
+.. autoclass:: ReceiptAggregator
+
 .. currentmodule:: aioxmpp.mdr
 
 .. autofunction:: compose_receipt
 """
 from .service import (  # NOQA: F401
     DeliveryReceiptsService,
+    ReceiptAggregator,
     compose_receipt,
 )
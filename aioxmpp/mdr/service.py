@@ -19,7 +19,11 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import asyncio
+import collections
+
 import aioxmpp.disco
+import aioxmpp.misc
 import aioxmpp.service
 import aioxmpp.tracking
 
@@ -136,3 +140,166 @@ def compose_receipt(message):
     reply.to = reply.to.bare()
     reply.xep0184_received = xso.Received(message.id_)
     return reply
+
+
+def _marker_id(message):
+    # in group chats, the id assigned by the room must be used
+    if message.type_ == aioxmpp.MessageType.GROUPCHAT:
+        room = message.from_.bare()
+        for stanza_id in message.xep0359_stanza_ids:
+            if stanza_id.by == room and stanza_id.id_ is not None:
+                return stanza_id.id_
+    return message.id_
+
+
+class ReceiptAggregator(aioxmpp.service.Service):
+    """
+    Coalesce outgoing :xep:`184` delivery receipts and :xep:`333` chat
+    markers.
+
+    When a large backlog of messages is processed (for example the offline
+    queue or the history of a group chat), replying with one receipt or
+    marker per message right away floods the stream. This service collects
+    receipts and markers over a window of :attr:`delay` seconds and sends
+    them together afterwards:
+
+    * Delivery receipts refer to individual messages. Duplicates are
+      dropped, all other receipts are sent, grouped per conversation.
+    * Chat markers apply to all previous messages of the conversation, so
+      only the newest marker of each type is sent per conversation.
+
+    Stanzas which the application sends while the window is open are
+    enqueued in the stream before the receipts and markers, which therefore
+    do not delay other traffic. When the service is shut down, the queued
+    receipts and markers are flushed (see :meth:`flush`).
+
+    .. automethod:: queue_receipt
+
+    .. automethod:: queue_marker
+
+    .. automethod:: flush
+
+    .. autoattribute:: delay
+
+    .. versionadded:: 0.14
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._delay = 1.0
+        self._receipts = collections.OrderedDict()
+        self._markers = collections.OrderedDict()
+        self._flush_handle = None
+
+    @property
+    def delay(self):
+        """
+        The window in seconds over which receipts and markers are collected.
+
+        The window starts with the first receipt or marker queued after the
+        previous flush. A delay of zero sends them on the next iteration of
+        the event loop, which still coalesces everything queued in the same
+        iteration.
+        """
+        return self._delay
+
+    @delay.setter
+    def delay(self, value):
+        if value < 0:
+            raise ValueError("delay must be non-negative")
+        self._delay = value
+
+    async def _shutdown(self):
+        self.flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(
+                self._delay,
+                self.flush,
+            )
+
+    def queue_receipt(self, message):
+        """
+        Queue a delivery receipt for a message.
+
+        :param message: The message to acknowledge.
+        :type message: :class:`aioxmpp.Message`
+        :raises ValueError: if no receipt can be composed for the message
+            (see :func:`compose_receipt`)
+
+        Queueing a receipt for a message id which is already queued for the
+        same conversation has no effect.
+        """
+        receipt = compose_receipt(message)
+        receipts = self._receipts.setdefault(receipt.to, {})
+        receipts.setdefault(message.id_, receipt)
+        self._schedule_flush()
+
+    def queue_marker(self, message, marker_type):
+        """
+        Queue a chat marker for a message.
+
+        :param message: The message to mark.
+        :type message: :class:`aioxmpp.Message`
+        :param marker_type: The marker to send.
+        :type marker_type: :class:`aioxmpp.misc.ReceivedMarker`,
+            :class:`aioxmpp.misc.DisplayedMarker` or
+            :class:`aioxmpp.misc.AcknowledgedMarker`
+        :raises ValueError: if the message is an error or has no id
+
+        A queued marker of the same type for the same conversation is
+        replaced. In group chats, the stanza-id assigned by the room is used
+        to refer to the message, if available.
+        """
+        if message.type_ == aioxmpp.MessageType.ERROR:
+            raise ValueError("markers cannot be sent for error messages")
+
+        id_ = _marker_id(message)
+        if id_ is None:
+            raise ValueError("markers cannot be sent for id-less messages")
+
+        reply = message.make_reply()
+        reply.to = reply.to.bare()
+        reply.xep0333_marker = marker_type()
+        reply.xep0333_marker.id_ = id_
+
+        key = reply.to, marker_type
+        # move the key to the end, so that markers are sent in the order of
+        # their latest update
+        self._markers.pop(key, None)
+        self._markers[key] = reply
+        self._schedule_flush()
+
+    def flush(self):
+        """
+        Send all queued receipts and markers now.
+
+        If the stream is not established, the queued receipts and markers
+        are dropped.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        receipts, self._receipts = \
+            self._receipts, collections.OrderedDict()
+        markers, self._markers = self._markers, collections.OrderedDict()
+
+        stanzas = [
+            receipt
+            for conversation in receipts.values()
+            for receipt in conversation.values()
+        ]
+        stanzas.extend(markers.values())
+
+        for i, stanza in enumerate(stanzas):
+            try:
+                self.client.enqueue(stanza)
+            except ConnectionError:
+                self.logger.debug(
+                    "stream not established, dropping %d receipts and "
+                    "markers",
+                    len(stanzas) - i,
+                )
+                break
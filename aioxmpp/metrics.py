@@ -0,0 +1,659 @@
+########################################################################
+# File name: metrics.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+"""
+:mod:`~aioxmpp.metrics` --- Instrumentation of the stanza processing pipeline
+#############################################################################
+
+This module provides an optional hook interface through which
+:class:`~aioxmpp.stream.StanzaStream` and :class:`~aioxmpp.protocol.XMLStream`
+report how much time each stanza spends in the different stages of
+processing.
+
+Instrumentation is disabled by default. Without a hook, the streams only
+check an attribute against :data:`None` at each instrumentation point and do
+not read the clock. To enable it, assign a :class:`MetricsHook` to
+:attr:`aioxmpp.stream.StanzaStream.metrics` (for a client, that is
+``client.stream.metrics``)::
+
+  collector = aioxmpp.metrics.MetricsCollector()
+  client.stream.metrics = collector
+
+  # later, e.g. in the handler of a HTTP endpoint scraped by Prometheus
+  text = aioxmpp.metrics.format_prometheus(collector)
+
+.. versionadded:: 0.14
+
+Stages and counters
+===================
+
+.. autoclass:: Stage
+
+.. autoclass:: Counter
+
+Hooks
+=====
+
+.. autoclass:: MetricsHook
+
+.. autoclass:: MetricsCollector
+
+.. autoclass:: MultiHook
+
+.. autoclass:: LatencyHistogram
+
+.. autofunction:: filter_name
+
+Exporters
+=========
+
+.. autofunction:: format_prometheus
+
+.. autoclass:: OpenTelemetryHook
+"""
+import bisect
+import math
+import time
+
+from enum import Enum
+
+
+#: Default upper bounds of the histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)
+
+clock = time.perf_counter
+
+
+class Stage(Enum):
+    """
+    Stages of stanza processing for which durations are reported.
+
+    .. attribute:: PARSE
+
+       Time spent in the XML parser for a chunk of data received from the
+       transport. A chunk may contain any number of stanzas (or only a part of
+       one), so this stage is reported without a stanza kind.
+
+    .. attribute:: DISPATCH
+
+       Time from taking an inbound stanza off the incoming queue until it has
+       been handed to all filters and handlers. This includes
+       :attr:`INBOUND_FILTER` and :attr:`HANDLER`.
+
+    .. attribute:: INBOUND_FILTER
+
+       Time spent in the service and application inbound filter chains.
+
+    .. attribute:: HANDLER
+
+       Time spent in the (synchronous part of the) handlers of an inbound
+       stanza. For IQ requests, this covers starting the handler coroutine,
+       not running it.
+
+    .. attribute:: OUTBOUND_QUEUE
+
+       Time an outbound stanza spent in the queue of the
+       :class:`~aioxmpp.stream.StanzaStream` before being processed.
+
+    .. attribute:: OUTBOUND_FILTER
+
+       Time spent in the application and service outbound filter chains.
+
+    .. attribute:: SERIALISE
+
+       Time spent serialising an outbound stanza onto the transport.
+
+    .. attribute:: SM_ACK
+
+       Time from sending a stanza until it was acknowledged by the server
+       via :xep:`198` Stream Management.
+    """
+
+    PARSE = "parse"
+    DISPATCH = "dispatch"
+    INBOUND_FILTER = "inbound_filter"
+    HANDLER = "handler"
+    OUTBOUND_QUEUE = "outbound_queue"
+    OUTBOUND_FILTER = "outbound_filter"
+    SERIALISE = "serialise"
+    SM_ACK = "sm_ack"
+
+
+class Counter(Enum):
+    """
+    Events which are counted per stanza kind.
+
+    .. attribute:: RECEIVED
+
+       A stanza was received.
+
+    .. attribute:: SENT
+
+       A stanza was written to the transport.
+
+    .. attribute:: DROPPED
+
+       A stanza was dropped by a filter chain, inbound or outbound.
+
+    .. attribute:: FAILED
+
+       Sending a stanza failed because it could not be serialised.
+    """
+
+    RECEIVED = "received"
+    SENT = "sent"
+    DROPPED = "dropped"
+    FAILED = "failed"
+
+
+def stanza_kind(stanza):
+    """
+    Return the kind of `stanza` as used in metric labels: ``"iq"``,
+    ``"message"`` or ``"presence"``.
+    """
+    return stanza.TAG[1]
+
+
+def filter_name(func):
+    """
+    Return the name under which the filter function `func` is reported in
+    metric labels.
+
+    This is the module and qualified name of the function (or of the function
+    underlying a bound method). For other callables, the :func:`repr` is used.
+    """
+    try:
+        return "{}.{}".format(func.__module__, func.__qualname__)
+    except AttributeError:
+        return repr(func)
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in seconds.
+
+    :param bounds: Upper bounds of the buckets in seconds.
+    :type bounds: iterable of :class:`float`
+
+    The buckets are cumulative, in the style of Prometheus: each bucket
+    counts all observations less than or equal to its upper bound. An
+    implicit bucket with an infinite upper bound counts all observations.
+
+    .. autoattribute:: bounds
+
+    .. autoattribute:: count
+
+    .. autoattribute:: sum
+
+    .. automethod:: buckets
+
+    .. automethod:: observe
+
+    .. automethod:: reset
+
+    .. versionadded:: 0.14
+
+       This class was added to :mod:`aioxmpp.tracking` and is available from
+       there, too.
+    """
+
+    def __init__(self, bounds):
+        super().__init__()
+        self._bounds = tuple(sorted(bounds))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+
+    @property
+    def bounds(self):
+        """
+        The upper bounds of the finite buckets, in ascending order.
+        """
+        return self._bounds
+
+    @property
+    def count(self):
+        """
+        The number of observations.
+        """
+        return sum(self._counts)
+
+    @property
+    def sum(self):
+        """
+        The sum of all observed values.
+        """
+        return self._sum
+
+    def buckets(self):
+        """
+        Return the cumulative bucket counts.
+
+        :rtype: :class:`list` of pairs of upper bound and count
+
+        The last pair has :data:`math.inf` as upper bound.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self._bounds + (math.inf,), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def observe(self, value):
+        """
+        Record an observation.
+        """
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def reset(self):
+        """
+        Drop all observations.
+        """
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+
+
+class MetricsHook:
+    """
+    Interface for receiving measurements from the streams.
+
+    Subclasses override the methods they are interested in; the default
+    implementations do nothing. The methods are called synchronously from
+    the stanza processing code and should return quickly.
+
+    .. automethod:: observe
+
+    .. automethod:: increment
+
+    .. automethod:: observe_filter
+    """
+
+    def observe(self, stage, kind, value):
+        """
+        Record that a stanza spent `value` seconds in `stage`.
+
+        :param stage: The processing stage.
+        :type stage: :class:`Stage`
+        :param kind: The kind of the stanza (``"iq"``, ``"message"`` or
+            ``"presence"``) or :data:`None` for measurements which are not
+            related to a single stanza.
+        :type kind: :class:`str` or :data:`None`
+        :param value: The duration in seconds.
+        :type value: :class:`float`
+        """
+
+    def increment(self, counter, kind, amount=1):
+        """
+        Increase `counter` for stanzas of the given `kind` by `amount`.
+
+        :param counter: The counter to increase.
+        :type counter: :class:`Counter`
+        :param kind: The kind of the stanza.
+        :type kind: :class:`str`
+        :param amount: The amount to add.
+        :type amount: :class:`int`
+        """
+
+    def observe_filter(self, chain, func, value):
+        """
+        Record that the filter function `func` took `value` seconds.
+
+        :param chain: The name of the filter chain, for example
+            ``"service_inbound_message"``.
+        :type chain: :class:`str` or :data:`None`
+        :param func: The filter function.
+        :param value: The duration in seconds.
+        :type value: :class:`float`
+
+        This is only called for filter chains whose
+        :attr:`~aioxmpp.callbacks.Filter.metrics` attribute is set. The time
+        spent in a whole chain is also included in :attr:`Stage.INBOUND_FILTER`
+        or :attr:`Stage.OUTBOUND_FILTER`. Use :func:`filter_name` to obtain a
+        label for `func`.
+        """
+
+
+class MetricsCollector(MetricsHook):
+    """
+    Collect measurements in memory.
+
+    :param buckets: Upper bounds of the histogram buckets in seconds.
+    :type buckets: iterable of :class:`float`
+
+    One :class:`LatencyHistogram` is kept per combination of :class:`Stage`
+    and stanza kind, and one count per combination of :class:`Counter` and
+    stanza kind. They are created on first use. Filter durations are kept in
+    one histogram per chain and :func:`filter_name` of the filter function.
+
+    .. automethod:: histogram
+
+    .. automethod:: histograms
+
+    .. automethod:: filter_histogram
+
+    .. automethod:: filter_histograms
+
+    .. automethod:: counter
+
+    .. automethod:: counters
+
+    .. automethod:: reset
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        super().__init__()
+        self._buckets = tuple(buckets)
+        self._histograms = {}
+        self._filter_histograms = {}
+        self._counters = {}
+
+    def observe(self, stage, kind, value):
+        key = stage, kind
+        try:
+            histogram = self._histograms[key]
+        except KeyError:
+            histogram = LatencyHistogram(self._buckets)
+            self._histograms[key] = histogram
+        histogram.observe(value)
+
+    def observe_filter(self, chain, func, value):
+        key = chain, filter_name(func)
+        try:
+            histogram = self._filter_histograms[key]
+        except KeyError:
+            histogram = LatencyHistogram(self._buckets)
+            self._filter_histograms[key] = histogram
+        histogram.observe(value)
+
+    def increment(self, counter, kind, amount=1):
+        key = counter, kind
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, stage, kind=None):
+        """
+        Return the histogram for `stage` and `kind`.
+
+        :rtype: :class:`LatencyHistogram` or :data:`None`
+
+        If nothing was recorded for the combination, :data:`None` is returned.
+        """
+        return self._histograms.get((stage, kind))
+
+    def histograms(self):
+        """
+        Return all histograms.
+
+        :rtype: :class:`list` of ``((stage, kind), histogram)`` pairs
+        """
+        return list(self._histograms.items())
+
+    def filter_histogram(self, chain, name):
+        """
+        Return the histogram for the filter function called `name` in the
+        filter chain `chain`.
+
+        :param name: The name of the function as returned by
+            :func:`filter_name`.
+        :rtype: :class:`LatencyHistogram` or :data:`None`
+        """
+        return self._filter_histograms.get((chain, name))
+
+    def filter_histograms(self):
+        """
+        Return all filter histograms.
+
+        :rtype: :class:`list` of ``((chain, name), histogram)`` pairs
+        """
+        return list(self._filter_histograms.items())
+
+    def counter(self, counter, kind):
+        """
+        Return the value of `counter` for stanzas of the given `kind`.
+        """
+        return self._counters.get((counter, kind), 0)
+
+    def counters(self):
+        """
+        Return all counters.
+
+        :rtype: :class:`list` of ``((counter, kind), value)`` pairs
+        """
+        return list(self._counters.items())
+
+    def reset(self):
+        """
+        Drop all recorded data.
+        """
+        self._histograms.clear()
+        self._filter_histograms.clear()
+        self._counters.clear()
+
+
+class MultiHook(MetricsHook):
+    """
+    Forward measurements to several hooks.
+
+    :param hooks: The hooks to forward to.
+    :type hooks: iterable of :class:`MetricsHook`
+
+    This allows to combine, for example, a :class:`MetricsCollector` with an
+    :class:`OpenTelemetryHook`.
+    """
+
+    def __init__(self, hooks):
+        super().__init__()
+        self._hooks = tuple(hooks)
+
+    def observe(self, stage, kind, value):
+        for hook in self._hooks:
+            hook.observe(stage, kind, value)
+
+    def increment(self, counter, kind, amount=1):
+        for hook in self._hooks:
+            hook.increment(counter, kind, amount)
+
+    def observe_filter(self, chain, func, value):
+        for hook in self._hooks:
+            hook.observe_filter(chain, func, value)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace(
+                "\n", "\\n"
+            ),
+        )
+        for name, value in labels
+    )
+
+
+def _format_histogram(lines, name, labels, histogram):
+    for bound, count in histogram.buckets():
+        lines.append("{}_bucket{{{}}} {}".format(
+            name,
+            _format_labels(labels + [("le", _format_value(bound))]),
+            count,
+        ))
+    lines.append("{}_sum{{{}}} {}".format(
+        name, _format_labels(labels), _format_value(histogram.sum),
+    ))
+    lines.append("{}_count{{{}}} {}".format(
+        name, _format_labels(labels), histogram.count,
+    ))
+
+
+def format_prometheus(collector, *, prefix="aioxmpp"):
+    """
+    Render the data of a collector in the Prometheus text exposition format.
+
+    :param collector: The collector to export.
+    :type collector: :class:`MetricsCollector`
+    :param prefix: Prefix for the metric names.
+    :type prefix: :class:`str`
+    :rtype: :class:`str`
+
+    The stage durations are exported as histogram ``<prefix>_stage_seconds``
+    with the labels ``stage`` and ``kind``; the counters as
+    ``<prefix>_stanzas_total`` with the labels ``event`` and ``kind``. An
+    empty ``kind`` label is used for measurements without a stanza kind.
+
+    If filter durations were recorded, they are exported as histogram
+    ``<prefix>_filter_seconds`` with the labels ``chain`` and ``filter``.
+    """
+    lines = []
+
+    name = "{}_stage_seconds".format(prefix)
+    lines.append(
+        "# HELP {} Time spent per stanza processing stage.".format(name)
+    )
+    lines.append("# TYPE {} histogram".format(name))
+    for (stage, kind), histogram in sorted(
+            collector.histograms(),
+            key=lambda item: (item[0][0].value, item[0][1] or "")):
+        _format_histogram(
+            lines, name,
+            [("stage", stage.value), ("kind", kind or "")],
+            histogram,
+        )
+
+    filter_histograms = collector.filter_histograms()
+    if filter_histograms:
+        name = "{}_filter_seconds".format(prefix)
+        lines.append(
+            "# HELP {} Time spent per filter function.".format(name)
+        )
+        lines.append("# TYPE {} histogram".format(name))
+        for (chain, filter_), histogram in sorted(
+                filter_histograms,
+                key=lambda item: (item[0][0] or "", item[0][1])):
+            _format_histogram(
+                lines, name,
+                [("chain", chain or ""), ("filter", filter_)],
+                histogram,
+            )
+
+    name = "{}_stanzas_total".format(prefix)
+    lines.append("# HELP {} Stanzas processed per event.".format(name))
+    lines.append("# TYPE {} counter".format(name))
+    for (counter, kind), value in sorted(
+            collector.counters(),
+            key=lambda item: (item[0][0].value, item[0][1] or "")):
+        lines.append("{}{{{}}} {}".format(
+            name,
+            _format_labels([("event", counter.value), ("kind", kind or "")]),
+            value,
+        ))
+
+    return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryHook(MetricsHook):
+    """
+    Forward measurements to OpenTelemetry instruments.
+
+    :param meter: The meter to create the instruments with.
+    :param prefix: Prefix for the instrument names.
+    :type prefix: :class:`str`
+
+    `meter` is used as an :class:`opentelemetry.metrics.Meter`: a histogram
+    ``<prefix>.stage.duration`` (unit ``s``) and a counter
+    ``<prefix>.stanzas`` are created with
+    :meth:`~opentelemetry.metrics.Meter.create_histogram` and
+    :meth:`~opentelemetry.metrics.Meter.create_counter`. Measurements are
+    recorded with the attributes ``stage``, ``event`` and ``kind``.
+
+    Filter durations are recorded in a histogram
+    ``<prefix>.filter.duration`` with the attributes ``chain`` and
+    ``filter``, which is created when the first one is observed.
+
+    :mod:`aioxmpp` does not depend on the OpenTelemetry API; any object with
+    compatible methods can be passed as `meter`.
+    """
+
+    def __init__(self, meter, *, prefix="aioxmpp"):
+        super().__init__()
+        self._meter = meter
+        self._prefix = prefix
+        self._filter_histogram = None
+        self._histogram = meter.create_histogram(
+            "{}.stage.duration".format(prefix),
+            unit="s",
+            description="Time spent per stanza processing stage.",
+        )
+        self._counter = meter.create_counter(
+            "{}.stanzas".format(prefix),
+            description="Stanzas processed per event.",
+        )
+        self._attributes = {}
+
+    def _get_attributes(self, key, name, value, kind):
+        try:
+            return self._attributes[key]
+        except KeyError:
+            attributes = {name: value}
+            if kind is not None:
+                attributes["kind"] = kind
+            self._attributes[key] = attributes
+            return attributes
+
+    def observe(self, stage, kind, value):
+        self._histogram.record(
+            value,
+            attributes=self._get_attributes(
+                (stage, kind), "stage", stage.value, kind,
+            ),
+        )
+
+    def increment(self, counter, kind, amount=1):
+        self._counter.add(
+            amount,
+            attributes=self._get_attributes(
+                (counter, kind), "event", counter.value, kind,
+            ),
+        )
+
+    def observe_filter(self, chain, func, value):
+        if self._filter_histogram is None:
+            self._filter_histogram = self._meter.create_histogram(
+                "{}.filter.duration".format(self._prefix),
+                unit="s",
+                description="Time spent per filter function.",
+            )
+        self._filter_histogram.record(
+            value,
+            attributes={"chain": chain or "", "filter": filter_name(func)},
+        )
@@ -21,6 +21,7 @@
 ########################################################################
 import asyncio
 import functools
+import logging
 import uuid
 
 from datetime import datetime
@@ -1154,9 +1155,9 @@ class Room(aioxmpp.im.conversation.AbstractConversation):
         return True
 
     def _handle_message(self, message, peer, sent, source):
-        self._service.logger.debug("%s: inbound message %r",
-                                   self._mucjid,
-                                   message)
+        logger = self._service.logger
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s: inbound message %r", self._mucjid, message)
 
         self._monitor.enable()
         self._monitor.reset()
@@ -36,6 +36,8 @@ of peers, no matter whether they are in the roster or not.
 
 .. currentmodule:: aioxmpp.presence
 
+.. autoclass:: CompactPresence
+
 .. class:: Service
 
    Alias of :class:`.PresenceClient`.
@@ -46,5 +48,9 @@ of peers, no matter whether they are in the roster or not.
 
 """
 
-from .service import PresenceClient, PresenceServer  # NOQA: F401
+from .service import (  # NOQA: F401
+    CompactPresence,
+    PresenceClient,
+    PresenceServer,
+)
 Service = PresenceClient  # NOQA
@@ -28,6 +28,103 @@ import aioxmpp.structs
 import aioxmpp.xso.model
 
 
+class CompactPresence:
+    """
+    Compact record of the relevant parts of an inbound presence stanza.
+
+    :class:`PresenceClient` stores instances of this class instead of the
+    full :class:`aioxmpp.Presence` stanzas if
+    :attr:`~PresenceClient.compact_store` is enabled. The attributes mirror
+    the attributes of the same name on :class:`aioxmpp.Presence`.
+
+    .. attribute:: from_
+
+       The JID of the resource the presence was received from.
+
+    .. attribute:: type_
+
+       The :class:`~aioxmpp.PresenceType` of the presence.
+
+    .. attribute:: show
+
+       The :class:`~aioxmpp.PresenceShow` value of the presence.
+
+    .. attribute:: priority
+
+       The priority of the resource.
+
+    .. attribute:: status
+
+       The :class:`~aioxmpp.structs.LanguageMap` of status texts.
+
+    .. attribute:: payloads
+
+       Mapping of attribute names of :class:`aioxmpp.Presence` to the values
+       retained from the stanza. Only attributes listed in
+       :attr:`PresenceClient.compact_payloads` and set on the stanza are
+       included.
+
+    .. autoattribute:: state
+
+    .. automethod:: from_stanza
+
+    .. versionadded:: 0.14
+    """
+
+    __slots__ = ("from_", "type_", "show", "priority", "status", "payloads")
+
+    def __init__(self, from_, type_, show, priority, status, payloads):
+        super().__init__()
+        self.from_ = from_
+        self.type_ = type_
+        self.show = show
+        self.priority = priority
+        self.status = status
+        self.payloads = payloads
+
+    @classmethod
+    def from_stanza(cls, stanza, payload_attrs=()):
+        """
+        Create a record from a presence stanza.
+
+        :param stanza: The presence stanza to extract the information from.
+        :type stanza: :class:`aioxmpp.Presence`
+        :param payload_attrs: Names of payload attributes to retain.
+        :type payload_attrs: iterable of :class:`str`
+        :rtype: :class:`CompactPresence`
+        """
+        payloads = {}
+        for attr in payload_attrs:
+            value = getattr(stanza, attr, None)
+            if value is not None:
+                payloads[attr] = value
+
+        return cls(
+            stanza.from_,
+            stanza.type_,
+            stanza.show,
+            stanza.priority,
+            stanza.status,
+            payloads,
+        )
+
+    @property
+    def state(self):
+        """
+        The :class:`~aioxmpp.PresenceState` described by the record.
+        """
+        return aioxmpp.structs.PresenceState.from_stanza(self)
+
+    def __repr__(self):
+        return "<{}.{} from={!r} type={!r} show={!r}>".format(
+            type(self).__module__,
+            type(self).__qualname__,
+            self.from_,
+            self.type_,
+            self.show,
+        )
+
+
 class PresenceClient(aioxmpp.service.Service):
     """
     The presence service tracks all incoming presence information (this does
@@ -55,6 +152,29 @@ class PresenceClient(aioxmpp.service.Service):
 
     .. automethod:: get_stanza
 
+    The most available resource of each bare JID is tracked incrementally
+    while presence stanzas are received, so that
+    :meth:`get_most_available_stanza` does not need to look at all resources.
+
+    To reduce memory use when tracking the presence of many peers, the full
+    stanzas can be replaced with :class:`~.presence.CompactPresence` records:
+
+    .. autoattribute:: compact_store
+
+    .. attribute:: compact_payloads
+       :annotation: = set()
+
+       Set of names of :class:`aioxmpp.Presence` attributes (such as
+       ``"xep0115_caps"``) which are retained in the
+       :attr:`~.presence.CompactPresence.payloads` of the records created if
+       :attr:`compact_store` is enabled.
+
+       .. versionadded:: 0.14
+
+    .. automethod:: retain_stanzas
+
+    .. automethod:: release_stanzas
+
     On presence changes of peers, signals are emitted:
 
     .. signal:: on_bare_available(stanza)
@@ -95,6 +215,9 @@ class PresenceClient(aioxmpp.service.Service):
     The three signals :meth:`on_available`,  :meth:`on_changed` and
     :meth:`on_unavailable` never fire for the same stanza.
 
+    The signals always receive the full stanza, independent of
+    :attr:`compact_store`.
+
     .. versionadded:: 0.4
 
     .. versionchanged:: 0.8
@@ -119,6 +242,101 @@ class PresenceClient(aioxmpp.service.Service):
         super().__init__(client, **kwargs)
 
         self._presences = {}
+        # maps bare JIDs to (resource, PresenceState) of the most available
+        # resource
+        self._most_available = {}
+        self._compact_store = False
+        self._retained = set()
+        self.compact_payloads = set()
+
+    @property
+    def compact_store(self):
+        """
+        Boolean flag to store compact records instead of full stanzas.
+
+        Defaults to :data:`False`. If set to true, presence stanzas received
+        from then on are stored as :class:`~.presence.CompactPresence` records
+        (except error presences and presences from peers for which
+        :meth:`retain_stanzas` has been called). The records are returned by
+        :meth:`get_stanza`, :meth:`get_peer_resources` and
+        :meth:`get_most_available_stanza` instead of the stanzas.
+
+        Stanzas which have been stored before the flag was set are not
+        converted.
+
+        .. versionadded:: 0.14
+        """
+        return self._compact_store
+
+    @compact_store.setter
+    def compact_store(self, value):
+        self._compact_store = bool(value)
+
+    def retain_stanzas(self, peer_jid):
+        """
+        Keep storing the full presence stanzas of a peer.
+
+        :param peer_jid: Bare JID of the peer.
+        :type peer_jid: :class:`aioxmpp.JID`
+
+        This only has an effect if :attr:`compact_store` is enabled: Stanzas
+        received from any resource of `peer_jid` after this call are stored as
+        full stanzas instead of :class:`~.presence.CompactPresence` records.
+
+        .. versionadded:: 0.14
+        """
+        self._retained.add(peer_jid)
+
+    def release_stanzas(self, peer_jid):
+        """
+        Undo the effect of :meth:`retain_stanzas`.
+
+        :param peer_jid: Bare JID of the peer.
+        :type peer_jid: :class:`aioxmpp.JID`
+
+        Stanzas which are already stored are not converted.
+
+        .. versionadded:: 0.14
+        """
+        self._retained.discard(peer_jid)
+
+    def _make_record(self, bare, st):
+        if not self._compact_store or bare in self._retained:
+            return st
+        return CompactPresence.from_stanza(st, self.compact_payloads)
+
+    def _rescan_most_available(self, bare, resources):
+        best = None
+        for resource, st in resources.items():
+            state = aioxmpp.structs.PresenceState.from_stanza(st)
+            # ties are won by the resource which was added last
+            if best is None or not state < best[1]:
+                best = resource, state
+
+        if best is None:
+            self._most_available.pop(bare, None)
+        else:
+            self._most_available[bare] = best
+
+    def _update_most_available(self, bare, resources, resource, added):
+        state = aioxmpp.structs.PresenceState.from_stanza(resources[resource])
+        try:
+            best_resource, best_state = self._most_available[bare]
+        except KeyError:
+            self._most_available[bare] = resource, state
+            return
+
+        if best_resource == resource:
+            if not state < best_state:
+                self._most_available[bare] = resource, state
+                return
+        elif best_state < state or (added and best_state == state):
+            self._most_available[bare] = resource, state
+            return
+        elif state < best_state:
+            return
+
+        self._rescan_most_available(bare, resources)
 
     def get_most_available_stanza(self, peer_jid):
         """
@@ -136,14 +354,17 @@ class PresenceClient(aioxmpp.service.Service):
 
         If there is no available resource for a given `peer_jid`, :data:`None`
         is returned.
+
+        .. versionchanged:: 0.14
+
+            The most available resource is now tracked incrementally, making
+            this a constant-time operation.
         """
-        presences = sorted(
-            self.get_peer_resources(peer_jid).items(),
-            key=lambda item: aioxmpp.structs.PresenceState.from_stanza(item[1])
-        )
-        if not presences:
+        try:
+            resource, _ = self._most_available[peer_jid]
+        except KeyError:
             return None
-        return presences[-1][1]
+        return self._presences[peer_jid][resource]
 
     def get_peer_resources(self, peer_jid):
         """
@@ -210,6 +431,8 @@ class PresenceClient(aioxmpp.service.Service):
                 if len(dest_dict) == 1:
                     self.on_bare_unavailable(st)
                 del dest_dict[resource]
+                if self._most_available.get(bare, (None,))[0] == resource:
+                    self._rescan_most_available(bare, dest_dict)
         elif st.type_ == aioxmpp.structs.PresenceType.ERROR:
             try:
                 dest_dict = self._presences[bare]
@@ -221,12 +444,15 @@ class PresenceClient(aioxmpp.service.Service):
                                         st)
                 self.on_bare_unavailable(st)
             self._presences[bare] = {None: st}
+            self._most_available.pop(bare, None)
         else:
             dest_dict = self._presences.setdefault(bare, {})
             dest_dict.pop(None, None)
             bare_became_available = not dest_dict
             resource_became_available = resource not in dest_dict
-            dest_dict[resource] = st
+            dest_dict[resource] = self._make_record(bare, st)
+            self._update_most_available(bare, dest_dict, resource,
+                                        resource_became_available)
 
             if bare_became_available:
                 self.on_bare_available(st)
@@ -42,6 +42,11 @@ Utilities for XML streams
 
 .. autofunction:: reset_stream_and_get_features
 
+Debugging
+=========
+
+.. autoclass:: WireDumpSampler
+
 Enumerations
 ============
 
@@ -61,7 +66,10 @@ from enum import Enum
 import xml.sax as sax
 import xml.parsers.expat as pyexpat
 
-from . import xml, errors, xso, nonza, stanza, callbacks, statemachine, utils
+from . import (
+    xml, errors, xso, nonza, stanza, callbacks, statemachine, utils,
+    metrics,
+)
 from .utils import namespaces
 
 logger = logging.getLogger(__name__)
@@ -140,10 +148,58 @@ class State(Enum):
     CLOSED = 6
 
 
+class WireDumpSampler:
+    """
+    Select which data is included in the debug wire dump of an
+    :class:`XMLStream`.
+
+    :param every: Only dump every `every`-th piece of data.
+    :type every: :class:`int`
+    :param jids: Only consider data which mentions one of these addresses.
+    :type jids: iterable of :class:`~aioxmpp.JID`
+    :raises ValueError: if `every` is less than one.
+
+    A piece of data is a chunk received from the transport or a single write
+    to it. Each XSO sent over the stream is written at once, but the stream
+    header and footer are written in several fragments; each fragment counts
+    as one piece towards `every`. The addresses are matched literally against
+    the serialised data, so a bare JID also matches all of its full JIDs.
+
+    The data may be any bytes-like object; sent XSOs are passed as
+    :class:`memoryview`.
+
+    Instances are used as :attr:`XMLStream.wire_dump_sampler`.
+
+    .. versionadded:: 0.14
+    """
+
+    def __init__(self, every=1, jids=()):
+        super().__init__()
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self._needles = tuple(str(jid).encode("utf-8") for jid in jids)
+        self._counter = 0
+
+    def __call__(self, data):
+        if self._needles:
+            # ``in`` does not search the contents of a memoryview
+            if not isinstance(data, bytes):
+                data = bytes(data)
+            if not any(needle in data for needle in self._needles):
+                return False
+        self._counter += 1
+        if self._counter < self.every:
+            return False
+        self._counter = 0
+        return True
+
+
 class DebugWrapper:
-    def __init__(self, dest, logger):
+    def __init__(self, dest, logger, sampler=None):
         self.dest = dest
         self.logger = logger
+        self.sampler = sampler
         if hasattr(dest, "flush"):
             self._flush = dest.flush
         else:
@@ -154,7 +210,8 @@ class DebugWrapper:
         self._written_mute_marker = False
 
     def _emit(self):
-        self.logger.debug("SENT %r", b"".join(self._pieces))
+        if self._pieces:
+            self.logger.debug("SENT %r", b"".join(self._pieces))
         self._pieces = []
         self._total_len = 0
 
@@ -163,7 +220,7 @@ class DebugWrapper:
             if not self._written_mute_marker:
                 self._pieces.append(b"<!-- some bytes omitted -->")
                 self._written_mute_marker = True
-        else:
+        elif self.sampler is None or self.sampler(data):
             self._pieces.append(data)
             self._total_len += len(data)
         result = self.dest.write(data)
@@ -253,6 +310,17 @@ class XMLStream(asyncio.Protocol):
 
        .. versionadded:: 0.4
 
+    .. attribute:: metrics
+
+       A :class:`~aioxmpp.metrics.MetricsHook` which receives the time spent
+       parsing received data (:attr:`~aioxmpp.metrics.Stage.PARSE`), or
+       :data:`None` (the default) to disable the measurement.
+
+       This is managed by the :class:`~aioxmpp.stream.StanzaStream` which uses
+       the XML stream; see :attr:`aioxmpp.stream.StanzaStream.metrics`.
+
+       .. versionadded:: 0.14
+
     Sending XSOs:
 
     .. automethod:: send_xso
@@ -321,6 +389,21 @@ class XMLStream(asyncio.Protocol):
        The maximum time to wait for the peer ``</stream:stream>`` before
        forcing to close the transport and considering the stream closed.
 
+    Debugging:
+
+    .. attribute:: wire_dump_sampler
+
+       If the logger of the stream is enabled for :data:`logging.DEBUG`, all
+       data sent and received is logged. If this is set to a callable, such
+       as a :class:`WireDumpSampler`, it is called with each chunk of
+       received data and each serialised XSO, and the data is only logged if
+       it returns true.
+
+       Like :attr:`shutdown_timeout`, this can be set on the class to affect
+       all streams. The default is :data:`None`, which logs everything.
+
+       .. versionadded:: 0.14
+
     """
 
     on_closing = callbacks.Signal()
@@ -328,6 +411,8 @@ class XMLStream(asyncio.Protocol):
 
     shutdown_timeout = 15
 
+    wire_dump_sampler = None
+
     def __init__(self, to,
                  features_future=None,
                  sorted_attributes=False,
@@ -374,6 +459,7 @@ class XMLStream(asyncio.Protocol):
         self.stanza_parser.add_class(nonza.StreamFeatures,
                                      self._rx_stream_features)
         self.error_handler = None
+        self.metrics = None
 
     def _invalid_transition(self, to, via=None):
         text = "invalid state transition: from={} to={}".format(
@@ -487,6 +573,10 @@ class XMLStream(asyncio.Protocol):
         self._features_futures.clear()
 
     def _rx_feed(self, blob):
+        hook = self.metrics
+        if hook is not None:
+            start = metrics.clock()
+
         try:
             self._parser.feed(blob)
         except sax.SAXParseException as exc:
@@ -510,6 +600,9 @@ class XMLStream(asyncio.Protocol):
                      " details."
             )
 
+        if hook is not None:
+            hook.observe(metrics.Stage.PARSE, None, metrics.clock() - start)
+
     def _deadtime_hard_limit_triggered(self):
         self._logger.debug("dead time hard limit exceeded")
         # pretend full shut-down handshake has happened
@@ -549,7 +642,10 @@ class XMLStream(asyncio.Protocol):
         self._closing_future.cancel()
 
     def data_received(self, blob):
-        self._logger.debug("RECV %r", blob)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            sampler = self.wire_dump_sampler
+            if sampler is None or sampler(blob):
+                self._logger.debug("RECV %r", blob)
         self._monitor.notify_received()
         try:
             self._rx_feed(blob)
@@ -642,7 +738,8 @@ class XMLStream(asyncio.Protocol):
         self._debug_wrapper = None
 
         if self._logger.getEffectiveLevel() <= logging.DEBUG:
-            dest = DebugWrapper(self._transport, self._logger)
+            dest = DebugWrapper(self._transport, self._logger,
+                                self.wire_dump_sampler)
             self._debug_wrapper = dest
         else:
             dest = self._transport
@@ -40,6 +40,8 @@ To start using PubSub services in your application, you have to load the
 
 .. currentmodule:: aioxmpp.pubsub
 
+.. autoclass:: NodeEvents()
+
 .. class:: Service
 
    Alias of :class:`.PubSubClient`.
@@ -193,6 +195,6 @@ Forms
 
 """
 
-from .service import PubSubClient  # NOQA: F401
+from .service import PubSubClient, NodeEvents  # NOQA: F401
 from .xso import NodeConfigForm  # NOQA: F401
 Service = PubSubClient
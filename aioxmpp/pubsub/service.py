@@ -20,9 +20,13 @@
 #
 ########################################################################
 import asyncio
+import functools
+import weakref
 
 import aioxmpp.callbacks
 import aioxmpp.disco
+import aioxmpp.errors
+import aioxmpp.rsm.xso
 import aioxmpp.service
 import aioxmpp.stanza
 import aioxmpp.structs
@@ -30,6 +34,130 @@ import aioxmpp.structs
 from . import xso as pubsub_xso
 
 
+class NodeEvents:
+    """
+    Event notifications for a single node.
+
+    *Never* instantiate this class yourself. Use
+    :meth:`PubSubClient.node_events` to obtain instances.
+
+    The signals fire only for notifications from the node the instance was
+    obtained for; the arguments are as for the signals of the same name on
+    :class:`PubSubClient`. Notifications are routed to the instance with a
+    single dictionary lookup, independent of the number of nodes for which
+    handlers are registered.
+
+    You have to keep a reference to the instance for as long as you want to
+    receive notifications. Registering a callback is not enough.
+
+    .. signal:: on_item_published(jid, node, item, *, message=None)
+
+    .. signal:: on_item_retracted(jid, node, id_, *, message=None)
+
+    .. signal:: on_node_deleted(jid, node, *, redirect_uri=None, message=None)
+
+    .. autoattribute:: jid
+
+    .. autoattribute:: node
+
+    .. autoattribute:: coalesce_delay
+
+    .. automethod:: flush
+
+    .. versionadded:: 0.14
+    """
+
+    on_item_published = aioxmpp.callbacks.Signal()
+    on_item_retracted = aioxmpp.callbacks.Signal()
+    on_node_deleted = aioxmpp.callbacks.Signal()
+
+    def __init__(self, jid, node):
+        super().__init__()
+        self._jid = jid
+        self._node = node
+        self._coalesce_delay = None
+        self._pending = {}
+        self._flush_handle = None
+
+    @property
+    def jid(self):
+        """
+        The address of the service, or :data:`None` if notifications from
+        any address are received (as used for PEP nodes).
+        """
+        return self._jid
+
+    @property
+    def node(self):
+        """
+        The name of the node.
+        """
+        return self._node
+
+    @property
+    def coalesce_delay(self):
+        """
+        Delay in seconds for which item notifications are held back, or
+        :data:`None`.
+
+        If this is not :data:`None`, :meth:`on_item_published` is deferred
+        by up to this many seconds. Only the most recent item published by
+        each address in that time is emitted; earlier items are dropped.
+        This is useful for nodes which change at a high rate and for which
+        only the most recent item is of interest.
+
+        Retractions and deletions are never deferred; pending items are
+        emitted before them to preserve the order.
+        """
+        return self._coalesce_delay
+
+    @coalesce_delay.setter
+    def coalesce_delay(self, value):
+        if value is not None and value < 0:
+            raise ValueError("coalesce_delay must be non-negative or None")
+        self._coalesce_delay = value
+        if value is None:
+            self.flush()
+
+    def flush(self):
+        """
+        Emit all held back item notifications immediately.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending = self._pending
+        self._pending = {}
+        for jid, (node, item, message) in pending.items():
+            self.on_item_published(jid, node, item, message=message)
+
+    def _item_published(self, jid, node, item, message):
+        if self._coalesce_delay is None:
+            self.on_item_published(jid, node, item, message=message)
+            return
+
+        self._pending.pop(jid, None)
+        self._pending[jid] = node, item, message
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_event_loop().call_later(
+                self._coalesce_delay,
+                self.flush,
+            )
+
+    def _item_retracted(self, jid, node, id_, message):
+        if self._pending:
+            self.flush()
+        self.on_item_retracted(jid, node, id_, message=message)
+
+    def _node_deleted(self, jid, node, redirect_uri, message):
+        if self._pending:
+            self.flush()
+        self.on_node_deleted(jid, node,
+                             redirect_uri=redirect_uri,
+                             message=message)
+
+
 class PubSubClient(aioxmpp.service.Service):
     """
     Client service implementing a Publish-Subscribe client. By loading it into
@@ -49,6 +177,7 @@ class PubSubClient(aioxmpp.service.Service):
           get_default_config
           get_items
           get_items_by_id
+          iter_items
           get_subscription_config
           get_subscriptions
           set_subscription_config
@@ -59,13 +188,16 @@ class PubSubClient(aioxmpp.service.Service):
           on_item_retracted
           on_node_deleted
           on_subscription_update
+          node_events
 
     Publisher use cases:
        .. autosummary::
 
           notify
           publish
+          publish_many
           retract
+          retract_many
 
     Owner use cases:
        .. autosummary::
@@ -107,14 +239,20 @@ class PubSubClient(aioxmpp.service.Service):
 
     .. automethod:: get_items_by_id
 
+    .. automethod:: iter_items
+
     Publishing and retracting items:
 
     .. automethod:: notify
 
     .. automethod:: publish
 
+    .. automethod:: publish_many
+
     .. automethod:: retract
 
+    .. automethod:: retract_many
+
     Manage nodes:
 
     .. automethod:: change_node_affiliations
@@ -139,6 +277,8 @@ class PubSubClient(aioxmpp.service.Service):
 
     Receiving notifications:
 
+    .. automethod:: node_events
+
     .. signal:: on_item_published(jid, node, item, *, message=None)
 
         Fires when a new item is published to a node to which we have a
@@ -216,6 +356,46 @@ class PubSubClient(aioxmpp.service.Service):
     def __init__(self, client, **kwargs):
         super().__init__(client, **kwargs)
         self._disco = self.dependencies[aioxmpp.DiscoClient]
+        self._node_events = weakref.WeakValueDictionary()
+
+    def node_events(self, jid, node):
+        """
+        Return the :class:`NodeEvents` for a node.
+
+        :param jid: Address of the PubSub service, or :data:`None` to
+            receive notifications for `node` from any address.
+        :type jid: :class:`aioxmpp.JID` or :data:`None`
+        :param node: Name of the node.
+        :type node: :class:`str`
+        :rtype: :class:`~aioxmpp.pubsub.NodeEvents`
+
+        As long as a reference to the returned object exists, calls with the
+        same arguments return the same object.
+
+        This does not subscribe to the node; use :meth:`subscribe` or (for
+        PEP) :mod:`aioxmpp.pep` for that. The signals of the
+        :class:`PubSubClient` itself continue to fire for all notifications.
+
+        .. versionadded:: 0.14
+        """
+        key = jid, node
+        try:
+            return self._node_events[key]
+        except KeyError:
+            result = NodeEvents(jid, node)
+            self._node_events[key] = result
+            return result
+
+    def _iter_node_events(self, jid, node):
+        if not self._node_events:
+            return
+        events = self._node_events.get((jid, node))
+        if events is not None:
+            yield events
+        if jid is not None:
+            events = self._node_events.get((None, node))
+            if events is not None:
+                yield events
 
     @aioxmpp.service.inbound_message_filter
     def filter_inbound_message(self, msg):
@@ -231,6 +411,8 @@ class PubSubClient(aioxmpp.service.Service):
                         item,
                         message=msg,
                     )
+                    for events in self._iter_node_events(msg.from_, node):
+                        events._item_published(msg.from_, node, item, msg)
                 for retract in payload.retracts:
                     node = payload.node
                     self.on_item_retracted(
@@ -239,6 +421,9 @@ class PubSubClient(aioxmpp.service.Service):
                         retract.id_,
                         message=msg,
                     )
+                    for events in self._iter_node_events(msg.from_, node):
+                        events._item_retracted(msg.from_, node, retract.id_,
+                                               msg)
             elif isinstance(payload, pubsub_xso.EventDelete):
                 self.on_node_deleted(
                     msg.from_,
@@ -246,6 +431,10 @@ class PubSubClient(aioxmpp.service.Service):
                     redirect_uri=payload.redirect_uri,
                     message=msg,
                 )
+                for events in self._iter_node_events(msg.from_,
+                                                     payload.node):
+                    events._node_deleted(msg.from_, payload.node,
+                                         payload.redirect_uri, msg)
 
         elif (msg.xep0060_request is not None and
               msg.xep0060_request.payload is not None):
@@ -617,6 +806,82 @@ class PubSubClient(aioxmpp.service.Service):
 
         return await self.client.send(iq)
 
+    def _request_items_page(self, jid, node, after, page_size):
+        iq = aioxmpp.stanza.IQ(to=jid, type_=aioxmpp.structs.IQType.GET)
+        iq.payload = pubsub_xso.Request(
+            pubsub_xso.Items(node)
+        )
+        rsm = aioxmpp.rsm.xso.ResultSetMetadata.limit(page_size)
+        if after is not None:
+            rsm.after = aioxmpp.rsm.xso.After(after)
+        iq.payload.rsm = rsm
+        return asyncio.ensure_future(self.client.send(iq))
+
+    @staticmethod
+    def _is_last_page(rsm, nitems):
+        if rsm.count is None or rsm.first is None or rsm.first.index is None:
+            return False
+        return rsm.first.index + nitems >= rsm.count
+
+    async def iter_items(self, jid, node, *, page_size=100):
+        """
+        Iterate over the items of a node, retrieving them page by page.
+
+        :param jid: Address of the PubSub service.
+        :type jid: :class:`aioxmpp.JID`
+        :param node: Name of the PubSub node to query.
+        :type node: :class:`str`
+        :param page_size: Number of items to request per page.
+        :type page_size: :class:`int`
+        :raises aioxmpp.errors.XMPPError: as returned by the service
+        :return: Asynchronous iterator over the :class:`.xso.Item` objects
+            of the node.
+
+        If the service supports Result Set Management (:xep:`59`, see
+        :attr:`.xso.Feature.RSM`), the items are requested in pages of at
+        most `page_size` items. The request for the next page is sent while
+        the items of the current page are being consumed. If the service
+        does not support it, all items are requested at once, as with
+        :meth:`get_items`.
+
+        Closing the iterator early cancels any outstanding request.
+
+        .. versionadded:: 0.14
+        """
+
+        if page_size <= 0:
+            raise ValueError("page_size must be positive")
+
+        features = await self.get_features(jid)
+        if pubsub_xso.Feature.RSM not in features:
+            response = await self.get_items(jid, node)
+            for item in response.payload.items:
+                yield item
+            return
+
+        request = self._request_items_page(jid, node, None, page_size)
+        try:
+            while request is not None:
+                response = await request
+                request = None
+
+                items = response.payload.items
+                rsm = response.rsm
+                if (items and
+                        rsm is not None and
+                        rsm.last is not None and
+                        rsm.last.value is not None and
+                        not self._is_last_page(rsm, len(items))):
+                    request = self._request_items_page(
+                        jid, node, rsm.last.value, page_size,
+                    )
+
+                for item in items:
+                    yield item
+        finally:
+            if request is not None:
+                request.cancel()
+
     async def get_subscriptions(self, jid, node=None):
         """
         Return all subscriptions of the local entity to a node.
@@ -687,6 +952,20 @@ class PubSubClient(aioxmpp.service.Service):
         does not inform us; this is unfortunately common).
         """
 
+        if publish_options is not None:
+            await self._check_publish_options_support(jid)
+
+        return await self._send_publish(jid, node, payload, id_,
+                                        publish_options)
+
+    async def _check_publish_options_support(self, jid):
+        features = await self.get_features(jid)
+        if pubsub_xso.Feature.PUBLISH_OPTIONS not in features:
+            raise RuntimeError(
+                "publish-options given, but not supported by server"
+            )
+
+    async def _send_publish(self, jid, node, payload, id_, publish_options):
         publish = pubsub_xso.Publish()
         publish.node = node
 
@@ -702,12 +981,6 @@ class PubSubClient(aioxmpp.service.Service):
         )
 
         if publish_options is not None:
-            features = await self.get_features(jid)
-            if pubsub_xso.Feature.PUBLISH_OPTIONS not in features:
-                raise RuntimeError(
-                    "publish-options given, but not supported by server"
-                )
-
             iq.payload.publish_options = pubsub_xso.PublishOptions()
             iq.payload.publish_options.data = publish_options
 
@@ -717,6 +990,129 @@ class PubSubClient(aioxmpp.service.Service):
             return response.payload.item.id_ or id_
         return id_
 
+    @staticmethod
+    def _is_transient_error(exc):
+        return (
+            isinstance(exc, aioxmpp.errors.XMPPWaitError) or
+            exc.condition == aioxmpp.errors.ErrorCondition.RESOURCE_CONSTRAINT
+        )
+
+    async def _send_with_retry(self, make_request, max_retries,
+                               retry_delay):
+        attempt = 0
+        while True:
+            try:
+                return await make_request()
+            except aioxmpp.errors.XMPPError as exc:
+                if (attempt >= max_retries or
+                        not self._is_transient_error(exc)):
+                    raise
+            await asyncio.sleep(retry_delay * 2 ** attempt)
+            attempt += 1
+
+    async def _run_pipelined(self, make_requests, window, max_retries,
+                             retry_delay):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+
+        results = []
+        in_flight = {}
+        make_requests = iter(make_requests)
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(in_flight) < window:
+                    try:
+                        make_request = next(make_requests)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    task = asyncio.ensure_future(self._send_with_retry(
+                        make_request,
+                        max_retries,
+                        retry_delay,
+                    ))
+                    in_flight[task] = len(results)
+                    results.append(None)
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    index = in_flight.pop(task)
+                    exc = task.exception()
+                    results[index] = exc if exc is not None else task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        return results
+
+    async def publish_many(self, jid, node, items, *,
+                           publish_options=None,
+                           window=16,
+                           max_retries=3,
+                           retry_delay=1.0):
+        """
+        Publish many items to a node, keeping several requests in flight.
+
+        :param jid: Address of the PubSub service.
+        :type jid: :class:`aioxmpp.JID`
+        :param node: Name of the PubSub node to publish to.
+        :type node: :class:`str`
+        :param items: The items to publish.
+        :type items: :class:`~collections.abc.Iterable` of pairs of item ID
+            (:class:`str` or :data:`None`) and payload
+            (:class:`aioxmpp.xso.XSO`)
+        :param publish_options: A data form with the options for the publish
+            requests
+        :type publish_options: :class:`aioxmpp.forms.Data`
+        :param window: Maximum number of requests in flight.
+        :type window: :class:`int`
+        :param max_retries: Maximum number of retries per item.
+        :type max_retries: :class:`int`
+        :param retry_delay: Delay before the first retry in seconds.
+        :type retry_delay: :class:`float`
+        :raises RuntimeError: if `publish_options` is not :data:`None` but
+            the service does not support `publish_options`
+        :return: One result per item, in the order of `items`.
+        :rtype: :class:`list`
+
+        Each item is published with a separate request as described in
+        :meth:`publish`. At most `window` requests are awaiting their reply
+        at any time; `items` is consumed lazily.
+
+        A request which fails with a :class:`~aioxmpp.errors.XMPPWaitError`
+        or with :attr:`aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT` is retried
+        up to `max_retries` times. The delay before the retry doubles with
+        each attempt, starting at `retry_delay`.
+
+        The result for an item is the item ID as returned by :meth:`publish`
+        or the exception the request finally failed with.
+
+        .. versionadded:: 0.14
+        """
+
+        if publish_options is not None:
+            await self._check_publish_options_support(jid)
+
+        return await self._run_pipelined(
+            (
+                functools.partial(self._send_publish,
+                                  jid, node, payload, id_,
+                                  publish_options)
+                for id_, payload in items
+            ),
+            window,
+            max_retries,
+            retry_delay,
+        )
+
     async def notify(self, jid, node):
         """
         Notify all subscribers of a node without publishing an item.
@@ -767,6 +1163,47 @@ class PubSubClient(aioxmpp.service.Service):
 
         await self.client.send(iq)
 
+    async def retract_many(self, jid, node, ids, *,
+                           notify=False,
+                           window=16,
+                           max_retries=3,
+                           retry_delay=1.0):
+        """
+        Retract many items from a node, keeping several requests in flight.
+
+        :param jid: Address of the PubSub service.
+        :type jid: :class:`aioxmpp.JID`
+        :param node: Name of the PubSub node to retract from.
+        :type node: :class:`str`
+        :param ids: The IDs of the items to retract.
+        :type ids: :class:`~collections.abc.Iterable` of :class:`str`
+        :param notify: Flag indicating whether subscribers shall be notified
+            about the retractions.
+        :type notify: :class:`bool`
+        :return: One result per item, in the order of `ids`.
+        :rtype: :class:`list`
+
+        Each item is retracted with a separate request as described in
+        :meth:`retract`. `window`, `max_retries` and `retry_delay` work as in
+        :meth:`publish_many`.
+
+        The result for an item is :data:`None` on success or the exception
+        the request finally failed with.
+
+        .. versionadded:: 0.14
+        """
+
+        return await self._run_pipelined(
+            (
+                functools.partial(self.retract, jid, node, id_,
+                                  notify=notify)
+                for id_ in ids
+            ),
+            window,
+            max_retries,
+            retry_delay,
+        )
+
     async def create(self, jid, node=None):
         """
         Create a new node at a service.
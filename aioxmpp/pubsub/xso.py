@@ -20,6 +20,7 @@
 #
 ########################################################################
 import aioxmpp.forms
+import aioxmpp.rsm.xso
 import aioxmpp.stanza
 import aioxmpp.xso as xso
 
@@ -107,6 +108,8 @@ class Feature(Enum):
         "http://jabber.org/protocol/pubsub#retrieve-items"
     RETRIEVE_SUBSCRIPTIONS = \
         "http://jabber.org/protocol/pubsub#retrieve-subscriptions"
+    RSM = \
+        "http://jabber.org/protocol/pubsub#rsm"
     SUBSCRIBE = \
         "http://jabber.org/protocol/pubsub#subscribe"
     SUBSCRIPTION_OPTIONS = \
@@ -481,6 +484,13 @@ class Request(xso.XSO):
        available here. If they are used without another payload, the
        :attr:`payload` attribute is :data:`None`.
 
+    .. attribute:: rsm
+
+       The :class:`~aioxmpp.rsm.xso.ResultSetMetadata` used to page through
+       :class:`Items`, or :data:`None`.
+
+       .. versionadded:: 0.14
+
     """
     TAG = (namespaces.xep0060, "pubsub")
 
@@ -509,6 +519,10 @@ class Request(xso.XSO):
         PublishOptions,
     ])
 
+    rsm = xso.Child([
+        aioxmpp.rsm.xso.ResultSetMetadata,
+    ])
+
     def __init__(self, payload=None):
         super().__init__()
         self.payload = payload
@@ -1282,6 +1296,13 @@ Feature.__docstring___ = \
 
        Retrieval of current subscriptions is supported.
 
+    .. attribute:: RSM
+       :annotation: = "http://jabber.org/protocol/pubsub#rsm"
+
+       Result Set Management (:xep:`59`) for item retrieval is supported.
+
+       .. versionadded:: 0.14
+
     .. attribute:: SUBSCRIBE
        :annotation: = "http://jabber.org/protocol/pubsub#subscribe"
 
@@ -69,6 +69,11 @@ For presence’
 
 .. autoclass:: Status()
 
+Logging
+=======
+
+.. autoclass:: StanzaSummary
+
 Exceptions
 ==========
 
@@ -1034,6 +1039,99 @@ class IQ(StanzaBase):
         return other_cls
 
 
+def _format_tag(tag):
+    namespace, localname = tag
+    if namespace is None:
+        return localname
+    return "{{{}}}{}".format(namespace, localname)
+
+
+class StanzaSummary:
+    """
+    Compact description of a `stanza` for logging.
+
+    :param stanza: The stanza to describe.
+    :type stanza: :class:`StanzaBase`
+
+    Only the kind, type, id and addresses of the stanza and the tags of its
+    direct children are looked at; payloads are neither formatted nor
+    traversed. Nothing is computed until the summary is formatted, so it can
+    be passed as a logging argument cheaply.
+
+    The :func:`repr` of the summary is meant for log messages,
+    :meth:`as_dict` for structured log handlers.
+
+    .. automethod:: as_dict
+
+    .. versionadded:: 0.14
+    """
+
+    __slots__ = ("stanza",)
+
+    def __init__(self, stanza):
+        self.stanza = stanza
+
+    def _payload_tags(self):
+        contents = self.stanza._xso_contents
+        tags = []
+        for prop in type(self.stanza).CHILD_PROPS:
+            try:
+                value = contents[prop]
+            except KeyError:
+                continue
+            if not value:
+                continue
+            if isinstance(value, xso.XSO):
+                tags.append(value.TAG)
+            elif isinstance(prop, xso.ChildTextMap):
+                tags.extend(prop.get_tag_map())
+            elif isinstance(value, list):
+                tags.extend(item.TAG for item in value
+                            if isinstance(item, xso.XSO))
+            elif isinstance(value, dict):
+                for items in value.values():
+                    tags.extend(item.TAG for item in items
+                                if isinstance(item, xso.XSO))
+        return [_format_tag(tag) for tag in tags]
+
+    def as_dict(self):
+        """
+        Return the summary as dictionary.
+
+        :rtype: :class:`dict`
+
+        The keys are ``"kind"`` (the local name of the stanza element, e.g.
+        ``"iq"``), ``"type"``, ``"id"``, ``"from"`` and ``"to"`` (all strings
+        or :data:`None`) and ``"payload"`` (a list of the tags of the child
+        elements in Clark notation).
+        """
+        stanza = self.stanza
+        result = {"kind": stanza.TAG[1]}
+        for key, attr in (("type", "type_"), ("id", "id_"),
+                          ("from", "from_"), ("to", "to")):
+            try:
+                value = getattr(stanza, attr)
+            except AttributeError:
+                value = None
+            value = getattr(value, "value", value)
+            if value is not None:
+                value = str(value)
+            result[key] = value
+        result["payload"] = self._payload_tags()
+        return result
+
+    def __repr__(self):
+        data = self.as_dict()
+        return "<{} type={} id={} from={} to={} payload=[{}]>".format(
+            data["kind"],
+            data["type"],
+            data["id"],
+            data["from"],
+            data["to"],
+            ", ".join(data["payload"]),
+        )
+
+
 def make_application_error(name, tag):
     """
     Create and return a **class** inheriting from :class:`.xso.XSO`. The
@@ -207,6 +207,7 @@ from . import (
     protocol,
     structs,
     ping,
+    metrics,
 )
 
 
@@ -378,13 +379,15 @@ class StanzaToken:
     .. automethod:: abort
     """
     __slots__ = ("stanza", "_state", "on_state_change", "_sent_future",
-                 "_state_exception")
+                 "_state_exception", "_queued_at", "_sent_at")
 
     def __init__(self, stanza, *, on_state_change=None):
         self.stanza = stanza
         self._state = StanzaState.ACTIVE
         self._state_exception = None
         self._sent_future = None
+        self._queued_at = None
+        self._sent_at = None
         self.on_state_change = on_state_change
 
     @property
@@ -664,6 +667,21 @@ class StanzaStream:
 
     .. autoattribute:: local_jid
 
+    .. autoattribute:: metrics
+
+    .. attribute:: structured_logging
+
+       If true, stanzas in the debug log messages of the stream are described
+       by a :class:`~aioxmpp.stanza.StanzaSummary` instead of their
+       :func:`repr`, which avoids formatting payloads. The summary is also
+       attached to the log record as ``stanza`` attribute for use by
+       structured log handlers.
+
+       This can be set on the class to affect all streams. It defaults to
+       false.
+
+       .. versionadded:: 0.14
+
     Signals:
 
     .. signal:: on_failure(exc)
@@ -751,6 +769,19 @@ class StanzaStream:
 
     _ALLOW_ENUM_COERCION = True
 
+    structured_logging = False
+
+    _FILTER_NAMES = (
+        "app_inbound_presence",
+        "service_inbound_presence",
+        "app_inbound_message",
+        "service_inbound_message",
+        "app_outbound_presence",
+        "service_outbound_presence",
+        "app_outbound_message",
+        "service_outbound_message",
+    )
+
     on_failure = callbacks.Signal()
     on_stream_destroyed = callbacks.Signal()
     on_stream_established = callbacks.Signal()
@@ -808,6 +839,11 @@ class StanzaStream:
         self.app_outbound_message_filter = AppFilter()
         self.service_outbound_message_filter = callbacks.Filter()
 
+        for name in self._FILTER_NAMES:
+            getattr(self, name + "_filter").name = name
+
+        self._metrics = None
+
     @property
     def local_jid(self):
         """
@@ -825,6 +861,43 @@ class StanzaStream:
     def local_jid(self, value):
         self._local_jid = value
 
+    @property
+    def metrics(self):
+        """
+        A :class:`~aioxmpp.metrics.MetricsHook` which receives per-stanza
+        timings and counts, or :data:`None` (the default) to disable the
+        instrumentation.
+
+        The hook is also handed to the :class:`~aioxmpp.protocol.XMLStream`
+        the stanza stream runs on and to the filter chains, which report the
+        time spent in each filter function under the name of the chain
+        without the ``_filter`` suffix (for example
+        ``"service_inbound_message"``). See :mod:`aioxmpp.metrics` for the
+        reported stages.
+
+        .. versionadded:: 0.14
+        """
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value):
+        self._metrics = value
+        for name in self._FILTER_NAMES:
+            getattr(self, name + "_filter").metrics = value
+        if self._xmlstream is not None:
+            self._xmlstream.metrics = value
+
+    def _debug_stanza(self, msg, stanza_obj, *args):
+        if self.structured_logging:
+            summary = stanza_.StanzaSummary(stanza_obj)
+            self._logger.debug(msg, summary, *args, extra={"stanza": summary})
+        else:
+            self._logger.debug(msg, stanza_obj, *args)
+
+    def _metrics_dropped(self, hook, stage, kind, start):
+        hook.observe(stage, kind, metrics.clock() - start)
+        hook.increment(metrics.Counter.DROPPED, kind)
+
     @property
     def round_trip_time(self):
         """
@@ -980,7 +1053,8 @@ class StanzaStream:
         spawns a request handler coroutine or drops the stanza while logging a
         warning if no handler can be found.
         """
-        self._logger.debug("incoming iq: %r", stanza_obj)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._debug_stanza("incoming iq: %r", stanza_obj)
         if stanza_obj.type_.is_response:
             # iq response
             self._logger.debug("iq is response")
@@ -1057,42 +1131,88 @@ class StanzaStream:
         """
         Process an incoming message stanza `stanza_obj`.
         """
-        self._logger.debug("incoming message: %r", stanza_obj)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._debug_stanza("incoming message: %r", stanza_obj)
+
+        hook = self._metrics
+        if hook is not None:
+            start = metrics.clock()
 
         stanza_obj = self.service_inbound_message_filter.filter(stanza_obj)
         if stanza_obj is None:
             self._logger.debug("incoming message dropped by service "
                                "filter chain")
+            if hook is not None:
+                self._metrics_dropped(
+                    hook, metrics.Stage.INBOUND_FILTER, "message", start,
+                )
             return
 
         stanza_obj = self.app_inbound_message_filter.filter(stanza_obj)
         if stanza_obj is None:
             self._logger.debug("incoming message dropped by application "
                                "filter chain")
+            if hook is not None:
+                self._metrics_dropped(
+                    hook, metrics.Stage.INBOUND_FILTER, "message", start,
+                )
             return
 
+        if hook is not None:
+            now = metrics.clock()
+            hook.observe(metrics.Stage.INBOUND_FILTER, "message", now - start)
+            start = now
+
         self.on_message_received(stanza_obj)
 
+        if hook is not None:
+            hook.observe(
+                metrics.Stage.HANDLER, "message", metrics.clock() - start,
+            )
+
     def _process_incoming_presence(self, stanza_obj):
         """
         Process an incoming presence stanza `stanza_obj`.
         """
-        self._logger.debug("incoming presence: %r", stanza_obj)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._debug_stanza("incoming presence: %r", stanza_obj)
+
+        hook = self._metrics
+        if hook is not None:
+            start = metrics.clock()
 
         stanza_obj = self.service_inbound_presence_filter.filter(stanza_obj)
         if stanza_obj is None:
             self._logger.debug("incoming presence dropped by service filter"
                                " chain")
+            if hook is not None:
+                self._metrics_dropped(
+                    hook, metrics.Stage.INBOUND_FILTER, "presence", start,
+                )
             return
 
         stanza_obj = self.app_inbound_presence_filter.filter(stanza_obj)
         if stanza_obj is None:
             self._logger.debug("incoming presence dropped by application "
                                "filter chain")
+            if hook is not None:
+                self._metrics_dropped(
+                    hook, metrics.Stage.INBOUND_FILTER, "presence", start,
+                )
             return
 
+        if hook is not None:
+            now = metrics.clock()
+            hook.observe(metrics.Stage.INBOUND_FILTER, "presence", now - start)
+            start = now
+
         self.on_presence_received(stanza_obj)
 
+        if hook is not None:
+            hook.observe(
+                metrics.Stage.HANDLER, "presence", metrics.clock() - start,
+            )
+
     def _process_incoming_erroneous_stanza(self, stanza_obj, exc):
         self._logger.debug(
             "erroneous stanza received (may be incomplete): %r",
@@ -1180,18 +1300,29 @@ class StanzaStream:
             self._sm_inbound_ctr += 1
             self._sm_inbound_ctr &= 0xffffffff
 
+        hook = self._metrics
+        if hook is not None:
+            start = metrics.clock()
+            kind = metrics.stanza_kind(stanza_obj)
+            hook.increment(metrics.Counter.RECEIVED, kind)
+
         # check if the stanza has errors
         if exc is not None:
             self._process_incoming_erroneous_stanza(stanza_obj, exc)
-            return
-
-        if isinstance(stanza_obj, stanza.IQ):
+        elif isinstance(stanza_obj, stanza.IQ):
             self._process_incoming_iq(stanza_obj)
+            if hook is not None:
+                hook.observe(metrics.Stage.HANDLER, kind,
+                             metrics.clock() - start)
         elif isinstance(stanza_obj, stanza.Message):
             self._process_incoming_message(stanza_obj)
         elif isinstance(stanza_obj, stanza.Presence):
             self._process_incoming_presence(stanza_obj)
 
+        if hook is not None:
+            hook.observe(metrics.Stage.DISPATCH, kind,
+                         metrics.clock() - start)
+
     def flush_incoming(self):
         """
         Flush all incoming queues to the respective processing methods. The
@@ -1224,6 +1355,14 @@ class StanzaStream:
 
         stanza_obj = token.stanza
 
+        hook = self._metrics
+        if hook is not None:
+            kind = metrics.stanza_kind(stanza_obj)
+            start = metrics.clock()
+            if token._queued_at is not None:
+                hook.observe(metrics.Stage.OUTBOUND_QUEUE, kind,
+                             start - token._queued_at)
+
         if isinstance(stanza_obj, stanza.Presence):
             stanza_obj = self.app_outbound_presence_filter.filter(
                 stanza_obj
@@ -1243,20 +1382,43 @@ class StanzaStream:
 
         if stanza_obj is None:
             token._set_state(StanzaState.DROPPED)
-            self._logger.debug("outgoing stanza %r dropped by filter chain",
-                               token.stanza)
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._debug_stanza(
+                    "outgoing stanza %r dropped by filter chain",
+                    token.stanza,
+                )
+            if hook is not None:
+                self._metrics_dropped(
+                    hook, metrics.Stage.OUTBOUND_FILTER, kind, start,
+                )
             return
 
-        self._logger.debug("forwarding stanza to xmlstream: %r",
-                           stanza_obj)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._debug_stanza("forwarding stanza to xmlstream: %r",
+                               stanza_obj)
+
+        if hook is not None:
+            now = metrics.clock()
+            if not isinstance(stanza_obj, stanza.IQ):
+                hook.observe(metrics.Stage.OUTBOUND_FILTER, kind,
+                             now - start)
+            start = now
 
         try:
             xmlstream.send_xso(stanza_obj)
         except Exception as exc:
             self._logger.warning("failed to send stanza", exc_info=True)
             token._set_state(StanzaState.FAILED, exc)
+            if hook is not None:
+                hook.increment(metrics.Counter.FAILED, kind)
             return
 
+        if hook is not None:
+            now = metrics.clock()
+            hook.observe(metrics.Stage.SERIALISE, kind, now - start)
+            hook.increment(metrics.Counter.SENT, kind)
+            token._sent_at = now
+
         if self._sm_enabled:
             token._set_state(StanzaState.SENT)
             self._sm_unacked_list.append(token)
@@ -1826,6 +1988,7 @@ class StanzaStream:
         xmlstream.stanza_parser.add_class(stanza.Message, receiver)
         xmlstream.stanza_parser.add_class(stanza.Presence, receiver)
         xmlstream.error_handler = self.recv_erroneous_stanza
+        xmlstream.metrics = self._metrics
 
         if self._sm_enabled:
             self._logger.debug("using SM")
@@ -1838,6 +2001,7 @@ class StanzaStream:
 
     def _start_rollback(self, xmlstream):
         xmlstream.error_handler = None
+        xmlstream.metrics = None
         xmlstream.stanza_parser.remove_class(stanza.Presence)
         xmlstream.stanza_parser.remove_class(stanza.Message)
         xmlstream.stanza_parser.remove_class(stanza.IQ)
@@ -2090,10 +2254,13 @@ class StanzaStream:
 
         stanza.validate()
         token = StanzaToken(stanza, **kwargs)
+        if self._metrics is not None:
+            token._queued_at = metrics.clock()
         self._active_queue.put_nowait(token)
         stanza.autoset_id()
-        self._logger.debug("enqueued stanza %r with token %r",
-                           stanza, token)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._debug_stanza("enqueued stanza %r with token %r",
+                               stanza, token)
         return token
 
     enqueue_stanza = _enqueue
@@ -2532,6 +2699,16 @@ class StanzaStream:
 
         if acked:
             self._logger.debug("%d stanzas acked by remote", len(acked))
+
+            hook = self._metrics
+            if hook is not None:
+                now = metrics.clock()
+                for token in acked:
+                    if token._sent_at is not None:
+                        hook.observe(metrics.Stage.SM_ACK,
+                                     metrics.stanza_kind(token.stanza),
+                                     now - token._sent_at)
+
         for token in acked:
             token._set_state(StanzaState.ACKED)
 
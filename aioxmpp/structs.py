@@ -73,6 +73,8 @@ Functions for working with language tags
 
 .. autofunction:: lookup_language
 
+.. autofunction:: negotiate_language
+
 """
 
 import collections
@@ -91,6 +93,9 @@ class CompatibilityMixin:
         return hash(self.value)
 
     def __eq__(self, other):
+        if self is other:
+            return True
+
         if not _USE_COMPAT_ENUM:
             return super().__eq__(other)
 
@@ -1047,6 +1052,13 @@ class PresenceState:
         return cls(available=available, show=show)
 
 
+@functools.lru_cache(maxsize=1024)
+def _intern_language(cls, s):
+    # language tags and ranges are immutable, so instances can be shared;
+    # the cache is bounded because the strings come from remote entities
+    return cls(tag=s)
+
+
 @functools.total_ordering
 class LanguageTag:
     """
@@ -1063,15 +1075,20 @@ class LanguageTag:
 
     .. autoattribute:: print_str
 
+    .. versionchanged:: 0.14
+
+       :meth:`fromstr` returns the same (immutable) instance for recently
+       used strings.
     """
 
-    __slots__ = ("_tag",)
+    __slots__ = ("_tag", "_match_str")
 
     def __init__(self, *, tag=None):
         if not tag:
             raise ValueError("tag cannot be empty")
 
         self._tag = tag
+        self._match_str = tag.lower()
 
     @property
     def match_str(self):
@@ -1079,7 +1096,7 @@ class LanguageTag:
         The string which is used for matching two language tags. This is the
         lower-cased version of the :attr:`print_str`.
         """
-        return self._tag.lower()
+        return self._match_str
 
     @property
     def print_str(self):
@@ -1100,31 +1117,31 @@ class LanguageTag:
            from that.
 
         """
-        return cls(tag=s)
+        return _intern_language(cls, s)
 
     def __str__(self):
         return self.print_str
 
     def __eq__(self, other):
         try:
-            return self.match_str == other.match_str
+            return self._match_str == other.match_str
         except AttributeError:
             return False
 
     def __lt__(self, other):
         try:
-            return self.match_str < other.match_str
+            return self._match_str < other.match_str
         except AttributeError:
             return NotImplemented
 
     def __le__(self, other):
         try:
-            return self.match_str <= other.match_str
+            return self._match_str <= other.match_str
         except AttributeError:
             return NotImplemented
 
     def __hash__(self):
-        return hash(self.match_str)
+        return hash(self._match_str)
 
     def __repr__(self):
         return "<{}.{}.fromstr({!r})>".format(
@@ -1150,15 +1167,20 @@ class LanguageRange:
 
     .. autoattribute:: print_str
 
+    .. versionchanged:: 0.14
+
+       :meth:`fromstr` returns the same (immutable) instance for recently
+       used strings.
     """
 
-    __slots__ = ("_tag",)
+    __slots__ = ("_tag", "_match_str")
 
     def __init__(self, *, tag=None):
         if not tag:
             raise ValueError("range cannot be empty")
 
         self._tag = tag
+        self._match_str = tag.lower()
 
     @property
     def match_str(self):
@@ -1166,7 +1188,7 @@ class LanguageRange:
         The string which is used for matching two language tags. This is the
         lower-cased version of the :attr:`print_str`.
         """
-        return self._tag.lower()
+        return self._match_str
 
     @property
     def print_str(self):
@@ -1190,19 +1212,19 @@ class LanguageRange:
         if s == "*":
             return cls.WILDCARD
 
-        return cls(tag=s)
+        return _intern_language(cls, s)
 
     def __str__(self):
         return self.print_str
 
     def __eq__(self, other):
         try:
-            return self.match_str == other.match_str
+            return self._match_str == other.match_str
         except AttributeError:
             return False
 
     def __hash__(self):
-        return hash(self.match_str)
+        return hash(self._match_str)
 
     def __repr__(self):
         return "<{}.{}.fromstr({!r})>".format(
@@ -1298,6 +1320,38 @@ def lookup_language(languages, ranges):
                 break
 
 
+@functools.lru_cache(maxsize=1024)
+def _negotiate_language(languages, ranges):
+    return lookup_language(sorted(languages), ranges)
+
+
+def negotiate_language(languages, ranges):
+    """
+    Look up a single language in the set `languages` using the lookup
+    mechanism described in RFC4647.
+
+    :param languages: The languages to choose from.
+    :type languages: iterable of :class:`LanguageTag`
+    :param ranges: The language ranges to look up, in priority order.
+    :type ranges: iterable of :class:`LanguageRange`
+    :return: The chosen language or :data:`None` if no language matches.
+
+    This works like :func:`lookup_language` on the sorted `languages`. The
+    results are cached, keyed by the set of `languages` and the sequence of
+    `ranges`, so that repeated negotiations over the same languages take
+    constant time. As language tags compare case-insensitively, the returned
+    tag may differ from the corresponding element of `languages` in case.
+
+    .. versionadded:: 0.14
+    """
+    ranges = tuple(ranges)
+    try:
+        return _negotiate_language(frozenset(languages), ranges)
+    except TypeError:
+        # unhashable language ranges
+        return lookup_language(sorted(languages), ranges)
+
+
 class LanguageMap(dict):
     """
     A :class:`dict` subclass specialized for holding :class:`LanugageTag`
@@ -1321,14 +1375,15 @@ class LanguageMap(dict):
         `lookup_language`. If `lookup_language` does not find a match and the
         mapping contains an entry with key :data:`None`, that entry is
         returned, otherwise :class:`KeyError` is raised.
+
+        .. versionchanged:: 0.14
+
+           The negotiation is cached via :func:`negotiate_language`.
         """
-        keys = list(self.keys())
-        try:
-            keys.remove(None)
-        except ValueError:
-            pass
-        keys.sort()
-        key = lookup_language(keys, language_ranges)
+        keys = self.keys()
+        if None in self:
+            keys = keys - {None}
+        key = negotiate_language(keys, language_ranges)
         return self[key]
 
     def any(self):
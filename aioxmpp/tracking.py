@@ -78,6 +78,19 @@ Tracking implementations
 
 .. autoclass:: BasicTrackingService
 
+Tracking store
+==============
+
+Tracking implementations which have to match incoming stanzas against many
+tracked messages can use a :class:`TrackingStore`:
+
+.. autoclass:: TrackingStore
+
+.. autoclass:: EvictionPolicy
+
+Latencies are recorded in :class:`aioxmpp.metrics.LatencyHistogram` objects
+(also available as :class:`aioxmpp.tracking.LatencyHistogram`).
+
 Interfaces
 ==========
 
@@ -88,6 +101,7 @@ Interfaces
 """
 import asyncio
 import functools
+import math
 
 from datetime import timedelta
 from enum import Enum
@@ -95,6 +109,8 @@ from enum import Enum
 import aioxmpp.callbacks
 import aioxmpp.service
 
+from aioxmpp.metrics import LatencyHistogram
+
 
 class MessageState(Enum):
     """
@@ -352,6 +368,412 @@ class MessageTracker:
         self.on_state_changed(self._state, self._response)
 
 
+class EvictionPolicy(Enum):
+    """
+    Policy applied by a :class:`TrackingStore` when a tracker is added while
+    the store is full.
+
+    .. attribute:: CLOSE_OLDEST
+
+       The oldest tracker in the store is closed (see
+       :meth:`MessageTracker.close`).
+
+    .. attribute:: DISCARD_OLDEST
+
+       The oldest tracker is removed from the store without closing it. Other
+       tracking implementations may still drive it.
+
+    .. attribute:: REJECT
+
+       The new tracker is not added and :class:`RuntimeError` is raised.
+
+    .. versionadded:: 0.14
+    """
+
+    CLOSE_OLDEST = 0
+    DISCARD_OLDEST = 1
+    REJECT = 2
+
+
+class _TimingWheel:
+    """
+    Hashed timing wheel.
+
+    Items are expired with a granularity of `resolution` seconds. At most one
+    timer handle exists per wheel, and only while items are scheduled.
+    """
+
+    def __init__(self, resolution, nslots, callback):
+        super().__init__()
+        self._resolution = resolution
+        self._slots = [{} for _ in range(nslots)]
+        self._items = {}
+        self._pos = 0
+        self._callback = callback
+        self._handle = None
+        self._next_tick = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def schedule(self, item, delay):
+        self.cancel(item)
+
+        nslots = len(self._slots)
+        ticks = max(1, math.ceil(delay / self._resolution))
+        slot = (self._pos + ticks) % nslots
+        self._slots[slot][item] = (ticks - 1) // nslots
+        self._items[item] = slot
+
+        if self._handle is None:
+            loop = asyncio.get_event_loop()
+            self._next_tick = loop.time() + self._resolution
+            self._handle = loop.call_at(self._next_tick, self._tick)
+
+    def cancel(self, item):
+        try:
+            slot = self._items.pop(item)
+        except KeyError:
+            return
+        del self._slots[slot][item]
+        if not self._items and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _advance(self, expired):
+        self._pos = (self._pos + 1) % len(self._slots)
+        slot = self._slots[self._pos]
+        for item, rounds in list(slot.items()):
+            if rounds:
+                slot[item] = rounds - 1
+            else:
+                del slot[item]
+                del self._items[item]
+                expired.append(item)
+
+    def _tick(self):
+        self._handle = None
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+
+        # catch up with all ticks which are due, in case the loop lagged
+        expired = []
+        self._advance(expired)
+        self._next_tick += self._resolution
+        while self._items and self._next_tick <= now:
+            self._advance(expired)
+            self._next_tick += self._resolution
+
+        if self._items:
+            self._handle = loop.call_at(self._next_tick, self._tick)
+
+        for item in expired:
+            self._callback(item)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for slot in self._slots:
+            slot.clear()
+        self._items.clear()
+
+
+class _TrackingStoreEntry:
+    __slots__ = ("keys", "peer", "sent_at", "observed", "tokens")
+
+    def __init__(self, keys, peer, sent_at):
+        self.keys = keys
+        self.peer = peer
+        self.sent_at = sent_at
+        self.observed = set()
+        self.tokens = ()
+
+
+class TrackingStore:
+    """
+    Bounded store of :class:`MessageTracker` objects with indices for
+    matching replies.
+
+    :param max_trackers: Maximum number of trackers in the store, or
+        :data:`None` for no limit.
+    :type max_trackers: :class:`int` or :data:`None`
+    :param eviction_policy: What to do when a tracker is added to a full
+        store.
+    :type eviction_policy: :class:`EvictionPolicy`
+    :param timeout: Default timeout in seconds after which trackers are
+        closed, or :data:`None` to keep them until they are closed otherwise.
+    :type timeout: :class:`numbers.Real`, :class:`datetime.timedelta` or
+        :data:`None`
+    :param timer_resolution: Granularity of the timeouts in seconds.
+    :type timer_resolution: :class:`float`
+    :param latency_buckets: Upper bounds of the latency histogram buckets in
+        seconds.
+
+    The store indexes trackers by the recipient and id of the tracked
+    stanza, by its :xep:`359` origin-id and by the stanza-ids assigned to it,
+    so that replies, errors and reflections can be matched in constant time.
+
+    Timeouts are managed with a single timing wheel instead of one timer
+    handle per tracker. Trackers which time out are closed. Closed trackers
+    are removed from the store automatically.
+
+    .. automethod:: add
+
+    .. automethod:: add_stanza_id
+
+    .. automethod:: discard
+
+    .. automethod:: match
+
+    .. automethod:: lookup_by_id
+
+    .. automethod:: lookup_by_origin_id
+
+    .. automethod:: lookup_by_stanza_id
+
+    .. automethod:: close
+
+    The store records the time it takes for its trackers to reach
+    :attr:`~.MessageState.DELIVERED_TO_SERVER`,
+    :attr:`~.MessageState.DELIVERED_TO_RECIPIENT` and
+    :attr:`~.MessageState.SEEN_BY_RECIPIENT`:
+
+    .. autoattribute:: latency
+
+    .. versionadded:: 0.14
+    """
+
+    DEFAULT_LATENCY_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+    )
+
+    _LATENCY_STATES = (
+        MessageState.DELIVERED_TO_SERVER,
+        MessageState.DELIVERED_TO_RECIPIENT,
+        MessageState.SEEN_BY_RECIPIENT,
+    )
+
+    def __init__(self, *,
+                 max_trackers=None,
+                 eviction_policy=EvictionPolicy.CLOSE_OLDEST,
+                 timeout=None,
+                 timer_resolution=1.0,
+                 latency_buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__()
+        if max_trackers is not None and max_trackers < 1:
+            raise ValueError("max_trackers must be positive or None")
+        self.max_trackers = max_trackers
+        self.eviction_policy = eviction_policy
+        self.timeout = timeout
+        self._entries = {}
+        self._index = {}
+        self._wheel = _TimingWheel(timer_resolution, 512, self._timed_out)
+        self._latency = {
+            state: LatencyHistogram(latency_buckets)
+            for state in self._LATENCY_STATES
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, tracker):
+        return tracker in self._entries
+
+    @property
+    def latency(self):
+        """
+        Mapping of :class:`MessageState` members to the
+        :class:`~aioxmpp.metrics.LatencyHistogram` of the time from
+        :meth:`add` to the first time a tracker entered that state.
+        """
+        return self._latency
+
+    def _evict(self):
+        if self.eviction_policy == EvictionPolicy.REJECT:
+            raise RuntimeError("tracking store is full")
+
+        oldest = next(iter(self._entries))
+        if self.eviction_policy == EvictionPolicy.CLOSE_OLDEST:
+            oldest.close()
+        # closing may already have removed the tracker via on_closed
+        self.discard(oldest)
+
+    def add(self, tracker, stanza, *, timeout=None):
+        """
+        Add a tracker for a message stanza.
+
+        :param tracker: The tracker to add.
+        :type tracker: :class:`MessageTracker`
+        :param stanza: The tracked stanza.
+        :type stanza: :class:`aioxmpp.Message`
+        :param timeout: Timeout for this tracker, overriding :attr:`timeout`.
+        :raises RuntimeError: if the store is full and the eviction policy is
+            :attr:`~.EvictionPolicy.REJECT`.
+        :raises ValueError: if the tracker is closed.
+
+        The stanza must have an id. If a tracker is added again, its indices
+        are updated and its timeout is restarted.
+        """
+        if tracker.closed:
+            raise ValueError("cannot add a closed tracker")
+
+        if tracker in self._entries:
+            self.discard(tracker)
+        elif (self.max_trackers is not None and
+                len(self._entries) >= self.max_trackers):
+            self._evict()
+
+        peer = stanza.to.bare()
+        keys = [("id", peer, stanza.id_)]
+        origin_id = getattr(stanza, "xep0359_origin_id", None)
+        if origin_id is not None and origin_id.id_ is not None:
+            keys.append(("origin-id", origin_id.id_))
+
+        entry = _TrackingStoreEntry(keys, peer,
+                                    asyncio.get_event_loop().time())
+        entry.tokens = (
+            tracker.on_closed.connect(
+                functools.partial(self.discard, tracker)
+            ),
+            tracker.on_state_changed.connect(
+                functools.partial(self._state_changed, tracker)
+            ),
+        )
+        self._entries[tracker] = entry
+        for key in keys:
+            self._index[key] = tracker
+
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is not None:
+            if isinstance(timeout, timedelta):
+                timeout = timeout.total_seconds()
+            self._wheel.schedule(tracker, timeout)
+
+    def add_stanza_id(self, tracker, by, id_):
+        """
+        Register a :xep:`359` stanza-id assigned to the tracked message.
+
+        :param tracker: The tracker of the message.
+        :type tracker: :class:`MessageTracker`
+        :param by: The entity which assigned the id.
+        :type by: :class:`aioxmpp.JID`
+        :param id_: The stanza-id.
+        :type id_: :class:`str`
+        :raises KeyError: if the tracker is not in the store.
+        """
+        entry = self._entries[tracker]
+        key = ("stanza-id", by, id_)
+        entry.keys.append(key)
+        self._index[key] = tracker
+
+    def discard(self, tracker):
+        """
+        Remove a tracker from the store without closing it.
+
+        If the tracker is not in the store, nothing happens.
+        """
+        try:
+            entry = self._entries.pop(tracker)
+        except KeyError:
+            return
+
+        for key in entry.keys:
+            if self._index.get(key) is tracker:
+                del self._index[key]
+        tracker.on_closed.disconnect(entry.tokens[0])
+        tracker.on_state_changed.disconnect(entry.tokens[1])
+        self._wheel.cancel(tracker)
+
+    def lookup_by_id(self, peer, id_):
+        """
+        Return the tracker for the message sent to `peer` with `id_`.
+
+        `peer` is compared as bare JID. Return :data:`None` if there is no
+        such tracker.
+        """
+        return self._index.get(("id", peer.bare(), id_))
+
+    def lookup_by_origin_id(self, origin_id):
+        """
+        Return the tracker for the message with the given :xep:`359`
+        origin-id, or :data:`None`.
+        """
+        return self._index.get(("origin-id", origin_id))
+
+    def lookup_by_stanza_id(self, by, id_):
+        """
+        Return the tracker for the message to which `by` assigned the
+        stanza-id `id_`, or :data:`None`.
+        """
+        return self._index.get(("stanza-id", by, id_))
+
+    def match(self, message):
+        """
+        Find the tracker for a reply to or reflection of a tracked message.
+
+        :param message: An inbound message.
+        :type message: :class:`aioxmpp.Message`
+        :return: The tracker or :data:`None`.
+
+        The origin-id, the stanza-ids and finally the sender and id of
+        `message` are looked up, in this order. Matches by origin-id or
+        stanza-id are only accepted if `message` was sent by the bare JID to
+        which the tracked message was addressed; these ids are visible to
+        third parties (for example to occupants of a MUC) and must not allow
+        them to affect the tracker.
+        """
+        index = self._index
+
+        try:
+            sender = message.from_.bare()
+        except AttributeError:
+            return None
+
+        origin_id = getattr(message, "xep0359_origin_id", None)
+        if origin_id is not None:
+            tracker = index.get(("origin-id", origin_id.id_))
+            if (tracker is not None and
+                    self._entries[tracker].peer == sender):
+                return tracker
+
+        for stanza_id in getattr(message, "xep0359_stanza_ids", ()):
+            tracker = index.get(("stanza-id", stanza_id.by, stanza_id.id_))
+            if (tracker is not None and
+                    self._entries[tracker].peer == sender):
+                return tracker
+
+        try:
+            key = "id", sender, message.id_
+        except AttributeError:
+            return None
+        return index.get(key)
+
+    def close(self):
+        """
+        Remove all trackers from the store without closing them and stop the
+        timer.
+        """
+        for tracker in list(self._entries):
+            self.discard(tracker)
+        self._wheel.close()
+
+    def _timed_out(self, tracker):
+        tracker.close()
+        self.discard(tracker)
+
+    def _state_changed(self, tracker, new_state, response=None):
+        histogram = self._latency.get(new_state)
+        if histogram is None:
+            return
+        entry = self._entries[tracker]
+        if new_state in entry.observed:
+            return
+        entry.observed.add(new_state)
+        histogram.observe(asyncio.get_event_loop().time() - entry.sent_at)
+
+
 class BasicTrackingService(aioxmpp.service.Service):
     """
     Error handling and :class:`~.StanzaToken`\\ -based tracking for messages.
@@ -370,11 +792,28 @@ class BasicTrackingService(aioxmpp.service.Service):
     .. automethod:: send_tracked
 
     .. automethod:: attach_tracker
+
+    .. autoattribute:: tracking_store
     """
 
     def __init__(self, client, **kwargs):
         super().__init__(client, **kwargs)
-        self._trackers = {}
+        self._trackers = TrackingStore()
+
+    @property
+    def tracking_store(self):
+        """
+        The :class:`TrackingStore` holding the trackers of this service.
+
+        It can be used to bound the number of tracked messages, to set a
+        default timeout and to read latency statistics.
+
+        .. versionadded:: 0.14
+        """
+        return self._trackers
+
+    async def _shutdown(self):
+        self._trackers.close()
 
     @aioxmpp.service.inbound_message_filter
     def _inbound_message_filter(self, message):
@@ -384,15 +823,10 @@ class BasicTrackingService(aioxmpp.service.Service):
         except AttributeError:
             return message
 
-        try:
-            key = message.from_.bare(), message.id_
-        except AttributeError:
-            return message
-
-        try:
-            tracker = self._trackers.pop(key)
-        except KeyError:
+        tracker = self._trackers.match(message)
+        if tracker is None:
             return message
+        self._trackers.discard(tracker)
 
         if tracker.state == MessageState.DELIVERED_TO_RECIPIENT:
             return
@@ -400,9 +834,6 @@ class BasicTrackingService(aioxmpp.service.Service):
             return
         tracker._set_state(MessageState.ERROR, message)
 
-    def _tracker_closed(self, key):
-        self._trackers.pop(key, None)
-
     def _stanza_sent(self, tracker, token, fut):
         # FIXME: look into whether this is correct, and if it is, document why:
         #
@@ -481,11 +912,7 @@ class BasicTrackingService(aioxmpp.service.Service):
         if tracker is None:
             tracker = MessageTracker()
         stanza.autoset_id()
-        key = stanza.to.bare(), stanza.id_
-        self._trackers[key] = tracker
-        tracker.on_closed.connect(
-            functools.partial(self._tracker_closed, key)
-        )
+        self._trackers.add(tracker, stanza)
         if token is not None:
             token.future.add_done_callback(
                 functools.partial(
@@ -20,13 +20,75 @@
 #
 ########################################################################
 import asyncio
+import copy
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import urllib.parse
 
 import aioxmpp
+import aioxmpp.cache
 import aioxmpp.service as service
+import aioxmpp.xml
+
+from aioxmpp.utils import mkdir_exist_ok
 
 from . import xso as vcard_xso
 
 
+logger = logging.getLogger(__name__)
+
+
+def _cache_file_name(jid):
+    return urllib.parse.quote(str(jid), safe="@") + ".xml"
+
+
+def _read_vcard_file(path):
+    try:
+        with path.open("rb") as f:
+            return aioxmpp.xml.read_single_xso(f, vcard_xso.VCard)
+    except FileNotFoundError:
+        return None
+
+
+def _write_vcard_file(path, vcard):
+    with tempfile.NamedTemporaryFile(dir=str(path.parent),
+                                     prefix=".",
+                                     delete=False) as tmpf:
+        try:
+            aioxmpp.xml.write_single_xso(vcard, tmpf)
+        except:  # NOQA
+            os.unlink(tmpf.name)
+            raise
+    os.replace(tmpf.name, str(path))
+
+
+def _unlink_vcard_file(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class _CacheEntry:
+    def __init__(self, vcard):
+        self.vcard = vcard
+        self._photo_hash = None
+
+    @property
+    def photo_hash(self):
+        # the photo is only decoded and hashed when the entry is validated
+        if self._photo_hash is None:
+            photo = self.vcard.get_photo_data()
+            if photo is None:
+                self._photo_hash = ""
+            else:
+                self._photo_hash = hashlib.sha1(photo).hexdigest()
+        return self._photo_hash
+
+
 class VCardService(service.Service):
     """
     Service for handling vcard-temp.
@@ -34,22 +96,190 @@ class VCardService(service.Service):
     .. automethod:: get_vcard
 
     .. automethod:: set_vcard
+
+    The vCards retrieved with :meth:`get_vcard` are cached. As vcard-temp has
+    no notification mechanism, the cache is only used if the caller can
+    supply the :xep:`153` photo hash of the vCard, which is advertised in
+    presence:
+
+    .. autoattribute:: cache_size
+
+    .. automethod:: load_cache
+
+    .. automethod:: clear_cache
+
+    .. versionchanged:: 0.14
+
+       The vCard cache was added.
     """
 
-    async def get_vcard(self, jid=None):
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._cache = aioxmpp.cache.LRUDict()
+        self._cache.maxsize = 256
+        self._cache_path = None
+        # key -> future of the last write to the cache directory
+        self._pending_writes = {}
+
+    async def _shutdown(self):
+        if self._pending_writes:
+            await asyncio.wait(list(self._pending_writes.values()))
+
+    @property
+    def cache_size(self):
+        """
+        Maximum number of vCards kept in memory.
+
+        Defaults to 256. The least recently used vCards are evicted first.
+        """
+        return self._cache.maxsize
+
+    @cache_size.setter
+    def cache_size(self, value):
+        self._cache.maxsize = value
+
+    async def load_cache(self, path):
+        """
+        Persist the vCard cache in a directory.
+
+        :param path: Path to the directory.
+        :type path: :class:`pathlib.Path`
+
+        The directory is created if it does not exist. vCards which are
+        retrieved from the network are written to the directory in the
+        background (:meth:`get_vcard` does not wait for the write) and vCards
+        which are not in memory are looked up in the directory before they
+        are requested from the network. All file access happens in the
+        default executor of the event loop.
+        """
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            mkdir_exist_ok,
+            path,
+        )
+        self._cache_path = path
+
+    def clear_cache(self):
+        """
+        Drop all vCards from the memory cache.
+
+        Persisted vCards (see :meth:`load_cache`) are not removed.
+        """
+        self._cache.clear()
+
+    def _cache_key(self, jid):
+        if jid is None:
+            return self.client.local_jid.bare()
+        return jid
+
+    async def _get_cached(self, key, photo_hash):
+        try:
+            entry = self._cache[key]
+        except KeyError:
+            entry = None
+
+        if entry is None and self._cache_path is not None:
+            try:
+                vcard = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    _read_vcard_file,
+                    self._cache_path / _cache_file_name(key),
+                )
+            except Exception:  # NOQA
+                logger.warning("failed to read cached vCard for %s", key,
+                               exc_info=True)
+                vcard = None
+            if vcard is not None:
+                entry = _CacheEntry(vcard)
+                self._cache[key] = entry
+
+        if entry is None or entry.photo_hash != photo_hash.lower():
+            return None
+
+        return copy.deepcopy(entry.vcard)
+
+    def _store(self, key, vcard):
+        self._cache[key] = _CacheEntry(vcard)
+        if self._cache_path is None:
+            return
+
+        # writes to the same file are serialised, so that an older vCard
+        # never replaces a newer one
+        fut = asyncio.ensure_future(self._write_cache_file(
+            self._cache_path / _cache_file_name(key),
+            key,
+            vcard,
+            self._pending_writes.get(key),
+        ))
+        self._pending_writes[key] = fut
+        fut.add_done_callback(functools.partial(self._write_done, key))
+
+    def _write_done(self, key, fut):
+        if self._pending_writes.get(key) is fut:
+            del self._pending_writes[key]
+
+    async def _write_cache_file(self, path, key, vcard, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                _write_vcard_file,
+                path,
+                vcard,
+            )
+        except Exception:  # NOQA
+            logger.warning("failed to persist vCard for %s", key,
+                           exc_info=True)
+
+    async def _invalidate(self, key):
+        self._cache.pop(key, None)
+        if self._cache_path is None:
+            return
+
+        pending = self._pending_writes.get(key)
+        if pending is not None:
+            await asyncio.wait([pending])
+
+        await asyncio.get_event_loop().run_in_executor(
+            None,
+            _unlink_vcard_file,
+            self._cache_path / _cache_file_name(key),
+        )
+
+    async def get_vcard(self, jid=None, *, photo_hash=None):
         """
         Get the vCard stored for the jid `jid`. If `jid` is
         :data:`None` get the vCard of the connected entity.
 
         :param jid: the object to retrieve.
+        :param photo_hash: the :xep:`153` photo hash last advertised by
+            `jid`, if known.
+        :type photo_hash: :class:`str` or :data:`None`
         :returns: the stored vCard.
 
+        If `photo_hash` is given and a cached vCard of `jid` with a photo of
+        that hash exists, the cached vCard is returned without sending a
+        request. An empty string as `photo_hash` matches a vCard without
+        photo. Otherwise, the vCard is requested and the cache is updated.
+
         We mask a :class:`XMPPCancelError` in case it is
         ``feature-not-implemented`` or ``item-not-found`` and return
         an empty vCard, since this can be understood to be semantically
         equivalent.
+
+        .. versionchanged:: 0.14
+
+           The `photo_hash` argument was added.
         """
 
+        key = self._cache_key(jid)
+        if photo_hash is not None:
+            cached = await self._get_cached(key, photo_hash)
+            if cached is not None:
+                return cached
+
         iq = aioxmpp.IQ(
             type_=aioxmpp.IQType.GET,
             to=jid,
@@ -57,15 +287,18 @@ class VCardService(service.Service):
         )
 
         try:
-            return await self.client.send(iq)
+            vcard = await self.client.send(iq)
         except aioxmpp.XMPPCancelError as e:
             if e.condition in (
                     aioxmpp.ErrorCondition.FEATURE_NOT_IMPLEMENTED,
                     aioxmpp.ErrorCondition.ITEM_NOT_FOUND):
-                return vcard_xso.VCard()
+                vcard = vcard_xso.VCard()
             else:
                 raise
 
+        self._store(key, copy.deepcopy(vcard))
+        return vcard
+
     async def set_vcard(self, vcard, jid=None):
         """
         Store the vCard `vcard` for the connected entity.
@@ -89,3 +322,4 @@ class VCardService(service.Service):
             to=jid,
         )
         await self.client.send(iq)
+        await self._invalidate(self._cache_key(jid))
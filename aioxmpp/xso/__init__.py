@@ -508,6 +508,15 @@ Using the context, we can now execute queries:
    # to find the first three FooXSO children where attr is set
    ec.eval(RootXSO.children / FooXSO[where(FooXSO.attr)][:3])
 
+Queries which are evaluated repeatedly can be compiled into a function with
+:meth:`.query.Expr.compile`, which saves walking the expression tree on each
+evaluation:
+
+.. code-block:: python
+
+   find_foos = (RootXSO.children / FooXSO).compile()
+   find_foos(ec)
+
 The following operators are available in the :mod:`aioxmpp.xso` namespace:
 
 .. autoclass:: where
@@ -521,6 +530,8 @@ they are rarely used directly in user code.
 
 .. autoclass:: EvaluationContext()
 
+.. autoclass:: Expr()
+
 .. note::
 
    The implementation details of the query language are documented in the
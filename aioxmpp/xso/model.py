@@ -157,6 +157,47 @@ class UnknownTopLevelTag(ValueError):
         self.ev_args = ev_args
 
 
+class _XSOListIndices:
+    """
+    Secondary indices of an :class:`XSOList`.
+
+    The indices map the type of the elements and the values of selected
+    attributes to the positions of the elements in the list. An attribute
+    index is dropped if an element has an unhashable value for it.
+    """
+
+    def __init__(self, type_, attr_names):
+        super().__init__()
+        self.type_ = type_
+        self.attr_names = attr_names
+        self.valid = False
+        self.types = None
+        self.attrs = {}
+
+    def add(self, index, item):
+        if self.types is not None:
+            self.types.setdefault(type(item), []).append(index)
+
+        for name, by_value in self.attrs.items():
+            if by_value is None:
+                continue
+            try:
+                value = getattr(item, name)
+            except AttributeError:
+                continue
+            try:
+                by_value.setdefault(value, []).append(index)
+            except TypeError:
+                self.attrs[name] = None
+
+    def rebuild(self, items):
+        self.types = {} if self.type_ else None
+        self.attrs = {name: {} for name in self.attr_names}
+        for i, item in enumerate(items):
+            self.add(i, item)
+        self.valid = True
+
+
 class XSOList(list):
     """
     A :class:`list` subclass; it provides the complete :class:`list` interface
@@ -166,12 +207,156 @@ class XSOList(list):
 
     .. automethod:: filtered
 
-    In the future, methods to add indices to :class:`XSOList` instances may be
-    added; right now, there is no need for the huge complexity which would
-    arise from keeping the indices up-to-date with changes in the elements
-    attributes.
+    .. automethod:: add_index
+
+    .. automethod:: reindex
+
+    .. automethod:: drop_indices
+
+    .. versionchanged:: 0.14
+
+       Optional indices for :meth:`filter` were added.
     """
 
+    _indices = None
+
+    def __reduce_ex__(self, protocol):
+        # copies (and unpickled lists) must not share the index object with
+        # this list; they get their own, which is built on first use
+        reduced = super().__reduce_ex__(protocol)
+        indices = self._indices
+        if indices is None or len(reduced) < 3:
+            return reduced
+        state = reduced[2]
+        if not isinstance(state, dict) or "_indices" not in state:
+            return reduced
+        state = dict(state)
+        state["_indices"] = _XSOListIndices(indices.type_,
+                                            indices.attr_names)
+        return reduced[:2] + (state,) + reduced[3:]
+
+    def _invalidate_indices(self):
+        if self._indices is not None:
+            self._indices.valid = False
+
+    def append(self, item):
+        super().append(item)
+        indices = self._indices
+        if indices is not None and indices.valid:
+            indices.add(len(self) - 1, item)
+
+    def extend(self, items):
+        start = len(self)
+        super().extend(items)
+        indices = self._indices
+        if indices is not None and indices.valid:
+            for i in range(start, len(self)):
+                indices.add(i, self[i])
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, n):
+        self._invalidate_indices()
+        return super().__imul__(n)
+
+    def __setitem__(self, index, value):
+        self._invalidate_indices()
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self._invalidate_indices()
+        super().__delitem__(index)
+
+    def insert(self, index, item):
+        self._invalidate_indices()
+        super().insert(index, item)
+
+    def pop(self, *args):
+        self._invalidate_indices()
+        return super().pop(*args)
+
+    def remove(self, item):
+        self._invalidate_indices()
+        super().remove(item)
+
+    def clear(self):
+        self._invalidate_indices()
+        super().clear()
+
+    def reverse(self):
+        self._invalidate_indices()
+        super().reverse()
+
+    def sort(self, *args, **kwargs):
+        self._invalidate_indices()
+        super().sort(*args, **kwargs)
+
+    def add_index(self, *, type_=False, lang=False, attrs=()):
+        """
+        Maintain indices to speed up :meth:`filter`.
+
+        :param type_: Index the elements by their type.
+        :type type_: :class:`bool`
+        :param lang: Index the elements by their ``lang`` attribute.
+        :type lang: :class:`bool`
+        :param attrs: Names of attributes by whose values the elements are
+            indexed.
+        :type attrs: iterable of :class:`str`
+
+        The indices are used by :meth:`filter` for the corresponding
+        arguments. Indices added by earlier calls are kept. Appending to the
+        list updates the indices; other modifications of the list cause them
+        to be rebuilt on the next call to :meth:`filter`.
+
+        Changes to the attributes of the elements are *not* detected. Call
+        :meth:`reindex` after modifying an indexed attribute of an element in
+        the list.
+
+        Attribute values must be hashable to be indexed; if an element has an
+        unhashable value for an attribute, the index for that attribute is
+        not used until the next :meth:`reindex`.
+
+        .. versionadded:: 0.14
+        """
+        old = self._indices
+        attr_names = set(attrs)
+        if lang:
+            attr_names.add("lang")
+        if old is not None:
+            type_ = type_ or old.type_
+            attr_names.update(old.attr_names)
+        self._indices = _XSOListIndices(bool(type_), frozenset(attr_names))
+
+    def reindex(self):
+        """
+        Rebuild the indices added with :meth:`add_index` on the next call to
+        :meth:`filter`.
+
+        .. versionadded:: 0.14
+        """
+        self._invalidate_indices()
+
+    def drop_indices(self):
+        """
+        Remove all indices added with :meth:`add_index`.
+
+        .. versionadded:: 0.14
+        """
+        self._indices = None
+
+    @staticmethod
+    def _match_lang(languages, lang):
+        # lookup a matching language among the set of `languages`
+        if isinstance(lang, structs.LanguageRange):
+            lang = (lang,)
+        match = structs.negotiate_language(languages, lang)
+        # no language? fallback is using the first one
+        if match is None:
+            match = min(languages)
+        return match
+
     def _filter_type(self, chained_results, type_):
         return (obj for obj in chained_results if isinstance(obj, type_))
 
@@ -181,24 +366,14 @@ class XSOList(list):
                   for item in chained_results
                   if hasattr(item, "lang") and item.lang is not None]
 
-        # get a sorted list of all languages in the current result set
-        languages = sorted(
-            {item.lang for item in result}
-        )
+        # get the set of all languages in the current result set
+        languages = {item.lang for item in result}
 
         if not languages:
             # no languages -> no results
             result = iter([])
         else:
-            # lookup a matching language
-            if isinstance(lang, structs.LanguageRange):
-                lang = [lang]
-            else:
-                lang = list(lang)
-            match = structs.lookup_language(languages, lang)
-            # no language? fallback is using the first one
-            if match is None:
-                match = languages[0]
+            match = self._match_lang(languages, lang)
             result = (item for item in result if item.lang == match)
 
         return result
@@ -210,6 +385,79 @@ class XSOList(list):
                       if hasattr(item, key) and getattr(item, key) == value)
         return result
 
+    def _filter_indexed(self, indices, type_, lang, attrs):
+        if not indices.valid:
+            indices.rebuild(self)
+
+        # the working sequence is kept as set of positions; None stands for
+        # the whole list
+        positions = None
+
+        def restrict(predicate):
+            candidates = range(len(self)) if positions is None else positions
+            return {i for i in candidates if predicate(self[i])}
+
+        if type_ is not None:
+            if indices.types is not None:
+                positions = set()
+                for item_type, type_positions in indices.types.items():
+                    if issubclass(item_type, type_):
+                        positions.update(type_positions)
+            else:
+                positions = restrict(lambda item: isinstance(item, type_))
+
+        if lang is not None:
+            by_lang = indices.attrs.get("lang")
+            if by_lang is not None:
+                languages = {
+                    item_lang
+                    for item_lang, lang_positions in by_lang.items()
+                    if item_lang is not None and (
+                        positions is None or
+                        not positions.isdisjoint(lang_positions)
+                    )
+                }
+            else:
+                positions = restrict(
+                    lambda item: getattr(item, "lang", None) is not None
+                )
+                languages = {self[i].lang for i in positions}
+
+            if not languages:
+                return iter([])
+
+            match = self._match_lang(languages, lang)
+            if by_lang is not None:
+                if positions is None:
+                    positions = set(by_lang[match])
+                else:
+                    positions.intersection_update(by_lang[match])
+            else:
+                positions = restrict(lambda item: item.lang == match)
+
+        for key, value in attrs.items():
+            by_value = indices.attrs.get(key)
+            if by_value is not None:
+                try:
+                    value_positions = by_value.get(value, ())
+                except TypeError:
+                    pass
+                else:
+                    if positions is None:
+                        positions = set(value_positions)
+                    else:
+                        positions.intersection_update(value_positions)
+                    continue
+
+            positions = restrict(
+                lambda item: (hasattr(item, key) and
+                              getattr(item, key) == value)
+            )
+
+        if positions is None:
+            return iter(list(self))
+        return iter([self[i] for i in sorted(positions)])
+
     def filter(self, *, type_=None, lang=None, attrs={}):
         """
         Return an iterable which produces a sequence of the elements inside
@@ -223,17 +471,17 @@ class XSOList(list):
         :class:`~.structs.LanguageRange` or an iterable of language ranges. The
         set of languages present among the working sequence is determined and
         used for a call to
-        :class:`~.structs.lookup_language`. If the lookup returns a language,
+        :func:`~.structs.negotiate_language`. If the lookup returns a language,
         all elements whose :attr:`lang` is different from that value are
         excluded from the working sequence.
 
         .. note::
 
            If an iterable of language ranges is given, it is evaluated into a
-           list. This may be of concern if a huge iterable is about to be used
+           tuple. This may be of concern if a huge iterable is about to be used
            for language ranges, but it is an requirement of the
-           :class:`~.structs.lookup_language` function which is used under the
-           hood.
+           :func:`~.structs.negotiate_language` function which is used under
+           the hood.
 
         .. note::
 
@@ -249,7 +497,21 @@ class XSOList(list):
         once. It is dynamic in the sense that changes to elements which are in
         the list *behind* the last element returned from the iterator will
         still be picked up when the iterator is resumed.
+
+        If indices have been added with :meth:`add_index` and any criteria are
+        given, the result is instead determined completely when :meth:`filter`
+        is called, using the indices where possible.
+
+        .. versionchanged:: 0.14
+
+           Indices added with :meth:`add_index` are used.
         """
+        indices = self._indices
+        if indices is not None and (type_ is not None or
+                                    lang is not None or
+                                    attrs):
+            return self._filter_indexed(indices, type_, lang, attrs)
+
         result = self
         if type_ is not None:
             result = self._filter_type(result, type_)
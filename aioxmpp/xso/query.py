@@ -22,8 +22,8 @@
 import abc
 import copy
 import itertools
-import inspect
 import operator
+import types
 
 
 class _SoftExprMixin:
@@ -171,34 +171,76 @@ class EvaluationContext:
         A result of an expression is said to be true if it contains at least
         one value. It has the same semantics as :func:`bool` on sequences.s
         """
-        result = expr.eval(self)
-        iterator = iter(result)
-        try:
-            next(iterator)
-        except StopIteration:
-            return False
-        else:
-            return True
-        finally:
-            if hasattr(iterator, "close"):
-                iterator.close()
+        return _to_bool(expr.eval(self))
+
+
+def _leaf(result):
+    if isinstance(result, types.GeneratorType):
+        return list(result)
+    return result
+
+
+def _to_bool(result):
+    if isinstance(result, (list, tuple)):
+        return bool(result)
+    iterator = iter(result)
+    try:
+        next(iterator)
+    except StopIteration:
+        return False
+    else:
+        return True
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
 
 
 class Expr(_ExprMixin, metaclass=abc.ABCMeta):
     """
     Base class for things which are solely expressions and nothing else.
+
+    .. automethod:: compile
     """
 
     @abc.abstractmethod
     def eval(self, ec):
         pass
 
-    def eval_leaf(self, ec):
-        result = self.eval(ec)
-        if inspect.isgenerator(result):
-            return list(result)
+    def _compile(self):
+        """
+        Return a function which takes an :class:`EvaluationContext` and
+        returns the same result as :meth:`eval`.
+
+        Subclasses override this to build a closure over the compiled
+        sub-expressions. The default uses :meth:`eval`.
+        """
+        return self.eval
+
+    def compile(self):
+        """
+        Compile the expression into a function.
+
+        :return: A function which takes an :class:`EvaluationContext` and
+            returns the same result as :meth:`eval` would.
+
+        The function avoids the repeated dispatch through the expression tree
+        on each evaluation. It is cached on the expression, so that repeated
+        calls return the same function. Expressions must not be modified after
+        they have been compiled.
+
+        .. versionadded:: 0.14
+        """
+        try:
+            return self._xq_compiled
+        except AttributeError:
+            pass
+        result = self._compile()
+        self._xq_compiled = result
         return result
 
+    def eval_leaf(self, ec):
+        return _leaf(self.eval(ec))
+
     def __repr__(self):
         return "<{}.{} {!r}>".format(
             type(self).__module__,
@@ -222,6 +264,17 @@ class ContextInstance(Expr):
         except KeyError:
             return []
 
+    def _compile(self):
+        class_ = self.class_
+
+        def context_instance(ec):
+            try:
+                return [ec.get_toplevel_object(class_)]
+            except KeyError:
+                return []
+
+        return context_instance
+
 
 class GetDescriptor(Expr):
     """
@@ -255,6 +308,39 @@ class GetDescriptor(Expr):
             )
         return vs
 
+    def _compile(self):
+        expr = self.expr._compile()
+        get = self.descriptor.__get__
+
+        if (type(self).new_values is GetDescriptor.new_values and
+                type(self).update_values is GetDescriptor.update_values):
+            def get_descriptor(ec):
+                vs = []
+                append = vs.append
+                for instance in expr(ec):
+                    try:
+                        append(get(instance, type(instance)))
+                    except AttributeError:
+                        continue
+                return vs
+
+            return get_descriptor
+
+        new_values = self.new_values
+        update_values = self.update_values
+
+        def get_descriptor(ec):
+            vs = new_values()
+            for instance in expr(ec):
+                try:
+                    vnew = get(instance, type(instance))
+                except AttributeError:
+                    continue
+                update_values(vs, vnew)
+            return vs
+
+        return get_descriptor
+
 
 class GetMappingDescriptor(GetDescriptor):
     def __init__(self, expr, descriptor, mapping_factory=dict, **kwargs):
@@ -291,6 +377,15 @@ class GetInstances(Expr):
             if isinstance(obj, self.class_):
                 yield obj
 
+    def _compile(self):
+        expr = self.expr._compile()
+        class_ = self.class_
+
+        def get_instances(ec):
+            return (obj for obj in expr(ec) if isinstance(obj, class_))
+
+        return get_instances
+
 
 class Nth(Expr):
     def __init__(self, expr, nth_expr):
@@ -312,6 +407,22 @@ class Nth(Expr):
             n, n+1,
         )
 
+    def _compile(self):
+        expr = self.expr._compile()
+        nth_expr = self.nth_expr._compile()
+
+        def nth(ec):
+            n, = nth_expr(ec)
+            iterable = expr(ec)
+            if isinstance(n, slice):
+                return itertools.islice(
+                    iterable,
+                    n.start, n.stop, n.step,
+                )
+            return itertools.islice(iterable, n, n+1)
+
+        return nth
+
 
 class ExprFilter(Expr):
     def __init__(self, expr, filter_expr):
@@ -327,6 +438,19 @@ class ExprFilter(Expr):
             if filter_result:
                 yield value
 
+    def _compile(self):
+        expr = self.expr._compile()
+        filter_expr = self.filter_expr._compile()
+
+        def expr_filter(ec):
+            for value in expr(ec):
+                sub_ec = ec.__copy__()
+                sub_ec.set_toplevel_object(value)
+                if _to_bool(filter_expr(sub_ec)):
+                    yield value
+
+        return expr_filter
+
 
 class where:
     """
@@ -360,6 +484,33 @@ class CmpOp(_BoolOpMixin, Expr):
                     return True
         return False
 
+    def _compile(self):
+        operand1 = self.operand1._compile()
+        operand2 = self.operand2._compile()
+        operator = self.operator
+
+        if isinstance(self.operand2, Constant):
+            value = self.operand2.value
+
+            def cmp_op(ec):
+                for v1 in _leaf(operand1(ec)):
+                    if operator(v1, value):
+                        return [True]
+                return []
+
+            return cmp_op
+
+        def cmp_op(ec):
+            vs1 = _leaf(operand1(ec))
+            vs2 = _leaf(operand2(ec))
+            for v1 in vs1:
+                for v2 in vs2:
+                    if operator(v1, v2):
+                        return [True]
+            return []
+
+        return cmp_op
+
 
 class NotOp(_BoolOpMixin, Expr):
     def __init__(self, operand):
@@ -369,6 +520,16 @@ class NotOp(_BoolOpMixin, Expr):
     def eval_leaf(self, ec):
         return not ec.eval_bool(self.operand)
 
+    def _compile(self):
+        operand = self.operand._compile()
+
+        def not_op(ec):
+            if _to_bool(operand(ec)):
+                return []
+            return [True]
+
+        return not_op
+
 
 def not_(expr):
     """
@@ -394,6 +555,14 @@ class Constant(Expr):
     def eval(self, ec):
         return [self.value]
 
+    def _compile(self):
+        value = self.value
+
+        def constant(ec):
+            return [value]
+
+        return constant
+
 
 # Here be dragons: if you use metaclass=abc.ABCMeta with this class, very
 # interesting things will blow up
@@ -439,6 +608,7 @@ def as_expr(thing, lhs=None):
     if isinstance(thing, Expr):
         if hasattr(thing, "expr"):
             thing.expr = as_expr(thing.expr, lhs=lhs)
+            thing.__dict__.pop("_xq_compiled", None)
         return thing
 
     if isinstance(thing, PreExpr):
@@ -32,6 +32,7 @@ import array
 import base64
 import binascii
 import decimal
+import functools
 import ipaddress
 import json
 import numbers
@@ -363,6 +364,16 @@ class DateTime(AbstractCDataType):
 
        The `legacy` argument was added.
 
+    .. versionchanged:: 0.14
+
+       Timestamps in the :xep:`82` format are parsed without
+       :meth:`~datetime.datetime.strptime`. The results for recently parsed
+       strings are cached, since batches of stanzas (for example from
+       :xep:`313` archives) often carry the same stamps.
+
+       Negative timezone offsets with non-zero minutes (such as ``-05:30``)
+       are now applied correctly.
+
     """
 
     tzextract = re.compile("((Z)|([+-][0-9]{2}):([0-9]{2}))$")
@@ -377,34 +388,7 @@ class DateTime(AbstractCDataType):
         return v
 
     def parse(self, v):
-        v = v.strip()
-        m = self.tzextract.search(v)
-        if m:
-            _, utc, hour_offset, minute_offset = m.groups()
-            if utc:
-                hour_offset = 0
-                minute_offset = 0
-            else:
-                hour_offset = int(hour_offset)
-                minute_offset = int(minute_offset)
-            tzinfo = pytz.utc
-            offset = timedelta(minutes=minute_offset + 60 * hour_offset)
-            v = v[:m.start()]
-        else:
-            tzinfo = None
-            offset = timedelta(0)
-
-        try:
-            dt = datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%f")
-        except ValueError:
-            try:
-                dt = datetime.strptime(v, "%Y-%m-%dT%H:%M:%S")
-            except ValueError:
-                dt = datetime.strptime(v, "%Y%m%dT%H:%M:%S")
-                tzinfo = pytz.utc
-                offset = timedelta(0)
-
-        return dt.replace(tzinfo=tzinfo) - offset
+        return _parse_datetime(v.strip())
 
     def format(self, v):
         if v.tzinfo:
@@ -420,6 +404,71 @@ class DateTime(AbstractCDataType):
         return result
 
 
+_DATETIME_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?"
+    r"(?:(Z)|([+-])(\d{2}):(\d{2}))?",
+    re.ASCII,
+)
+
+
+def _tz_offset(m):
+    """
+    Return the tzinfo and the UTC offset for a :attr:`DateTime.tzextract`
+    match.
+    """
+
+    _, utc, hour_offset, minute_offset = m.groups()
+    if utc:
+        return pytz.utc, timedelta(0)
+    minutes = int(hour_offset[1:]) * 60 + int(minute_offset)
+    if hour_offset[0] == "-":
+        minutes = -minutes
+    return pytz.utc, timedelta(minutes=minutes)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_datetime(v):
+    m = _DATETIME_RE.fullmatch(v)
+    if m is not None:
+        (year, month, day, hour, minute, second, fraction,
+         utc, sign, hour_offset, minute_offset) = m.groups()
+        dt = datetime(
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second),
+            int(fraction.ljust(6, "0")) if fraction else 0,
+        )
+        if utc:
+            return dt.replace(tzinfo=pytz.utc)
+        if sign:
+            offset = timedelta(minutes=int(hour_offset) * 60 +
+                               int(minute_offset))
+            if sign == "-":
+                offset = -offset
+            return dt.replace(tzinfo=pytz.utc) - offset
+        return dt
+
+    # everything else, including the legacy format, takes the slow path
+    m = DateTime.tzextract.search(v)
+    if m:
+        tzinfo, offset = _tz_offset(m)
+        v = v[:m.start()]
+    else:
+        tzinfo = None
+        offset = timedelta(0)
+
+    try:
+        dt = datetime.strptime(v, "%Y-%m-%dT%H:%M:%S.%f")
+    except ValueError:
+        try:
+            dt = datetime.strptime(v, "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            dt = datetime.strptime(v, "%Y%m%dT%H:%M:%S")
+            tzinfo = pytz.utc
+            offset = timedelta(0)
+
+    return dt.replace(tzinfo=tzinfo) - offset
+
+
 class Date(AbstractCDataType):
     """
     ISO date :term:`Character Data Type`.
@@ -461,15 +510,7 @@ class Time(AbstractCDataType):
         v = v.strip()
         m = DateTime.tzextract.search(v)
         if m:
-            _, utc, hour_offset, minute_offset = m.groups()
-            if utc:
-                hour_offset = 0
-                minute_offset = 0
-            else:
-                hour_offset = int(hour_offset)
-                minute_offset = int(minute_offset)
-            tzinfo = pytz.utc
-            offset = timedelta(minutes=minute_offset + 60 * hour_offset)
+            tzinfo, offset = _tz_offset(m)
             v = v[:m.start()]
         else:
             tzinfo = None
@@ -511,7 +552,7 @@ class _BinaryType(AbstractCDataType):
     def coerce(self, v):
         if isinstance(v, bytes):
             return v
-        elif isinstance(v, (bytearray, array.array)):
+        elif isinstance(v, (bytearray, array.array, memoryview)):
             return bytes(v)
         raise TypeError("must be convertible to bytes")
 
@@ -532,7 +573,9 @@ class Base64Binary(_BinaryType):
         self._empty_as_equal = empty_as_equal
 
     def parse(self, v):
-        return base64.b64decode(v)
+        # a2b_base64 reads ASCII str directly, without the intermediate
+        # bytes object b64decode would create
+        return binascii.a2b_base64(v)
 
     def format(self, v):
         if self._empty_as_equal and not v:
@@ -747,6 +790,29 @@ class TextChildMap(AbstractElementType):
         return xso
 
 
+def _enum_member_table(enum_class, key):
+    """
+    Return a dictionary mapping ``key(member.value)`` to the member for each
+    member of `enum_class`.
+
+    Members for which `key` raises :class:`TypeError` or :class:`ValueError`
+    are left out. If `enum_class` cannot be iterated, the table is empty.
+    """
+
+    table = {}
+    try:
+        members = list(enum_class)
+    except TypeError:
+        return table
+
+    for member in members:
+        try:
+            table[key(member.value)] = member
+        except (TypeError, ValueError):
+            pass
+    return table
+
+
 class EnumCDataType(AbstractCDataType):
     """
     Use an :class:`enum.Enum` as type for an XSO descriptor.
@@ -847,6 +913,12 @@ class EnumCDataType(AbstractCDataType):
     .. versionchanged:: 0.10
 
         Support for `pass_unknown` was added.
+
+    .. versionchanged:: 0.14
+
+        :meth:`parse` looks up the members in a table from the formatted
+        member values, which is built on first use. Strings which are not in
+        the table are parsed as before.
     """
 
     def __init__(self, enum_class, nested_type=String(), *,
@@ -869,12 +941,43 @@ class EnumCDataType(AbstractCDataType):
         self.allow_unknown = allow_unknown
         self.pass_unknown = pass_unknown
 
+    @property
+    def enum_class(self):
+        return self._enum_class
+
+    @enum_class.setter
+    def enum_class(self, value):
+        self._enum_class = value
+        self._parse_table = None
+
+    @property
+    def nested_type(self):
+        return self._nested_type
+
+    @nested_type.setter
+    def nested_type(self, value):
+        self._nested_type = value
+        self._parse_table = None
+
+    def _build_parse_table(self):
+        nested_type = self._nested_type
+
+        def key(value):
+            s = nested_type.format(value)
+            # only use strings which parse back to the member value; this
+            # keeps the table consistent with nested_type.parse
+            if nested_type.parse(s) != value:
+                raise ValueError()
+            return s
+
+        return _enum_member_table(self._enum_class, key)
+
     def coerce(self, value):
         if (not self.pass_unknown and self.accept_unknown and
                 isinstance(value, Unknown)):
             return value
 
-        if isinstance(value, self.enum_class):
+        if isinstance(value, self._enum_class):
             return value
 
         if self.allow_coerce:
@@ -888,27 +991,34 @@ class EnumCDataType(AbstractCDataType):
                     stacklevel=stacklevel,
                 )
 
-            value = self.nested_type.coerce(value)
+            value = self._nested_type.coerce(value)
             try:
-                return self.enum_class(value)
+                return self._enum_class(value)
             except ValueError:
                 if self.pass_unknown:
                     return value
                 raise
 
         if self.pass_unknown:
-            value = self.nested_type.coerce(value)
+            value = self._nested_type.coerce(value)
             return value
 
         raise TypeError("not a valid {} value: {!r}".format(
-            self.enum_class,
+            self._enum_class,
             value,
         ))
 
     def parse(self, s):
-        parsed = self.nested_type.parse(s)
+        table = self._parse_table
+        if table is None:
+            table = self._parse_table = self._build_parse_table()
+        member = table.get(s)
+        if member is not None:
+            return member
+
+        parsed = self._nested_type.parse(s)
         try:
-            return self.enum_class(parsed)
+            return self._enum_class(parsed)
         except ValueError:
             if self.pass_unknown:
                 return parsed
@@ -917,9 +1027,9 @@ class EnumCDataType(AbstractCDataType):
             raise
 
     def format(self, v):
-        if self.pass_unknown and not isinstance(v, self.enum_class):
-            return self.nested_type.format(v)
-        return self.nested_type.format(v.value)
+        if self.pass_unknown and not isinstance(v, self._enum_class):
+            return self._nested_type.format(v)
+        return self._nested_type.format(v.value)
 
 
 class EnumElementType(AbstractElementType):
@@ -967,6 +1077,11 @@ class EnumElementType(AbstractElementType):
     :class:`Unknown` value needs to be done explicitly in code, it is unlikely
     that a user will *accidentally* assign an unspecified value to a descriptor
     using this type with `accept_unknown`.
+
+    .. versionchanged:: 0.14
+
+        :meth:`unpack` looks up the members in a table from the member values,
+        which is built on first use.
     """
 
     def __init__(self, enum_class, nested_type, *,
@@ -982,6 +1097,15 @@ class EnumElementType(AbstractElementType):
         self.accept_unknown = accept_unknown
         self.allow_unknown = allow_unknown
 
+    @property
+    def enum_class(self):
+        return self._enum_class
+
+    @enum_class.setter
+    def enum_class(self, value):
+        self._enum_class = value
+        self._value_table = None
+
     def get_xso_types(self):
         return self.nested_type.get_xso_types()
 
@@ -990,7 +1114,7 @@ class EnumElementType(AbstractElementType):
             return value
         if self.allow_coerce:
             if self.deprecate_coerce:
-                if isinstance(value, self.enum_class):
+                if isinstance(value, self._enum_class):
                     return value
                 stacklevel = (4 if self.deprecate_coerce is True
                               else self.deprecate_coerce)
@@ -1000,18 +1124,31 @@ class EnumElementType(AbstractElementType):
                     DeprecationWarning,
                     stacklevel=stacklevel,
                 )
-            return self.enum_class(value)
-        if isinstance(value, self.enum_class):
+            return self._enum_class(value)
+        if isinstance(value, self._enum_class):
             return value
         raise TypeError("not a valid {} value: {!r}".format(
-            self.enum_class,
+            self._enum_class,
             value,
         ))
 
     def unpack(self, s):
         parsed = self.nested_type.unpack(s)
+        table = self._value_table
+        if table is None:
+            table = self._value_table = _enum_member_table(
+                self._enum_class,
+                lambda value: value,
+            )
+        try:
+            member = table.get(parsed)
+        except TypeError:
+            member = None
+        if member is not None:
+            return member
+
         try:
-            return self.enum_class(parsed)
+            return self._enum_class(parsed)
         except ValueError:
             if self.allow_unknown:
                 return Unknown(parsed)
@@ -0,0 +1,141 @@
+########################################################################
+# File name: conftest.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+"""
+pytest integration of the benchmarks.
+
+Run the benchmarks with::
+
+  python -m pytest benchmarks --benchmark-report=results.json
+
+and compare a later run against the saved results with::
+
+  python -m pytest benchmarks --benchmark-baseline=results.json
+
+A run which is more than ``--benchmark-tolerance`` (relative, default 0.1)
+worse than the baseline for any key fails. For durations, smaller is better;
+for rates (units of the form ``things/s``), larger is better.
+
+Benchmarks are skipped unless the ``benchmarks`` directory (or a part of it)
+is selected explicitly, so that they do not slow down the test suite.
+"""
+import io
+import os
+
+import pytest
+
+import aioxmpp.benchtest as benchtest
+
+
+_BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("aioxmpp benchmarks")
+    group.addoption(
+        "--benchmark-report",
+        metavar="FILE",
+        default=None,
+        help="Save the benchmark results as JSON to FILE",
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        metavar="FILE",
+        default=None,
+        help="Compare the benchmark results against a previous report",
+    )
+    group.addoption(
+        "--benchmark-tolerance",
+        metavar="FRACTION",
+        type=float,
+        default=0.1,
+        help="Tolerated relative regression against the baseline",
+    )
+
+
+def _is_selected(config):
+    for arg in config.args:
+        path = os.path.abspath(str(arg).split("::", 1)[0])
+        if (path == _BENCHMARK_DIR or
+                path.startswith(_BENCHMARK_DIR + os.sep)):
+            return True
+    return False
+
+
+def pytest_collection_modifyitems(config, items):
+    if _is_selected(config):
+        return
+
+    skip = pytest.mark.skip(reason="benchmarks must be selected explicitly")
+    for item in items:
+        if str(item.fspath).startswith(_BENCHMARK_DIR + os.sep):
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    results = benchtest.current_results()
+    if not results:
+        return
+
+    report = config.getoption("benchmark_report", None)
+    if report is not None:
+        with open(report, "w") as f:
+            benchtest.dump_results(f)
+
+    baseline = config.getoption("benchmark_baseline", None)
+    if baseline is not None:
+        with open(baseline) as f:
+            baseline_results = benchtest.load_results(f)
+        regressions = benchtest.compare_results(
+            baseline_results,
+            results,
+            tolerance=config.getoption("benchmark_tolerance", 0.1),
+        )
+        config._aioxmpp_bench_regressions = regressions
+        if regressions and session.exitstatus == 0:
+            session.exitstatus = 1
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not benchtest.current_results():
+        return
+
+    terminalreporter.section("benchmark results")
+    buf = io.StringIO()
+    benchtest.print_report(buf)
+    terminalreporter.write(buf.getvalue())
+
+    regressions = getattr(config, "_aioxmpp_bench_regressions", None)
+    if regressions is None:
+        return
+
+    if not regressions:
+        terminalreporter.write_line("no regressions against the baseline")
+        return
+
+    terminalreporter.section("benchmark regressions")
+    for key, base, current, change in regressions:
+        terminalreporter.write_line(
+            "{}: {:.4g} -> {:.4g} ({:+.1%})".format(
+                "/".join(key), base, current, change,
+            )
+        )
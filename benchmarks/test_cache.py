@@ -19,6 +19,7 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import asyncio
 import io
 import unittest
 import random
@@ -65,3 +66,69 @@ class TestLRUDict(unittest.TestCase):
                 lru_dict[object()] = object()
 
         record(key, t.elapsed, "s")
+
+    @times(1000)
+    def test_inserts_weighted(self):
+        key = self.KEY + ("inserts_weighted",)
+
+        N = 1000
+
+        lru_dict = aioxmpp.cache.LRUDict()
+        lru_dict.maxsize = None
+        lru_dict.weight = len
+        lru_dict.maxweight = N * 10
+        for i in range(N):
+            lru_dict[object()] = "x" * 10
+
+        with timed() as t:
+            for i in range(N):
+                lru_dict[object()] = "x" * 10
+
+        record(key, t.elapsed, "s")
+
+    @times(1000)
+    def test_random_access_ttl(self):
+        key = self.KEY + ("random_access_ttl",)
+
+        N = 1000
+
+        lru_dict = aioxmpp.cache.LRUDict()
+        lru_dict.maxsize = N
+        lru_dict.ttl = 3600
+        keys = [object() for i in range(N)]
+        for i in range(N):
+            lru_dict[keys[i]] = object()
+
+        with timed() as t:
+            for i in range(N):
+                lru_dict[keys[random.randrange(0, N)]]
+
+        record(key, t.elapsed, "s")
+
+    @times(100)
+    def test_get_or_create_async(self):
+        key = self.KEY + ("get_or_create_async",)
+
+        N = 1000
+
+        lru_dict = aioxmpp.cache.LRUDict()
+        lru_dict.maxsize = N // 2
+
+        async def factory():
+            return object()
+
+        async def run():
+            for i in range(N):
+                await lru_dict.get_or_create_async(
+                    random.randrange(0, N),
+                    factory,
+                )
+
+        loop = asyncio.new_event_loop()
+        try:
+            with timed() as t:
+                loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+        record(key, t.elapsed, "s")
@@ -0,0 +1,143 @@
+########################################################################
+# File name: test_callbacks.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import unittest
+
+import aioxmpp.callbacks
+
+from aioxmpp.benchtest import times, timed, record
+
+
+class Listener:
+    def __call__(self, *args, **kwargs):
+        pass
+
+    def meth(self, *args, **kwargs):
+        pass
+
+
+class NullLoop:
+    def call_soon(self, *args):
+        pass
+
+
+class TestAdHocSignal(unittest.TestCase):
+    KEY = "aioxmpp.callbacks", "AdHocSignal"
+
+    N = 10000
+
+    def _fire(self, signal, name):
+        with timed() as t:
+            for i in range(self.N):
+                signal(i, foo=i)
+
+        record(self.KEY + (name,), self.N / t.elapsed, "emissions/s")
+
+    @times(30)
+    def test_no_listeners(self):
+        signal = aioxmpp.callbacks.AdHocSignal()
+        self._fire(signal, "no_listeners")
+
+    @times(30)
+    def test_strong_listeners(self):
+        signal = aioxmpp.callbacks.AdHocSignal()
+        for i in range(5):
+            signal.connect(Listener())
+        self._fire(signal, "strong_listeners")
+
+    @times(30)
+    def test_weak_listeners(self):
+        signal = aioxmpp.callbacks.AdHocSignal()
+        listeners = [Listener() for i in range(5)]
+        for listener in listeners:
+            signal.connect(listener.meth, signal.WEAK)
+        self._fire(signal, "weak_listeners")
+
+    @times(30)
+    def test_mixed_listeners(self):
+        signal = aioxmpp.callbacks.AdHocSignal()
+        listener = Listener()
+        signal.connect(listener)
+        signal.connect(listener.meth, signal.WEAK)
+        signal.connect(
+            listener,
+            signal.ASYNC_WITH_LOOP(NullLoop()),
+        )
+        self._fire(signal, "mixed_listeners")
+
+    @times(30)
+    def test_connect_disconnect_churn(self):
+        signal = aioxmpp.callbacks.AdHocSignal()
+        for i in range(5):
+            signal.connect(Listener())
+        listener = Listener()
+
+        with timed() as t:
+            for i in range(self.N):
+                token = signal.connect(listener)
+                signal(i)
+                signal.disconnect(token)
+
+        record(self.KEY + ("connect_fire_disconnect",),
+               self.N / t.elapsed, "cycles/s")
+
+
+def passthrough(obj):
+    return obj
+
+
+class TestFilter(unittest.TestCase):
+    KEY = "aioxmpp.callbacks", "Filter"
+
+    N = 10000
+
+    def _filter(self, filter_, name):
+        obj = object()
+        with timed() as t:
+            for i in range(self.N):
+                filter_.filter(obj)
+
+        record(self.KEY + (name,), self.N / t.elapsed, "calls/s")
+
+    @times(30)
+    def test_empty_chain(self):
+        self._filter(aioxmpp.callbacks.Filter(), "empty_chain")
+
+    @times(30)
+    def test_chain(self):
+        filter_ = aioxmpp.callbacks.Filter()
+        for i in range(5):
+            filter_.register(passthrough, i)
+        self._filter(filter_, "chain")
+
+    @times(30)
+    def test_register_unregister(self):
+        filter_ = aioxmpp.callbacks.Filter()
+        for i in range(50):
+            filter_.register(passthrough, i % 10)
+
+        with timed() as t:
+            for i in range(self.N):
+                token = filter_.register(passthrough, i % 10)
+                filter_.unregister(token)
+
+        record(self.KEY + ("register_unregister",),
+               self.N / t.elapsed, "cycles/s")
@@ -0,0 +1,265 @@
+########################################################################
+# File name: test_e2e.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import asyncio
+import contextlib
+import itertools
+import logging
+import time
+import unittest
+
+import aioxmpp
+import aioxmpp.dispatcher
+import aioxmpp.ping
+
+from aioxmpp.benchtest import times, timed, record
+from aioxmpp.benchtest.server import LoopbackServer
+from aioxmpp.testutils import run_coroutine
+
+
+class LoopbackTestCase(unittest.TestCase):
+    """
+    Base class for benchmarks which run real clients against a
+    :class:`~aioxmpp.benchtest.server.LoopbackServer`.
+    """
+
+    TIMEOUT = 60
+
+    _resources = itertools.count()
+
+    _QUIET_LOGGERS = "aioopenssl", "aioxmpp"
+
+    @classmethod
+    def setUpClass(cls):
+        # connection failures are provoked on purpose and the resulting
+        # tracebacks would only distort the timing
+        cls._saved_log_levels = {}
+        for name in cls._QUIET_LOGGERS:
+            logger = logging.getLogger(name)
+            cls._saved_log_levels[name] = logger.level
+            logger.setLevel(logging.CRITICAL)
+        cls.server = LoopbackServer()
+        try:
+            run_coroutine(cls.server.start())
+        except:  # NOQA
+            # tearDownClass is not called if setUpClass fails
+            cls._restore_log_levels()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            run_coroutine(cls.server.stop())
+        finally:
+            cls._restore_log_levels()
+
+    @classmethod
+    def _restore_log_levels(cls):
+        for name, level in cls._saved_log_levels.items():
+            logging.getLogger(name).setLevel(level)
+
+    def setUp(self):
+        self.exit_stack = contextlib.AsyncExitStack()
+        self.echo = aioxmpp.JID.fromstr(self.server.echo_domain)
+
+    def tearDown(self):
+        run_coroutine(self.exit_stack.aclose())
+
+    def connect(self, localpart):
+        client = self.server.make_client(
+            localpart,
+            "bench{}".format(next(self._resources)),
+        )
+        run_coroutine(
+            self.exit_stack.enter_async_context(client.connected()),
+            timeout=self.TIMEOUT,
+        )
+        return client
+
+
+class TestMessageRoundTrip(LoopbackTestCase):
+    KEY = "aioxmpp.e2e", "Message"
+
+    N = 500
+
+    async def _round_trips(self, client, key):
+        loop = asyncio.get_event_loop()
+        dispatcher = client.summon(aioxmpp.dispatcher.SimpleMessageDispatcher)
+        received = asyncio.Queue()
+        dispatcher.register_callback(
+            aioxmpp.MessageType.CHAT,
+            self.echo,
+            received.put_nowait,
+        )
+
+        try:
+            for i in range(self.N):
+                msg = aioxmpp.Message(
+                    type_=aioxmpp.MessageType.CHAT,
+                    to=self.echo,
+                )
+                msg.body[None] = "message {}".format(i)
+                t0 = loop.time()
+                client.enqueue(msg)
+                await received.get()
+                record(key, loop.time() - t0, "s")
+        finally:
+            dispatcher.unregister_callback(
+                aioxmpp.MessageType.CHAT,
+                self.echo,
+            )
+
+    @times(3)
+    def test_round_trip_latency(self):
+        client = self.connect("alice")
+        run_coroutine(
+            self._round_trips(client, self.KEY + ("round-trip", "latency")),
+            timeout=self.TIMEOUT,
+        )
+
+
+class TestIQThroughput(LoopbackTestCase):
+    KEY = "aioxmpp.e2e", "IQ"
+
+    N = 2000
+
+    async def _ping_many(self, client, window):
+        sem = asyncio.Semaphore(window)
+
+        async def ping():
+            async with sem:
+                await aioxmpp.ping.ping(client, self.echo)
+
+        await asyncio.gather(*(ping() for _ in range(self.N)))
+
+    def _iq_throughput(self, window):
+        client = self.connect("alice")
+        key = self.KEY + ("ping", "window={}".format(window))
+
+        with timed() as t:
+            run_coroutine(self._ping_many(client, window),
+                          timeout=self.TIMEOUT)
+
+        record(key, self.N / t.elapsed, "iq/s")
+
+    @times(3)
+    def test_sequential(self):
+        self._iq_throughput(1)
+
+    @times(3)
+    def test_window_32(self):
+        self._iq_throughput(32)
+
+
+class TestPresenceFlood(LoopbackTestCase):
+    KEY = "aioxmpp.e2e", "Presence"
+
+    N = 2000
+
+    @times(3)
+    def test_directed_presence_flood(self):
+        sender = self.connect("alice")
+        receiver = self.connect("bob")
+        dispatcher = receiver.summon(
+            aioxmpp.dispatcher.SimplePresenceDispatcher
+        )
+
+        done = asyncio.get_event_loop().create_future()
+        counter = 0
+
+        def on_presence(stanza):
+            nonlocal counter
+            counter += 1
+            if counter == self.N and not done.done():
+                done.set_result(None)
+
+        dispatcher.register_callback(
+            aioxmpp.PresenceType.AVAILABLE,
+            sender.local_jid,
+            on_presence,
+        )
+
+        with timed() as t:
+            for i in range(self.N):
+                pres = aioxmpp.Presence(
+                    type_=aioxmpp.PresenceType.AVAILABLE,
+                    to=receiver.local_jid,
+                )
+                pres.status[None] = "status {}".format(i)
+                sender.enqueue(pres)
+            run_coroutine(done, timeout=self.TIMEOUT)
+
+        record(self.KEY + ("directed", "flood"), self.N / t.elapsed,
+               "presence/s")
+
+
+class TestMUCJoin(LoopbackTestCase):
+    KEY = "aioxmpp.e2e", "MUC"
+
+    N = 50
+
+    @times(3, pass_iteration=True)
+    def test_join_rooms(self, iteration):
+        client = self.connect("alice")
+        muc = client.summon(aioxmpp.MUCClient)
+
+        with timed() as t:
+            futures = []
+            for i in range(self.N):
+                _, fut = muc.join(
+                    aioxmpp.JID(
+                        "room{}-{}".format(iteration, i),
+                        self.server.muc_domain,
+                        None,
+                    ),
+                    "bench",
+                )
+                futures.append(fut)
+            run_coroutine(asyncio.gather(*futures), timeout=self.TIMEOUT)
+
+        record(self.KEY + ("join", "parallel"), self.N / t.elapsed,
+               "joins/s")
+
+
+class TestResume(LoopbackTestCase):
+    KEY = "aioxmpp.e2e", "StreamManagement"
+
+    N = 10
+
+    def test_resume_latency(self):
+        client = self.connect("alice")
+        key = self.KEY + ("resume", "latency")
+
+        for _ in range(self.N):
+            resumed = asyncio.get_event_loop().create_future()
+            client.on_stream_resumed.connect(
+                resumed,
+                client.on_stream_resumed.AUTO_FUTURE,
+            )
+
+            t0 = time.monotonic()
+            self.server.kill_connections()
+            run_coroutine(resumed, timeout=self.TIMEOUT)
+            record(key, time.monotonic() - t0, "s")
+
+            # make sure the resumed stream is usable before the next round
+            run_coroutine(aioxmpp.ping.ping(client, self.echo),
+                          timeout=self.TIMEOUT)
@@ -0,0 +1,155 @@
+########################################################################
+# File name: test_forms.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import unittest
+
+import aioxmpp.forms as forms
+
+from aioxmpp.benchtest import times, timed, record
+
+
+class BenchForm(forms.Form):
+    FORM_TYPE = "urn:example:bench"
+
+    name = forms.TextSingle(var="name")
+    password = forms.TextPrivate(var="password")
+    enabled = forms.Boolean(var="enabled")
+    tags = forms.TextMulti(var="tags")
+    choice = forms.ListSingle(var="choice")
+
+
+def make_form_xso():
+    data = forms.Data(type_=forms.DataType.FORM)
+    data.fields.append(forms.Field(
+        var="FORM_TYPE",
+        type_=forms.FieldType.HIDDEN,
+        values=["urn:example:bench"],
+    ))
+    data.fields.append(forms.Field(
+        var="name",
+        type_=forms.FieldType.TEXT_SINGLE,
+        values=["foo"],
+    ))
+    data.fields.append(forms.Field(
+        var="password",
+        type_=forms.FieldType.TEXT_SINGLE,
+        values=["secret"],
+    ))
+    data.fields.append(forms.Field(
+        var="enabled",
+        type_=forms.FieldType.BOOLEAN,
+        values=["1"],
+    ))
+    data.fields.append(forms.Field(
+        var="tags",
+        type_=forms.FieldType.TEXT_MULTI,
+        values=["a", "b"],
+    ))
+    data.fields.append(forms.Field(
+        var="choice",
+        type_=forms.FieldType.LIST_SINGLE,
+        values=["x"],
+        options={"x": "X", "y": "Y"},
+    ))
+    for i in range(5):
+        data.fields.append(forms.Field(
+            var="unknown{}".format(i),
+            type_=forms.FieldType.TEXT_SINGLE,
+            values=["v"],
+        ))
+    return data
+
+
+def make_table_xso(nrows):
+    data = forms.Data(type_=forms.DataType.RESULT)
+    data.reported = forms.Reported()
+    data.reported.fields.extend([
+        forms.Field(var="jid", type_=forms.FieldType.JID_SINGLE),
+        forms.Field(var="name", type_=forms.FieldType.TEXT_SINGLE),
+        forms.Field(var="groups", type_=forms.FieldType.TEXT_MULTI),
+    ])
+    for i in range(nrows):
+        item = forms.Item()
+        item.fields.extend([
+            forms.Field(var="jid", values=["user{}@example".format(i)]),
+            forms.Field(var="name", values=["User {}".format(i)]),
+            forms.Field(var="groups", values=["a", "b"]),
+        ])
+        data.items.append(item)
+    return data
+
+
+class TestForm(unittest.TestCase):
+    KEY = "aioxmpp.forms", "Form"
+
+    N = 2000
+
+    @times(30)
+    def test_from_xso(self):
+        data = make_form_xso()
+        with timed() as t:
+            for i in range(self.N):
+                BenchForm.from_xso(data)
+
+        record(self.KEY + ("from_xso",), self.N / t.elapsed, "forms/s")
+
+    @times(30)
+    def test_render_reply(self):
+        f = BenchForm.from_xso(make_form_xso())
+        with timed() as t:
+            for i in range(self.N):
+                f.render_reply()
+
+        record(self.KEY + ("render_reply",), self.N / t.elapsed, "forms/s")
+
+
+class TestTable(unittest.TestCase):
+    KEY = "aioxmpp.forms", "Data"
+
+    NROWS = 1000
+
+    @times(30)
+    def test_read_rows_from_fields(self):
+        data = make_table_xso(self.NROWS)
+        columns = [
+            (field.var, field.type_.is_multivalued)
+            for field in data.reported.fields
+        ]
+        with timed() as t:
+            for item in data.items:
+                by_var = {field.var: field for field in item.fields}
+                tuple(
+                    tuple(by_var[var].values) if multi
+                    else by_var[var].values[0]
+                    for var, multi in columns
+                )
+
+        record(self.KEY + ("read_rows_from_fields",),
+               self.NROWS / t.elapsed, "rows/s")
+
+    @times(30)
+    def test_iter_rows(self):
+        data = make_table_xso(self.NROWS)
+        with timed() as t:
+            for row in data.iter_rows():
+                pass
+
+        record(self.KEY + ("iter_rows",), self.NROWS / t.elapsed, "rows/s")
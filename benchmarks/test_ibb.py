@@ -0,0 +1,134 @@
+########################################################################
+# File name: test_ibb.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import asyncio
+import io
+import unittest
+import unittest.mock
+
+import aioxmpp
+import aioxmpp.ibb as ibb
+import aioxmpp.ibb.xso as ibb_xso
+import aioxmpp.xml
+
+from aioxmpp.benchtest import times, timed, record
+from aioxmpp.testutils import make_connected_client, run_coroutine
+
+
+TEST_JID1 = aioxmpp.JID.fromstr("foo@bar.example/a")
+TEST_JID2 = aioxmpp.JID.fromstr("foo@bar.example/b")
+
+
+def _loopback_send(peer_service, from_):
+    # serialise and parse the payload to account for the wire format
+    handlers = {
+        ibb_xso.Open: peer_service._handle_open_request,
+        ibb_xso.Data: peer_service._handle_data,
+        ibb_xso.Close: peer_service._handle_close_request,
+    }
+
+    async def send(stanza):
+        buf = io.BytesIO()
+        aioxmpp.xml.write_single_xso(stanza.payload, buf)
+        buf.seek(0)
+        type_ = type(stanza.payload)
+        payload = aioxmpp.xml.read_single_xso(buf, type_)
+        iq = aioxmpp.IQ(
+            aioxmpp.IQType.SET,
+            from_=from_,
+            to=stanza.to,
+            payload=payload,
+        )
+        return await handlers[type_](iq)
+
+    return send
+
+
+class SinkProtocol(asyncio.Protocol):
+    def __init__(self, nbytes):
+        super().__init__()
+        self.received = 0
+        self.nbytes = nbytes
+        self.done = asyncio.Future()
+
+    def data_received(self, data):
+        self.received += len(data)
+        if self.received >= self.nbytes and not self.done.done():
+            self.done.set_result(None)
+
+    def connection_lost(self, exc):
+        pass
+
+
+class SourceProtocol(asyncio.Protocol):
+    def connection_lost(self, exc):
+        pass
+
+
+class TestIBBTransfer(unittest.TestCase):
+    KEY = "aioxmpp.ibb", "IBBTransport"
+
+    NBYTES = 100 * 1024 * 1024
+    CHUNK = 1024 * 1024
+
+    def setUp(self):
+        self.cc1 = make_connected_client()
+        self.cc1.local_jid = TEST_JID1
+        self.cc2 = make_connected_client()
+        self.cc2.local_jid = TEST_JID2
+        self.s1 = ibb.IBBService(self.cc1)
+        self.s2 = ibb.IBBService(self.cc2)
+        self.cc1.send = _loopback_send(self.s2, TEST_JID1)
+        self.cc2.send = _loopback_send(self.s1, TEST_JID2)
+
+    async def _transfer(self, window):
+        sink = SinkProtocol(self.NBYTES)
+        self.s2.expect_session(lambda: sink, TEST_JID1, "bench")
+        self.s1.send_window = window
+        transport, _ = await self.s1.open_session(
+            SourceProtocol,
+            TEST_JID2,
+            block_size=ibb.service.MAX_BLOCK_SIZE,
+            sid="bench",
+        )
+
+        chunk = b"x" * self.CHUNK
+        for _ in range(self.NBYTES // self.CHUNK):
+            transport.write(chunk)
+
+        await sink.done
+        transport.close()
+
+    def _run(self, window):
+        key = self.KEY + ("100MiB", "window={}".format(window))
+
+        with timed() as t:
+            run_coroutine(self._transfer(window), timeout=600)
+
+        record(key, self.NBYTES / t.elapsed / 1024 / 1024, "MiB/s")
+
+    @times(1)
+    def test_transfer_window_1(self):
+        self._run(1)
+
+    @times(1)
+    def test_transfer_window_8(self):
+        self._run(8)
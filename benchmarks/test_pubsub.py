@@ -0,0 +1,113 @@
+########################################################################
+# File name: test_pubsub.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import asyncio
+import unittest
+import unittest.mock
+
+import aioxmpp
+import aioxmpp.pubsub.service as pubsub_service
+import aioxmpp.pubsub.xso as pubsub_xso
+import aioxmpp.xso as xso
+
+from aioxmpp.benchtest import times, timed, record
+from aioxmpp.testutils import make_connected_client, run_coroutine
+
+
+TEST_TO = aioxmpp.JID.fromstr("pubsub.example")
+TEST_NODE = "urn:example:catalogue"
+
+
+@pubsub_xso.as_payload_class
+class BenchPayload(xso.XSO):
+    TAG = ("uri:aioxmpp:benchmarks", "payload")
+
+    data = xso.Text()
+
+    def __init__(self, data="x"):
+        super().__init__()
+        self.data = data
+
+
+class EchoServerStub:
+    """
+    Reply to every IQ after a fixed round trip time, echoing the item.
+    """
+
+    def __init__(self, rtt):
+        super().__init__()
+        self.rtt = rtt
+
+    async def send(self, iq):
+        await asyncio.sleep(self.rtt)
+        response = pubsub_xso.Request(pubsub_xso.Publish())
+        response.payload.node = iq.payload.payload.node
+        response.payload.item = pubsub_xso.Item(iq.payload.payload.item.id_)
+        return response
+
+
+class TestPublish(unittest.TestCase):
+    KEY = "aioxmpp.pubsub", "PubSubClient"
+
+    N = 200
+    RTT = 0.001
+
+    def setUp(self):
+        self.cc = make_connected_client()
+        self.cc.send = EchoServerStub(self.RTT).send
+        self.s = pubsub_service.PubSubClient(self.cc, dependencies={
+            aioxmpp.DiscoClient: unittest.mock.Mock(),
+        })
+        self.items = [(str(i), BenchPayload()) for i in range(self.N)]
+
+    async def _publish_sequentially(self):
+        for id_, payload in self.items:
+            await self.s.publish(TEST_TO, TEST_NODE, payload,
+                                 id_=id_)
+
+    @times(5)
+    def test_publish_sequential(self):
+        key = self.KEY + ("publish", "sequential")
+
+        with timed() as t:
+            run_coroutine(self._publish_sequentially(), timeout=60)
+
+        record(key, self.N / t.elapsed, "items/s")
+
+    def _publish_many(self, window):
+        key = self.KEY + ("publish_many", "window={}".format(window))
+
+        with timed() as t:
+            run_coroutine(
+                self.s.publish_many(TEST_TO, TEST_NODE,
+                                    self.items, window=window),
+                timeout=60,
+            )
+
+        record(key, self.N / t.elapsed, "items/s")
+
+    @times(5)
+    def test_publish_many_window_16(self):
+        self._publish_many(16)
+
+    @times(5)
+    def test_publish_many_window_64(self):
+        self._publish_many(64)
@@ -0,0 +1,79 @@
+########################################################################
+# File name: test_structs.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import unittest
+
+import aioxmpp.structs as structs
+
+from aioxmpp.benchtest import times, timed, record
+
+
+class TestLanguageMap(unittest.TestCase):
+    KEY = "aioxmpp.structs", "LanguageMap"
+
+    N = 10000
+
+    RANGES = [
+        structs.LanguageRange.fromstr("de-DE"),
+        structs.LanguageRange.fromstr("en"),
+    ]
+
+    def _lookup(self, languages, name):
+        mapping = structs.LanguageMap()
+        for language in languages:
+            mapping[structs.LanguageTag.fromstr(language)] = language
+
+        ranges = self.RANGES
+        with timed() as t:
+            for i in range(self.N):
+                mapping.lookup(ranges)
+
+        record(self.KEY + (name,), self.N / t.elapsed, "lookups/s")
+
+    @times(30)
+    def test_lookup_one_language(self):
+        self._lookup(["en"], "lookup_one_language")
+
+    @times(30)
+    def test_lookup_two_languages(self):
+        self._lookup(["en", "de"], "lookup_two_languages")
+
+    @times(30)
+    def test_lookup_many_languages(self):
+        self._lookup(
+            ["en", "en-GB", "de", "de-CH", "fr", "it", "es", "nl", "pl",
+             "sv"],
+            "lookup_many_languages",
+        )
+
+
+class TestLanguageTag(unittest.TestCase):
+    KEY = "aioxmpp.structs", "LanguageTag"
+
+    N = 10000
+
+    @times(30)
+    def test_fromstr(self):
+        with timed() as t:
+            for i in range(self.N):
+                structs.LanguageTag.fromstr("en-GB")
+
+        record(self.KEY + ("fromstr",), self.N / t.elapsed, "calls/s")
@@ -0,0 +1,103 @@
+########################################################################
+# File name: test_xso.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import unittest
+
+import aioxmpp
+import aioxmpp.disco.xso as disco_xso
+import aioxmpp.xso as xso
+import aioxmpp.xso.query as xso_query
+
+from aioxmpp.benchtest import times, timed, record
+
+
+def make_items_query(n):
+    query = disco_xso.ItemsQuery()
+    for i in range(n):
+        query.items.append(disco_xso.Item(
+            aioxmpp.JID.fromstr("pubsub.example"),
+            node="node{}".format(i),
+        ))
+    return query
+
+
+class TestXSOList(unittest.TestCase):
+    KEY = "aioxmpp.xso.model", "XSOList"
+
+    N = 1000
+
+    LOOKUPS = 100
+
+    def _filter(self, items, name):
+        nodes = ["node{}".format(i * 7 % self.N) for i in range(self.LOOKUPS)]
+
+        with timed() as t:
+            for node in nodes:
+                items.filtered(attrs={"node": node})
+
+        record(self.KEY + (name,), self.LOOKUPS / t.elapsed, "lookups/s")
+
+    @times(30)
+    def test_filter_by_attribute(self):
+        query = make_items_query(self.N)
+        self._filter(query.items, "filter_by_attribute")
+
+    @times(30)
+    def test_filter_by_attribute_indexed(self):
+        query = make_items_query(self.N)
+        query.items.add_index(attrs=["node"])
+        self._filter(query.items, "filter_by_attribute_indexed")
+
+
+class TestQuery(unittest.TestCase):
+    KEY = "aioxmpp.xso.query", "Expr"
+
+    N = 100
+
+    EVALUATIONS = 1000
+
+    def setUp(self):
+        self.ec = xso_query.EvaluationContext()
+        self.ec.set_toplevel_object(make_items_query(self.N))
+        self.expr = xso_query.as_expr(
+            disco_xso.ItemsQuery.items / disco_xso.Item[
+                xso.where(disco_xso.Item.node == "node50")
+            ] / disco_xso.Item.jid
+        )
+
+    @times(30)
+    def test_eval(self):
+        with timed() as t:
+            for i in range(self.EVALUATIONS):
+                list(self.ec.eval(self.expr))
+
+        record(self.KEY + ("eval",), self.EVALUATIONS / t.elapsed,
+               "evaluations/s")
+
+    @times(30)
+    def test_compiled(self):
+        fn = self.expr.compile()
+        with timed() as t:
+            for i in range(self.EVALUATIONS):
+                list(fn(self.ec))
+
+        record(self.KEY + ("compiled",), self.EVALUATIONS / t.elapsed,
+               "evaluations/s")
@@ -0,0 +1,168 @@
+########################################################################
+# File name: test_xso_types.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import unittest
+
+import aioxmpp.structs as structs
+import aioxmpp.xso as xso
+
+from aioxmpp.benchtest import times, timed, record
+
+
+class TestEnumCDataType(unittest.TestCase):
+    KEY = "aioxmpp.xso.types", "EnumCDataType"
+
+    N = 20000
+
+    VALUES = ["chat", "normal", "groupchat", "headline", "error"]
+
+    @times(30)
+    def test_parse(self):
+        t = xso.EnumCDataType(structs.MessageType)
+        values = self.VALUES * (self.N // len(self.VALUES))
+        with timed() as t_:
+            for value in values:
+                t.parse(value)
+
+        record(self.KEY + ("parse",), len(values) / t_.elapsed, "values/s")
+
+    @times(30)
+    def test_parse_unknown(self):
+        t = xso.EnumCDataType(structs.MessageType)
+        with timed() as t_:
+            for i in range(self.N):
+                t.parse("foo")
+
+        record(self.KEY + ("parse_unknown",), self.N / t_.elapsed,
+               "values/s")
+
+    @times(30)
+    def test_coerce(self):
+        t = xso.EnumCDataType(structs.MessageType)
+        value = structs.MessageType.CHAT
+        with timed() as t_:
+            for i in range(self.N):
+                t.coerce(value)
+
+        record(self.KEY + ("coerce",), self.N / t_.elapsed, "values/s")
+
+    @times(30)
+    def test_member_eq(self):
+        a = structs.MessageType.CHAT
+        b = structs.MessageType.CHAT
+        with timed() as t_:
+            for i in range(self.N):
+                a == b
+
+        record(self.KEY + ("member_eq",), self.N / t_.elapsed, "compares/s")
+
+
+class TestDateTime(unittest.TestCase):
+    KEY = "aioxmpp.xso.types", "DateTime"
+
+    N = 5000
+
+    @times(30)
+    def test_parse_distinct(self):
+        t = xso.DateTime()
+        values = [
+            "2019-03-{:02d}T{:02d}:{:02d}:{:02d}.{:03d}Z".format(
+                i % 28 + 1, i % 24, i % 60, (i * 7) % 60, i % 1000,
+            )
+            for i in range(self.N)
+        ]
+        with timed() as t_:
+            for value in values:
+                t.parse(value)
+
+        record(self.KEY + ("parse_distinct",), self.N / t_.elapsed,
+               "values/s")
+
+    @times(30)
+    def test_parse_repeated(self):
+        t = xso.DateTime()
+        values = [
+            "2019-03-01T12:00:{:02d}Z".format(i % 10)
+            for i in range(self.N)
+        ]
+        with timed() as t_:
+            for value in values:
+                t.parse(value)
+
+        record(self.KEY + ("parse_repeated",), self.N / t_.elapsed,
+               "values/s")
+
+    @times(30)
+    def test_parse_offset(self):
+        t = xso.DateTime()
+        values = [
+            "2019-03-{:02d}T{:02d}:00:00+01:00".format(i % 28 + 1, i % 24)
+            for i in range(self.N)
+        ]
+        with timed() as t_:
+            for value in values:
+                t.parse(value)
+
+        record(self.KEY + ("parse_offset",), self.N / t_.elapsed,
+               "values/s")
+
+    @times(30)
+    def test_parse_legacy(self):
+        t = xso.DateTime()
+        values = [
+            "201903{:02d}T{:02d}:00:00".format(i % 28 + 1, i % 24)
+            for i in range(self.N)
+        ]
+        with timed() as t_:
+            for value in values:
+                t.parse(value)
+
+        record(self.KEY + ("parse_legacy",), self.N / t_.elapsed,
+               "values/s")
+
+
+class TestScalarTypes(unittest.TestCase):
+    KEY = "aioxmpp.xso.types",
+
+    N = 20000
+
+    def _parse(self, type_, value, name):
+        with timed() as t_:
+            for i in range(self.N):
+                type_.parse(value)
+
+        record(self.KEY + (name, "parse"), self.N / t_.elapsed, "values/s")
+
+    @times(30)
+    def test_string_parse(self):
+        self._parse(xso.String(), "foo", "String")
+
+    @times(30)
+    def test_integer_parse(self):
+        self._parse(xso.Integer(), "1234", "Integer")
+
+    @times(30)
+    def test_bool_parse(self):
+        self._parse(xso.Bool(), "true", "Bool")
+
+    @times(30)
+    def test_jid_parse(self):
+        self._parse(xso.JID(), "user@example.com/res", "JID")
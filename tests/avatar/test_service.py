@@ -23,6 +23,8 @@ import asyncio
 import base64
 import contextlib
 import hashlib
+import pathlib
+import tempfile
 import unittest
 
 import aioxmpp
@@ -355,6 +357,24 @@ class TestAvatarService(unittest.TestCase):
         self.s.metadata_cache_size = 100
         self.assertEqual(self.s.metadata_cache_size, 100)
 
+    def test_image_cache(self):
+        self.assertIsInstance(self.s.image_cache,
+                              avatar_service.AvatarImageCache)
+        cache = avatar_service.AvatarImageCache()
+        self.s.image_cache = cache
+        self.assertIs(self.s.image_cache, cache)
+        del self.s.image_cache
+        self.assertIsNot(self.s.image_cache, cache)
+
+    def test_descriptors_share_image_cache(self):
+        descriptor = self.s._cook_vcard_notify(
+            TEST_JID1,
+            unittest.mock.Mock(xep0153_x=unittest.mock.Mock(
+                photo=TEST_IMAGE_SHA1
+            )),
+        )[0]
+        self.assertIs(descriptor._image_cache, self.s.image_cache)
+
     def test_handle_stream_destroyed_is_depsignal_handler(self):
         self.assertTrue(aioxmpp.service.is_depsignal_handler(
             aioxmpp.stream.StanzaStream,
@@ -419,6 +439,24 @@ class TestAvatarService(unittest.TestCase):
             []
         )
 
+    def test_rehash_passes_advertised_hash_to_vcard_service(self):
+        with unittest.mock.patch.object(self.vcard, "get_vcard",
+                                        new=CoroutineMock()):
+            vcard = vcard_xso.VCard()
+            vcard.set_photo_data("image/png", TEST_IMAGE)
+            self.vcard.get_vcard.return_value = vcard
+
+            stanza = aioxmpp.Presence()
+            stanza.xep0153_x = avatar_xso.VCardTempUpdate(TEST_IMAGE_SHA1)
+            self.s._handle_on_available(TEST_FROM_OTHER, stanza)
+            run_coroutine(self.s._vcard_rehash_task)
+
+            self.vcard.get_vcard.assert_called_once_with(
+                photo_hash=TEST_IMAGE_SHA1,
+            )
+
+        self.assertEqual(self.s._vcard_id, TEST_IMAGE_SHA1)
+
     def test_trigger_rehash(self):
         mock_handler = unittest.mock.Mock()
         self.s.on_metadata_changed.connect(mock_handler)
@@ -1232,11 +1270,13 @@ class TestAvatarDescriptors(unittest.TestCase):
                 self.vcard.get_vcard.mock_calls,
                 [
                     unittest.mock.call(
-                        TEST_JID1
+                        TEST_JID1,
+                        photo_hash=TEST_IMAGE_SHA1.upper(),
                     ),
                     unittest.mock.call().get_photo_data(),
                     unittest.mock.call(
-                        TEST_JID1
+                        TEST_JID1,
+                        photo_hash=TEST_IMAGE_SHA1.upper(),
                     ),
                     unittest.mock.call().get_photo_data(),
                 ]
@@ -1300,3 +1340,207 @@ class TestAvatarDescriptors(unittest.TestCase):
         self.assertFalse(descriptor.has_image_data_in_pubsub)
         with self.assertRaises(NotImplementedError):
             run_coroutine(descriptor.get_image_bytes())
+
+
+class TestAvatarImageCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = avatar_service.AvatarImageCache()
+        self.fetch = CoroutineMock()
+        self.fetch.return_value = TEST_IMAGE
+
+    def tearDown(self):
+        del self.cache
+
+    def test_defaults(self):
+        self.assertEqual(self.cache.memory_limit, 4 * 1024 * 1024)
+        self.assertEqual(self.cache.disk_limit, 64 * 1024 * 1024)
+
+    def test_limits_reject_negative_values(self):
+        with self.assertRaises(ValueError):
+            self.cache.memory_limit = -1
+        with self.assertRaises(ValueError):
+            self.cache.disk_limit = -1
+
+    def test_fetches_once_and_caches(self):
+        res1 = run_coroutine(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, self.fetch
+        ))
+        res2 = run_coroutine(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1.upper(), self.fetch
+        ))
+
+        self.assertEqual(res1, TEST_IMAGE)
+        self.assertIs(res1, res2)
+        self.assertSequenceEqual(self.fetch.mock_calls,
+                                 [unittest.mock.call()])
+
+    def test_concurrent_requests_share_fetch(self):
+        fut = asyncio.Future()
+
+        async def fetch():
+            return await fut
+
+        fetch_mock = unittest.mock.Mock(side_effect=fetch)
+
+        task1 = asyncio.ensure_future(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, fetch_mock
+        ))
+        task2 = asyncio.ensure_future(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, fetch_mock
+        ))
+        run_coroutine(asyncio.sleep(0))
+
+        fut.set_result(TEST_IMAGE)
+        res1, res2 = run_coroutine(asyncio.gather(task1, task2))
+
+        self.assertEqual(res1, TEST_IMAGE)
+        self.assertEqual(res2, TEST_IMAGE)
+        self.assertEqual(len(fetch_mock.mock_calls), 1)
+
+    def test_cancelling_one_waiter_keeps_fetch_running(self):
+        fut = asyncio.Future()
+
+        async def fetch():
+            return await fut
+
+        task1 = asyncio.ensure_future(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, fetch
+        ))
+        task2 = asyncio.ensure_future(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, fetch
+        ))
+        run_coroutine(asyncio.sleep(0))
+        task1.cancel()
+
+        fut.set_result(TEST_IMAGE)
+        self.assertEqual(run_coroutine(task2), TEST_IMAGE)
+
+    def test_exceptions_are_propagated_and_not_cached(self):
+        self.fetch.side_effect = RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            run_coroutine(self.cache.get_image_bytes(
+                TEST_IMAGE_SHA1, self.fetch
+            ))
+
+        self.fetch.side_effect = None
+        res = run_coroutine(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, self.fetch
+        ))
+        self.assertEqual(res, TEST_IMAGE)
+        self.assertEqual(len(self.fetch.mock_calls), 2)
+
+    def test_mismatching_data_is_returned_but_not_cached(self):
+        self.fetch.return_value = b"foo"
+
+        with self.assertLogs("aioxmpp.avatar.service", "WARNING"):
+            res = run_coroutine(self.cache.get_image_bytes(
+                TEST_IMAGE_SHA1, self.fetch
+            ))
+        self.assertEqual(res, b"foo")
+
+        run_coroutine(self.cache.get_image_bytes(
+            TEST_IMAGE_SHA1, self.fetch
+        ))
+        self.assertEqual(len(self.fetch.mock_calls), 2)
+
+    def test_memory_limit_evicts_least_recently_used(self):
+        data1, data2 = b"foo", b"quux"
+        id1 = hashlib.sha1(data1).hexdigest()
+        id2 = hashlib.sha1(data2).hexdigest()
+        self.cache.memory_limit = 7
+
+        for id_, data in [(id1, data1), (id2, data2), (id1, data1)]:
+            run_coroutine(self.cache.get_image_bytes(
+                id_, CoroutineMock(return_value=data)
+            ))
+
+        fetch = CoroutineMock(return_value=b"bazz")
+        run_coroutine(self.cache.get_image_bytes(
+            hashlib.sha1(b"bazz").hexdigest(), fetch
+        ))
+
+        fetch1 = CoroutineMock(return_value=data1)
+        fetch2 = CoroutineMock(return_value=data2)
+        run_coroutine(self.cache.get_image_bytes(id1, fetch1))
+        run_coroutine(self.cache.get_image_bytes(id2, fetch2))
+        self.assertEqual(len(fetch1.mock_calls), 0)
+        self.assertEqual(len(fetch2.mock_calls), 1)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "avatars"
+            run_coroutine(self.cache.load_disk_tier(path))
+            run_coroutine(self.cache.get_image_bytes(
+                TEST_IMAGE_SHA1, self.fetch
+            ))
+
+            self.assertEqual(
+                (path / TEST_IMAGE_SHA1).read_bytes(),
+                TEST_IMAGE,
+            )
+
+            cache = avatar_service.AvatarImageCache()
+            run_coroutine(cache.load_disk_tier(path))
+            fetch = CoroutineMock()
+            res = run_coroutine(cache.get_image_bytes(
+                TEST_IMAGE_SHA1, fetch
+            ))
+
+            self.assertEqual(res, TEST_IMAGE)
+            self.assertSequenceEqual(fetch.mock_calls, [])
+
+    def test_corrupt_disk_file_is_dropped_and_refetched(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir)
+            (path / TEST_IMAGE_SHA1).write_bytes(b"garbage")
+            run_coroutine(self.cache.load_disk_tier(path))
+
+            with self.assertLogs("aioxmpp.avatar.service", "WARNING"):
+                res = run_coroutine(self.cache.get_image_bytes(
+                    TEST_IMAGE_SHA1, self.fetch
+                ))
+
+            self.assertEqual(res, TEST_IMAGE)
+            self.assertSequenceEqual(self.fetch.mock_calls,
+                                     [unittest.mock.call()])
+            self.assertEqual(
+                (path / TEST_IMAGE_SHA1).read_bytes(),
+                TEST_IMAGE,
+            )
+
+    def test_disk_limit_evicts_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir)
+            run_coroutine(self.cache.load_disk_tier(path))
+            run_coroutine(self.cache.get_image_bytes(
+                TEST_IMAGE_SHA1, self.fetch
+            ))
+            self.cache.disk_limit = 0
+            run_coroutine(asyncio.sleep(0.1))
+
+            self.assertFalse((path / TEST_IMAGE_SHA1).exists())
+
+    def test_descriptor_uses_cache(self):
+        vcard = unittest.mock.Mock()
+        vcard.get_vcard = CoroutineMock()
+        vcard.get_vcard.return_value = unittest.mock.Mock()
+        vcard.get_vcard.return_value.get_photo_data.return_value = \
+            TEST_IMAGE
+
+        descriptor1 = avatar_service.VCardAvatarDescriptor(
+            TEST_JID1, TEST_IMAGE_SHA1,
+            vcard=vcard,
+            image_cache=self.cache,
+        )
+        descriptor2 = avatar_service.VCardAvatarDescriptor(
+            TEST_JID2, TEST_IMAGE_SHA1,
+            vcard=vcard,
+            image_cache=self.cache,
+        )
+
+        self.assertEqual(run_coroutine(descriptor1.get_image_bytes()),
+                         TEST_IMAGE)
+        self.assertEqual(run_coroutine(descriptor2.get_image_bytes()),
+                         TEST_IMAGE)
+        self.assertEqual(vcard.get_vcard.call_count, 1)
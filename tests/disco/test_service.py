@@ -21,9 +21,12 @@
 ########################################################################
 import asyncio
 import contextlib
+import io
+import json
 import unittest
 import sys
 
+import aioxmpp.callbacks
 import aioxmpp.service as service
 import aioxmpp.disco.service as disco_service
 import aioxmpp.disco.xso as disco_xso
@@ -1901,6 +1904,613 @@ class TestDiscoClient(unittest.TestCase):
 
         self.assertIs(ctx.exception, exc)
 
+    def test_info_cache_ttl_defaults_to_None(self):
+        self.assertIsNone(self.s.info_cache_ttl)
+        self.assertIsNone(self.s.info_cache_max_stale)
+        self.assertDictEqual(self.s.negative_cache_ttl, {})
+
+    def test_info_cache_ttl_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            self.s.info_cache_ttl = -1
+        with self.assertRaises(ValueError):
+            self.s.info_cache_max_stale = -1
+
+    def test_query_info_expires_after_ttl(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response1, response2 = disco_xso.InfoQuery(), disco_xso.InfoQuery()
+
+        self.s.info_cache_ttl = 10
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+            send_and_decode.return_value = response1
+
+            result = run_coroutine(self.s.query_info(to))
+            self.assertIs(result, response1)
+
+            monotonic.return_value = 109.9
+            result = run_coroutine(self.s.query_info(to))
+            self.assertIs(result, response1)
+            self.assertEqual(len(send_and_decode.mock_calls), 1)
+
+            send_and_decode.return_value = response2
+            monotonic.return_value = 110
+            result = run_coroutine(self.s.query_info(to))
+            self.assertIs(result, response2)
+
+        self.assertSequenceEqual(
+            send_and_decode.mock_calls,
+            [
+                unittest.mock.call(to, None),
+                unittest.mock.call(to, None),
+            ]
+        )
+
+    def test_query_info_set_info_cache_does_not_expire(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response = disco_xso.InfoQuery()
+
+        self.s.info_cache_ttl = 10
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+
+            self.s.set_info_cache(to, None, response)
+
+            monotonic.return_value = 1000
+            result = run_coroutine(self.s.query_info(to))
+
+        self.assertIs(result, response)
+        send_and_decode.assert_not_called()
+
+    def test_query_info_caches_errors_with_negative_ttl(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        exc = errors.XMPPCancelError(
+            condition=errors.ErrorCondition.SERVICE_UNAVAILABLE
+        )
+
+        self.s.negative_cache_ttl[
+            errors.ErrorCondition.SERVICE_UNAVAILABLE
+        ] = 60
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+            send_and_decode.side_effect = exc
+
+            with self.assertRaises(errors.XMPPCancelError) as ctx:
+                run_coroutine(self.s.query_info(to))
+            self.assertIs(ctx.exception, exc)
+
+            monotonic.return_value = 159
+            with self.assertRaises(errors.XMPPCancelError) as ctx:
+                run_coroutine(self.s.query_info(to))
+            self.assertIs(ctx.exception, exc)
+
+            self.assertEqual(len(send_and_decode.mock_calls), 1)
+
+            monotonic.return_value = 160
+            send_and_decode.side_effect = None
+            send_and_decode.return_value = disco_xso.InfoQuery()
+            result = run_coroutine(self.s.query_info(to))
+
+        self.assertIs(result, send_and_decode.return_value)
+        self.assertEqual(len(send_and_decode.mock_calls), 2)
+
+    def test_query_info_does_not_cache_other_error_conditions(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+
+        self.s.negative_cache_ttl[
+            errors.ErrorCondition.SERVICE_UNAVAILABLE
+        ] = 60
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = errors.XMPPCancelError(
+                condition=errors.ErrorCondition.ITEM_NOT_FOUND
+            )
+
+            with self.assertRaises(errors.XMPPCancelError):
+                run_coroutine(self.s.query_info(to))
+
+            send_and_decode.side_effect = ConnectionError()
+
+            with self.assertRaises(ConnectionError):
+                run_coroutine(self.s.query_info(to))
+
+        self.assertEqual(len(send_and_decode.mock_calls), 2)
+
+    def test_query_info_require_fresh_bypasses_negative_cache(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+
+        self.s.negative_cache_ttl[
+            errors.ErrorCondition.SERVICE_UNAVAILABLE
+        ] = 60
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = errors.XMPPCancelError(
+                condition=errors.ErrorCondition.SERVICE_UNAVAILABLE
+            )
+
+            with self.assertRaises(errors.XMPPCancelError):
+                run_coroutine(self.s.query_info(to))
+
+            send_and_decode.side_effect = None
+            send_and_decode.return_value = disco_xso.InfoQuery()
+
+            result = run_coroutine(self.s.query_info(to, require_fresh=True))
+
+        self.assertIs(result, send_and_decode.return_value)
+
+    def test_query_info_serves_stale_while_revalidating(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response1, response2 = disco_xso.InfoQuery(), disco_xso.InfoQuery()
+
+        self.s.info_cache_ttl = 10
+        self.s.info_cache_max_stale = 5
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+            send_and_decode.return_value = response1
+
+            run_coroutine(self.s.query_info(to))
+
+            send_and_decode.return_value = response2
+            monotonic.return_value = 112
+
+            result1 = run_coroutine(self.s.query_info(to))
+            result2 = run_coroutine(self.s.query_info(to))
+            run_coroutine(asyncio.sleep(0))
+            result3 = run_coroutine(self.s.query_info(to))
+
+        self.assertIs(result1, response1)
+        self.assertIn(result2, (response1, response2))
+        self.assertIs(result3, response2)
+        self.assertEqual(len(send_and_decode.mock_calls), 2)
+
+    def test_query_info_does_not_serve_stale_after_max_stale(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response1, response2 = disco_xso.InfoQuery(), disco_xso.InfoQuery()
+
+        self.s.info_cache_ttl = 10
+        self.s.info_cache_max_stale = 5
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+            send_and_decode.return_value = response1
+
+            run_coroutine(self.s.query_info(to))
+
+            send_and_decode.return_value = response2
+            monotonic.return_value = 115
+
+            result = run_coroutine(self.s.query_info(to))
+
+        self.assertIs(result, response2)
+
+    def test_query_info_keeps_stale_on_failed_revalidation(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response = disco_xso.InfoQuery()
+
+        self.s.info_cache_ttl = 10
+        self.s.info_cache_max_stale = 5
+
+        with contextlib.ExitStack() as stack:
+            send_and_decode = stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()))
+            monotonic = stack.enter_context(unittest.mock.patch(
+                "time.monotonic"))
+            monotonic.return_value = 100
+            send_and_decode.return_value = response
+
+            run_coroutine(self.s.query_info(to))
+
+            send_and_decode.side_effect = ConnectionError()
+            monotonic.return_value = 112
+
+            result1 = run_coroutine(self.s.query_info(to))
+            run_coroutine(asyncio.sleep(0))
+            result2 = run_coroutine(self.s.query_info(to))
+
+        self.assertIs(result1, response)
+        self.assertIs(result2, response)
+
+    def test_flush_cache_clears_expiry(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        self.s.info_cache_ttl = 10
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.return_value = disco_xso.InfoQuery()
+            run_coroutine(self.s.query_info(to))
+
+        self.assertTrue(self.s._info_expires)
+        self.s.flush_cache()
+        self.assertFalse(self.s._info_expires)
+
+    def _collect(self, aiter):
+        async def collect():
+            return [item async for item in aiter]
+
+        return run_coroutine(collect())
+
+    def test_query_info_many(self):
+        jids = [
+            structs.JID.fromstr("user{}@foo.example/res".format(i))
+            for i in range(5)
+        ]
+        responses = {jid: disco_xso.InfoQuery() for jid in jids}
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = \
+                lambda jid, node: responses[jid]
+
+            result = self._collect(
+                self.s.query_info_many(jids, node="foo")
+            )
+
+        self.assertCountEqual(
+            result,
+            list(responses.items()),
+        )
+        self.assertCountEqual(
+            send_and_decode.mock_calls,
+            [unittest.mock.call(jid, "foo") for jid in jids]
+        )
+
+    def test_query_info_many_yields_in_completion_order(self):
+        slow = structs.JID.fromstr("slow@foo.example/res")
+        fast = structs.JID.fromstr("fast@foo.example/res")
+
+        async def send_and_decode(jid, node):
+            if jid == slow:
+                await asyncio.sleep(0.05)
+            return jid
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=send_and_decode):
+            result = self._collect(self.s.query_info_many([slow, fast]))
+
+        self.assertSequenceEqual(result, [(fast, fast), (slow, slow)])
+
+    def test_query_info_many_bounds_concurrency(self):
+        jids = [
+            structs.JID.fromstr("user{}@foo.example/res".format(i))
+            for i in range(20)
+        ]
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send_and_decode(jid, node):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(in_flight, max_in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return disco_xso.InfoQuery()
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=send_and_decode):
+            result = self._collect(
+                self.s.query_info_many(jids, max_concurrency=3)
+            )
+
+        self.assertEqual(len(result), len(jids))
+        self.assertEqual(max_in_flight, 3)
+
+    def test_query_info_many_rejects_non_positive_concurrency(self):
+        with self.assertRaises(ValueError):
+            self._collect(self.s.query_info_many([], max_concurrency=0))
+
+    def test_query_info_many_yields_exceptions(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        exc = errors.XMPPCancelError(
+            condition=errors.ErrorCondition.SERVICE_UNAVAILABLE
+        )
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = exc
+
+            result = self._collect(self.s.query_info_many([to]))
+
+        self.assertSequenceEqual(result, [(to, exc)])
+
+    def test_query_info_many_deduplicates_jids(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response = disco_xso.InfoQuery()
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.return_value = response
+
+            result = self._collect(self.s.query_info_many([to, to, to]))
+
+        self.assertSequenceEqual(result, [(to, response)])
+        send_and_decode.assert_called_once_with(to, None)
+
+    def test_query_info_many_queries_once_per_group(self):
+        jids = [
+            structs.JID.fromstr("user{}@foo.example/res".format(i))
+            for i in range(4)
+        ]
+        groups = {
+            jids[0]: "a",
+            jids[1]: "a",
+            jids[2]: "b",
+        }
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = lambda jid, node: jid
+
+            result = self._collect(
+                self.s.query_info_many(jids, group_key=groups.get)
+            )
+
+        self.assertCountEqual(
+            result,
+            [
+                (jids[0], jids[0]),
+                (jids[1], jids[0]),
+                (jids[2], jids[2]),
+                (jids[3], jids[3]),
+            ]
+        )
+        self.assertCountEqual(
+            send_and_decode.mock_calls,
+            [
+                unittest.mock.call(jids[0], None),
+                unittest.mock.call(jids[2], None),
+                unittest.mock.call(jids[3], None),
+            ]
+        )
+
+    def test_query_info_many_falls_back_to_next_group_member(self):
+        jid1 = structs.JID.fromstr("user1@foo.example/res")
+        jid2 = structs.JID.fromstr("user2@foo.example/res")
+        jid3 = structs.JID.fromstr("user3@foo.example/res")
+        exc = errors.XMPPCancelError(
+            condition=errors.ErrorCondition.RECIPIENT_UNAVAILABLE
+        )
+
+        def side_effect(jid, node):
+            if jid == jid1:
+                raise exc
+            return jid
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = side_effect
+
+            result = self._collect(
+                self.s.query_info_many(
+                    [jid1, jid2, jid3],
+                    group_key=lambda jid: "a",
+                )
+            )
+
+        self.assertSequenceEqual(
+            result,
+            [
+                (jid1, exc),
+                (jid2, jid2),
+                (jid3, jid2),
+            ]
+        )
+
+    def test_query_info_many_cancels_in_flight_queries_on_close(self):
+        jids = [
+            structs.JID.fromstr("user{}@foo.example/res".format(i))
+            for i in range(4)
+        ]
+        cancelled = []
+
+        async def send_and_decode(jid, node):
+            if jid != jids[0]:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(jid)
+                    raise
+            return jid
+
+        async def consume():
+            aiter = self.s.query_info_many(jids, max_concurrency=2)
+            async for item in aiter:
+                await aiter.aclose()
+                return item
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=send_and_decode):
+            result = run_coroutine(consume())
+            run_coroutine(asyncio.sleep(0))
+
+        self.assertEqual(result, (jids[0], jids[0]))
+        self.assertSequenceEqual(cancelled, [jids[1]])
+
+    def test_prefetch_info(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        response = disco_xso.InfoQuery()
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.return_value = response
+
+            task = self.s.prefetch_info(to, node="foo")
+            run_coroutine(task)
+
+            result = run_coroutine(self.s.query_info(to, node="foo"))
+
+        self.assertIs(result, response)
+        send_and_decode.assert_called_once_with(to, "foo")
+
+    def test_prefetch_info_on_presence_stays_connected(self):
+        jid1 = structs.JID.fromstr("user@foo.example/res1")
+        jid2 = structs.JID.fromstr("user@foo.example/res2")
+        signal = aioxmpp.callbacks.AdHocSignal()
+
+        with unittest.mock.patch.object(self.s, "prefetch_info") as prefetch:
+            prefetch.return_value = unittest.mock.sentinel.task
+            signal.connect(self.s.prefetch_info_on_presence)
+            signal(jid1, unittest.mock.sentinel.stanza1)
+            signal(jid2, unittest.mock.sentinel.stanza2)
+
+        self.assertSequenceEqual(
+            prefetch.mock_calls,
+            [
+                unittest.mock.call(jid1),
+                unittest.mock.call(jid2),
+            ]
+        )
+
+    def test_prefetch_info_swallows_errors(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.side_effect = errors.XMPPCancelError(
+                condition=errors.ErrorCondition.SERVICE_UNAVAILABLE
+            )
+
+            self.assertIsNone(run_coroutine(self.s.prefetch_info(to)))
+
+    def test_dump_and_load_info_cache(self):
+        to1 = structs.JID.fromstr("user@foo.example/res1")
+        to2 = structs.JID.fromstr("user@foo.example/res2")
+
+        info1 = disco_xso.InfoQuery(features={"urn:example:a"})
+        info1.identities.append(disco_xso.Identity(category="client",
+                                                   type_="pc"))
+        info2 = disco_xso.InfoQuery(node="foo",
+                                    features={"urn:example:b"})
+
+        self.s.info_cache_ttl = 10
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.return_value = info1
+            run_coroutine(self.s.query_info(to1))
+
+            send_and_decode.side_effect = errors.XMPPCancelError(
+                condition=errors.ErrorCondition.SERVICE_UNAVAILABLE
+            )
+            with self.assertRaises(errors.XMPPCancelError):
+                run_coroutine(self.s.query_info(to2))
+
+        self.s.set_info_cache(to2, "foo", info2)
+
+        f = io.StringIO()
+        self.s.dump_info_cache(f)
+
+        s2 = disco_service.DiscoClient(self.cc)
+        f.seek(0)
+        s2.load_info_cache(f)
+
+        with unittest.mock.patch.object(
+                s2,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            result1 = run_coroutine(s2.query_info(to1))
+            result2 = run_coroutine(s2.query_info(to2, node="foo"))
+
+        send_and_decode.assert_not_called()
+
+        self.assertSetEqual(result1.features, {"urn:example:a"})
+        self.assertEqual(result1.identities[0].category, "client")
+        self.assertEqual(result2.node, "foo")
+        self.assertSetEqual(result2.features, {"urn:example:b"})
+        self.assertIn((to1, None), s2._info_expires)
+        self.assertNotIn((to2, "foo"), s2._info_expires)
+
+    def test_load_info_cache_skips_expired_entries(self):
+        to = structs.JID.fromstr("user@foo.example/res1")
+        self.s.info_cache_ttl = 10
+
+        with unittest.mock.patch.object(
+                self.s,
+                "send_and_decode_info_query",
+                new=CoroutineMock()) as send_and_decode:
+            send_and_decode.return_value = disco_xso.InfoQuery()
+            run_coroutine(self.s.query_info(to))
+
+        f = io.StringIO()
+        self.s.dump_info_cache(f)
+        f.seek(0)
+
+        s2 = disco_service.DiscoClient(self.cc)
+        with unittest.mock.patch("time.time") as time_:
+            time_.return_value = 2**40
+            s2.load_info_cache(f)
+
+        self.assertEqual(len(s2._info_pending), 0)
+
+    def test_load_info_cache_rejects_unknown_version(self):
+        f = io.StringIO(json.dumps({"version": 2, "entries": []}))
+        with self.assertRaises(ValueError):
+            self.s.load_info_cache(f)
+
 
 class Testmount_as_node(unittest.TestCase):
     def setUp(self):
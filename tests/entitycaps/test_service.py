@@ -488,6 +488,132 @@ class TestCache(unittest.TestCase):
 
             self.assertTrue((p / key.path).is_file())
 
+    def test_load_user_db_file_creates_file(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            p = pathlib.Path(tempdir) / "sub" / "caps.sqlite"
+            run_coroutine(self.c.load_user_db_file(p))
+            self.assertTrue(p.is_file())
+
+        with self.assertRaises(KeyError):
+            self.c.lookup_in_database(unittest.mock.Mock())
+
+    def test_load_user_db_file_runs_in_executor(self):
+        with contextlib.ExitStack() as stack:
+            run_in_executor = stack.enter_context(unittest.mock.patch.object(
+                asyncio.get_event_loop(),
+                "run_in_executor",
+                new=CoroutineMock(),
+            ))
+            run_in_executor.return_value = {}
+
+            run_coroutine(self.c.load_user_db_file(
+                unittest.mock.sentinel.path
+            ))
+
+        run_in_executor.assert_called_once_with(
+            None,
+            entitycaps_service.load_db_file,
+            unittest.mock.sentinel.path,
+        )
+
+    def test_add_cache_entry_batches_writes_to_db_file(self):
+        q1 = aioxmpp.xml.read_single_xso(
+            io.BytesIO(aioxmpp.xml.serialize_single_xso(
+                TEST_DB_ENTRY
+            ).encode("utf-8")),
+            disco.xso.InfoQuery,
+        )
+        q2 = disco.xso.InfoQuery()
+        q2.captured_events = [
+            ("start", q2.TAG[0], q2.TAG[1], {}),
+            ("end",)
+        ]
+        key1 = unittest.mock.Mock()
+        key1.path = pathlib.Path("key") / "1"
+        key2 = unittest.mock.Mock()
+        key2.path = pathlib.Path("key") / "2"
+
+        with contextlib.ExitStack() as stack:
+            tempdir = stack.enter_context(tempfile.TemporaryDirectory())
+            p = pathlib.Path(tempdir) / "caps.sqlite"
+            run_coroutine(self.c.load_user_db_file(p))
+
+            write_db_entries = stack.enter_context(unittest.mock.patch(
+                "aioxmpp.entitycaps.service.write_db_entries",
+                wraps=entitycaps_service.write_db_entries,
+            ))
+
+            self.c.add_cache_entry(key1, q1)
+            self.c.add_cache_entry(key2, q2)
+
+            run_coroutine(self.c.flush())
+
+            write_db_entries.assert_called_once_with(
+                p,
+                [
+                    (str(key1.path), q1.captured_events),
+                    (str(key2.path), q2.captured_events),
+                ]
+            )
+
+            c2 = entitycaps_service.Cache()
+            run_coroutine(c2.load_user_db_file(p))
+
+        result1 = c2.lookup_in_database(key1)
+        self.assertIsInstance(result1, disco.xso.InfoQuery)
+        self.assertEqual(result1.identities[0].name, "Tkabber")
+        self.assertSetEqual(result1.features, TEST_DB_ENTRY.features)
+
+        result2 = c2.lookup_in_database(key2)
+        self.assertIsInstance(result2, disco.xso.InfoQuery)
+        self.assertFalse(result2.features)
+
+    def test_db_file_lookups_share_parsed_entry(self):
+        key = unittest.mock.Mock()
+        key.path = pathlib.Path("key")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            p = pathlib.Path(tempdir) / "caps.sqlite"
+            entitycaps_service.write_db_entries(
+                p,
+                [(str(key.path), TEST_DB_ENTRY.captured_events)],
+            )
+
+            run_coroutine(self.c.load_user_db_file(p))
+
+        with unittest.mock.patch(
+                "aioxmpp.xml.read_single_xso",
+                wraps=aioxmpp.xml.read_single_xso) as read_single_xso:
+            result1 = self.c.lookup_in_database(key)
+            result2 = self.c.lookup_in_database(key)
+
+        self.assertIs(result1, result2)
+        self.assertEqual(len(read_single_xso.mock_calls), 1)
+
+    def test_db_file_is_used_before_directories(self):
+        key = unittest.mock.Mock()
+        key.path = pathlib.Path("key")
+        base = unittest.mock.Mock()
+        base.p = unittest.mock.MagicMock()
+        self.c.set_system_db_path(base.p)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            p = pathlib.Path(tempdir) / "caps.sqlite"
+            entitycaps_service.write_db_entries(
+                p,
+                [(str(key.path), TEST_DB_ENTRY.captured_events)],
+            )
+
+            run_coroutine(self.c.load_user_db_file(p))
+
+        result = self.c.lookup_in_database(key)
+
+        self.assertIsInstance(result, disco.xso.InfoQuery)
+        self.assertFalse(base.p.mock_calls)
+
+    def test_flush_without_pending_writes_returns(self):
+        run_coroutine(self.c.flush())
+
 
 class TestService(unittest.TestCase):
     def setUp(self):
@@ -764,6 +890,137 @@ class TestService(unittest.TestCase):
 
         self.assertEqual(result, presence)
 
+    def test_query_info_many_groups_by_announced_key(self):
+        presence1 = unittest.mock.Mock(spec=aioxmpp.Presence)
+        presence2 = unittest.mock.Mock(spec=aioxmpp.Presence)
+
+        self.impl390.extract_keys.side_effect = [
+            iter([unittest.mock.sentinel.key1, unittest.mock.sentinel.key2]),
+            iter([unittest.mock.sentinel.key3]),
+        ]
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(
+                unittest.mock.patch("aioxmpp.utils.LazyTask")
+            )
+
+            self.s.handle_inbound_presence(presence1)
+            self.s.handle_inbound_presence(presence2)
+
+        result = self.s.query_info_many(
+            [presence1.from_, presence2.from_],
+            max_concurrency=2,
+        )
+
+        self.disco_client.query_info_many.assert_called_once_with(
+            [presence1.from_, presence2.from_],
+            group_key=unittest.mock.ANY,
+            max_concurrency=2,
+        )
+        self.assertEqual(result, self.disco_client.query_info_many())
+
+        _, _, kwargs = self.disco_client.query_info_many.mock_calls[0]
+        group_key = kwargs["group_key"]
+        self.assertEqual(group_key(presence1.from_),
+                         unittest.mock.sentinel.key1)
+        self.assertEqual(group_key(presence2.from_),
+                         unittest.mock.sentinel.key3)
+        self.assertIsNone(group_key(TEST_FROM))
+
+    def test_unavailable_presence_forgets_announced_key(self):
+        presence = aioxmpp.Presence(
+            type_=structs.PresenceType.AVAILABLE,
+            from_=TEST_FROM,
+        )
+
+        self.impl390.extract_keys.return_value = iter([
+            unittest.mock.sentinel.key1,
+        ])
+
+        with unittest.mock.patch("aioxmpp.utils.LazyTask"):
+            self.s.handle_inbound_presence(presence)
+
+        unavailable = aioxmpp.Presence(
+            type_=structs.PresenceType.UNAVAILABLE,
+            from_=TEST_FROM,
+        )
+        self.assertIs(self.s.handle_inbound_presence(unavailable),
+                      unavailable)
+
+        self.s.query_info_many([TEST_FROM])
+        _, _, kwargs = self.disco_client.query_info_many.mock_calls[0]
+        self.assertIsNone(kwargs["group_key"](TEST_FROM))
+
+    def test_available_presence_without_caps_forgets_announced_key(self):
+        presence = aioxmpp.Presence(
+            type_=structs.PresenceType.AVAILABLE,
+            from_=TEST_FROM,
+        )
+
+        self.impl390.extract_keys.return_value = iter([
+            unittest.mock.sentinel.key1,
+        ])
+
+        with unittest.mock.patch("aioxmpp.utils.LazyTask"):
+            self.s.handle_inbound_presence(presence)
+
+        self.impl390.extract_keys.return_value = iter([])
+        self.impl115.extract_keys.return_value = iter([])
+        presence = aioxmpp.Presence(
+            type_=structs.PresenceType.AVAILABLE,
+            from_=TEST_FROM,
+        )
+        self.assertIs(self.s.handle_inbound_presence(presence), presence)
+
+        self.s.query_info_many([TEST_FROM])
+        _, _, kwargs = self.disco_client.query_info_many.mock_calls[0]
+        self.assertIsNone(kwargs["group_key"](TEST_FROM))
+
+    def test_query_info_many_does_not_group_for_non_root_node(self):
+        presence = aioxmpp.Presence(
+            type_=structs.PresenceType.AVAILABLE,
+            from_=TEST_FROM,
+        )
+
+        self.impl390.extract_keys.return_value = iter([
+            unittest.mock.sentinel.key1,
+        ])
+
+        with unittest.mock.patch("aioxmpp.utils.LazyTask"):
+            self.s.handle_inbound_presence(presence)
+
+        self.s.query_info_many([TEST_FROM], node="foo")
+        self.disco_client.query_info_many.assert_called_once_with(
+            [TEST_FROM],
+            group_key=None,
+            node="foo",
+        )
+
+        self.disco_client.query_info_many.reset_mock()
+        self.s.query_info_many([TEST_FROM], node=None)
+        _, _, kwargs = self.disco_client.query_info_many.mock_calls[0]
+        self.assertEqual(kwargs["group_key"](TEST_FROM),
+                         unittest.mock.sentinel.key1)
+
+    def test_stream_destroyed_forgets_announced_keys(self):
+        presence = aioxmpp.Presence(
+            type_=structs.PresenceType.AVAILABLE,
+            from_=TEST_FROM,
+        )
+
+        self.impl390.extract_keys.return_value = iter([
+            unittest.mock.sentinel.key1,
+        ])
+
+        with unittest.mock.patch("aioxmpp.utils.LazyTask"):
+            self.s.handle_inbound_presence(presence)
+
+        self.cc.on_stream_destroyed()
+
+        self.s.query_info_many([TEST_FROM])
+        _, _, kwargs = self.disco_client.query_info_many.mock_calls[0]
+        self.assertIsNone(kwargs["group_key"](TEST_FROM))
+
     def test_handle_inbound_presence_ignores_115_if_disabled(self):
         self.s.xep115_support = False
 
@@ -1824,6 +2081,169 @@ class TestService(unittest.TestCase):
             self.s.update_hash
         )
 
+    def test__info_changed_coalesces_updates(self):
+        with contextlib.ExitStack() as stack:
+            get_event_loop = stack.enter_context(unittest.mock.patch(
+                "asyncio.get_event_loop"
+            ))
+
+            self.s._info_changed()
+            self.s._info_changed()
+            self.s._info_changed()
+
+        get_event_loop().call_soon.assert_called_once_with(
+            self.s.update_hash
+        )
+
+    def test__info_changed_reschedules_after_update_hash(self):
+        with contextlib.ExitStack() as stack:
+            get_event_loop = stack.enter_context(unittest.mock.patch(
+                "asyncio.get_event_loop"
+            ))
+            stack.enter_context(unittest.mock.patch.object(
+                disco.StaticNode,
+                "clone",
+            ))
+            stack.enter_context(unittest.mock.patch.object(
+                self.s,
+                "_push_hashset",
+            ))
+
+            self.s._info_changed()
+            self.s.update_hash()
+            self.s._info_changed()
+
+        self.assertEqual(
+            get_event_loop().call_soon.mock_calls,
+            [
+                unittest.mock.call(self.s.update_hash),
+                unittest.mock.call().cancel(),
+                unittest.mock.call(self.s.update_hash),
+            ]
+        )
+
+    def test_update_hash_delay_defaults_to_None(self):
+        self.assertIsNone(self.s.update_hash_delay)
+
+    def test_update_hash_delay_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            self.s.update_hash_delay = -1
+
+    def test__info_changed_debounces_with_update_hash_delay(self):
+        self.s.update_hash_delay = 0.5
+
+        with contextlib.ExitStack() as stack:
+            get_event_loop = stack.enter_context(unittest.mock.patch(
+                "asyncio.get_event_loop"
+            ))
+            handle1 = unittest.mock.Mock()
+            handle2 = unittest.mock.Mock()
+            get_event_loop().call_later.side_effect = [handle1, handle2]
+
+            self.s._info_changed()
+            handle1.cancel.assert_not_called()
+            self.s._info_changed()
+
+        handle1.cancel.assert_called_once_with()
+        handle2.cancel.assert_not_called()
+        get_event_loop().call_soon.assert_not_called()
+        self.assertEqual(
+            get_event_loop().call_later.mock_calls,
+            [
+                unittest.mock.call(0.5, self.s.update_hash),
+                unittest.mock.call(0.5, self.s.update_hash),
+            ]
+        )
+
+    def test_update_hash_memoises_hashset(self):
+        base = unittest.mock.Mock()
+
+        self.impl115.calculate_keys.return_value = iter([
+            base.key1,
+        ])
+
+        self.impl390.calculate_keys.return_value = iter([
+            base.key2,
+        ])
+
+        with contextlib.ExitStack() as stack:
+            clone = stack.enter_context(
+                unittest.mock.patch.object(
+                    disco.StaticNode,
+                    "clone",
+                )
+            )
+            clone().iter_features.side_effect = lambda: iter(["a", "b"])
+            clone().iter_identities.side_effect = lambda: iter([
+                ("client", "pc", None, None),
+            ])
+            clone.reset_mock()
+
+            push_hashset = stack.enter_context(
+                unittest.mock.patch.object(
+                    self.s,
+                    "_push_hashset",
+                )
+            )
+            push_hashset.side_effect = [True, False]
+
+            with self.s.on_ver_changed.context_connect(base.cb):
+                self.s.update_hash()
+                self.s.update_hash()
+
+        clone().as_info_xso.assert_called_once_with()
+        info = clone().as_info_xso()
+
+        self.impl115.calculate_keys.assert_called_once_with(info)
+        self.impl390.calculate_keys.assert_called_once_with(info)
+
+        self.assertEqual(
+            push_hashset.mock_calls,
+            [
+                unittest.mock.call(
+                    clone(),
+                    {
+                        self.impl115: {base.key1},
+                        self.impl390: {base.key2},
+                    }
+                )
+            ] * 2
+        )
+
+        base.cb.assert_called_once_with()
+
+    def test_update_hash_memo_is_keyed_by_features_and_identities(self):
+        features = ["a"]
+
+        self.impl390.calculate_keys.side_effect = lambda info: iter([
+            unittest.mock.Mock()
+        ])
+
+        with contextlib.ExitStack() as stack:
+            clone = stack.enter_context(
+                unittest.mock.patch.object(
+                    disco.StaticNode,
+                    "clone",
+                )
+            )
+            clone().iter_features.side_effect = lambda: iter(features)
+            clone().iter_identities.side_effect = lambda: iter([])
+
+            stack.enter_context(
+                unittest.mock.patch.object(
+                    self.s,
+                    "_push_hashset",
+                )
+            )
+
+            self.s.update_hash()
+            features.append("b")
+            self.s.update_hash()
+            features.remove("b")
+            self.s.update_hash()
+
+        self.assertEqual(len(self.impl390.calculate_keys.mock_calls), 2)
+
     def test_handle_outbound_presence_inserts_keys(self):
         base = unittest.mock.Mock()
         self.impl115.calculate_keys.return_value = iter([
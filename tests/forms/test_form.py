@@ -386,6 +386,73 @@ class TestFormClass(unittest.TestCase):
             form.DescriptorClass,
         ))
 
+    def test_template_indexes_fields_by_var(self):
+        class F(form.Form):
+            FORM_TYPE = "foo"
+
+            jid = fields.JIDSingle(var="jid")
+            text = fields.TextPrivate(var="text")
+
+        template = F._get_template()
+        self.assertCountEqual(template.fields, ["jid", "text"])
+
+        descriptor, allowed_types = template.fields["jid"]
+        self.assertIs(descriptor, F.jid)
+        self.assertSetEqual(
+            allowed_types,
+            {forms_xso.FieldType.JID_SINGLE},
+        )
+
+        descriptor, allowed_types = template.fields["text"]
+        self.assertIs(descriptor, F.text)
+        self.assertSetEqual(
+            allowed_types,
+            {forms_xso.FieldType.TEXT_SINGLE,
+             forms_xso.FieldType.TEXT_PRIVATE},
+        )
+
+    def test_template_is_cached_per_class(self):
+        class F(form.Form):
+            jid = fields.JIDSingle(var="jid")
+
+        class G(F):
+            text = fields.TextSingle(var="text")
+
+        self.assertIs(F._get_template(), F._get_template())
+        self.assertIsNot(F._get_template(), G._get_template())
+        self.assertCountEqual(F._get_template().fields, ["jid"])
+        self.assertCountEqual(G._get_template().fields, ["jid", "text"])
+
+    def test_template_invalidated_by_new_descriptor(self):
+        class F(form.Form):
+            jid = fields.JIDSingle(var="jid")
+
+        old_template = F._get_template()
+        F.text = fields.TextSingle(var="text")
+
+        template = F._get_template()
+        self.assertIsNot(template, old_template)
+        self.assertCountEqual(template.fields, ["jid", "text"])
+
+    def test_template_kept_on_non_descriptor_attribute(self):
+        class F(form.Form):
+            jid = fields.JIDSingle(var="jid")
+
+        template = F._get_template()
+        F.FORM_TYPE = "foo"
+        self.assertIs(F._get_template(), template)
+
+    def test_template_invalidated_by_register_descriptor_keys(self):
+        class F(form.Form):
+            jid = fields.JIDSingle(var="jid")
+
+        old_template = F._get_template()
+        F._register_descriptor_keys(F.jid, [(fields.descriptor_ns, "alias")])
+
+        template = F._get_template()
+        self.assertIsNot(template, old_template)
+        self.assertIs(template.fields["alias"][0], F.jid)
+
 
 class TestForm(unittest.TestCase):
     def test_init(self):
@@ -933,3 +933,85 @@ class TestData(unittest.TestCase):
         self.assertIsNone(
             d.get_form_type(),
         )
+
+    def _make_table(self):
+        d = forms_xso.Data(type_=forms_xso.DataType.RESULT)
+        d.reported = forms_xso.Reported()
+        d.reported.fields.extend([
+            forms_xso.Field(var="jid", type_=forms_xso.FieldType.JID_SINGLE),
+            forms_xso.Field(var="groups",
+                            type_=forms_xso.FieldType.LIST_MULTI),
+            forms_xso.Field(var="name"),
+        ])
+
+        item = forms_xso.Item()
+        item.fields.extend([
+            forms_xso.Field(var="jid", values=["a@b.c"]),
+            forms_xso.Field(var="groups", values=["x", "y"]),
+            forms_xso.Field(var="name", values=["A"]),
+        ])
+        d.items.append(item)
+
+        item = forms_xso.Item()
+        item.fields.extend([
+            forms_xso.Field(var="name"),
+            forms_xso.Field(var="jid", values=["d@e.f"]),
+        ])
+        d.items.append(item)
+
+        return d
+
+    def test_get_report_columns(self):
+        d = self._make_table()
+        self.assertEqual(
+            d.get_report_columns(),
+            ("jid", "groups", "name"),
+        )
+
+    def test_get_report_columns_rejects_missing_header(self):
+        d = forms_xso.Data(type_=forms_xso.DataType.RESULT)
+        with self.assertRaisesRegex(ValueError, "no report header"):
+            d.get_report_columns()
+
+    def test_iter_rows(self):
+        d = self._make_table()
+        self.assertSequenceEqual(
+            list(d.iter_rows()),
+            [
+                ("a@b.c", ("x", "y"), "A"),
+                ("d@e.f", (), None),
+            ]
+        )
+
+    def test_iter_rows_with_columns(self):
+        d = self._make_table()
+        self.assertSequenceEqual(
+            list(d.iter_rows(["name", "jid", "missing"])),
+            [
+                ("A", "a@b.c", None),
+                (None, "d@e.f", None),
+            ]
+        )
+
+    def test_iter_rows_is_lazy(self):
+        d = self._make_table()
+        rows = d.iter_rows()
+        self.assertEqual(next(rows), ("a@b.c", ("x", "y"), "A"))
+        d.items[1].fields[1].values[:] = ["g@h.i"]
+        self.assertEqual(next(rows), ("g@h.i", (), None))
+
+    def test_iter_rows_rejects_missing_header_without_columns(self):
+        d = forms_xso.Data(type_=forms_xso.DataType.RESULT)
+        with self.assertRaisesRegex(ValueError, "no report header"):
+            next(d.iter_rows())
+
+    def test_iter_rows_without_header(self):
+        d = self._make_table()
+        d.reported = None
+        self.assertSequenceEqual(
+            list(d.iter_rows(["groups"])),
+            [
+                ("x",),
+                (None,),
+            ]
+        )
@@ -0,0 +1,441 @@
+########################################################################
+# File name: test_service.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import aioxmpp
+import aioxmpp.disco
+import aioxmpp.forms
+import aioxmpp.service
+
+import aioxmpp.httpupload as httpupload
+import aioxmpp.httpupload.service as httpupload_service
+import aioxmpp.httpupload.xso as httpupload_xso
+
+from aioxmpp.utils import namespaces
+
+from aioxmpp.testutils import (
+    make_connected_client,
+    run_coroutine,
+    CoroutineMock,
+)
+
+
+TEST_JID = aioxmpp.JID.fromstr("romeo@montague.example/balcony")
+TEST_DOMAIN = aioxmpp.JID.fromstr("montague.example")
+TEST_SERVICE = aioxmpp.JID.fromstr("upload.montague.example")
+
+
+def make_info(features, max_file_size=None):
+    info = aioxmpp.disco.xso.InfoQuery(features=features)
+    if max_file_size is not None:
+        form = aioxmpp.forms.Data(aioxmpp.forms.DataType.RESULT)
+        form.fields.append(aioxmpp.forms.Field(
+            type_=aioxmpp.forms.FieldType.HIDDEN,
+            var="FORM_TYPE",
+            values=[namespaces.xep0363_http_upload],
+        ))
+        form.fields.append(aioxmpp.forms.Field(
+            var="max-file-size",
+            values=[str(max_file_size)],
+        ))
+        info.exts.append(form)
+    return info
+
+
+def make_slot(put_url="https://up.example/put",
+              get_url="https://up.example/get"):
+    slot = httpupload_xso.Slot()
+    slot.put = httpupload_xso.Put()
+    slot.get = httpupload_xso.Get()
+    slot.put.url = put_url
+    slot.put.headers["Authorization"] = "Basic Zm9vOmJhcg=="
+    slot.get.url = get_url
+    return slot
+
+
+class TestHTTPUploadClient(unittest.TestCase):
+    def setUp(self):
+        self.cc = make_connected_client()
+        self.cc.local_jid = TEST_JID
+        self.disco = unittest.mock.Mock()
+        self.disco.query_items = CoroutineMock()
+        self.disco.query_items.return_value = \
+            aioxmpp.disco.xso.ItemsQuery(items=[
+                aioxmpp.disco.xso.Item(TEST_SERVICE),
+                aioxmpp.disco.xso.Item(
+                    aioxmpp.JID.fromstr("conference.montague.example")
+                ),
+            ])
+        self.infos = {
+            TEST_DOMAIN: make_info(["urn:xmpp:ping"]),
+            TEST_SERVICE: make_info([namespaces.xep0363_http_upload],
+                                    max_file_size=1024),
+            aioxmpp.JID.fromstr("conference.montague.example"):
+            aioxmpp.errors.XMPPCancelError(
+                aioxmpp.ErrorCondition.ITEM_NOT_FOUND
+            ),
+        }
+        self.query_info_many_calls = []
+
+        async def query_info_many(jids, **kwargs):
+            jids = list(jids)
+            self.query_info_many_calls.append(jids)
+            for jid in jids:
+                yield jid, self.infos[jid]
+
+        self.disco.query_info_many = query_info_many
+
+        self.cc.send.side_effect = lambda *args, **kwargs: make_slot()
+
+        self.s = httpupload_service.HTTPUploadClient(
+            self.cc,
+            dependencies={
+                aioxmpp.DiscoClient: self.disco,
+            }
+        )
+
+    def tearDown(self):
+        run_coroutine(self.s._shutdown())
+        del self.s
+        del self.cc
+
+    def test_is_service(self):
+        self.assertTrue(issubclass(
+            httpupload_service.HTTPUploadClient,
+            aioxmpp.service.Service,
+        ))
+
+    def test_orders_after_disco(self):
+        self.assertIn(
+            aioxmpp.DiscoClient,
+            httpupload_service.HTTPUploadClient.ORDER_AFTER,
+        )
+
+    def test_is_exported(self):
+        self.assertIs(
+            httpupload.HTTPUploadClient,
+            httpupload_service.HTTPUploadClient,
+        )
+        self.assertIs(
+            aioxmpp.HTTPUploadClient,
+            httpupload_service.HTTPUploadClient,
+        )
+
+    def test_get_upload_service_discovers_service(self):
+        result = run_coroutine(self.s.get_upload_service())
+
+        self.assertEqual(result, (TEST_SERVICE, 1024))
+        self.disco.query_items.assert_called_once_with(TEST_DOMAIN)
+        self.assertEqual(
+            self.query_info_many_calls,
+            [[TEST_DOMAIN, TEST_SERVICE,
+              aioxmpp.JID.fromstr("conference.montague.example")]],
+        )
+
+    def test_get_upload_service_without_max_file_size(self):
+        self.infos[TEST_SERVICE] = make_info(
+            [namespaces.xep0363_http_upload]
+        )
+        self.assertEqual(
+            run_coroutine(self.s.get_upload_service()),
+            (TEST_SERVICE, None),
+        )
+
+    def test_get_upload_service_prefers_server_domain(self):
+        self.infos[TEST_DOMAIN] = make_info(
+            [namespaces.xep0363_http_upload],
+            max_file_size=10,
+        )
+        self.assertEqual(
+            run_coroutine(self.s.get_upload_service()),
+            (TEST_DOMAIN, 10),
+        )
+
+    def test_get_upload_service_caches_result(self):
+        async def test():
+            return await asyncio.gather(
+                self.s.get_upload_service(),
+                self.s.get_upload_service(),
+            )
+
+        r1, r2 = run_coroutine(test())
+        r3 = run_coroutine(self.s.get_upload_service())
+        self.assertEqual(r1, r2)
+        self.assertEqual(r1, r3)
+        self.assertEqual(self.disco.query_items.call_count, 1)
+        self.assertEqual(len(self.query_info_many_calls), 1)
+
+    def test_get_upload_service_raises_if_not_found(self):
+        del self.infos[TEST_SERVICE]
+        self.disco.query_items.return_value = aioxmpp.disco.xso.ItemsQuery()
+
+        with self.assertRaisesRegex(RuntimeError, "no HTTP upload service"):
+            run_coroutine(self.s.get_upload_service())
+
+    def test_get_upload_service_does_not_cache_failure(self):
+        self.disco.query_items.side_effect = \
+            aioxmpp.errors.XMPPWaitError(
+                aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT
+            )
+
+        with self.assertRaises(aioxmpp.errors.XMPPWaitError):
+            run_coroutine(self.s.get_upload_service())
+
+        self.disco.query_items.side_effect = None
+        self.assertEqual(
+            run_coroutine(self.s.get_upload_service()),
+            (TEST_SERVICE, 1024),
+        )
+
+    def test_stream_destroyed_clears_cache(self):
+        run_coroutine(self.s.get_upload_service())
+        self.s._stream_destroyed()
+        run_coroutine(self.s.get_upload_service())
+        self.assertEqual(self.disco.query_items.call_count, 2)
+
+    def test_stream_destroyed_is_depsignal(self):
+        self.assertTrue(aioxmpp.service.is_depsignal_handler(
+            aioxmpp.Client,
+            "on_stream_destroyed",
+            httpupload_service.HTTPUploadClient._stream_destroyed,
+        ))
+
+    def test_request_slot(self):
+        slot = run_coroutine(self.s.request_slot("foo.txt", 10, "text/plain"))
+
+        self.assertIsInstance(slot, httpupload_xso.Slot)
+        self.cc.send.assert_called_once_with(unittest.mock.ANY)
+        _, (iq, ), _ = self.cc.send.mock_calls[-1]
+        self.assertEqual(iq.to, TEST_SERVICE)
+        self.assertEqual(iq.type_, aioxmpp.IQType.GET)
+        self.assertEqual(iq.payload.filename, "foo.txt")
+        self.assertEqual(iq.payload.size, 10)
+        self.assertEqual(iq.payload.content_type, "text/plain")
+
+    def test_request_slot_rejects_too_large_files(self):
+        with self.assertRaisesRegex(ValueError, "too large"):
+            run_coroutine(self.s.request_slot("foo.txt", 1025, "text/plain"))
+        self.cc.send.assert_not_called()
+
+    def test_request_slot_uses_prefetched_slot(self):
+        self.s.prefetch_slot("foo.txt", 10, "text/plain")
+        run_coroutine(asyncio.sleep(0.01))
+        self.assertEqual(self.cc.send.call_count, 1)
+
+        slot = run_coroutine(self.s.request_slot("foo.txt", 10, "text/plain"))
+        self.assertIsInstance(slot, httpupload_xso.Slot)
+        self.assertEqual(self.cc.send.call_count, 1)
+
+        # a prefetched slot is only used once
+        run_coroutine(self.s.request_slot("foo.txt", 10, "text/plain"))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_prefetch_slot_deduplicates(self):
+        self.s.prefetch_slot("foo.txt", 10, "text/plain")
+        self.s.prefetch_slot("foo.txt", 10, "text/plain")
+        run_coroutine(asyncio.sleep(0.01))
+        self.assertEqual(self.cc.send.call_count, 1)
+
+    def test_request_slot_ignores_different_prefetched_slot(self):
+        self.s.prefetch_slot("foo.txt", 10, "text/plain")
+        run_coroutine(asyncio.sleep(0.01))
+        run_coroutine(self.s.request_slot("foo.txt", 11, "text/plain"))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_request_slot_ignores_expired_prefetched_slot(self):
+        with unittest.mock.patch(
+                "aioxmpp.httpupload.service.time") as time_:
+            monotonic = time_.monotonic
+            monotonic.return_value = 100
+            self.s.prefetch_slot("foo.txt", 10, "text/plain")
+            run_coroutine(asyncio.sleep(0.01))
+            self.assertEqual(self.cc.send.call_count, 1)
+
+            monotonic.return_value = 160
+            run_coroutine(self.s.request_slot("foo.txt", 10, "text/plain"))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_request_slot_retries_failed_prefetch(self):
+        self.cc.send.side_effect = aioxmpp.errors.XMPPWaitError(
+            aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT
+        )
+        self.s.prefetch_slot("foo.txt", 10, "text/plain")
+        run_coroutine(asyncio.sleep(0.01))
+
+        self.cc.send.side_effect = lambda *args, **kwargs: make_slot()
+        slot = run_coroutine(self.s.request_slot("foo.txt", 10, "text/plain"))
+        self.assertIsInstance(slot, httpupload_xso.Slot)
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_prefetch_slot_evicts_oldest(self):
+        self.s.max_prefetched_slots = 2
+        for i in range(3):
+            self.s.prefetch_slot("{}.txt".format(i), 10, "text/plain")
+        run_coroutine(asyncio.sleep(0.01))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+        run_coroutine(self.s.request_slot("0.txt", 10, "text/plain"))
+        self.assertEqual(self.cc.send.call_count, 3)
+        run_coroutine(self.s.request_slot("2.txt", 10, "text/plain"))
+        self.assertEqual(self.cc.send.call_count, 3)
+
+    def test_slot_pool_settings_validate(self):
+        self.assertEqual(self.s.slot_lifetime, 60)
+        self.assertEqual(self.s.max_prefetched_slots, 8)
+        with self.assertRaises(ValueError):
+            self.s.slot_lifetime = -1
+        with self.assertRaises(ValueError):
+            self.s.max_prefetched_slots = -1
+
+    @contextlib.contextmanager
+    def _tempfile(self, data):
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            yield path
+        finally:
+            os.unlink(path)
+
+    def _make_put(self):
+        bodies = []
+
+        async def put(url, headers, body):
+            chunks = []
+            async for chunk in body:
+                chunks.append(chunk)
+            bodies.append(b"".join(chunks))
+
+        return unittest.mock.Mock(side_effect=put), bodies
+
+    def test_upload(self):
+        put, bodies = self._make_put()
+        data = b"x" * 100
+
+        with self._tempfile(data) as path:
+            url, hashes = run_coroutine(self.s.upload(
+                path, put,
+                content_type="text/plain",
+                hash_algos=["sha-256"],
+            ))
+
+            _, (iq, ), _ = self.cc.send.mock_calls[-1]
+            self.assertEqual(iq.payload.filename, os.path.basename(path))
+
+        self.assertEqual(url, "https://up.example/get")
+        self.assertEqual(len(hashes), 1)
+        self.assertEqual(hashes[0].algo, "sha-256")
+        self.assertEqual(hashes[0].digest, hashlib.sha256(data).digest())
+
+        self.assertEqual(iq.payload.size, 100)
+        self.assertEqual(iq.payload.content_type, "text/plain")
+
+        put.assert_called_once_with(
+            "https://up.example/put",
+            unittest.mock.ANY,
+            unittest.mock.ANY,
+        )
+        self.assertEqual(bodies, [data])
+        _, (_, headers, _), _ = put.mock_calls[-1]
+        self.assertEqual(headers["Authorization"], "Basic Zm9vOmJhcg==")
+        self.assertEqual(headers["Content-Type"], "text/plain")
+        self.assertEqual(headers["Content-Length"], "100")
+
+    def test_upload_with_explicit_filename(self):
+        put = CoroutineMock()
+        put.return_value = None
+
+        with self._tempfile(b"foo") as path:
+            run_coroutine(self.s.upload(path, put, filename="bar.bin"))
+
+        _, (iq, ), _ = self.cc.send.mock_calls[-1]
+        self.assertEqual(iq.payload.filename, "bar.bin")
+        self.assertEqual(iq.payload.content_type, "application/octet-stream")
+
+    def test_upload_uses_prefetched_slot(self):
+        put, bodies = self._make_put()
+
+        with self._tempfile(b"foo") as path:
+            self.s.prefetch_slot(
+                os.path.basename(path), 3, "application/octet-stream",
+            )
+            run_coroutine(asyncio.sleep(0.01))
+            run_coroutine(self.s.upload(path, put))
+
+        self.assertEqual(self.cc.send.call_count, 1)
+        put.assert_called_once_with(
+            "https://up.example/put",
+            unittest.mock.ANY,
+            unittest.mock.ANY,
+        )
+        self.assertEqual(bodies, [b"foo"])
+
+    def test_upload_streams_body_in_chunks(self):
+        put, bodies = self._make_put()
+        data = bytes(range(256)) * 1024
+
+        with unittest.mock.patch.object(
+                self.s, "request_slot",
+                new=CoroutineMock(return_value=make_slot())):
+            with self._tempfile(data) as path:
+                _, hashes = run_coroutine(self.s.upload(
+                    path, put,
+                    hash_algos=["sha-256"],
+                ))
+
+        self.assertEqual(bodies, [data])
+        self.assertEqual(hashes[0].digest, hashlib.sha256(data).digest())
+
+    def test_upload_fails_if_file_grows_during_upload(self):
+        async def put(url, headers, body):
+            with open(path, "ab") as f:
+                f.write(b"bar")
+            async for _ in body:
+                pass
+
+        with self._tempfile(b"foo") as path:
+            with self.assertRaisesRegex(RuntimeError, "file changed"):
+                run_coroutine(self.s.upload(
+                    path, put,
+                ))
+
+    def test_upload_rejects_too_large_files(self):
+        put = CoroutineMock()
+
+        with self._tempfile(b"x" * 2048) as path:
+            with self.assertRaisesRegex(ValueError, "too large"):
+                run_coroutine(self.s.upload(path, put))
+
+        put.assert_not_called()
+
+    def test_upload_propagates_put_errors(self):
+        put = CoroutineMock()
+        put.side_effect = OSError("connection reset")
+
+        with self._tempfile(b"foo") as path:
+            with self.assertRaisesRegex(OSError, "connection reset"):
+                run_coroutine(self.s.upload(path, put))
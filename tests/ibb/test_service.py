@@ -20,6 +20,8 @@
 #
 ########################################################################
 import asyncio
+import hashlib
+import io
 import unittest
 import unittest.mock
 
@@ -594,8 +596,151 @@ class TestIBBService_OpenConnection(unittest.TestCase):
         self.handle.write(b" " * 21)
         run_coroutine(pause_fut)
         run_coroutine(resume_fut)
-        self.assertLess(len(self.handle._write_buffer), 10)
-        self.assertGreater(len(self.handle._write_buffer), 0)
+        self.assertLess(self.handle.get_write_buffer_size(), 10)
+        self.assertGreater(self.handle.get_write_buffer_size(), 0)
+
+    def test_send_window_defaults_to_service_setting(self):
+        self.assertEqual(self.s.send_window, 1)
+        self.assertEqual(self.handle.get_send_window(), 1)
+
+        self.s.send_window = 4
+        handle, _ = run_coroutine(
+            self.s.open_session(unittest.mock.Mock(), TEST_JID2)
+        )
+        self.assertEqual(handle.get_send_window(), 4)
+        handle.abort()
+
+    def test_set_send_window_rejects_non_positive(self):
+        with self.assertRaises(ValueError):
+            self.handle.set_send_window(0)
+
+    def test_send_window_keeps_blocks_in_flight(self):
+        self.handle._block_size = 4
+        self.handle.set_send_window(3)
+
+        replies = []
+        sent = []
+
+        async def patched_send(stanza):
+            fut = asyncio.Future()
+            replies.append(fut)
+            sent.append(stanza)
+            await fut
+
+        self.cc.send = patched_send
+        self.handle.write(b"0123456789abcdef")
+        run_coroutine(asyncio.sleep(0))
+
+        self.assertEqual(len(sent), 3)
+
+        replies[1].set_result(None)
+        run_coroutine(asyncio.sleep(0))
+        self.assertEqual(len(sent), 3)
+
+        replies[0].set_result(None)
+        run_coroutine(asyncio.sleep(0))
+        self.assertEqual(len(sent), 4)
+
+        for fut in replies[2:]:
+            fut.set_result(None)
+        run_coroutine(asyncio.sleep(0))
+
+        self.assertSequenceEqual(
+            [iq.payload.seq for iq in sent],
+            [0, 1, 2, 3],
+        )
+        self.assertEqual(
+            b"".join(iq.payload.content for iq in sent),
+            b"0123456789abcdef",
+        )
+
+    def test_send_window_resends_blocks_rejected_after_wait_error(self):
+        self.handle._block_size = 4
+        self.handle.set_send_window(2)
+
+        sent = []
+        errors = [
+            aioxmpp.errors.XMPPWaitError(
+                aioxmpp.errors.ErrorCondition.RESOURCE_CONSTRAINT
+            ),
+            aioxmpp.errors.XMPPCancelError(
+                aioxmpp.errors.ErrorCondition.UNEXPECTED_REQUEST
+            ),
+        ]
+        done = asyncio.Future()
+
+        async def patched_send(stanza):
+            sent.append(stanza)
+            if errors:
+                raise errors.pop(0)
+            if len(sent) == 5:
+                done.set_result(None)
+
+        self.cc.send = patched_send
+        self.handle.write(b"01234567abc")
+        run_coroutine(done)
+
+        self.assertSequenceEqual(
+            [(iq.payload.seq, iq.payload.content) for iq in sent],
+            [
+                (0, b"0123"),
+                (1, b"4567"),
+                (0, b"0123"),
+                (1, b"4567"),
+                (2, b"abc"),
+            ]
+        )
+        self.assertEqual(self.handle._retries, 0)
+
+    def test_small_writes_are_coalesced_into_blocks(self):
+        self.handle._block_size = 4
+        sent = []
+        done = asyncio.Future()
+
+        async def patched_send(stanza):
+            sent.append(stanza.payload.content)
+            if sum(map(len, sent)) == 7:
+                done.set_result(None)
+
+        self.cc.send = patched_send
+        self.handle.write(b"01")
+        self.handle.write(b"23")
+        self.handle.write(b"456")
+        run_coroutine(done)
+
+        self.assertSequenceEqual(sent, [b"0123", b"456"])
+
+    def test_write_copies_mutable_buffers(self):
+        data = bytearray(b"data")
+        done = asyncio.Future()
+
+        async def patched_send(stanza):
+            done.set_result(stanza.payload.content)
+
+        self.cc.send = patched_send
+        self.handle.write(data)
+        data[:] = b"xxxx"
+
+        self.assertEqual(run_coroutine(done), b"data")
+
+    def test_pause_and_resume_writing_called_once(self):
+        self.handle._block_size = 5
+        self.handle.set_write_buffer_limits(20, 10)
+        self.protocol.pause_writing = unittest.mock.Mock()
+        self.protocol.resume_writing = unittest.mock.Mock()
+        done = asyncio.Future()
+
+        async def patched_send(stanza):
+            if not self.handle.get_write_buffer_size():
+                done.set_result(None)
+
+        self.cc.send = patched_send
+        self.handle.write(b" " * 21)
+        self.handle.write(b" " * 4)
+        run_coroutine(done)
+
+        self.protocol.pause_writing.assert_called_once_with()
+        self.protocol.resume_writing.assert_called_once_with()
 
 class TestIBBService_OpenConnectionMessage(unittest.TestCase):
 
@@ -794,3 +939,199 @@ class TestIBBTransport(unittest.TestCase):
             self.protocol.data_received.mock_calls,
             [unittest.mock.call(b"foobar")]
         )
+
+
+def _loopback_send(peer_service, from_):
+    handlers = {
+        ibb_xso.Open: peer_service._handle_open_request,
+        ibb_xso.Data: peer_service._handle_data,
+        ibb_xso.Close: peer_service._handle_close_request,
+    }
+
+    async def send(stanza):
+        iq = aioxmpp.IQ(
+            aioxmpp.IQType.SET,
+            from_=from_,
+            to=stanza.to,
+            payload=stanza.payload,
+        )
+        return await handlers[type(stanza.payload)](iq)
+
+    return send
+
+
+class TestFileTransfer(unittest.TestCase):
+    def setUp(self):
+        self.cc1 = make_connected_client()
+        self.cc1.local_jid = TEST_FROM
+        self.cc2 = make_connected_client()
+        self.cc2.local_jid = TEST_JID1
+        self.s1 = ibb.IBBService(self.cc1)
+        self.s2 = ibb.IBBService(self.cc2)
+        self.cc1.send = _loopback_send(self.s2, TEST_FROM)
+        self.cc2.send = _loopback_send(self.s1, TEST_JID1)
+
+        self.data = bytes(range(256)) * 1000
+
+    def tearDown(self):
+        self.s1._on_stream_destroyed()
+        self.s2._on_stream_destroyed()
+        del self.s1
+        del self.s2
+
+    def test_send_and_receive_file(self):
+        src = io.BytesIO(self.data)
+        dest = io.BytesIO()
+        sent_progress = []
+        received_progress = []
+
+        receive_task = asyncio.ensure_future(self.s2.receive_file(
+            TEST_FROM, "sid", dest,
+            hash_algos=["sha-256", "sha-1"],
+            progress=received_progress.append,
+        ))
+        run_coroutine(asyncio.sleep(0))
+
+        sent_hashes = run_coroutine(self.s1.send_file(
+            TEST_JID1, src,
+            sid="sid",
+            block_size=4096,
+            chunk_size=65536,
+            hash_algos=["sha-256", "sha-1"],
+            progress=sent_progress.append,
+        ))
+        received_hashes = run_coroutine(receive_task)
+
+        self.assertEqual(dest.getvalue(), self.data)
+
+        self.assertEqual(
+            [(h.algo, h.digest) for h in sent_hashes],
+            [
+                ("sha-256", hashlib.sha256(self.data).digest()),
+                ("sha-1", hashlib.sha1(self.data).digest()),
+            ]
+        )
+        self.assertEqual(
+            [(h.algo, h.digest) for h in received_hashes],
+            [(h.algo, h.digest) for h in sent_hashes],
+        )
+
+        self.assertEqual(sent_progress[-1], len(self.data))
+        self.assertEqual(sent_progress, sorted(sent_progress))
+        self.assertEqual(len(sent_progress), 4)
+        self.assertEqual(received_progress[-1], len(self.data))
+
+        self.assertFalse(self.s1._sessions)
+        self.assertFalse(self.s2._sessions)
+
+    def test_send_empty_file(self):
+        dest = io.BytesIO()
+        receive_task = asyncio.ensure_future(self.s2.receive_file(
+            TEST_FROM, "sid", dest,
+        ))
+        run_coroutine(asyncio.sleep(0))
+
+        sent_hashes = run_coroutine(self.s1.send_file(
+            TEST_JID1, io.BytesIO(), sid="sid",
+        ))
+        received_hashes = run_coroutine(receive_task)
+
+        self.assertEqual(dest.getvalue(), b"")
+        self.assertEqual(sent_hashes[0].digest,
+                         hashlib.sha256(b"").digest())
+        self.assertEqual(received_hashes[0].digest,
+                         hashlib.sha256(b"").digest())
+
+    def test_send_file_fails_if_peer_closes_session_early(self):
+        loopback_send = self.cc1.send
+
+        async def send(stanza):
+            if (isinstance(stanza.payload, ibb_xso.Data) and
+                    stanza.payload.seq == 2):
+                self.s1._sessions["sid", TEST_JID1]._connection_closed()
+                await asyncio.Future()
+            return await loopback_send(stanza)
+
+        self.cc1.send = send
+
+        receive_task = asyncio.ensure_future(self.s2.receive_file(
+            TEST_FROM, "sid", io.BytesIO(),
+        ))
+        run_coroutine(asyncio.sleep(0))
+
+        with self.assertRaisesRegex(ConnectionError,
+                                    "session closed after [0-9]+ of"):
+            run_coroutine(self.s1.send_file(
+                TEST_JID1, io.BytesIO(self.data),
+                sid="sid",
+                block_size=4096,
+            ))
+
+        receive_task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            run_coroutine(receive_task)
+
+    def test_send_file_respects_flow_control(self):
+        chunk_size = 4096
+        reads = []
+        in_flight = []
+
+        src = io.BytesIO(self.data)
+        orig_read = src.read
+
+        def read(size):
+            reads.append(size)
+            return orig_read(size)
+
+        src.read = read
+
+        async def send(stanza):
+            if isinstance(stanza.payload, ibb_xso.Data):
+                fut = asyncio.Future()
+                in_flight.append(fut)
+                await fut
+
+        self.cc1.send = send
+
+        async def open_session(protocol_factory, peer_jid, **kwargs):
+            transport = ibb_service.IBBTransport(
+                self.s1, peer_jid, "sid", ibb_xso.IBBStanzaType.IQ, 4096,
+            )
+            self.s1._sessions["sid", peer_jid] = transport
+            protocol = protocol_factory()
+            transport.set_protocol(protocol)
+            return transport, protocol
+
+        with unittest.mock.patch.object(self.s1, "open_session",
+                                        new=open_session):
+            task = asyncio.ensure_future(self.s1.send_file(
+                TEST_JID1, src, chunk_size=chunk_size,
+            ))
+            run_coroutine(asyncio.sleep(0.05))
+
+        # the high-water mark is eight blocks
+        self.assertLessEqual(len(reads), 10)
+        self.assertFalse(task.done())
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            run_coroutine(task)
+
+    def test_receive_file_propagates_write_errors(self):
+        dest = unittest.mock.Mock()
+        dest.write.side_effect = OSError()
+
+        receive_task = asyncio.ensure_future(self.s2.receive_file(
+            TEST_FROM, "sid", dest,
+        ))
+        run_coroutine(asyncio.sleep(0))
+
+        send_task = asyncio.ensure_future(self.s1.send_file(
+            TEST_JID1, io.BytesIO(self.data), sid="sid",
+        ))
+
+        with self.assertRaises(OSError):
+            run_coroutine(receive_task)
+
+        with self.assertRaises(aioxmpp.errors.XMPPCancelError):
+            run_coroutine(send_task)
@@ -19,10 +19,12 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import asyncio
 import unittest
 import unittest.mock
 
 import aioxmpp.disco
+import aioxmpp.misc
 import aioxmpp.mdr.service as mdr_service
 import aioxmpp.mdr.xso as mdr_xso
 import aioxmpp.service
@@ -30,6 +32,7 @@ import aioxmpp.tracking
 
 from aioxmpp.testutils import (
     make_connected_client,
+    run_coroutine,
 )
 
 
@@ -278,3 +281,202 @@ class Testcompose_receipt(unittest.TestCase):
     def test_strips_body(self):
         msg = mdr_service.compose_receipt(self.msg)
         self.assertFalse(msg.body)
+
+
+TEST_ROOM = aioxmpp.JID.fromstr("room@muc.example")
+
+
+class TestReceiptAggregator(unittest.TestCase):
+    def setUp(self):
+        self.cc = make_connected_client()
+        self.cc.enqueue.return_value = None
+        self.s = mdr_service.ReceiptAggregator(self.cc, dependencies={})
+        self.s.delay = 0.01
+        self.id_counter = 0
+
+    def tearDown(self):
+        run_coroutine(self.s._shutdown())
+        del self.s
+        del self.cc
+
+    def _make_message(self, from_=TEST_TO,
+                      type_=aioxmpp.MessageType.CHAT):
+        self.id_counter += 1
+        msg = aioxmpp.Message(
+            type_=type_,
+            from_=from_,
+            to=TEST_FROM,
+            id_="id{}".format(self.id_counter),
+        )
+        msg.body[None] = "foo"
+        return msg
+
+    def _sent(self):
+        return [
+            args[0] for _, args, _ in self.cc.enqueue.mock_calls
+        ]
+
+    def test_is_service(self):
+        self.assertTrue(issubclass(
+            mdr_service.ReceiptAggregator,
+            aioxmpp.service.Service,
+        ))
+
+    def test_is_exported(self):
+        self.assertIs(aioxmpp.ReceiptAggregator,
+                      mdr_service.ReceiptAggregator)
+
+    def test_delay(self):
+        s = mdr_service.ReceiptAggregator(self.cc, dependencies={})
+        self.assertEqual(s.delay, 1.0)
+        with self.assertRaises(ValueError):
+            s.delay = -1
+
+    def test_receipts_are_sent_after_delay(self):
+        msgs = [self._make_message() for _ in range(3)]
+        for msg in msgs:
+            self.s.queue_receipt(msg)
+
+        self.cc.enqueue.assert_not_called()
+        run_coroutine(asyncio.sleep(0.05))
+
+        sent = self._sent()
+        self.assertEqual(
+            [st.xep0184_received.message_id for st in sent],
+            [msg.id_ for msg in msgs],
+        )
+        for st in sent:
+            self.assertEqual(st.to, TEST_TO.bare())
+
+    def test_duplicate_receipts_are_dropped(self):
+        msg = self._make_message()
+        self.s.queue_receipt(msg)
+        self.s.queue_receipt(msg)
+        self.s.flush()
+        self.assertEqual(len(self._sent()), 1)
+
+    def test_receipts_are_grouped_per_conversation(self):
+        other = aioxmpp.JID.fromstr("other@example.com/res")
+        m1 = self._make_message()
+        m2 = self._make_message(from_=other)
+        m3 = self._make_message()
+        for msg in [m1, m2, m3]:
+            self.s.queue_receipt(msg)
+        self.s.flush()
+
+        self.assertEqual(
+            [st.xep0184_received.message_id for st in self._sent()],
+            [m1.id_, m3.id_, m2.id_],
+        )
+
+    def test_queue_receipt_validates_message(self):
+        msg = self._make_message()
+        msg.id_ = None
+        with self.assertRaises(ValueError):
+            self.s.queue_receipt(msg)
+
+    def test_only_newest_marker_is_sent(self):
+        msgs = [self._make_message() for _ in range(5)]
+        for msg in msgs:
+            self.s.queue_marker(msg, aioxmpp.misc.DisplayedMarker)
+        self.s.queue_marker(msgs[1], aioxmpp.misc.AcknowledgedMarker)
+        self.s.flush()
+
+        sent = self._sent()
+        self.assertEqual(len(sent), 2)
+        self.assertIsInstance(sent[0].xep0333_marker,
+                              aioxmpp.misc.DisplayedMarker)
+        self.assertEqual(sent[0].xep0333_marker.id_, msgs[-1].id_)
+        self.assertEqual(sent[0].to, TEST_TO.bare())
+        self.assertEqual(sent[0].type_, aioxmpp.MessageType.CHAT)
+        self.assertFalse(sent[0].body)
+        self.assertIsInstance(sent[1].xep0333_marker,
+                              aioxmpp.misc.AcknowledgedMarker)
+        self.assertEqual(sent[1].xep0333_marker.id_, msgs[1].id_)
+
+    def test_markers_are_per_conversation(self):
+        other = aioxmpp.JID.fromstr("other@example.com/res")
+        m1 = self._make_message()
+        m2 = self._make_message(from_=other)
+        self.s.queue_marker(m1, aioxmpp.misc.DisplayedMarker)
+        self.s.queue_marker(m2, aioxmpp.misc.DisplayedMarker)
+        self.s.flush()
+
+        self.assertEqual(
+            [(st.to, st.xep0333_marker.id_) for st in self._sent()],
+            [(TEST_TO.bare(), m1.id_), (other.bare(), m2.id_)],
+        )
+
+    def test_groupchat_marker_uses_room_stanza_id(self):
+        msg = self._make_message(
+            from_=TEST_ROOM.replace(resource="nick"),
+            type_=aioxmpp.MessageType.GROUPCHAT,
+        )
+        msg.xep0359_stanza_ids.append(
+            aioxmpp.misc.StanzaID(id_="other", by=TEST_FROM.bare())
+        )
+        msg.xep0359_stanza_ids.append(
+            aioxmpp.misc.StanzaID(id_="room-id", by=TEST_ROOM)
+        )
+        self.s.queue_marker(msg, aioxmpp.misc.DisplayedMarker)
+        self.s.flush()
+
+        sent, = self._sent()
+        self.assertEqual(sent.to, TEST_ROOM)
+        self.assertEqual(sent.type_, aioxmpp.MessageType.GROUPCHAT)
+        self.assertEqual(sent.xep0333_marker.id_, "room-id")
+
+    def test_queue_marker_validates_message(self):
+        msg = self._make_message(type_=aioxmpp.MessageType.ERROR)
+        with self.assertRaises(ValueError):
+            self.s.queue_marker(msg, aioxmpp.misc.DisplayedMarker)
+
+        msg = self._make_message()
+        msg.id_ = None
+        with self.assertRaises(ValueError):
+            self.s.queue_marker(msg, aioxmpp.misc.DisplayedMarker)
+
+    def test_receipts_are_sent_before_markers(self):
+        msg = self._make_message()
+        self.s.queue_marker(msg, aioxmpp.misc.ReceivedMarker)
+        self.s.queue_receipt(msg)
+        self.s.flush()
+
+        sent = self._sent()
+        self.assertIsNotNone(sent[0].xep0184_received)
+        self.assertIsNotNone(sent[1].xep0333_marker)
+
+    def test_window_is_not_extended_by_new_items(self):
+        self.s.delay = 0.05
+        self.s.queue_receipt(self._make_message())
+        run_coroutine(asyncio.sleep(0.03))
+        self.s.queue_receipt(self._make_message())
+        run_coroutine(asyncio.sleep(0.03))
+        self.assertEqual(len(self._sent()), 2)
+
+    def test_flush_cancels_timer(self):
+        self.s.queue_receipt(self._make_message())
+        self.s.flush()
+        run_coroutine(asyncio.sleep(0.05))
+        self.assertEqual(len(self._sent()), 1)
+
+    def test_flush_drops_stanzas_if_disconnected(self):
+        self.cc.enqueue.side_effect = ConnectionError()
+        self.s.queue_receipt(self._make_message())
+        self.s.queue_receipt(self._make_message())
+        self.s.flush()
+        self.assertEqual(self.cc.enqueue.call_count, 1)
+
+        self.cc.enqueue.side_effect = None
+        self.s.flush()
+        self.assertEqual(self.cc.enqueue.call_count, 1)
+
+    def test_shutdown_flushes_pending(self):
+        msg = self._make_message()
+        self.s.queue_receipt(msg)
+        self.s.queue_marker(msg, aioxmpp.misc.DisplayedMarker)
+        run_coroutine(self.s._shutdown())
+        self.assertEqual(len(self._sent()), 2)
+
+        run_coroutine(asyncio.sleep(0.05))
+        self.assertEqual(len(self._sent()), 2)
@@ -19,6 +19,7 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import random
 import types
 import unittest
 
@@ -444,6 +445,187 @@ class TestPresenceClient(unittest.TestCase):
             base.mock_calls
         )
 
+    def _most_available_by_sorting(self, peer_jid):
+        presences = sorted(
+            self.s.get_peer_resources(peer_jid).items(),
+            key=lambda item: structs.PresenceState.from_stanza(item[1])
+        )
+        if not presences:
+            return None
+        return presences[-1][1]
+
+    def test_most_available_index_matches_full_scan(self):
+        rng = random.Random(1)
+        resources = ["r{}".format(i) for i in range(4)]
+        shows = list(structs.PresenceShow)
+
+        for _ in range(500):
+            resource = rng.choice(resources)
+            type_ = rng.choice([
+                structs.PresenceType.AVAILABLE,
+                structs.PresenceType.AVAILABLE,
+                structs.PresenceType.AVAILABLE,
+                structs.PresenceType.UNAVAILABLE,
+                structs.PresenceType.ERROR,
+            ])
+
+            if type_ == structs.PresenceType.ERROR:
+                st = stanza.Presence(type_=type_, from_=TEST_PEER_JID1)
+            else:
+                st = stanza.Presence(
+                    type_=type_,
+                    from_=TEST_PEER_JID1.replace(resource=resource),
+                )
+                if type_ == structs.PresenceType.AVAILABLE:
+                    st.show = rng.choice(shows)
+
+            self.s.handle_presence(st)
+
+            self.assertIs(
+                self.s.get_most_available_stanza(TEST_PEER_JID1),
+                self._most_available_by_sorting(TEST_PEER_JID1),
+            )
+
+    def test_get_most_available_stanza_after_best_resource_leaves(self):
+        st1 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              show=structs.PresenceShow.AWAY,
+                              from_=TEST_PEER_JID1.replace(resource="foo"))
+        self.s.handle_presence(st1)
+        st2 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              show=structs.PresenceShow.CHAT,
+                              from_=TEST_PEER_JID1.replace(resource="bar"))
+        self.s.handle_presence(st2)
+
+        self.assertIs(self.s.get_most_available_stanza(TEST_PEER_JID1), st2)
+
+        self.s.handle_presence(
+            stanza.Presence(type_=structs.PresenceType.UNAVAILABLE,
+                            from_=TEST_PEER_JID1.replace(resource="bar"))
+        )
+
+        self.assertIs(self.s.get_most_available_stanza(TEST_PEER_JID1), st1)
+
+        self.s.handle_presence(
+            stanza.Presence(type_=structs.PresenceType.UNAVAILABLE,
+                            from_=TEST_PEER_JID1.replace(resource="foo"))
+        )
+
+        self.assertIsNone(self.s.get_most_available_stanza(TEST_PEER_JID1))
+        self.assertNotIn(TEST_PEER_JID1, self.s._most_available)
+
+    def test_get_most_available_stanza_is_None_after_error(self):
+        self.s.handle_presence(
+            stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                            from_=TEST_PEER_JID1.replace(resource="foo"))
+        )
+        self.s.handle_presence(
+            stanza.Presence(type_=structs.PresenceType.ERROR,
+                            from_=TEST_PEER_JID1)
+        )
+
+        self.assertIsNone(self.s.get_most_available_stanza(TEST_PEER_JID1))
+
+    def test_get_most_available_stanza_ignores_full_jid(self):
+        self.s.handle_presence(
+            stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                            from_=TEST_PEER_JID1.replace(resource="foo"))
+        )
+
+        self.assertIsNone(self.s.get_most_available_stanza(
+            TEST_PEER_JID1.replace(resource="foo")
+        ))
+
+    def test_compact_store_defaults_to_false(self):
+        self.assertFalse(self.s.compact_store)
+        self.assertSetEqual(self.s.compact_payloads, set())
+
+    def test_compact_store_stores_records(self):
+        self.s.compact_store = True
+        self.s.compact_payloads.add("xep0115_caps")
+
+        st = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                             show=structs.PresenceShow.AWAY,
+                             from_=TEST_PEER_JID1.replace(resource="foo"))
+        st.priority = 10
+        st.status[None] = "foo"
+        st.xep0115_caps = unittest.mock.sentinel.caps
+
+        self.s.handle_presence(st)
+
+        record = self.s.get_stanza(st.from_)
+        self.assertIsInstance(record, presence_service.CompactPresence)
+        self.assertEqual(record.from_, st.from_)
+        self.assertEqual(record.type_, structs.PresenceType.AVAILABLE)
+        self.assertEqual(record.show, structs.PresenceShow.AWAY)
+        self.assertEqual(record.priority, 10)
+        self.assertEqual(record.status, {None: "foo"})
+        self.assertEqual(record.payloads,
+                         {"xep0115_caps": unittest.mock.sentinel.caps})
+        self.assertEqual(
+            record.state,
+            structs.PresenceState(True, structs.PresenceShow.AWAY),
+        )
+
+        self.assertIs(
+            self.s.get_most_available_stanza(TEST_PEER_JID1),
+            record,
+        )
+        self.assertDictEqual(
+            self.s.get_peer_resources(TEST_PEER_JID1),
+            {"foo": record},
+        )
+
+    def test_compact_store_passes_full_stanza_to_signals(self):
+        self.s.compact_store = True
+
+        st1 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              from_=TEST_PEER_JID1.replace(resource="foo"))
+        self.s.handle_presence(st1)
+
+        st2 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              show=structs.PresenceShow.DND,
+                              from_=TEST_PEER_JID1.replace(resource="foo"))
+        self.s.handle_presence(st2)
+
+        self.assertSequenceEqual(
+            self.listener.mock_calls,
+            [
+                unittest.mock.call.on_bare_available(st1),
+                unittest.mock.call.on_available(st1.from_, st1),
+                unittest.mock.call.on_changed(st2.from_, st2),
+            ]
+        )
+
+    def test_compact_store_does_not_compact_error_presence(self):
+        self.s.compact_store = True
+
+        st = stanza.Presence(type_=structs.PresenceType.ERROR,
+                             from_=TEST_PEER_JID1)
+        self.s.handle_presence(st)
+
+        self.assertIs(self.s.get_stanza(TEST_PEER_JID1), st)
+
+    def test_retain_stanzas_keeps_full_stanzas(self):
+        self.s.compact_store = True
+        self.s.retain_stanzas(TEST_PEER_JID1)
+
+        st1 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              from_=TEST_PEER_JID1.replace(resource="foo"))
+        self.s.handle_presence(st1)
+        st2 = stanza.Presence(type_=structs.PresenceType.AVAILABLE,
+                              from_=TEST_PEER_JID2.replace(resource="foo"))
+        self.s.handle_presence(st2)
+
+        self.assertIs(self.s.get_stanza(st1.from_), st1)
+        self.assertIsInstance(self.s.get_stanza(st2.from_),
+                              presence_service.CompactPresence)
+
+        self.s.release_stanzas(TEST_PEER_JID1)
+        self.s.handle_presence(st1)
+
+        self.assertIsInstance(self.s.get_stanza(st1.from_),
+                              presence_service.CompactPresence)
+
     def tearDown(self):
         del self.s
         del self.cc
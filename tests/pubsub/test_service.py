@@ -19,11 +19,13 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import asyncio
 import contextlib
 import unittest
 
 import aioxmpp.disco
 import aioxmpp.forms
+import aioxmpp.rsm.xso
 import aioxmpp.service
 import aioxmpp.stanza
 import aioxmpp.structs
@@ -416,6 +418,206 @@ class TestService(unittest.TestCase):
             ]
         )
 
+    def _make_event_message(self, payload, from_=TEST_TO):
+        msg = aioxmpp.stanza.Message(
+            type_=aioxmpp.structs.MessageType.NORMAL,
+            from_=from_,
+        )
+        msg.xep0060_event = pubsub_xso.Event(payload)
+        return msg
+
+    def test_node_events_returns_same_object_while_referenced(self):
+        events = self.s.node_events(TEST_TO, "node")
+        self.assertIsInstance(events, pubsub_service.NodeEvents)
+        self.assertEqual(events.jid, TEST_TO)
+        self.assertEqual(events.node, "node")
+        self.assertIs(self.s.node_events(TEST_TO, "node"), events)
+        self.assertIsNot(self.s.node_events(TEST_TO, "other"), events)
+        self.assertIsNot(self.s.node_events(None, "node"), events)
+
+    def test_node_events_routes_by_service_and_node(self):
+        events = self.s.node_events(TEST_TO, "node")
+        any_events = self.s.node_events(None, "node")
+        other_events = self.s.node_events(TEST_TO, "other")
+
+        m = unittest.mock.Mock()
+        m.events.return_value = None
+        m.any_events.return_value = None
+        m.other_events.return_value = None
+        events.on_item_published.connect(m.events)
+        any_events.on_item_published.connect(m.any_events)
+        other_events.on_item_published.connect(m.other_events)
+
+        item = pubsub_xso.EventItem(SomePayload(), id_="foo")
+        msg = self._make_event_message(
+            pubsub_xso.EventItems(items=[item], node="node")
+        )
+        self.assertIsNone(self.s.filter_inbound_message(msg))
+
+        item2 = pubsub_xso.EventItem(SomePayload(), id_="bar")
+        msg2 = self._make_event_message(
+            pubsub_xso.EventItems(items=[item2], node="node"),
+            from_=TEST_JID1,
+        )
+        self.assertIsNone(self.s.filter_inbound_message(msg2))
+
+        self.assertSequenceEqual(
+            m.mock_calls,
+            [
+                unittest.mock.call.events(TEST_TO, "node", item,
+                                          message=msg),
+                unittest.mock.call.any_events(TEST_TO, "node", item,
+                                              message=msg),
+                unittest.mock.call.any_events(TEST_JID1, "node", item2,
+                                              message=msg2),
+            ]
+        )
+
+    def test_node_events_retract_and_delete(self):
+        events = self.s.node_events(TEST_TO, "node")
+
+        m = unittest.mock.Mock()
+        m.return_value = None
+        events.on_item_retracted.connect(m.retracted)
+        events.on_node_deleted.connect(m.deleted)
+
+        msg1 = self._make_event_message(
+            pubsub_xso.EventItems(
+                retracts=[pubsub_xso.EventRetract("foo")],
+                node="node",
+            )
+        )
+        msg2 = self._make_event_message(
+            pubsub_xso.EventDelete("node", redirect_uri="some-uri")
+        )
+        self.s.filter_inbound_message(msg1)
+        self.s.filter_inbound_message(msg2)
+
+        self.assertSequenceEqual(
+            m.mock_calls,
+            [
+                unittest.mock.call.retracted(TEST_TO, "node", "foo",
+                                             message=msg1),
+                unittest.mock.call.deleted(TEST_TO, "node",
+                                           redirect_uri="some-uri",
+                                           message=msg2),
+            ]
+        )
+
+    def test_node_events_are_released_when_unreferenced(self):
+        events = self.s.node_events(TEST_TO, "node")
+        m = unittest.mock.Mock()
+        events.on_item_published.connect(m)
+        del events
+
+        msg = self._make_event_message(
+            pubsub_xso.EventItems(
+                items=[pubsub_xso.EventItem(SomePayload())],
+                node="node",
+            )
+        )
+        self.s.filter_inbound_message(msg)
+
+        m.assert_not_called()
+
+    def test_node_events_coalesce_delay_rejects_negative(self):
+        events = self.s.node_events(TEST_TO, "node")
+        with self.assertRaises(ValueError):
+            events.coalesce_delay = -1
+
+    def test_node_events_coalesce_last_value_wins(self):
+        events = self.s.node_events(None, "node")
+        events.coalesce_delay = 0.01
+        self.assertEqual(events.coalesce_delay, 0.01)
+
+        m = unittest.mock.Mock()
+        m.return_value = None
+        events.on_item_published.connect(m)
+
+        items = [
+            pubsub_xso.EventItem(SomePayload(), id_=str(i))
+            for i in range(3)
+        ]
+        msgs = []
+        for item in items:
+            msg = self._make_event_message(
+                pubsub_xso.EventItems(items=[item], node="node")
+            )
+            msgs.append(msg)
+            self.s.filter_inbound_message(msg)
+
+        other_item = pubsub_xso.EventItem(SomePayload(), id_="other")
+        other_msg = self._make_event_message(
+            pubsub_xso.EventItems(items=[other_item], node="node"),
+            from_=TEST_JID1,
+        )
+        self.s.filter_inbound_message(other_msg)
+
+        m.assert_not_called()
+
+        run_coroutine(asyncio.sleep(0.02))
+
+        self.assertSequenceEqual(
+            m.mock_calls,
+            [
+                unittest.mock.call(TEST_TO, "node", items[-1],
+                                   message=msgs[-1]),
+                unittest.mock.call(TEST_JID1, "node", other_item,
+                                   message=other_msg),
+            ]
+        )
+
+    def test_node_events_retraction_flushes_coalesced_items(self):
+        events = self.s.node_events(TEST_TO, "node")
+        events.coalesce_delay = 10
+
+        m = unittest.mock.Mock()
+        m.return_value = None
+        events.on_item_published.connect(m.published)
+        events.on_item_retracted.connect(m.retracted)
+
+        item = pubsub_xso.EventItem(SomePayload(), id_="foo")
+        msg1 = self._make_event_message(
+            pubsub_xso.EventItems(items=[item], node="node")
+        )
+        msg2 = self._make_event_message(
+            pubsub_xso.EventItems(
+                retracts=[pubsub_xso.EventRetract("foo")],
+                node="node",
+            )
+        )
+        self.s.filter_inbound_message(msg1)
+        self.s.filter_inbound_message(msg2)
+
+        self.assertSequenceEqual(
+            m.mock_calls,
+            [
+                unittest.mock.call.published(TEST_TO, "node", item,
+                                             message=msg1),
+                unittest.mock.call.retracted(TEST_TO, "node", "foo",
+                                             message=msg2),
+            ]
+        )
+
+    def test_node_events_disabling_coalescing_flushes(self):
+        events = self.s.node_events(TEST_TO, "node")
+        events.coalesce_delay = 10
+
+        m = unittest.mock.Mock()
+        m.return_value = None
+        events.on_item_published.connect(m)
+
+        item = pubsub_xso.EventItem(SomePayload(), id_="foo")
+        msg = self._make_event_message(
+            pubsub_xso.EventItems(items=[item], node="node")
+        )
+        self.s.filter_inbound_message(msg)
+        m.assert_not_called()
+
+        events.coalesce_delay = None
+
+        m.assert_called_once_with(TEST_TO, "node", item, message=msg)
+
     def test_init(self):
         self.disco = unittest.mock.Mock()
         self.cc = make_connected_client()
@@ -1060,6 +1262,138 @@ class TestService(unittest.TestCase):
                 ids=ids,
             ))
 
+    def _make_items_page(self, ids, last=None, count=None, index=None):
+        response = pubsub_xso.Request(pubsub_xso.Items("foo"))
+        response.payload.items = [pubsub_xso.Item(id_) for id_ in ids]
+        if last is not None or count is not None:
+            response.rsm = aioxmpp.rsm.xso.ResultSetMetadata()
+            response.rsm.count = count
+            if last is not None:
+                response.rsm.last = aioxmpp.rsm.xso.Last(last)
+            if index is not None:
+                response.rsm.first = aioxmpp.rsm.xso.First(ids[0])
+                response.rsm.first.index = index
+        return response
+
+    async def _collect_item_ids(self, aiter):
+        return [item.id_ async for item in aiter]
+
+    def test_iter_items_pages_with_rsm(self):
+        self.cc.send.side_effect = [
+            self._make_items_page(["a", "b"], last="b"),
+            self._make_items_page(["c"], last="c"),
+            self._make_items_page([]),
+        ]
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.RSM}
+
+            result = run_coroutine(self._collect_item_ids(
+                self.s.iter_items(TEST_TO, "foo", page_size=2)
+            ))
+
+        get_features.assert_called_once_with(TEST_TO)
+        self.assertEqual(result, ["a", "b", "c"])
+        self.assertEqual(len(self.cc.send.mock_calls), 3)
+
+        afters = []
+        for (request_iq,), _ in self.cc.send.call_args_list:
+            self.assertEqual(request_iq.to, TEST_TO)
+            self.assertEqual(request_iq.type_, aioxmpp.structs.IQType.GET)
+            request = request_iq.payload
+            self.assertIsInstance(request.payload, pubsub_xso.Items)
+            self.assertEqual(request.payload.node, "foo")
+            self.assertEqual(request.rsm.max_, 2)
+            afters.append(request.rsm.after and request.rsm.after.value)
+
+        self.assertEqual(afters, [None, "b", "c"])
+
+    def test_iter_items_stops_at_count(self):
+        self.cc.send.side_effect = [
+            self._make_items_page(["a", "b"], last="b", count=3, index=0),
+            self._make_items_page(["c"], last="c", count=3, index=2),
+        ]
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.RSM}
+
+            result = run_coroutine(self._collect_item_ids(
+                self.s.iter_items(TEST_TO, "foo", page_size=2)
+            ))
+
+        self.assertEqual(result, ["a", "b", "c"])
+        self.assertEqual(len(self.cc.send.mock_calls), 2)
+
+    def test_iter_items_prefetches_next_page(self):
+        self.cc.send.side_effect = [
+            self._make_items_page(["a", "b"], last="b"),
+            self._make_items_page([]),
+        ]
+
+        async def consume_one():
+            aiter = self.s.iter_items(TEST_TO, "foo", page_size=2)
+            item = await aiter.__anext__()
+            await asyncio.sleep(0)
+            nsent = len(self.cc.send.mock_calls)
+            await aiter.aclose()
+            return item, nsent
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.RSM}
+            item, nsent = run_coroutine(consume_one())
+
+        self.assertEqual(item.id_, "a")
+        self.assertEqual(nsent, 2)
+
+    def test_iter_items_cancels_prefetch_on_close(self):
+        fut = asyncio.Future()
+
+        async def send(iq):
+            if iq.payload.rsm.after is None:
+                return self._make_items_page(["a"], last="a")
+            return await fut
+
+        self.cc.send = send
+
+        async def consume_one():
+            aiter = self.s.iter_items(TEST_TO, "foo")
+            await aiter.__anext__()
+            await asyncio.sleep(0)
+            await aiter.aclose()
+            await asyncio.sleep(0)
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.RSM}
+            run_coroutine(consume_one())
+
+        self.assertTrue(fut.cancelled())
+
+    def test_iter_items_falls_back_without_rsm(self):
+        self.cc.send.return_value = self._make_items_page(["a", "b", "c"])
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.RETRIEVE_ITEMS}
+
+            result = run_coroutine(self._collect_item_ids(
+                self.s.iter_items(TEST_TO, "foo", page_size=2)
+            ))
+
+        self.assertEqual(result, ["a", "b", "c"])
+        (request_iq,), _ = self.cc.send.call_args
+        self.assertIsNone(request_iq.payload.rsm)
+        self.assertIsNone(request_iq.payload.payload.max_items)
+
+    def test_iter_items_rejects_non_positive_page_size(self):
+        with self.assertRaises(ValueError):
+            run_coroutine(self._collect_item_ids(
+                self.s.iter_items(TEST_TO, "foo", page_size=0)
+            ))
+
         self.assertEqual(
             0,
             len(self.cc.send.mock_calls)
@@ -1460,6 +1794,158 @@ class TestService(unittest.TestCase):
 
         self.assertEqual(result, "some-other-id")
 
+    def test_publish_many(self):
+        payloads = [SomePayload() for i in range(5)]
+        self.cc.send.return_value = None
+
+        result = run_coroutine(self.s.publish_many(
+            TEST_TO,
+            "foo",
+            (("id{}".format(i), payload)
+             for i, payload in enumerate(payloads)),
+            window=2,
+        ))
+
+        self.assertEqual(result, ["id{}".format(i) for i in range(5)])
+        self.assertEqual(len(self.cc.send.mock_calls), 5)
+
+        for i, ((request_iq,), _) in enumerate(self.cc.send.call_args_list):
+            self.assertEqual(request_iq.to, TEST_TO)
+            self.assertEqual(request_iq.type_, aioxmpp.structs.IQType.SET)
+            request = request_iq.payload
+            self.assertIsInstance(request.payload, pubsub_xso.Publish)
+            self.assertEqual(request.payload.node, "foo")
+            self.assertEqual(request.payload.item.id_, "id{}".format(i))
+            self.assertIs(request.payload.item.registered_payload,
+                          payloads[i])
+
+    def test_publish_many_bounds_requests_in_flight(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send(iq):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(in_flight, max_in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+
+        self.cc.send = send
+
+        result = run_coroutine(self.s.publish_many(
+            TEST_TO,
+            "foo",
+            [(str(i), SomePayload()) for i in range(10)],
+            window=3,
+        ))
+
+        self.assertEqual(result, [str(i) for i in range(10)])
+        self.assertEqual(max_in_flight, 3)
+
+    def test_publish_many_rejects_empty_window(self):
+        with self.assertRaises(ValueError):
+            run_coroutine(self.s.publish_many(
+                TEST_TO,
+                "foo",
+                [("a", SomePayload())],
+                window=0,
+            ))
+
+    def test_publish_many_reports_errors_per_item(self):
+        exc = aioxmpp.errors.XMPPCancelError(
+            aioxmpp.ErrorCondition.ITEM_NOT_FOUND,
+        )
+        self.cc.send.side_effect = [None, exc, None]
+
+        result = run_coroutine(self.s.publish_many(
+            TEST_TO,
+            "foo",
+            [(str(i), SomePayload()) for i in range(3)],
+            window=1,
+        ))
+
+        self.assertEqual(result, ["0", exc, "2"])
+        self.assertEqual(len(self.cc.send.mock_calls), 3)
+
+    def test_publish_many_retries_transient_errors(self):
+        self.cc.send.side_effect = [
+            aioxmpp.errors.XMPPWaitError(
+                aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT,
+            ),
+            aioxmpp.errors.XMPPCancelError(
+                aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT,
+            ),
+            None,
+        ]
+
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        with unittest.mock.patch("asyncio.sleep", new=sleep):
+            result = run_coroutine(self.s.publish_many(
+                TEST_TO,
+                "foo",
+                [("a", SomePayload())],
+                retry_delay=0.5,
+            ))
+
+        self.assertEqual(result, ["a"])
+        self.assertEqual(len(self.cc.send.mock_calls), 3)
+        self.assertEqual([delay for delay in delays if delay], [0.5, 1.0])
+
+    def test_publish_many_gives_up_after_max_retries(self):
+        exc = aioxmpp.errors.XMPPWaitError(
+            aioxmpp.ErrorCondition.RESOURCE_CONSTRAINT,
+        )
+        self.cc.send.side_effect = exc
+
+        result = run_coroutine(self.s.publish_many(
+            TEST_TO,
+            "foo",
+            [("a", SomePayload())],
+            max_retries=2,
+            retry_delay=0,
+        ))
+
+        self.assertEqual(result, [exc])
+        self.assertEqual(len(self.cc.send.mock_calls), 3)
+
+    def test_publish_many_checks_publish_options_once(self):
+        self.cc.send.return_value = None
+        data = unittest.mock.sentinel.publish_options
+
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = {pubsub_xso.Feature.PUBLISH_OPTIONS}
+
+            run_coroutine(self.s.publish_many(
+                TEST_TO,
+                "foo",
+                [(str(i), SomePayload()) for i in range(3)],
+                publish_options=data,
+            ))
+
+        get_features.assert_called_once_with(TEST_TO)
+        for (request_iq,), _ in self.cc.send.call_args_list:
+            self.assertIs(request_iq.payload.publish_options.data, data)
+
+    def test_publish_many_publish_options_not_supported(self):
+        with unittest.mock.patch.object(self.s, "get_features",
+                                        new=CoroutineMock()) as get_features:
+            get_features.return_value = set()
+
+            with self.assertRaises(RuntimeError):
+                run_coroutine(self.s.publish_many(
+                    TEST_TO,
+                    "foo",
+                    [("a", SomePayload())],
+                    publish_options=unittest.mock.sentinel.publish_options,
+                ))
+
+        self.cc.send.assert_not_called()
+
     def test_notify_uses_publish_with_None_payload(self):
         with contextlib.ExitStack() as stack:
             publish = stack.enter_context(
@@ -1516,6 +2002,33 @@ class TestService(unittest.TestCase):
         item = request.payload.item
         self.assertIs(item.id_, "some-id")
 
+    def test_retract_many(self):
+        exc = aioxmpp.errors.XMPPCancelError(
+            aioxmpp.ErrorCondition.ITEM_NOT_FOUND,
+        )
+        self.cc.send.side_effect = [None, exc]
+
+        result = run_coroutine(self.s.retract_many(
+            TEST_TO,
+            "foo",
+            ["a", "b"],
+            notify=True,
+            window=1,
+        ))
+
+        self.assertEqual(result, [None, exc])
+
+        ids = []
+        for (request_iq,), _ in self.cc.send.call_args_list:
+            self.assertEqual(request_iq.to, TEST_TO)
+            request = request_iq.payload
+            self.assertIsInstance(request.payload, pubsub_xso.Retract)
+            self.assertEqual(request.payload.node, "foo")
+            self.assertTrue(request.payload.notify)
+            ids.append(request.payload.item.id_)
+
+        self.assertEqual(ids, ["a", "b"])
+
     def test_retract_with_notify(self):
         self.cc.send.return_value = None
 
@@ -25,6 +25,7 @@ import unittest.mock
 
 import aioxmpp.forms as forms
 import aioxmpp.pubsub.xso as pubsub_xso
+import aioxmpp.rsm.xso
 import aioxmpp.stanza as stanza
 import aioxmpp.structs as structs
 import aioxmpp.xso as xso
@@ -1108,6 +1109,18 @@ class TestRequest(unittest.TestCase):
             }
         )
 
+    def test_rsm(self):
+        self.assertIsInstance(
+            pubsub_xso.Request.rsm,
+            xso.Child
+        )
+        self.assertSetEqual(
+            pubsub_xso.Request.rsm._classes,
+            {
+                aioxmpp.rsm.xso.ResultSetMetadata,
+            }
+        )
+
     def test_options(self):
         self.assertIsInstance(
             pubsub_xso.Request.options,
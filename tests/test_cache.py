@@ -19,11 +19,15 @@
 # <http://www.gnu.org/licenses/>.
 #
 ########################################################################
+import asyncio
 import collections.abc
 import unittest
+import unittest.mock
 
 import aioxmpp.cache as cache
 
+from aioxmpp.testutils import run_coroutine
+
 
 class TestLRUDict(unittest.TestCase):
     def setUp(self):
@@ -300,3 +304,265 @@ class TestLRUDict(unittest.TestCase):
             with self.assertRaises(KeyError):
                 self.d[k]
             self.assertTrue(self.d._test_consistency())
+
+    def test_values_and_items_do_not_count_as_use(self):
+        self.d.maxsize = 2
+        self.d["a"] = 1
+        self.d["b"] = 2
+
+        self.assertCountEqual(list(self.d.values()), [1, 2])
+        self.assertCountEqual(list(self.d.items()), [("a", 1), ("b", 2)])
+        self.assertEqual(self.d.hits, 0)
+
+        self.d["c"] = 3
+        self.assertNotIn("a", self.d)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_setting_existing_entry_does_not_count_as_use(self):
+        self.d.maxsize = 2
+        self.d["a"] = 1
+        self.d["b"] = 2
+        self.d["a"] = 3
+        self.d["c"] = 4
+
+        self.assertSetEqual(set(self.d), {"b", "c"})
+        self.assertTrue(self.d._test_consistency())
+
+    def test_counters(self):
+        self.d.maxsize = 2
+        self.assertEqual(self.d.hits, 0)
+        self.assertEqual(self.d.misses, 0)
+        self.assertEqual(self.d.evictions, 0)
+
+        self.d["a"] = 1
+        self.d["a"]
+        self.d.get("b")
+        self.d["b"] = 2
+        self.d["c"] = 3
+        del self.d["c"]
+
+        self.assertEqual(self.d.hits, 1)
+        self.assertEqual(self.d.misses, 1)
+        self.assertEqual(self.d.evictions, 1)
+
+        self.d.reset_counters()
+        self.assertEqual(self.d.hits, 0)
+        self.assertEqual(self.d.misses, 0)
+        self.assertEqual(self.d.evictions, 0)
+
+    def test_default_weight(self):
+        self.assertIsNone(self.d.weight)
+        self.assertIsNone(self.d.maxweight)
+        self.assertEqual(self.d.total_weight, 0)
+
+    def test_maxweight_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            self.d.maxweight = -1
+
+    def test_purge_by_weight(self):
+        self.d.maxsize = None
+        self.d.weight = len
+        self.d.maxweight = 10
+
+        self.d["a"] = "xxxx"
+        self.d["b"] = "xxxx"
+        self.assertEqual(self.d.total_weight, 8)
+        self.d["a"]
+        self.d["c"] = "xxxx"
+
+        self.assertSetEqual(set(self.d), {"a", "c"})
+        self.assertEqual(self.d.total_weight, 8)
+        self.assertEqual(self.d.evictions, 1)
+        self.assertTrue(self.d._test_consistency())
+
+        self.d["c"] = "x"
+        self.assertEqual(self.d.total_weight, 5)
+        self.assertTrue(self.d._test_consistency())
+
+        del self.d["a"]
+        self.assertEqual(self.d.total_weight, 1)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_entry_heavier_than_maxweight_is_not_retained(self):
+        self.d.maxsize = None
+        self.d.weight = len
+        self.d.maxweight = 3
+
+        self.d["a"] = "xxxx"
+        self.assertNotIn("a", self.d)
+        self.assertEqual(self.d.total_weight, 0)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_setting_weight_recomputes_and_purges(self):
+        self.d.maxsize = None
+        self.d.maxweight = 5
+        self.d["a"] = "xxx"
+        self.d["b"] = "xxx"
+
+        self.d.weight = len
+        self.assertSetEqual(set(self.d), {"b"})
+        self.assertEqual(self.d.total_weight, 3)
+        self.assertTrue(self.d._test_consistency())
+
+        self.d.weight = None
+        self.assertEqual(self.d.total_weight, 0)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_clear_resets_weight(self):
+        self.d.weight = len
+        self.d["a"] = "xxx"
+        self.d.clear()
+        self.assertEqual(self.d.total_weight, 0)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_default_ttl(self):
+        self.assertIsNone(self.d.ttl)
+
+    def test_ttl_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            self.d.ttl = -1
+
+    def test_entries_expire_after_ttl(self):
+        self.d.maxsize = None
+        self.d.ttl = 10
+
+        with unittest.mock.patch("time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.d["a"] = 1
+            self.d.store("b", 2, None)
+            self.d.store("c", 3, 20)
+
+            monotonic.return_value = 109
+            self.assertEqual(self.d["a"], 1)
+
+            monotonic.return_value = 110
+            with self.assertRaises(KeyError):
+                self.d["a"]
+            self.assertEqual(self.d["b"], 2)
+            self.assertEqual(self.d["c"], 3)
+
+        self.assertSetEqual(set(self.d), {"b", "c"})
+        self.assertEqual(self.d.misses, 1)
+        self.assertEqual(self.d.evictions, 1)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_item_assignment_replaces_ttl(self):
+        self.d.maxsize = None
+
+        with unittest.mock.patch("time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.d.store("a", 1, 10)
+            self.d["a"] = 2
+
+            monotonic.return_value = 200
+            self.assertEqual(self.d["a"], 2)
+
+        self.assertTrue(self.d._test_consistency())
+
+    def test_purge_expired(self):
+        self.d.maxsize = None
+
+        with unittest.mock.patch("time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.d.store("a", 1, 10)
+            self.d.store("b", 2, 20)
+            self.d["c"] = 3
+
+            monotonic.return_value = 115
+            self.d.purge_expired()
+
+        self.assertSetEqual(set(self.d), {"b", "c"})
+        self.assertEqual(self.d.evictions, 1)
+        self.assertTrue(self.d._test_consistency())
+
+    def test_get_or_create_async_returns_existing_value(self):
+        factory = unittest.mock.Mock()
+        self.d["a"] = 1
+
+        self.assertEqual(
+            run_coroutine(self.d.get_or_create_async("a", factory)),
+            1,
+        )
+        factory.assert_not_called()
+
+    def test_get_or_create_async_stores_created_value(self):
+        calls = []
+
+        async def factory():
+            calls.append(None)
+            return 2
+
+        self.assertEqual(
+            run_coroutine(self.d.get_or_create_async("a", factory)),
+            2,
+        )
+        self.assertEqual(self.d["a"], 2)
+        self.assertEqual(
+            run_coroutine(self.d.get_or_create_async("a", factory)),
+            2,
+        )
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_create_async_is_single_flight(self):
+        calls = []
+        event = asyncio.Event()
+
+        async def factory():
+            calls.append(None)
+            await event.wait()
+            return 3
+
+        async def test():
+            tasks = [
+                asyncio.ensure_future(
+                    self.d.get_or_create_async("a", factory)
+                )
+                for i in range(3)
+            ]
+            await asyncio.sleep(0)
+            event.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertSequenceEqual(run_coroutine(test()), [3, 3, 3])
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_create_async_propagates_exception(self):
+        class FooException(Exception):
+            pass
+
+        calls = []
+
+        async def factory():
+            calls.append(None)
+            raise FooException()
+
+        for i in range(2):
+            with self.assertRaises(FooException):
+                run_coroutine(self.d.get_or_create_async("a", factory))
+
+        self.assertNotIn("a", self.d)
+        self.assertEqual(len(calls), 2)
+
+    def test_get_or_create_async_cancelling_caller_does_not_cancel_factory(
+            self):
+        event = asyncio.Event()
+
+        async def factory():
+            await event.wait()
+            return 4
+
+        async def test():
+            first = asyncio.ensure_future(
+                self.d.get_or_create_async("a", factory)
+            )
+            second = asyncio.ensure_future(
+                self.d.get_or_create_async("a", factory)
+            )
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.sleep(0)
+            event.set()
+            return await second
+
+        self.assertEqual(run_coroutine(test()), 4)
+        self.assertEqual(self.d["a"], 4)
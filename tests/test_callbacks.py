@@ -1088,6 +1088,164 @@ class TestAdHocSignal(unittest.TestCase):
 
         self.assertEqual(fut, Future())
 
+    def test_fire_reuses_snapshot(self):
+        signal = AdHocSignal()
+        signal.connect(unittest.mock.Mock(return_value=None))
+
+        signal()
+        snapshot = signal._snapshot
+        self.assertIsNotNone(snapshot)
+
+        signal()
+        self.assertIs(signal._snapshot, snapshot)
+
+    def test_connect_and_disconnect_invalidate_snapshot(self):
+        signal = AdHocSignal()
+        signal()
+
+        token = signal.connect(unittest.mock.Mock(return_value=None))
+        self.assertIsNone(signal._snapshot)
+
+        signal()
+        self.assertIsNotNone(signal._snapshot)
+
+        signal.disconnect(token)
+        self.assertIsNone(signal._snapshot)
+
+    def test_disconnect_of_unknown_token_keeps_snapshot(self):
+        signal = AdHocSignal()
+        signal.connect(unittest.mock.Mock(return_value=None))
+        signal()
+        snapshot = signal._snapshot
+
+        signal.disconnect(object())
+        self.assertIs(signal._snapshot, snapshot)
+
+    def test_strong_listener_receives_keyword_arguments(self):
+        signal = AdHocSignal()
+        fun = unittest.mock.Mock(return_value=None)
+        signal.connect(fun)
+
+        signal(1, foo="bar")
+
+        fun.assert_called_once_with(1, foo="bar")
+
+    def test_custom_mode(self):
+        signal = AdHocSignal()
+        wrapper = unittest.mock.Mock(return_value=True)
+        mode = unittest.mock.Mock(return_value=wrapper)
+
+        signal.connect(unittest.mock.sentinel.f, mode)
+        signal(1, foo="bar")
+        signal()
+
+        mode.assert_called_once_with(unittest.mock.sentinel.f)
+        self.assertSequenceEqual(
+            wrapper.mock_calls,
+            [
+                unittest.mock.call((1,), {"foo": "bar"}),
+                unittest.mock.call((), {}),
+            ]
+        )
+
+    def test_connect_during_emission_takes_effect_on_next_emission(self):
+        signal = AdHocSignal()
+        late = unittest.mock.Mock(return_value=None)
+
+        def connect_late():
+            signal.connect(late)
+            return True
+
+        signal.connect(connect_late)
+
+        signal()
+        late.assert_not_called()
+
+        signal()
+        late.assert_called_once_with()
+
+    def test_disconnect_during_emission_takes_effect_on_next_emission(self):
+        signal = AdHocSignal()
+        second = unittest.mock.Mock(return_value=None)
+
+        def disconnect_second():
+            signal.disconnect(second_token)
+
+        signal.connect(disconnect_second)
+        second_token = signal.connect(second)
+
+        signal()
+        second.assert_called_once_with()
+        second.reset_mock()
+
+        signal()
+        second.assert_not_called()
+
+    def test_listener_disconnecting_itself_and_returning_true(self):
+        signal = AdHocSignal()
+
+        def listener():
+            signal.disconnect(token)
+            return True
+
+        token = signal.connect(listener)
+
+        signal()
+
+        self.assertFalse(signal._connections)
+
+    def test_removed_listener_not_called_by_nested_emission(self):
+        signal = AdHocSignal()
+        oneshot = unittest.mock.Mock(return_value=True)
+        nested = False
+
+        def refire():
+            nonlocal nested
+            if not nested:
+                nested = True
+                signal()
+
+        signal.connect(oneshot)
+        signal.connect(refire)
+
+        signal()
+
+        oneshot.assert_called_once_with()
+
+    def test_dead_weak_references_are_removed_in_one_batch(self):
+        signal = AdHocSignal()
+
+        class Foo:
+            def meth(self):
+                return None
+
+        foos = [Foo(), Foo()]
+        alive = Foo()
+        for foo in foos:
+            signal.connect(foo.meth, AdHocSignal.WEAK)
+        alive_token = signal.connect(alive.meth, AdHocSignal.WEAK)
+        del foos, foo
+
+        with unittest.mock.patch.object(
+                signal, "_remove",
+                wraps=signal._remove) as _remove:
+            signal()
+
+        self.assertEqual(len(_remove.mock_calls), 1)
+        self.assertSequenceEqual(list(signal._connections), [alive_token])
+
+    def test_raising_strong_listener_is_removed(self):
+        signal = AdHocSignal()
+        signal.logger = unittest.mock.Mock()
+        fun = unittest.mock.Mock(side_effect=ValueError())
+        signal.connect(fun)
+
+        signal()
+        signal()
+
+        fun.assert_called_once_with()
+        signal.logger.exception.assert_called_once_with(unittest.mock.ANY)
+
 
 class TestSyncAdHocSignal(unittest.TestCase):
     def test_connect_and_fire(self):
@@ -1428,6 +1586,133 @@ class TestFilter(unittest.TestCase):
             calls
         )
 
+    def test_register_keeps_addition_order_within_same_order(self):
+        mock = unittest.mock.Mock()
+
+        self.f.register(mock.func1, 1)
+        self.f.register(mock.func2, 0)
+        self.f.register(mock.func3, 1)
+        self.f.register(mock.func4, 0)
+
+        self.f.filter(mock.stanza)
+
+        self.assertSequenceEqual(
+            [name for name, _, _ in mock.mock_calls],
+            ["func2", "func4", "func1", "func3"],
+        )
+
+    def test_unregister_among_same_order(self):
+        mock = unittest.mock.Mock()
+
+        self.f.register(mock.func1, 0)
+        token = self.f.register(mock.func2, 0)
+        self.f.register(mock.func3, 0)
+        self.f.register(mock.func4, -1)
+
+        self.f.unregister(token)
+        self.f.filter(mock.stanza)
+
+        self.assertSequenceEqual(
+            [name for name, _, _ in mock.mock_calls],
+            ["func4", "func1", "func3"],
+        )
+
+    def test_unregister_twice_raises_ValueError(self):
+        token = self.f.register(unittest.mock.Mock(), 0)
+        self.f.unregister(token)
+        with self.assertRaisesRegex(ValueError, "unregistered token"):
+            self.f.unregister(token)
+
+    def test_unregister_raises_ValueError_for_unhashable_token(self):
+        with self.assertRaisesRegex(ValueError, "unregistered token"):
+            self.f.unregister([])
+
+    def test_filter_returns_object_if_chain_is_empty(self):
+        obj = object()
+        self.assertIs(self.f.filter(obj, 1, foo=2), obj)
+
+        token = self.f.register(unittest.mock.Mock(), 0)
+        self.f.unregister(token)
+        self.assertIs(self.f.filter(obj), obj)
+
+    def test_changes_during_filter_take_effect_on_next_call(self):
+        mock = unittest.mock.Mock()
+
+        def func1(obj):
+            self.f.unregister(token2)
+            self.f.register(mock.func3, 0)
+            return obj
+
+        self.f.register(func1, 0)
+        token2 = self.f.register(mock.func2, 1)
+
+        self.f.filter(mock.stanza)
+        self.assertSequenceEqual(
+            [name for name, _, _ in mock.mock_calls],
+            ["func2"],
+        )
+
+    def test_metrics_and_name_default_to_None(self):
+        self.assertIsNone(self.f.metrics)
+        self.assertIsNone(self.f.name)
+
+    def test_filter_reports_timing_per_function(self):
+        mock = unittest.mock.Mock()
+        self.f.metrics = mock.hook
+        self.f.name = "chain"
+
+        self.f.register(mock.func1, 0)
+        self.f.register(mock.func2, 1)
+
+        with unittest.mock.patch("aioxmpp.metrics.clock") as clock:
+            clock.side_effect = [1.0, 1.5, 2.0, 4.0]
+            result = self.f.filter(mock.stanza, 1, foo=2)
+
+        calls = list(mock.mock_calls)
+
+        self.assertEqual(result, mock.func2())
+        self.assertSequenceEqual(
+            calls,
+            [
+                unittest.mock.call.func1(mock.stanza, 1, foo=2),
+                unittest.mock.call.hook.observe_filter(
+                    "chain", mock.func1, 0.5,
+                ),
+                unittest.mock.call.func2(mock.func1(), 1, foo=2),
+                unittest.mock.call.hook.observe_filter(
+                    "chain", mock.func2, 2.0,
+                ),
+            ]
+        )
+
+    def test_filter_reports_timing_on_abort_and_exception(self):
+        mock = unittest.mock.Mock()
+        mock.func1.return_value = None
+        mock.func2.side_effect = ValueError()
+        self.f.metrics = mock.hook
+
+        token = self.f.register(mock.func1, 0)
+        self.f.register(mock.func2, 1)
+
+        with unittest.mock.patch("aioxmpp.metrics.clock") as clock:
+            clock.side_effect = [1.0, 2.0]
+            self.assertIsNone(self.f.filter(mock.stanza))
+
+        self.f.unregister(token)
+
+        with unittest.mock.patch("aioxmpp.metrics.clock") as clock:
+            clock.side_effect = [1.0, 3.0]
+            with self.assertRaises(ValueError):
+                self.f.filter(mock.stanza)
+
+        self.assertSequenceEqual(
+            mock.hook.mock_calls,
+            [
+                unittest.mock.call.observe_filter(None, mock.func1, 1.0),
+                unittest.mock.call.observe_filter(None, mock.func2, 2.0),
+            ]
+        )
+
     def test_context_register_is_context_manager(self):
         cm = self.f.context_register(
             unittest.mock.sentinel.func,
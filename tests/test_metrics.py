@@ -0,0 +1,361 @@
+########################################################################
+# File name: test_metrics.py
+# This file is part of: aioxmpp
+#
+# LICENSE
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program.  If not, see
+# <http://www.gnu.org/licenses/>.
+#
+########################################################################
+import math
+import unittest
+import unittest.mock
+
+import aioxmpp.metrics as metrics
+import aioxmpp.tracking
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def setUp(self):
+        self.h = metrics.LatencyHistogram([1, 0.1, 10])
+
+    def test_is_available_from_tracking(self):
+        self.assertIs(
+            aioxmpp.tracking.LatencyHistogram,
+            metrics.LatencyHistogram,
+        )
+
+    def test_bounds_are_sorted(self):
+        self.assertEqual(self.h.bounds, (0.1, 1, 10))
+
+    def test_initially_empty(self):
+        self.assertEqual(self.h.count, 0)
+        self.assertEqual(self.h.sum, 0)
+        self.assertEqual(
+            self.h.buckets(),
+            [(0.1, 0), (1, 0), (10, 0), (float("inf"), 0)],
+        )
+
+    def test_observe(self):
+        for value in [0.05, 0.1, 0.5, 20]:
+            self.h.observe(value)
+
+        self.assertEqual(self.h.count, 4)
+        self.assertAlmostEqual(self.h.sum, 20.65)
+        self.assertEqual(
+            self.h.buckets(),
+            [(0.1, 2), (1, 3), (10, 3), (float("inf"), 4)],
+        )
+
+    def test_reset(self):
+        self.h.observe(1)
+        self.h.reset()
+        self.assertEqual(self.h.count, 0)
+        self.assertEqual(self.h.sum, 0)
+
+
+class TestMetricsHook(unittest.TestCase):
+    def test_methods_do_nothing(self):
+        hook = metrics.MetricsHook()
+        hook.observe(metrics.Stage.PARSE, None, 1.0)
+        hook.increment(metrics.Counter.SENT, "iq")
+        hook.observe_filter("chain", unittest.mock.sentinel.func, 1.0)
+
+
+class Testfilter_name(unittest.TestCase):
+    def test_function(self):
+        def func():
+            pass
+
+        self.assertEqual(
+            metrics.filter_name(func),
+            "tests.test_metrics.Testfilter_name.test_function.<locals>.func",
+        )
+
+    def test_bound_method(self):
+        self.assertEqual(
+            metrics.filter_name(metrics.MetricsCollector().reset),
+            "aioxmpp.metrics.MetricsCollector.reset",
+        )
+
+    def test_falls_back_to_repr(self):
+        self.assertEqual(
+            metrics.filter_name(unittest.mock.sentinel.func),
+            "sentinel.func",
+        )
+
+
+class TestMetricsCollector(unittest.TestCase):
+    def setUp(self):
+        self.c = metrics.MetricsCollector(buckets=[0.1, 1])
+
+    def test_is_hook(self):
+        self.assertIsInstance(self.c, metrics.MetricsHook)
+
+    def test_default_buckets(self):
+        c = metrics.MetricsCollector()
+        c.observe(metrics.Stage.PARSE, None, 0.001)
+        self.assertEqual(
+            c.histogram(metrics.Stage.PARSE).bounds,
+            metrics.DEFAULT_BUCKETS,
+        )
+
+    def test_histogram_is_None_without_observations(self):
+        self.assertIsNone(self.c.histogram(metrics.Stage.HANDLER, "iq"))
+
+    def test_observe_per_stage_and_kind(self):
+        self.c.observe(metrics.Stage.HANDLER, "iq", 0.05)
+        self.c.observe(metrics.Stage.HANDLER, "iq", 0.5)
+        self.c.observe(metrics.Stage.HANDLER, "message", 2)
+
+        h = self.c.histogram(metrics.Stage.HANDLER, "iq")
+        self.assertEqual(h.bounds, (0.1, 1))
+        self.assertEqual(h.count, 2)
+        self.assertEqual(
+            self.c.histogram(metrics.Stage.HANDLER, "message").count,
+            1,
+        )
+        self.assertCountEqual(
+            [key for key, _ in self.c.histograms()],
+            [
+                (metrics.Stage.HANDLER, "iq"),
+                (metrics.Stage.HANDLER, "message"),
+            ]
+        )
+
+    def test_increment(self):
+        self.c.increment(metrics.Counter.SENT, "iq")
+        self.c.increment(metrics.Counter.SENT, "iq", 2)
+        self.c.increment(metrics.Counter.DROPPED, "message")
+
+        self.assertEqual(self.c.counter(metrics.Counter.SENT, "iq"), 3)
+        self.assertEqual(self.c.counter(metrics.Counter.SENT, "message"), 0)
+        self.assertCountEqual(
+            self.c.counters(),
+            [
+                ((metrics.Counter.SENT, "iq"), 3),
+                ((metrics.Counter.DROPPED, "message"), 1),
+            ]
+        )
+
+    def test_observe_filter_per_chain_and_function(self):
+        def func():
+            pass
+
+        name = metrics.filter_name(func)
+
+        self.c.observe_filter("a", func, 0.05)
+        self.c.observe_filter("a", func, 0.5)
+        self.c.observe_filter("b", func, 2)
+
+        self.assertIsNone(self.c.filter_histogram("c", name))
+        h = self.c.filter_histogram("a", name)
+        self.assertEqual(h.bounds, (0.1, 1))
+        self.assertEqual(h.count, 2)
+        self.assertCountEqual(
+            [key for key, _ in self.c.filter_histograms()],
+            [("a", name), ("b", name)],
+        )
+        self.assertEqual(self.c.histograms(), [])
+
+    def test_reset(self):
+        self.c.observe(metrics.Stage.HANDLER, "iq", 0.05)
+        self.c.observe_filter("a", unittest.mock.sentinel.func, 0.05)
+        self.c.increment(metrics.Counter.SENT, "iq")
+        self.c.reset()
+        self.assertEqual(self.c.histograms(), [])
+        self.assertEqual(self.c.filter_histograms(), [])
+        self.assertEqual(self.c.counters(), [])
+
+
+class TestMultiHook(unittest.TestCase):
+    def test_forwards_to_all_hooks(self):
+        hooks = [unittest.mock.Mock(), unittest.mock.Mock()]
+        multi = metrics.MultiHook(hooks)
+
+        multi.observe(metrics.Stage.SERIALISE, "iq", 0.1)
+        multi.increment(metrics.Counter.SENT, "iq", 2)
+        multi.observe_filter("a", unittest.mock.sentinel.func, 0.5)
+
+        for hook in hooks:
+            self.assertSequenceEqual(
+                hook.mock_calls,
+                [
+                    unittest.mock.call.observe(
+                        metrics.Stage.SERIALISE, "iq", 0.1,
+                    ),
+                    unittest.mock.call.increment(
+                        metrics.Counter.SENT, "iq", 2,
+                    ),
+                    unittest.mock.call.observe_filter(
+                        "a", unittest.mock.sentinel.func, 0.5,
+                    ),
+                ]
+            )
+
+
+class Testformat_prometheus(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(
+            metrics.format_prometheus(metrics.MetricsCollector()),
+            "# HELP aioxmpp_stage_seconds Time spent per stanza processing "
+            "stage.\n"
+            "# TYPE aioxmpp_stage_seconds histogram\n"
+            "# HELP aioxmpp_stanzas_total Stanzas processed per event.\n"
+            "# TYPE aioxmpp_stanzas_total counter\n"
+        )
+
+    def test_histograms_and_counters(self):
+        c = metrics.MetricsCollector(buckets=[0.5])
+        c.observe(metrics.Stage.PARSE, None, 0.25)
+        c.observe(metrics.Stage.HANDLER, "iq", 0.25)
+        c.observe(metrics.Stage.HANDLER, "iq", 1)
+        c.increment(metrics.Counter.SENT, "presence", 3)
+
+        lines = metrics.format_prometheus(c, prefix="xmpp").splitlines()
+
+        self.assertSequenceEqual(
+            [line for line in lines if not line.startswith("#")],
+            [
+                'xmpp_stage_seconds_bucket'
+                '{stage="handler",kind="iq",le="0.5"} 1',
+                'xmpp_stage_seconds_bucket'
+                '{stage="handler",kind="iq",le="+Inf"} 2',
+                'xmpp_stage_seconds_sum{stage="handler",kind="iq"} 1.25',
+                'xmpp_stage_seconds_count{stage="handler",kind="iq"} 2',
+                'xmpp_stage_seconds_bucket'
+                '{stage="parse",kind="",le="0.5"} 1',
+                'xmpp_stage_seconds_bucket'
+                '{stage="parse",kind="",le="+Inf"} 1',
+                'xmpp_stage_seconds_sum{stage="parse",kind=""} 0.25',
+                'xmpp_stage_seconds_count{stage="parse",kind=""} 1',
+                'xmpp_stanzas_total{event="sent",kind="presence"} 3',
+            ]
+        )
+
+    def test_filter_histograms(self):
+        c = metrics.MetricsCollector(buckets=[0.5])
+        c.observe_filter("app_inbound_message", unittest.mock.sentinel.f, 1)
+        c.observe_filter(None, unittest.mock.sentinel.f, 0.25)
+
+        lines = metrics.format_prometheus(c, prefix="xmpp").splitlines()
+
+        self.assertSequenceEqual(
+            lines[2:],
+            [
+                "# HELP xmpp_filter_seconds Time spent per filter function.",
+                "# TYPE xmpp_filter_seconds histogram",
+                'xmpp_filter_seconds_bucket'
+                '{chain="",filter="sentinel.f",le="0.5"} 1',
+                'xmpp_filter_seconds_bucket'
+                '{chain="",filter="sentinel.f",le="+Inf"} 1',
+                'xmpp_filter_seconds_sum{chain="",filter="sentinel.f"} 0.25',
+                'xmpp_filter_seconds_count{chain="",filter="sentinel.f"} 1',
+                'xmpp_filter_seconds_bucket'
+                '{chain="app_inbound_message",filter="sentinel.f",le="0.5"} 0',
+                'xmpp_filter_seconds_bucket'
+                '{chain="app_inbound_message",filter="sentinel.f",'
+                'le="+Inf"} 1',
+                'xmpp_filter_seconds_sum'
+                '{chain="app_inbound_message",filter="sentinel.f"} 1.0',
+                'xmpp_filter_seconds_count'
+                '{chain="app_inbound_message",filter="sentinel.f"} 1',
+                "# HELP xmpp_stanzas_total Stanzas processed per event.",
+                "# TYPE xmpp_stanzas_total counter",
+            ]
+        )
+
+    def test_escapes_label_values(self):
+        self.assertEqual(
+            metrics._format_labels([("kind", 'a"b\\c\nd')]),
+            'kind="a\\"b\\\\c\\nd"',
+        )
+
+    def test_formats_infinity(self):
+        self.assertEqual(metrics._format_value(math.inf), "+Inf")
+
+
+class TestOpenTelemetryHook(unittest.TestCase):
+    def setUp(self):
+        self.meter = unittest.mock.Mock()
+        self.hook = metrics.OpenTelemetryHook(self.meter, prefix="xmpp")
+
+    def test_creates_instruments(self):
+        self.meter.create_histogram.assert_called_once_with(
+            "xmpp.stage.duration",
+            unit="s",
+            description=unittest.mock.ANY,
+        )
+        self.meter.create_counter.assert_called_once_with(
+            "xmpp.stanzas",
+            description=unittest.mock.ANY,
+        )
+
+    def test_observe_records_on_histogram(self):
+        self.hook.observe(metrics.Stage.HANDLER, "iq", 0.25)
+        self.hook.observe(metrics.Stage.PARSE, None, 0.5)
+
+        self.assertSequenceEqual(
+            self.meter.create_histogram().record.mock_calls,
+            [
+                unittest.mock.call(
+                    0.25,
+                    attributes={"stage": "handler", "kind": "iq"},
+                ),
+                unittest.mock.call(
+                    0.5,
+                    attributes={"stage": "parse"},
+                ),
+            ]
+        )
+
+    def test_increment_adds_to_counter(self):
+        self.hook.increment(metrics.Counter.DROPPED, "message", 2)
+
+        self.meter.create_counter().add.assert_called_once_with(
+            2,
+            attributes={"event": "dropped", "kind": "message"},
+        )
+
+    def test_observe_filter_creates_histogram_on_first_use(self):
+        meter = unittest.mock.Mock()
+        filter_histogram = unittest.mock.Mock()
+        hook = metrics.OpenTelemetryHook(meter, prefix="xmpp")
+        meter.create_histogram.reset_mock()
+        meter.create_histogram.return_value = filter_histogram
+
+        hook.observe_filter("app_inbound_message",
+                            unittest.mock.sentinel.f, 0.25)
+        hook.observe_filter(None, unittest.mock.sentinel.f, 0.5)
+
+        meter.create_histogram.assert_called_once_with(
+            "xmpp.filter.duration",
+            unit="s",
+            description=unittest.mock.ANY,
+        )
+        self.assertSequenceEqual(
+            filter_histogram.record.mock_calls,
+            [
+                unittest.mock.call(
+                    0.25,
+                    attributes={"chain": "app_inbound_message",
+                                "filter": "sentinel.f"},
+                ),
+                unittest.mock.call(
+                    0.5,
+                    attributes={"chain": "", "filter": "sentinel.f"},
+                ),
+            ]
+        )
@@ -33,6 +33,7 @@ import aioxmpp.structs as structs
 import aioxmpp.xso as xso
 import aioxmpp.nonza as nonza
 import aioxmpp.errors as errors
+import aioxmpp.metrics as metrics
 import aioxmpp.utils
 
 from aioxmpp.testutils import (
@@ -45,7 +46,7 @@ from aioxmpp.testutils import (
 )
 from aioxmpp import xmltestutils
 
-from aioxmpp.protocol import XMLStream, DebugWrapper
+from aioxmpp.protocol import XMLStream, DebugWrapper, WireDumpSampler
 from aioxmpp.structs import JID
 from aioxmpp.utils import namespaces
 
@@ -269,6 +270,44 @@ class TestDebugWrapper(unittest.TestCase):
             b"foo<!-- some bytes omitted --><!-- some bytes omitted -->baz"
         )
 
+    def test_sampler_selects_written_data(self):
+        sampler = unittest.mock.Mock()
+        sampler.side_effect = [True, False, True]
+        dw = DebugWrapper(self.buf, self.logger, sampler)
+
+        dw.write(b"foo")
+        dw.write(b"bar")
+        dw.write(b"baz")
+
+        self.assertSequenceEqual(
+            self.buf.write.mock_calls,
+            [
+                unittest.mock.call(b"foo"),
+                unittest.mock.call(b"bar"),
+                unittest.mock.call(b"baz"),
+            ]
+        )
+
+        dw.flush()
+
+        self.assertSequenceEqual(
+            sampler.mock_calls,
+            [
+                unittest.mock.call(b"foo"),
+                unittest.mock.call(b"bar"),
+                unittest.mock.call(b"baz"),
+            ]
+        )
+        self.logger.debug.assert_called_once_with("SENT %r", b"foobaz")
+
+    def test_flush_without_data_does_not_log(self):
+        dw = DebugWrapper(self.buf, self.logger, lambda data: False)
+        dw.write(b"foo")
+        dw.flush()
+
+        self.buf.flush.assert_called_once_with()
+        self.logger.debug.assert_not_called()
+
     def test_mute_correctly_unmutes_on_exception(self):
         class FooException(Exception):
             pass
@@ -298,6 +337,69 @@ class TestDebugWrapper(unittest.TestCase):
         )
 
 
+class TestWireDumpSampler(unittest.TestCase):
+    def test_default_selects_everything(self):
+        sampler = WireDumpSampler()
+        for i in range(3):
+            self.assertTrue(sampler(b"foo"))
+
+    def test_every(self):
+        sampler = WireDumpSampler(every=3)
+        self.assertSequenceEqual(
+            [sampler(b"foo") for i in range(7)],
+            [False, False, True, False, False, True, False],
+        )
+
+    def test_every_must_be_positive(self):
+        with self.assertRaisesRegex(ValueError, "at least 1"):
+            WireDumpSampler(every=0)
+
+    def test_jids(self):
+        sampler = WireDumpSampler(jids=[TEST_PEER, JID.fromstr("x@y.z/r")])
+        self.assertTrue(sampler(b"<iq to='bar.example/foo'/>"))
+        self.assertTrue(sampler(b"<message from='x@y.z/r'/>"))
+        self.assertFalse(sampler(b"<message from='x@y.z/other'/>"))
+        self.assertFalse(sampler(b"<presence/>"))
+
+    def test_jids_with_memoryview(self):
+        sampler = WireDumpSampler(jids=[TEST_PEER])
+        self.assertTrue(sampler(memoryview(b"<iq to='bar.example/foo'/>")))
+        self.assertTrue(sampler(bytearray(b"<iq to='bar.example/foo'/>")))
+        self.assertFalse(sampler(memoryview(b"<presence/>")))
+
+    def test_jids_with_memoryview_through_debug_wrapper(self):
+        dest = io.BytesIO()
+        logger = unittest.mock.Mock()
+        wrapper = DebugWrapper(dest, logger,
+                               WireDumpSampler(jids=[TEST_PEER]))
+
+        buf = io.BytesIO()
+        buf.write(b"<iq to='bar.example/foo'/>")
+        wrapper.write(buf.getbuffer())
+        wrapper.write(memoryview(b"<presence/>"))
+        wrapper.flush()
+
+        self.assertEqual(
+            dest.getvalue(),
+            b"<iq to='bar.example/foo'/><presence/>",
+        )
+        logger.debug.assert_called_once_with(
+            "SENT %r", b"<iq to='bar.example/foo'/>",
+        )
+
+    def test_jids_and_every(self):
+        sampler = WireDumpSampler(every=2, jids=[TEST_PEER])
+        self.assertSequenceEqual(
+            [
+                sampler(b"<presence/>"),
+                sampler(b"<iq to='bar.example'/>"),
+                sampler(b"<presence/>"),
+                sampler(b"<iq to='bar.example'/>"),
+            ],
+            [False, False, False, True],
+        )
+
+
 class TestXMLStream(unittest.TestCase):
     def setUp(self):
         self.maxDiff = None
@@ -2303,6 +2405,68 @@ class TestXMLStream(unittest.TestCase):
 
         self.monitor.notify_received.assert_called_once_with()
 
+    def test_data_received_logs_data(self):
+        logger = logging.getLogger("test")
+        logger.setLevel(logging.DEBUG)
+        t, p = self._make_stream(to=TEST_PEER, base_logger=logger)
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(unittest.mock.patch.object(p, "_rx_feed"))
+            cm = stack.enter_context(
+                self.assertLogs("test.XMLStream", logging.DEBUG)
+            )
+            p.data_received(b"foo")
+
+        self.assertEqual(cm.records[0].getMessage(), "RECV b'foo'")
+
+    def test_data_received_consults_wire_dump_sampler(self):
+        logger = logging.getLogger("test")
+        logger.setLevel(logging.DEBUG)
+        t, p = self._make_stream(to=TEST_PEER, base_logger=logger)
+        p.wire_dump_sampler = unittest.mock.Mock()
+        p.wire_dump_sampler.return_value = False
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(unittest.mock.patch.object(p, "_rx_feed"))
+            debug = stack.enter_context(
+                unittest.mock.patch.object(p._logger, "debug")
+            )
+            p.data_received(b"foo")
+
+        p.wire_dump_sampler.assert_called_once_with(b"foo")
+        debug.assert_not_called()
+
+    def test_data_received_skips_sampler_without_debug_logging(self):
+        logger = logging.getLogger("test")
+        logger.setLevel(logging.INFO)
+        t, p = self._make_stream(to=TEST_PEER, base_logger=logger)
+        p.wire_dump_sampler = unittest.mock.Mock()
+
+        with unittest.mock.patch.object(p, "_rx_feed"):
+            p.data_received(b"foo")
+
+        p.wire_dump_sampler.assert_not_called()
+
+    def test_metrics_default_to_None(self):
+        t, p = self._make_stream(to=TEST_PEER)
+        self.assertIsNone(p.metrics)
+
+    def test_rx_feed_reports_parse_time(self):
+        t, p = self._make_stream(to=TEST_PEER)
+        p.metrics = unittest.mock.Mock()
+
+        with unittest.mock.patch.object(p, "_parser", create=True) as parser:
+            p._rx_feed(unittest.mock.sentinel.blob)
+
+        parser.feed.assert_called_once_with(unittest.mock.sentinel.blob)
+        p.metrics.observe.assert_called_once_with(
+            metrics.Stage.PARSE,
+            None,
+            unittest.mock.ANY,
+        )
+        _, (_, _, value), _ = p.metrics.observe.mock_calls[0]
+        self.assertGreaterEqual(value, 0)
+
     def test_customize_stream_from(self):
         t, p = self._make_stream(
             to=TEST_PEER,
@@ -1233,6 +1233,71 @@ class TestIQ(unittest.TestCase):
             iq.validate()
 
 
+class TestStanzaSummary(unittest.TestCase):
+    def test_message(self):
+        msg = stanza.Message(
+            type_=structs.MessageType.CHAT,
+            from_=TEST_FROM,
+            to=TEST_TO,
+            id_="foo",
+        )
+        msg.body[None] = "secret"
+
+        summary = stanza.StanzaSummary(msg)
+
+        self.assertDictEqual(
+            summary.as_dict(),
+            {
+                "kind": "message",
+                "type": "chat",
+                "id": "foo",
+                "from": str(TEST_FROM),
+                "to": str(TEST_TO),
+                "payload": ["{jabber:client}body"],
+            }
+        )
+        self.assertEqual(
+            repr(summary),
+            "<message type=chat id=foo from=foo@example.test "
+            "to=bar@example.test payload=[{jabber:client}body]>"
+        )
+        self.assertNotIn("secret", repr(summary))
+
+    def test_iq_payload_is_not_formatted(self):
+        iq = stanza.IQ(type_=structs.IQType.GET, payload=TestPayload())
+
+        with unittest.mock.patch.object(TestPayload, "__repr__") as repr_:
+            data = stanza.StanzaSummary(iq).as_dict()
+
+        repr_.assert_not_called()
+        self.assertEqual(data["kind"], "iq")
+        self.assertEqual(data["type"], "get")
+        self.assertEqual(data["payload"], ["{foo}bar"])
+
+    def test_available_presence_without_addresses(self):
+        pres = stanza.Presence()
+
+        self.assertDictEqual(
+            stanza.StanzaSummary(pres).as_dict(),
+            {
+                "kind": "presence",
+                "type": None,
+                "id": None,
+                "from": None,
+                "to": None,
+                "payload": [],
+            }
+        )
+
+    def test_is_lazy(self):
+        msg = stanza.Message(type_=structs.MessageType.CHAT)
+        summary = stanza.StanzaSummary(msg)
+        self.assertIs(summary.stanza, msg)
+
+        msg.id_ = "late"
+        self.assertEqual(summary.as_dict()["id"], "late")
+
+
 class Testmake_application_error(unittest.TestCase):
     def setUp(self):
         self._stack_ctx = contextlib.ExitStack()
@@ -23,6 +23,7 @@ import asyncio
 import contextlib
 import functools
 import ipaddress
+import logging
 import time
 import unittest
 import warnings
@@ -40,6 +41,7 @@ import aioxmpp.errors as errors
 import aioxmpp.callbacks as callbacks
 import aioxmpp.service as service
 import aioxmpp.dispatcher
+import aioxmpp.metrics as metrics
 
 from datetime import timedelta
 
@@ -4144,6 +4146,235 @@ class TestStanzaStream(StanzaStreamTestBase):
         )
 
 
+class TestStanzaStreamMetrics(StanzaStreamTestBase):
+    def setUp(self):
+        super().setUp()
+        self.collector = metrics.MetricsCollector()
+
+    def test_metrics_default_to_None(self):
+        self.assertIsNone(self.stream.metrics)
+
+    def test_metrics_are_handed_to_xmlstream(self):
+        self.stream.metrics = self.collector
+        self.stream.start(self.xmlstream)
+        self.assertIs(self.xmlstream.metrics, self.collector)
+        run_coroutine(asyncio.sleep(0))
+
+        self.stream.metrics = None
+        self.assertIsNone(self.xmlstream.metrics)
+
+    def test_filters_are_named(self):
+        for name in ["app_inbound_presence", "service_inbound_presence",
+                     "app_inbound_message", "service_inbound_message",
+                     "app_outbound_presence", "service_outbound_presence",
+                     "app_outbound_message", "service_outbound_message"]:
+            filter_ = getattr(self.stream, name + "_filter")
+            self.assertEqual(filter_.name, name)
+            self.assertIsNone(filter_.metrics)
+
+    def test_metrics_are_handed_to_filters(self):
+        self.stream.metrics = self.collector
+        for name in stream.StanzaStream._FILTER_NAMES:
+            self.assertIs(
+                getattr(self.stream, name + "_filter").metrics,
+                self.collector,
+            )
+
+        self.stream.metrics = None
+        for name in stream.StanzaStream._FILTER_NAMES:
+            self.assertIsNone(getattr(self.stream, name + "_filter").metrics)
+
+    def test_inbound_message_filter_timing(self):
+        self.stream.metrics = self.collector
+
+        def filter_func(stanza):
+            return stanza
+
+        self.stream.service_inbound_message_filter.register(filter_func, 0)
+
+        fut = asyncio.Future()
+        self.stream.on_message_received.connect(fut.set_result)
+
+        self.stream.start(self.xmlstream)
+        self.stream.recv_stanza(make_test_message())
+        run_coroutine(fut)
+
+        self.assertCountEqual(
+            [key for key, _ in self.collector.filter_histograms()],
+            [
+                ("service_inbound_message",
+                 metrics.filter_name(filter_func)),
+            ]
+        )
+
+    def test_inbound_message(self):
+        self.stream.metrics = self.collector
+
+        fut = asyncio.Future()
+        self.stream.on_message_received.connect(fut.set_result)
+
+        self.stream.start(self.xmlstream)
+        self.stream.recv_stanza(make_test_message())
+        run_coroutine(fut)
+
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.RECEIVED, "message"),
+            1,
+        )
+        for stage in [metrics.Stage.DISPATCH,
+                      metrics.Stage.INBOUND_FILTER,
+                      metrics.Stage.HANDLER]:
+            self.assertEqual(
+                self.collector.histogram(stage, "message").count,
+                1,
+                stage,
+            )
+
+    def test_inbound_message_dropped_by_filter(self):
+        self.stream.metrics = self.collector
+
+        filter_func = unittest.mock.Mock()
+        filter_func.return_value = None
+        self.stream.app_inbound_message_filter.register(filter_func, 0)
+
+        self.stream.start(self.xmlstream)
+        self.stream.recv_stanza(make_test_message())
+        run_coroutine(asyncio.sleep(0))
+
+        filter_func.assert_called_once_with(unittest.mock.ANY)
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.DROPPED, "message"),
+            1,
+        )
+        self.assertEqual(
+            self.collector.histogram(
+                metrics.Stage.INBOUND_FILTER, "message"
+            ).count,
+            1,
+        )
+        self.assertIsNone(
+            self.collector.histogram(metrics.Stage.HANDLER, "message"),
+        )
+
+    def test_inbound_iq_response(self):
+        self.stream.metrics = self.collector
+
+        iq = make_test_iq(type_=structs.IQType.RESULT)
+        fut = asyncio.Future()
+        self.stream.register_iq_response_future(TEST_FROM, iq.id_, fut)
+
+        self.stream.start(self.xmlstream)
+        self.stream.recv_stanza(iq)
+        run_coroutine(fut)
+
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.RECEIVED, "iq"),
+            1,
+        )
+        self.assertEqual(
+            self.collector.histogram(metrics.Stage.HANDLER, "iq").count,
+            1,
+        )
+        self.assertIsNone(
+            self.collector.histogram(metrics.Stage.INBOUND_FILTER, "iq"),
+        )
+
+    def test_outbound_presence(self):
+        self.stream.metrics = self.collector
+
+        pres = make_test_presence()
+        self.stream._enqueue(pres)
+        self.stream.start(self.xmlstream)
+
+        self.assertIs(run_coroutine(self.sent_stanzas.get()), pres)
+
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.SENT, "presence"),
+            1,
+        )
+        for stage in [metrics.Stage.OUTBOUND_QUEUE,
+                      metrics.Stage.OUTBOUND_FILTER,
+                      metrics.Stage.SERIALISE]:
+            self.assertEqual(
+                self.collector.histogram(stage, "presence").count,
+                1,
+                stage,
+            )
+
+    def test_outbound_failure_is_counted(self):
+        self.stream.metrics = self.collector
+
+        self.xmlstream.send_xso = unittest.mock.Mock(
+            side_effect=ValueError()
+        )
+        token = self.stream._enqueue(make_test_iq())
+        self.stream.start(self.xmlstream)
+        run_coroutine(asyncio.sleep(0))
+
+        self.assertEqual(token.state, stream.StanzaState.FAILED)
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.FAILED, "iq"),
+            1,
+        )
+        self.assertEqual(
+            self.collector.counter(metrics.Counter.SENT, "iq"),
+            0,
+        )
+
+    def test_no_timestamps_without_metrics(self):
+        token = self.stream._enqueue(make_test_iq())
+        self.stream.start(self.xmlstream)
+        run_coroutine(self.sent_stanzas.get())
+
+        self.assertIsNone(token._queued_at)
+        self.assertIsNone(token._sent_at)
+
+
+class TestStanzaStreamLogging(StanzaStreamTestBase):
+    def test_structured_logging_defaults_to_false(self):
+        self.assertFalse(stream.StanzaStream.structured_logging)
+        self.assertFalse(self.stream.structured_logging)
+
+    def test_logs_stanza(self):
+        iq = make_test_iq()
+
+        with self.assertLogs("aioxmpp.StanzaStream", logging.DEBUG) as cm:
+            token = self.stream._enqueue(iq)
+
+        record, = cm.records
+        self.assertEqual(record.args, (iq, token))
+        self.assertFalse(hasattr(record, "stanza"))
+
+    def test_structured_logging(self):
+        self.stream.structured_logging = True
+        iq = make_test_iq()
+
+        with self.assertLogs("aioxmpp.StanzaStream", logging.DEBUG) as cm:
+            token = self.stream._enqueue(iq)
+
+        record, = cm.records
+        summary, token_arg = record.args
+        self.assertIsInstance(summary, stanza.StanzaSummary)
+        self.assertIs(summary.stanza, iq)
+        self.assertIs(token_arg, token)
+        self.assertIs(record.stanza, summary)
+        self.assertIn("payload=[{uri:tests:test_stream.py}foo]",
+                      record.getMessage())
+
+    def test_no_stanza_logging_if_debug_is_disabled(self):
+        self.stream._logger = unittest.mock.Mock(["isEnabledFor", "debug"])
+        self.stream._logger.isEnabledFor.return_value = False
+
+        with unittest.mock.patch.object(
+                self.stream, "_debug_stanza") as _debug_stanza:
+            self.stream._enqueue(make_test_iq())
+            self.stream._process_incoming_message(make_test_message())
+            self.stream._process_incoming_presence(make_test_presence())
+
+        self.stream._logger.isEnabledFor.assert_called_with(logging.DEBUG)
+        _debug_stanza.assert_not_called()
+
+
 class TestStanzaStreamSM(StanzaStreamTestBase):
     def setUp(self):
         super().setUp()
@@ -5139,6 +5370,36 @@ class TestStanzaStreamSM(StanzaStreamTestBase):
         with self.assertRaises(errors.StreamNegotiationFailure):
             self.stream.sm_ack(1)
 
+    def test_sm_ack_latency_is_reported(self):
+        collector = metrics.MetricsCollector()
+        self.stream.metrics = collector
+
+        iq = make_test_iq()
+
+        self.stream.start(self.xmlstream)
+        run_coroutine_with_peer(
+            self.stream.start_sm(),
+            self.xmlstream.run_test(self.successful_sm)
+        )
+
+        self.stream._enqueue(iq)
+
+        run_coroutine(self.xmlstream.run_test([
+            XMLStreamMock.Send(iq),
+            XMLStreamMock.Send(
+                nonza.SMRequest(),
+                response=XMLStreamMock.Receive(
+                    nonza.SMAcknowledgement(counter=1)
+                )
+            )
+        ]))
+        run_coroutine(asyncio.sleep(0))
+
+        self.assertEqual(
+            collector.histogram(metrics.Stage.SM_ACK, "iq").count,
+            1,
+        )
+
     def test_stop_sm(self):
         self.stream.start(self.xmlstream)
         run_coroutine_with_peer(
@@ -22,6 +22,7 @@
 import collections.abc
 import enum
 import unittest
+import unittest.mock
 import warnings
 
 import aioxmpp
@@ -1027,6 +1028,21 @@ class TestLanguageTag(unittest.TestCase):
         with self.assertRaises(AttributeError):
             tag.foo = "bar"
 
+    def test_fromstr_interns_instances(self):
+        tag1 = structs.LanguageTag.fromstr("de-DE")
+        tag2 = structs.LanguageTag.fromstr("de-DE")
+        tag3 = structs.LanguageTag.fromstr("de-de")
+        self.assertIs(tag1, tag2)
+        self.assertIsNot(tag1, tag3)
+        self.assertEqual(tag1, tag3)
+        self.assertEqual(tag3.print_str, "de-de")
+
+    def test_fromstr_does_not_mix_classes(self):
+        tag = structs.LanguageTag.fromstr("en")
+        range_ = structs.LanguageRange.fromstr("en")
+        self.assertIsInstance(tag, structs.LanguageTag)
+        self.assertIsInstance(range_, structs.LanguageRange)
+
 
 class TestLanguageRange(unittest.TestCase):
     def test_init_requires_kwargs(self):
@@ -1122,6 +1138,16 @@ class TestLanguageRange(unittest.TestCase):
         with self.assertRaises(AttributeError):
             r.foo = "bar"
 
+    def test_fromstr_interns_instances(self):
+        self.assertIs(
+            structs.LanguageRange.fromstr("en-GB"),
+            structs.LanguageRange.fromstr("en-GB"),
+        )
+        self.assertIs(
+            structs.LanguageRange.fromstr("de-DE").strip_rightmost(),
+            structs.LanguageRange.fromstr("de"),
+        )
+
 
 class Testbasic_filter_languages(unittest.TestCase):
     def setUp(self):
@@ -1274,6 +1300,63 @@ class Testlookup_language(unittest.TestCase):
         )
 
 
+class Testnegotiate_language(unittest.TestCase):
+    def setUp(self):
+        structs._negotiate_language.cache_clear()
+        self.languages = list(map(structs.LanguageTag.fromstr, [
+            "it",
+            "fr-CH",
+            "de-Latn-DE-1999",
+        ]))
+
+    def tearDown(self):
+        structs._negotiate_language.cache_clear()
+
+    def test_equals_lookup_language_on_sorted_languages(self):
+        for ranges in [["en", "fr-ch", "de-de"], ["it"], ["en"],
+                       ["de-de", "en-GB", "en"], ["fr-FR", "de-DE", "fr"],
+                       ["*"]]:
+            ranges = list(map(structs.LanguageRange.fromstr, ranges))
+            self.assertEqual(
+                structs.lookup_language(sorted(self.languages), ranges),
+                structs.negotiate_language(self.languages, ranges),
+                ranges,
+            )
+
+    def test_result_is_cached(self):
+        ranges = [structs.LanguageRange.fromstr("fr")]
+        with unittest.mock.patch(
+                "aioxmpp.structs.lookup_language") as lookup_language:
+            result1 = structs.negotiate_language(self.languages, ranges)
+            result2 = structs.negotiate_language(
+                reversed(self.languages),
+                iter(ranges),
+            )
+
+        lookup_language.assert_called_once_with(
+            sorted(self.languages),
+            tuple(ranges),
+        )
+        self.assertEqual(result1, lookup_language())
+        self.assertEqual(result2, lookup_language())
+
+    def test_cache_key_includes_ranges(self):
+        self.assertEqual(
+            structs.negotiate_language(
+                self.languages,
+                [structs.LanguageRange.fromstr("it")],
+            ),
+            structs.LanguageTag.fromstr("it"),
+        )
+        self.assertEqual(
+            structs.negotiate_language(
+                self.languages,
+                [structs.LanguageRange.fromstr("fr")],
+            ),
+            structs.LanguageTag.fromstr("fr-CH"),
+        )
+
+
 class TestLanguageMap(unittest.TestCase):
     def test_implements_mapping(self):
         mapping = structs.LanguageMap()
@@ -1457,6 +1540,28 @@ class TestLanguageMap(unittest.TestCase):
             mapping.lookup([structs.LanguageRange.fromstr("it")])
         )
 
+    def test_lookup_negotiates_over_keys_without_None(self):
+        mapping = structs.LanguageMap()
+        mapping[None] = "foobar"
+        mapping[structs.LanguageTag.fromstr("de")] = "Test"
+        mapping[structs.LanguageTag.fromstr("en")] = "test"
+        ranges = [structs.LanguageRange.fromstr("de")]
+
+        with unittest.mock.patch(
+                "aioxmpp.structs.negotiate_language") as negotiate_language:
+            negotiate_language.return_value = \
+                structs.LanguageTag.fromstr("en")
+            result = mapping.lookup(ranges)
+
+        negotiate_language.assert_called_once_with(
+            {
+                structs.LanguageTag.fromstr("de"),
+                structs.LanguageTag.fromstr("en"),
+            },
+            ranges,
+        )
+        self.assertEqual(result, "test")
+
     def test_any_returns_only_key(self):
         m = structs.LanguageMap()
         m[None] = "fnord"
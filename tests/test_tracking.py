@@ -27,6 +27,7 @@ import unittest.mock
 
 from datetime import timedelta
 
+import aioxmpp.misc
 import aioxmpp.service
 import aioxmpp.tracking as tracking
 
@@ -34,6 +35,7 @@ from aioxmpp.utils import namespaces
 
 from aioxmpp.testutils import (
     make_connected_client,
+    run_coroutine,
 )
 
 
@@ -367,6 +369,285 @@ class TestMessageTracker(unittest.TestCase):
         )
 
 
+class TestTrackingStore(unittest.TestCase):
+    def setUp(self):
+        self.store = tracking.TrackingStore()
+
+    def tearDown(self):
+        self.store.close()
+
+    def _make_message(self, id_, origin_id=None):
+        msg = aioxmpp.Message(
+            type_=aioxmpp.MessageType.CHAT,
+            from_=TEST_LOCAL,
+            to=TEST_PEER,
+            id_=id_,
+        )
+        if origin_id is not None:
+            msg.xep0359_origin_id = aioxmpp.misc.OriginID(origin_id)
+        return msg
+
+    def _make_reply(self, id_):
+        return aioxmpp.Message(
+            type_=aioxmpp.MessageType.CHAT,
+            from_=TEST_PEER,
+            to=TEST_LOCAL,
+            id_=id_,
+        )
+
+    def test_add_and_lookup_by_id(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo"))
+
+        self.assertIn(tracker, self.store)
+        self.assertEqual(len(self.store), 1)
+        self.assertIs(self.store.lookup_by_id(TEST_PEER, "foo"), tracker)
+        self.assertIs(
+            self.store.lookup_by_id(TEST_PEER.bare(), "foo"),
+            tracker,
+        )
+        self.assertIsNone(self.store.lookup_by_id(TEST_PEER, "bar"))
+
+    def test_add_rejects_closed_tracker(self):
+        tracker = tracking.MessageTracker()
+        tracker.close()
+        with self.assertRaises(ValueError):
+            self.store.add(tracker, self._make_message("foo"))
+
+    def test_lookup_by_origin_id(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo", origin_id="oid"))
+        self.assertIs(self.store.lookup_by_origin_id("oid"), tracker)
+        self.assertIsNone(self.store.lookup_by_origin_id("foo"))
+
+    def test_lookup_by_stanza_id(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo"))
+        self.store.add_stanza_id(tracker, TEST_PEER.bare(), "sid")
+        self.assertIs(
+            self.store.lookup_by_stanza_id(TEST_PEER.bare(), "sid"),
+            tracker,
+        )
+        self.assertIsNone(self.store.lookup_by_stanza_id(TEST_LOCAL, "sid"))
+
+    def test_add_stanza_id_requires_tracker_in_store(self):
+        with self.assertRaises(KeyError):
+            self.store.add_stanza_id(tracking.MessageTracker(),
+                                     TEST_PEER, "sid")
+
+    def test_match(self):
+        t1 = tracking.MessageTracker()
+        t2 = tracking.MessageTracker()
+        t3 = tracking.MessageTracker()
+        self.store.add(t1, self._make_message("id1", origin_id="oid1"))
+        self.store.add(t2, self._make_message("id2"))
+        self.store.add(t3, self._make_message("id3"))
+        self.store.add_stanza_id(t3, TEST_PEER.bare(), "sid3")
+
+        reply = self._make_reply("unrelated")
+        reply.xep0359_origin_id = aioxmpp.misc.OriginID("oid1")
+        self.assertIs(self.store.match(reply), t1)
+
+        self.assertIs(self.store.match(self._make_reply("id2")), t2)
+
+        reply = self._make_reply("unrelated")
+        reply.xep0359_stanza_ids.append(
+            aioxmpp.misc.StanzaID(id_="sid3", by=TEST_PEER.bare())
+        )
+        self.assertIs(self.store.match(reply), t3)
+
+        self.assertIsNone(self.store.match(self._make_reply("unrelated")))
+
+    def test_match_rejects_ids_from_other_senders(self):
+        t1 = tracking.MessageTracker()
+        self.store.add(t1, self._make_message("id1", origin_id="oid1"))
+        self.store.add_stanza_id(t1, TEST_PEER.bare(), "sid1")
+
+        reply = self._make_reply("unrelated")
+        reply.from_ = TEST_LOCAL
+        reply.xep0359_origin_id = aioxmpp.misc.OriginID("oid1")
+        reply.xep0359_stanza_ids.append(
+            aioxmpp.misc.StanzaID(id_="sid1", by=TEST_PEER.bare())
+        )
+        self.assertIsNone(self.store.match(reply))
+
+    def test_match_tolerates_broken_stanzas(self):
+        self.assertIsNone(self.store.match(object()))
+
+    def test_discard(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo", origin_id="oid"))
+        self.store.discard(tracker)
+
+        self.assertNotIn(tracker, self.store)
+        self.assertIsNone(self.store.lookup_by_id(TEST_PEER, "foo"))
+        self.assertIsNone(self.store.lookup_by_origin_id("oid"))
+        self.assertFalse(tracker.closed)
+
+        # idempotent
+        self.store.discard(tracker)
+
+    def test_discard_keeps_index_of_newer_tracker(self):
+        t1 = tracking.MessageTracker()
+        t2 = tracking.MessageTracker()
+        self.store.add(t1, self._make_message("foo"))
+        self.store.add(t2, self._make_message("foo"))
+        self.store.discard(t1)
+        self.assertIs(self.store.lookup_by_id(TEST_PEER, "foo"), t2)
+
+    def test_closing_tracker_removes_it(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo"))
+        tracker.close()
+        self.assertNotIn(tracker, self.store)
+        self.assertIsNone(self.store.lookup_by_id(TEST_PEER, "foo"))
+
+    def test_readding_tracker_updates_indices(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("foo"))
+        self.store.add(tracker, self._make_message("bar"))
+        self.assertEqual(len(self.store), 1)
+        self.assertIsNone(self.store.lookup_by_id(TEST_PEER, "foo"))
+        self.assertIs(self.store.lookup_by_id(TEST_PEER, "bar"), tracker)
+
+    def test_max_trackers_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            tracking.TrackingStore(max_trackers=0)
+
+    def test_eviction_close_oldest(self):
+        self.store.max_trackers = 2
+        trackers = [tracking.MessageTracker() for _ in range(3)]
+        for i, tracker in enumerate(trackers):
+            self.store.add(tracker, self._make_message(str(i)))
+
+        self.assertEqual(len(self.store), 2)
+        self.assertTrue(trackers[0].closed)
+        self.assertNotIn(trackers[0], self.store)
+        self.assertIn(trackers[1], self.store)
+        self.assertIn(trackers[2], self.store)
+
+    def test_eviction_discard_oldest(self):
+        self.store.max_trackers = 1
+        self.store.eviction_policy = tracking.EvictionPolicy.DISCARD_OLDEST
+        t1 = tracking.MessageTracker()
+        t2 = tracking.MessageTracker()
+        self.store.add(t1, self._make_message("1"))
+        self.store.add(t2, self._make_message("2"))
+
+        self.assertFalse(t1.closed)
+        self.assertNotIn(t1, self.store)
+        self.assertIn(t2, self.store)
+
+    def test_eviction_reject(self):
+        self.store.max_trackers = 1
+        self.store.eviction_policy = tracking.EvictionPolicy.REJECT
+        t1 = tracking.MessageTracker()
+        t2 = tracking.MessageTracker()
+        self.store.add(t1, self._make_message("1"))
+        with self.assertRaisesRegex(RuntimeError, "full"):
+            self.store.add(t2, self._make_message("2"))
+
+        self.assertIn(t1, self.store)
+        self.assertNotIn(t2, self.store)
+        # re-adding a tracker which is in the store is fine
+        self.store.add(t1, self._make_message("1"))
+
+    def test_timeout_closes_tracker(self):
+        store = tracking.TrackingStore(timeout=0.02, timer_resolution=0.01)
+        t1 = tracking.MessageTracker()
+        t2 = tracking.MessageTracker()
+        store.add(t1, self._make_message("1"))
+        store.add(t2, self._make_message("2"), timeout=timedelta(seconds=1))
+
+        run_coroutine(asyncio.sleep(0.1))
+
+        self.assertTrue(t1.closed)
+        self.assertNotIn(t1, store)
+        self.assertFalse(t2.closed)
+        store.close()
+
+    def test_timeouts_beyond_one_wheel_revolution(self):
+        store = tracking.TrackingStore(timer_resolution=0.0001)
+        tracker = tracking.MessageTracker()
+        # 512 slots at 0.1 ms cover 51.2 ms per revolution
+        store.add(tracker, self._make_message("1"), timeout=0.12)
+
+        run_coroutine(asyncio.sleep(0.06))
+        self.assertFalse(tracker.closed)
+
+        run_coroutine(asyncio.sleep(0.2))
+        self.assertTrue(tracker.closed)
+        store.close()
+
+    def test_uses_single_timer_handle(self):
+        store = tracking.TrackingStore(timeout=10)
+        loop = asyncio.get_event_loop()
+        with unittest.mock.patch.object(loop, "call_at") as call_at:
+            for i in range(10):
+                store.add(tracking.MessageTracker(),
+                          self._make_message(str(i)))
+
+        call_at.assert_called_once_with(unittest.mock.ANY, unittest.mock.ANY)
+
+    def test_discard_cancels_timeout(self):
+        store = tracking.TrackingStore(timeout=0.02, timer_resolution=0.01)
+        tracker = tracking.MessageTracker()
+        store.add(tracker, self._make_message("1"))
+        store.discard(tracker)
+
+        run_coroutine(asyncio.sleep(0.05))
+        self.assertFalse(tracker.closed)
+        store.close()
+
+    def test_records_latency(self):
+        loop = asyncio.get_event_loop()
+        tracker = tracking.MessageTracker()
+
+        with unittest.mock.patch.object(loop, "time") as time:
+            time.return_value = 100
+            self.store.add(tracker, self._make_message("1"))
+            time.return_value = 100.2
+            tracker._set_state(tracking.MessageState.DELIVERED_TO_SERVER)
+            time.return_value = 101.5
+            tracker._set_state(tracking.MessageState.DELIVERED_TO_RECIPIENT)
+            tracker._set_state(tracking.MessageState.DELIVERED_TO_RECIPIENT)
+
+        latency = self.store.latency
+        self.assertEqual(
+            latency[tracking.MessageState.DELIVERED_TO_SERVER].count,
+            1,
+        )
+        self.assertAlmostEqual(
+            latency[tracking.MessageState.DELIVERED_TO_SERVER].sum,
+            0.2,
+        )
+        self.assertEqual(
+            latency[tracking.MessageState.DELIVERED_TO_RECIPIENT].count,
+            1,
+        )
+        self.assertAlmostEqual(
+            latency[tracking.MessageState.DELIVERED_TO_RECIPIENT].sum,
+            1.5,
+        )
+        self.assertEqual(
+            latency[tracking.MessageState.SEEN_BY_RECIPIENT].count,
+            0,
+        )
+        self.assertNotIn(tracking.MessageState.ERROR, latency)
+
+    def test_discarded_trackers_do_not_record_latency(self):
+        tracker = tracking.MessageTracker()
+        self.store.add(tracker, self._make_message("1"))
+        self.store.discard(tracker)
+        tracker._set_state(tracking.MessageState.DELIVERED_TO_SERVER)
+        self.assertEqual(
+            self.store.latency[
+                tracking.MessageState.DELIVERED_TO_SERVER
+            ].count,
+            0,
+        )
+
+
 class TestBasicTrackingService(unittest.TestCase):
     def setUp(self):
         self.cc = make_connected_client()
@@ -754,6 +1035,66 @@ class TestBasicTrackingService(unittest.TestCase):
         )
         self.assertTrue(tracker.closed)
 
+    def test_tracking_store(self):
+        self.assertIsInstance(self.s.tracking_store, tracking.TrackingStore)
+
+        tracker = tracking.MessageTracker()
+        msg = aioxmpp.Message(
+            type_=aioxmpp.MessageType.CHAT,
+            from_=TEST_LOCAL,
+            to=TEST_PEER,
+        )
+        self.s.attach_tracker(msg, tracker)
+        self.assertIn(tracker, self.s.tracking_store)
+
+    def test_error_is_matched_by_origin_id(self):
+        tracker = tracking.MessageTracker()
+        msg = aioxmpp.Message(
+            type_=aioxmpp.MessageType.CHAT,
+            from_=TEST_LOCAL,
+            to=TEST_PEER,
+        )
+        msg.xep0359_origin_id = aioxmpp.misc.OriginID("oid")
+        self.s.attach_tracker(msg, tracker)
+
+        error = aioxmpp.Message(
+            type_=aioxmpp.MessageType.ERROR,
+            from_=TEST_PEER,
+            to=TEST_LOCAL,
+            id_="unrelated",
+        )
+        error.xep0359_origin_id = aioxmpp.misc.OriginID("oid")
+
+        self.assertIsNone(self.s._inbound_message_filter(error))
+        self.assertEqual(tracker.state, tracking.MessageState.ERROR)
+        self.assertNotIn(tracker, self.s.tracking_store)
+
+    def test_forged_error_from_other_jid_does_not_change_tracker(self):
+        tracker = tracking.MessageTracker()
+        msg = aioxmpp.Message(
+            type_=aioxmpp.MessageType.CHAT,
+            from_=TEST_LOCAL,
+            to=TEST_PEER,
+        )
+        msg.xep0359_origin_id = aioxmpp.misc.OriginID("oid")
+        self.s.attach_tracker(msg, tracker)
+        self.s.tracking_store.add_stanza_id(tracker, TEST_PEER.bare(), "sid")
+
+        error = aioxmpp.Message(
+            type_=aioxmpp.MessageType.ERROR,
+            from_=TEST_PEER.replace(localpart="other"),
+            to=TEST_LOCAL,
+            id_="unrelated",
+        )
+        error.xep0359_origin_id = aioxmpp.misc.OriginID("oid")
+        error.xep0359_stanza_ids.append(
+            aioxmpp.misc.StanzaID(id_="sid", by=TEST_PEER.bare())
+        )
+
+        self.assertIs(self.s._inbound_message_filter(error), error)
+        self.assertEqual(tracker.state, tracking.MessageState.IN_TRANSIT)
+        self.assertIn(tracker, self.s.tracking_store)
+
     def test_attach_tracker_autocreates_tracker_if_needed(self):
         msg = aioxmpp.Message(
             type_=aioxmpp.MessageType.CHAT,
@@ -20,10 +20,17 @@
 #
 ########################################################################
 
+import asyncio
+import hashlib
+import io
+import pathlib
+import tempfile
+import threading
 import unittest
 
 import aioxmpp
 import aioxmpp.service as service
+import aioxmpp.xml
 
 from aioxmpp.utils import namespaces
 
@@ -39,6 +46,9 @@ from aioxmpp.testutils import (
 TEST_JID1 = aioxmpp.JID.fromstr("foo@baz.bar")
 TEST_JID2 = aioxmpp.JID.fromstr("foo@baz.bar/quux")
 
+TEST_IMAGE = b"\x89PNG\r\n\x1a\n not really a png"
+TEST_IMAGE_SHA1 = hashlib.sha1(TEST_IMAGE).hexdigest()
+
 class TestService(unittest.TestCase):
 
     def setUp(self):
@@ -161,3 +171,209 @@ class TestService(unittest.TestCase):
         self.assertEqual(arg.type_, aioxmpp.IQType.SET)
         self.assertEqual(arg.to, some_jid)
         self.assertIs(arg.payload, vcard)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.cc = make_connected_client()
+        self.cc.local_jid = TEST_JID2
+        self.s = vcard_service.VCardService(
+            self.cc,
+            dependencies={},
+        )
+        self.vcard = vcard_xso.VCard()
+        self.vcard.set_photo_data("image/png", TEST_IMAGE)
+        self.cc.send = CoroutineMock()
+        self.cc.send.side_effect = lambda iq: self._make_reply()
+
+    def tearDown(self):
+        del self.s
+        del self.cc
+
+    def _make_reply(self):
+        buf = io.BytesIO()
+        aioxmpp.xml.write_single_xso(self.vcard, buf)
+        buf.seek(0)
+        return aioxmpp.xml.read_single_xso(buf, vcard_xso.VCard)
+
+    def test_cache_size(self):
+        self.assertEqual(self.s.cache_size, 256)
+        self.s.cache_size = 2
+        self.assertEqual(self.s.cache_size, 2)
+
+    def test_get_vcard_without_photo_hash_always_fetches(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_get_vcard_uses_cache_if_hash_matches(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        result = run_coroutine(self.s.get_vcard(
+            TEST_JID1,
+            photo_hash=TEST_IMAGE_SHA1.upper(),
+        ))
+        self.assertEqual(self.cc.send.call_count, 1)
+        self.assertEqual(result.get_photo_data(), TEST_IMAGE)
+
+    def test_cached_vcard_is_a_copy(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        result = run_coroutine(self.s.get_vcard(
+            TEST_JID1,
+            photo_hash=TEST_IMAGE_SHA1,
+        ))
+        result.clear_photo_data()
+
+        result = run_coroutine(self.s.get_vcard(
+            TEST_JID1,
+            photo_hash=TEST_IMAGE_SHA1,
+        ))
+        self.assertEqual(self.cc.send.call_count, 1)
+        self.assertEqual(result.get_photo_data(), TEST_IMAGE)
+
+    def test_get_vcard_refetches_if_hash_differs(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(TEST_JID1, photo_hash="1234"))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_empty_hash_matches_vcard_without_photo(self):
+        self.vcard.clear_photo_data()
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(TEST_JID1, photo_hash=""))
+        self.assertEqual(self.cc.send.call_count, 1)
+
+    def test_cache_is_per_jid(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(
+            TEST_JID1.replace(localpart="other"),
+            photo_hash=TEST_IMAGE_SHA1,
+        ))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_own_vcard_is_cached_under_bare_jid(self):
+        run_coroutine(self.s.get_vcard())
+        run_coroutine(self.s.get_vcard(photo_hash=TEST_IMAGE_SHA1))
+        run_coroutine(self.s.get_vcard(
+            TEST_JID2.bare(),
+            photo_hash=TEST_IMAGE_SHA1,
+        ))
+        self.assertEqual(self.cc.send.call_count, 1)
+
+    def test_masked_errors_are_cached_as_empty_vcard(self):
+        self.cc.send.side_effect = aioxmpp.XMPPCancelError(
+            aioxmpp.ErrorCondition.ITEM_NOT_FOUND
+        )
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(TEST_JID1, photo_hash=""))
+        self.assertEqual(self.cc.send.call_count, 1)
+
+    def test_set_vcard_invalidates(self):
+        run_coroutine(self.s.get_vcard())
+        run_coroutine(self.s.set_vcard(vcard_xso.VCard()))
+        run_coroutine(self.s.get_vcard(photo_hash=TEST_IMAGE_SHA1))
+        self.assertEqual(self.cc.send.call_count, 3)
+
+    def test_clear_cache(self):
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        self.s.clear_cache()
+        run_coroutine(self.s.get_vcard(TEST_JID1, photo_hash=TEST_IMAGE_SHA1))
+        self.assertEqual(self.cc.send.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        self.s.cache_size = 1
+        run_coroutine(self.s.get_vcard(TEST_JID1))
+        run_coroutine(self.s.get_vcard(TEST_JID2))
+        run_coroutine(self.s.get_vcard(TEST_JID1, photo_hash=TEST_IMAGE_SHA1))
+        self.assertEqual(self.cc.send.call_count, 3)
+
+    def test_photo_is_hashed_lazily(self):
+        with unittest.mock.patch.object(
+                vcard_xso.VCard, "get_photo_data") as get_photo_data:
+            run_coroutine(self.s.get_vcard(TEST_JID1))
+            get_photo_data.assert_not_called()
+
+    def test_persistent_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / "vcards"
+            run_coroutine(self.s.load_cache(path))
+            self.assertTrue(path.is_dir())
+            run_coroutine(self.s.get_vcard(TEST_JID1))
+            run_coroutine(self.s.shutdown())
+
+            s2 = vcard_service.VCardService(self.cc, dependencies={})
+            run_coroutine(s2.load_cache(path))
+            result = run_coroutine(s2.get_vcard(
+                TEST_JID1,
+                photo_hash=TEST_IMAGE_SHA1,
+            ))
+            self.assertEqual(self.cc.send.call_count, 1)
+            self.assertEqual(result.get_photo_data(), TEST_IMAGE)
+
+            run_coroutine(s2.set_vcard(vcard_xso.VCard(), jid=TEST_JID1))
+            s3 = vcard_service.VCardService(self.cc, dependencies={})
+            run_coroutine(s3.load_cache(path))
+            run_coroutine(s3.get_vcard(
+                TEST_JID1,
+                photo_hash=TEST_IMAGE_SHA1,
+            ))
+            self.assertEqual(self.cc.send.call_count, 3)
+
+    def test_get_vcard_does_not_wait_for_cache_write(self):
+        written = threading.Event()
+        release = threading.Event()
+
+        def write_vcard_file(path, vcard):
+            release.wait(5)
+            written.set()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_coroutine(self.s.load_cache(pathlib.Path(tmpdir)))
+            with unittest.mock.patch(
+                    "aioxmpp.vcard.service._write_vcard_file",
+                    new=write_vcard_file):
+                result = run_coroutine(self.s.get_vcard(TEST_JID1))
+                self.assertEqual(result.get_photo_data(), TEST_IMAGE)
+                self.assertFalse(written.is_set())
+
+                release.set()
+                run_coroutine(self.s.shutdown())
+                self.assertTrue(written.is_set())
+
+    def test_set_vcard_removes_file_after_pending_write(self):
+        release = threading.Event()
+
+        def write_vcard_file(path, vcard):
+            release.wait(5)
+            path.write_bytes(b"")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir)
+            run_coroutine(self.s.load_cache(path))
+            with unittest.mock.patch(
+                    "aioxmpp.vcard.service._write_vcard_file",
+                    new=write_vcard_file):
+                run_coroutine(self.s.get_vcard(TEST_JID1))
+                task = asyncio.ensure_future(
+                    self.s.set_vcard(vcard_xso.VCard(), jid=TEST_JID1)
+                )
+                run_coroutine(asyncio.sleep(0.01))
+                release.set()
+                run_coroutine(task)
+
+            self.assertFalse(
+                (path / vcard_service._cache_file_name(TEST_JID1)).exists()
+            )
+
+    def test_corrupt_cache_file_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir)
+            run_coroutine(self.s.load_cache(path))
+            (path / vcard_service._cache_file_name(TEST_JID1)).write_bytes(
+                b"<garbage"
+            )
+
+            with self.assertLogs("aioxmpp.vcard.service", "WARNING"):
+                run_coroutine(self.s.get_vcard(
+                    TEST_JID1,
+                    photo_hash=TEST_IMAGE_SHA1,
+                ))
+            self.assertEqual(self.cc.send.call_count, 1)
@@ -26,6 +26,8 @@ import contextlib
 import copy
 import enum
 import functools
+import pickle
+import types
 import unittest
 import unittest.mock
 
@@ -2435,6 +2437,235 @@ class TestXSOList(unittest.TestCase):
         del self.b_s
 
 
+class TestXSOListIndexed(TestXSOList):
+    def setUp(self):
+        super().setUp()
+        self.l.add_index(type_=True, lang=True, attrs=["foo", "bar"])
+
+    def test_filter_by_generic_attribute_is_dynamic_generator(self):
+        self.a_s[0].foo = "a"
+        self.a_s[1].foo = "b"
+        self.a_s[2].foo = "b"
+
+        gen = self.l.filter(attrs={"foo": "a"})
+        self.a_s[1].foo = "a"
+        self.assertSequenceEqual(list(gen), [self.a_s[0]])
+
+    def _check_copy_has_own_indices(self, copied):
+        self.assertIsNot(copied._indices, self.l._indices)
+
+        new = self.ClsA()
+        new.foo = "a"
+        copied.append(new)
+
+        self.assertSequenceEqual(
+            list(self.l.filter(attrs={"foo": "a"})),
+            [self.a_s[0]],
+        )
+        self.assertEqual(
+            len(list(copied.filter(attrs={"foo": "a"}))),
+            2,
+        )
+        self.assertSequenceEqual(
+            list(self.l.filter(attrs={"foo": "a"})),
+            [self.a_s[0]],
+        )
+
+    def test_copy_does_not_share_indices(self):
+        self.a_s[0].foo = "a"
+        self.l.filter(attrs={"foo": None})
+        copied = copy.copy(self.l)
+        self.assertIsInstance(copied, xso_model.XSOList)
+        self.assertSequenceEqual(copied, self.l)
+        self._check_copy_has_own_indices(copied)
+
+    def test_deepcopy_does_not_share_indices(self):
+        self.a_s[0].foo = "a"
+        self.l.filter(attrs={"foo": None})
+        copied = copy.deepcopy(self.l)
+        self.assertIsInstance(copied, xso_model.XSOList)
+        self.assertEqual(len(copied), len(self.l))
+        self._check_copy_has_own_indices(copied)
+
+    def test_pickle_does_not_share_indices(self):
+        items = xso_model.XSOList(
+            types.SimpleNamespace(foo=i % 2) for i in range(4)
+        )
+        items.add_index(attrs=["foo"])
+        self.assertEqual(len(list(items.filter(attrs={"foo": 1}))), 2)
+
+        unpickled = pickle.loads(pickle.dumps(items))
+        self.assertIsNot(unpickled._indices, items._indices)
+        unpickled.append(types.SimpleNamespace(foo=1))
+        self.assertEqual(len(list(unpickled.filter(attrs={"foo": 1}))), 3)
+        self.assertEqual(len(list(items.filter(attrs={"foo": 1}))), 2)
+
+    def test_filter_by_base_type(self):
+        self.assertSequenceEqual(
+            self.l,
+            self.l.filtered(type_=xso.XSO),
+        )
+        self.assertSequenceEqual(
+            self.l,
+            self.l.filtered(type_=(self.ClsA, self.ClsB)),
+        )
+        self.assertSequenceEqual(
+            [],
+            self.l.filtered(type_=str),
+        )
+
+    def test_filter_by_type_and_attribute(self):
+        self.a_s[0].foo = "a"
+        self.a_s[1].foo = "b"
+        self.b_s[0].bar = "b"
+
+        self.assertSequenceEqual(
+            [self.a_s[1]],
+            self.l.filtered(type_=self.ClsA, attrs={"foo": "b"}),
+        )
+        self.assertSequenceEqual(
+            [],
+            self.l.filtered(type_=self.ClsB, attrs={"foo": "b"}),
+        )
+
+    def test_language_is_chosen_among_working_sequence(self):
+        self.a_s[0].lang = structs.LanguageTag.fromstr("de")
+        self.b_s[0].lang = structs.LanguageTag.fromstr("en")
+        self.b_s[1].lang = structs.LanguageTag.fromstr("fr")
+
+        self.assertSequenceEqual(
+            [self.a_s[0]],
+            self.l.filtered(type_=self.ClsA,
+                            lang=structs.LanguageRange.fromstr("en")),
+        )
+
+    def test_no_languages_yields_nothing(self):
+        self.assertSequenceEqual(
+            [],
+            self.l.filtered(lang=structs.LanguageRange.fromstr("en")),
+        )
+
+    def test_append_and_extend_update_indices(self):
+        self.assertSequenceEqual(self.a_s, self.l.filtered(type_=self.ClsA))
+
+        a1, a2, a3 = self.ClsA(), self.ClsA(), self.ClsA()
+        a1.foo = "x"
+        self.l.append(a1)
+        self.l.extend([a2])
+        self.l += [a3]
+
+        self.assertSequenceEqual(
+            self.a_s + [a1, a2, a3],
+            self.l.filtered(type_=self.ClsA),
+        )
+        self.assertSequenceEqual([a1], self.l.filtered(attrs={"foo": "x"}))
+
+    def test_other_modifications_rebuild_indices(self):
+        def check():
+            self.assertSequenceEqual(
+                [item for item in self.l if isinstance(item, self.ClsB)],
+                self.l.filtered(type_=self.ClsB),
+            )
+
+        check()
+        new_b = self.ClsB()
+        self.l.insert(0, new_b)
+        check()
+        del self.l[1]
+        check()
+        self.l[0] = self.ClsA()
+        check()
+        self.l.reverse()
+        check()
+        self.l.sort(key=lambda item: isinstance(item, self.ClsA))
+        check()
+        self.l.pop()
+        check()
+        self.l.remove(self.b_s[1])
+        check()
+        self.l *= 2
+        check()
+        self.l.clear()
+        check()
+
+    def test_reindex_picks_up_attribute_changes(self):
+        self.a_s[0].foo = "a"
+        self.assertSequenceEqual(
+            [self.a_s[0]],
+            self.l.filtered(attrs={"foo": "a"}),
+        )
+
+        self.a_s[1].foo = "a"
+        self.assertSequenceEqual(
+            [self.a_s[0]],
+            self.l.filtered(attrs={"foo": "a"}),
+        )
+
+        self.l.reindex()
+        self.assertSequenceEqual(
+            [self.a_s[0], self.a_s[1]],
+            self.l.filtered(attrs={"foo": "a"}),
+        )
+
+    def test_unhashable_values_fall_back_to_scanning(self):
+        obj = unittest.mock.Mock()
+        obj.foo = ["a"]
+        self.l.append(obj)
+        self.a_s[0].foo = "a"
+
+        self.assertSequenceEqual(
+            [obj],
+            self.l.filtered(attrs={"foo": ["a"]}),
+        )
+        self.assertSequenceEqual(
+            [self.a_s[0]],
+            self.l.filtered(attrs={"foo": "a"}),
+        )
+
+    def test_unhashable_query_value_falls_back_to_scanning(self):
+        self.assertSequenceEqual(
+            [],
+            self.l.filtered(attrs={"foo": ["a"]}),
+        )
+
+    def test_add_index_keeps_previous_indices(self):
+        self.l.add_index(attrs=["baz"])
+        self.l.filtered(type_=self.ClsA)
+        self.assertTrue(self.l._indices.type_)
+        self.assertEqual(
+            self.l._indices.attr_names,
+            {"foo", "bar", "lang", "baz"},
+        )
+
+    def test_drop_indices(self):
+        self.l.drop_indices()
+        self.assertIsNone(self.l._indices)
+        self.assertSequenceEqual(self.a_s, self.l.filtered(type_=self.ClsA))
+
+    def test_deepcopy(self):
+        self.a_s[0].foo = "a"
+        self.l.filtered(attrs={"foo": "a"})
+
+        l2 = copy.deepcopy(self.l)
+        self.assertIsInstance(l2, xso_model.XSOList)
+        self.assertSequenceEqual(
+            [l2[0]],
+            l2.filtered(attrs={"foo": "a"}),
+        )
+        self.assertIsNot(l2[0], self.a_s[0])
+
+
+class TestXSOListAttributeIndexOnly(TestXSOList):
+    def setUp(self):
+        super().setUp()
+        self.l.add_index(attrs=["foo"])
+
+    test_filter_by_generic_attribute_is_dynamic_generator = (
+        TestXSOListIndexed.
+        test_filter_by_generic_attribute_is_dynamic_generator
+    )
+
+
 class Test_PropBase(unittest.TestCase):
     def setUp(self):
         self.default = object()
@@ -485,6 +485,27 @@ class TestExpr(unittest.TestCase):
             [1, 2]
         )
 
+    def test_compile_defaults_to_eval(self):
+        expr = unittest.mock.Mock()
+        e = self.DummyExpr(mock=expr)
+
+        fn = e.compile()
+        result = fn(unittest.mock.sentinel.ec)
+
+        expr.eval.assert_called_once_with(unittest.mock.sentinel.ec)
+        self.assertEqual(result, expr.eval())
+
+    def test_compile_is_cached(self):
+        e = self.DummyExpr(mock=unittest.mock.Mock())
+
+        with unittest.mock.patch.object(e, "_compile") as _compile:
+            fn1 = e.compile()
+            fn2 = e.compile()
+
+        _compile.assert_called_once_with()
+        self.assertIs(fn1, _compile())
+        self.assertIs(fn1, fn2)
+
     def test_eval_leaf_keeps_mappings(self):
         expr = unittest.mock.Mock()
         expr.eval.return_value = {"1": "2"}
@@ -1776,4 +1797,67 @@ class Test__integration__(unittest.TestCase):
             ]
         )
 
-# foo
+    def test_as_expr_drops_compiled_function(self):
+        expr = xso_query.as_expr(FooXSO.attr)
+        old = expr.compile()
+
+        new_expr = xso_query.as_expr(
+            expr,
+            lhs=xso_query.as_expr(RootXSO.children),
+        )
+
+        self.assertIs(new_expr, expr)
+        self.assertIsNot(new_expr.compile(), old)
+
+    def test_compiled_matches_eval(self):
+        xso = RootXSO()
+        xso.attr = "root"
+
+        f = FooXSO()
+        f.attr = "foo1"
+        xso.children.append(f)
+
+        f = BazXSO()
+        f.attr2 = "baz1"
+        xso.children.append(f)
+
+        f = FooXSO()
+        f.attr = "foo2"
+        xso.children.append(f)
+
+        f = FooXSO()
+        f.attr = "bar1/foo"
+        b = BarXSO()
+        b.child = f
+        xso.children.append(b)
+
+        ec = xso_query.EvaluationContext()
+        ec.set_toplevel_object(xso)
+
+        queries = [
+            RootXSO.children / BarXSO.child / FooXSO.attr,
+            RootXSO.children / FooXSO.attr,
+            RootXSO.children / FooXSO,
+            RootXSO.children / FooXSO[::2],
+            RootXSO.children / FooXSO[1],
+            RootXSO.children / FooXSO[xso_query.where(FooXSO.attr)][:2],
+            RootXSO.children / FooXSO[:2][xso_query.where(FooXSO.attr)],
+            RootXSO.children / FooXSO[
+                xso_query.where(xso_query.not_(FooXSO.attr))
+            ],
+            RootXSO.children / FooXSO[
+                xso_query.where(FooXSO.attr == "foo1")
+            ] / FooXSO.attr,
+            RootXSO.children / FooXSO.attr == "foo2",
+            RootXSO.children / FooXSO.attr == "foo3",
+            xso_query.not_(RootXSO.children / FooXSO.attr == "foo3"),
+            RootXSO.attr,
+        ]
+
+        for query in queries:
+            query = xso_query.as_expr(query)
+            self.assertSequenceEqual(
+                list(query.compile()(ec)),
+                list(query.eval(ec)),
+                query,
+            )
@@ -37,6 +37,7 @@ import pytz
 from datetime import datetime, date, time
 
 import aioxmpp.xso as xso
+import aioxmpp.xso.types as xso_types
 import aioxmpp.structs as structs
 
 
@@ -524,6 +525,51 @@ class TestDateTimeType(unittest.TestCase):
             datetime(1969, 7, 21, 2, 56, 15, tzinfo=pytz.utc)
         )
 
+    def test_parse_negative_offset_with_minutes(self):
+        t = xso.DateTime()
+        self.assertEqual(
+            t.parse("2014-01-26T14:10:10-05:30"),
+            datetime(2014, 1, 26, 19, 40, 10, tzinfo=pytz.utc),
+        )
+
+    def test_parse_short_fraction(self):
+        t = xso.DateTime()
+        self.assertEqual(
+            t.parse("2014-01-26T20:40:10.12Z"),
+            datetime(2014, 1, 26, 20, 40, 10, 120000, tzinfo=pytz.utc),
+        )
+
+    def test_parse_strips_whitespace(self):
+        t = xso.DateTime()
+        self.assertEqual(
+            t.parse(" 2014-01-26T20:40:10Z\n"),
+            datetime(2014, 1, 26, 20, 40, 10, tzinfo=pytz.utc),
+        )
+
+    def test_parse_non_padded_fields(self):
+        t = xso.DateTime()
+        self.assertEqual(
+            t.parse("2014-1-26T20:40:10"),
+            datetime(2014, 1, 26, 20, 40, 10),
+        )
+
+    def test_parse_rejects_invalid_values(self):
+        t = xso.DateTime()
+        for value in ["2014-13-26T20:40:10Z",
+                      "2014-01-26T20:40:10.1234567Z",
+                      "2014-01-26T25:40:10Z",
+                      "2014-01-26"]:
+            with self.assertRaises(ValueError):
+                t.parse(value)
+
+    def test_parse_caches_results(self):
+        t = xso.DateTime()
+        xso_types._parse_datetime.cache_clear()
+        dt1 = t.parse("2014-01-26T20:40:10Z")
+        dt2 = t.parse("2014-01-26T20:40:10Z")
+        self.assertIs(dt1, dt2)
+        self.assertEqual(xso_types._parse_datetime.cache_info().hits, 1)
+
     def test_emit_legacy_format_with_switch(self):
         t = xso.DateTime(legacy=True)
         self.assertEqual(
@@ -621,6 +667,12 @@ class TestTime(unittest.TestCase):
             time(19, 40, 10, tzinfo=pytz.utc),
             t.parse("20:40:10+01:00"))
 
+    def test_parse_negative_offset_with_minutes(self):
+        t = xso.Time()
+        self.assertEqual(
+            time(19, 40, 10, tzinfo=pytz.utc),
+            t.parse("14:10:10-05:30"))
+
     def test_parse_local(self):
         t = xso.Time()
         self.assertEqual(
@@ -1298,6 +1350,37 @@ class TestEnumCDataType(unittest.TestCase):
                 enum_value,
             )
 
+    def test_parse_looks_up_formatted_values_in_table(self):
+        nested_type = xso.Integer()
+        e = xso.EnumCDataType(self.SomeEnum, nested_type)
+        self.assertEqual(e.parse("1"), self.SomeEnum.X)
+
+        with unittest.mock.patch.object(nested_type, "parse") as parse:
+            self.assertIs(e.parse("2"), self.SomeEnum.Y)
+
+        parse.assert_not_called()
+
+    def test_parse_falls_back_for_non_canonical_strings(self):
+        e = xso.EnumCDataType(self.SomeEnum, xso.Integer())
+        self.assertIs(e.parse("03"), self.SomeEnum.Z)
+
+    def test_parse_table_respects_nested_type_parse(self):
+        class E(Enum):
+            X = "Foo"
+
+        e = xso.EnumCDataType(E, xso.String(prepfunc=str.lower))
+        self.assertEqual(e.parse("Foo"), xso.Unknown("foo"))
+
+    def test_parse_table_reset_on_enum_class_change(self):
+        class E(Enum):
+            X = "1"
+
+        e = xso.EnumCDataType(self.SomeEnum, xso.Integer())
+        self.assertIs(e.parse("1"), self.SomeEnum.X)
+        e.enum_class = E
+        e.nested_type = xso.String()
+        self.assertIs(e.parse("1"), E.X)
+
     def test_format_uses_enum_value_and_nested_type(self):
         enum_class = unittest.mock.Mock()
         enum_value = unittest.mock.Mock()
@@ -1742,6 +1825,15 @@ class TestEnumElementType(unittest.TestCase):
                 enum_value,
             )
 
+    def test_unpack_table_reset_on_enum_class_change(self):
+        class E(Enum):
+            X = 1
+
+        e = xso.EnumElementType(self.SomeEnum, self.FancyType())
+        self.assertIs(e.unpack(1), self.SomeEnum.X)
+        e.enum_class = E
+        self.assertIs(e.unpack(1), E.X)
+
     def test_pack_uses_enum_value_and_nested_type(self):
         enum_class = unittest.mock.Mock()
         enum_value = unittest.mock.Mock()